@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import api from '../../services/api';
 import Modal from '../../comun/Modal';
 import './Luxe.css';
@@ -10,7 +10,9 @@ const Clientes = () => {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
     const [searchTerm, setSearchTerm] = useState('');
-    const [pagination, setPagination] = useState({ page: 1, total_pages: 1, total: 0 });
+    const [pagination, setPagination] = useState({ page: 1, total_pages: 1, total: 0, has_more: false });
+    // Paginación por cursor: cursors.current[n] es el cursor para pedir la página n + 1
+    const cursors = useRef([null]);
     const [birthdayFilter, setBirthdayFilter] = useState(false);
 
     // Modals
@@ -50,7 +52,7 @@ const Clientes = () => {
             const response = await api.get('/api/customers/admin/list/', {
                 baseURL: process.env.REACT_APP_LUXE_SERVICE,
                 params: {
-                    page,
+                    cursor: page > 1 ? cursors.current[page - 1] : undefined,
                     search,
                     page_size: 15,
                     birthday_today: birthdayFilter ? 'true' : 'false'
@@ -58,8 +60,17 @@ const Clientes = () => {
             });
 
             if (response.data.status === 'success') {
+                const data = response.data.data.pagination;
+                if (page === 1) cursors.current = [null];
+                cursors.current[page] = data.next_cursor;
                 setCustomers(response.data.data.customers || []);
-                setPagination(response.data.data.pagination);
+                // El total solo viene en la primera página
+                setPagination(prev => ({
+                    page,
+                    total: data.total ?? prev.total,
+                    total_pages: data.total_pages ?? prev.total_pages,
+                    has_more: data.has_more
+                }));
             }
         } catch (err) {
             console.error('Error fetching customers:', err);
@@ -227,6 +238,23 @@ const Clientes = () => {
             });
 
             setImportResults(res.data);
+
+            // La importación corre en segundo plano: consultar el avance del job
+            let job = res.data;
+            while (job.job_id && ['pending', 'running'].includes(job.job_status)) {
+                await new Promise(resolve => setTimeout(resolve, 2000));
+                const jobRes = await api.get(`/api/customers/admin/import-excel/jobs/${job.job_id}/`, {
+                    baseURL: process.env.REACT_APP_LUXE_SERVICE
+                });
+                const data = jobRes.data.data;
+                job = { job_id: data.job_id, job_status: data.status };
+                setImportResults({
+                    status: data.status === 'failed' ? 'error' : 'success',
+                    message: data.message || `Procesando... ${data.processed_rows}/${data.total_rows} filas (${data.progress}%)`,
+                    errors: data.errors
+                });
+            }
+
             if (res.data.status === 'success') {
                 setTimeout(() => {
                     fetchCustomers();
@@ -451,7 +479,7 @@ const Clientes = () => {
                             </span>
                             <button
                                 className="btn-boutique outline"
-                                disabled={pagination.page === pagination.total_pages}
+                                disabled={!pagination.has_more}
                                 onClick={() => fetchCustomers(pagination.page + 1, searchTerm)}
                             >
                                 Siguiente
@@ -215,18 +215,13 @@ const Etiquetas = () => {
 
         setPrinting(true);
         try {
-            const productsToSend = selectedProducts.map(p => {
-                return {
-                    name: p.name,
-                    code: p.code,
-                    price: parseFloat(p.price).toFixed(2)
-                };
-            });
+            const productIds = selectedProducts.map(p => p.id);
 
-            const result = await printerService.printLabels(productsToSend, copies);
+            const result = await printerService.printLabels(productIds, copies);
 
             if (result.status === 'success') {
-                alert(`✅ ${selectedProducts.length} etiqueta(s) enviada(s) al Bot!\nJob: ${result.job_number}`);
+                const chunks = result.chunks > 1 ? ` en ${result.chunks} bloques` : '';
+                alert(`✅ ${selectedProducts.length} etiqueta(s) enviada(s) al Bot${chunks}!\nJob: ${result.job_number}`);
                 setSelectedProducts([]);
             } else {
                 alert(`Error: ${result.message || 'Error desconocido'}`);
@@ -88,7 +88,7 @@ const Impresoras = () => {
         try {
             // Create a test print job
             const testContent = printer.printer_type === 'label'
-                ? { products: [{ name: 'PRUEBA', code: '12345678', price: 1.00 }], copies: 1 }
+                ? { test: true, copies: 1 }
                 : { order: { items: [{ name: 'Producto de Prueba', quantity: 1, price: 1.00 }], total: 1.00 } };
 
             const endpoint = printer.printer_type === 'label'
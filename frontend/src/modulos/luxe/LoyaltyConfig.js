@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import api from '../../services/api';
+import { runLoyaltyReprocess, describeReprocessPreview } from '../../services/loyaltyReprocess';
 import './Loyalty.css';
 
 const LoyaltyConfig = () => {
@@ -174,15 +175,20 @@ const LoyaltyConfig = () => {
     };
 
     const handleReprocess = async () => {
-        if (!window.confirm("¡ATENCIÓN! Esto ELIMINARÁ todos los puntos actuales y los RECALCULARÁ desde cero. ¿Deseas continuar?")) return;
         try {
             setLoading(true);
-            const res = await api.post('/api/loyalty/config/earning-rules/reprocess_past_orders/', {}, { baseURL: '/api/luxe' });
-            alert(`Sincronización Exitosa:\n- Órdenes procesadas: ${res.data.orders_processed}\n- Cuentas actualizadas: ${res.data.accounts_updated}`);
+            // Primero una simulación para mostrar qué va a cambiar
+            const preview = await runLoyaltyReprocess(true);
+            setLoading(false);
+            if (!window.confirm(`${describeReprocessPreview(preview)}\n\n¡ATENCIÓN! Esto ELIMINARÁ todos los puntos actuales y los RECALCULARÁ desde cero. ¿Deseas continuar?`)) return;
+
+            setLoading(true);
+            const job = await runLoyaltyReprocess(false);
+            alert(`Sincronización Exitosa:\n- Órdenes procesadas: ${job.orders_processed}\n- Cuentas actualizadas: ${job.accounts_updated}`);
             loadData();
         } catch (error) {
             console.error("Error al reprocesar:", error);
-            alert("Error al sincronizar puntos.");
+            alert(error.response?.data?.error || "Error al sincronizar puntos.");
         } finally {
             setLoading(false);
         }
@@ -110,9 +110,7 @@ const SistemaEtiquetas = () => {
         setTestResult(null);
         try {
             const response = await api.post('/api/hardware/print/label/', {
-                products: [
-                    { name: 'PRUEBA ETIQUETA', code: '12345678', price: 9.99 }
-                ],
+                test: true,
                 copies: 1,
                 printer_id: printer.id
             }, { baseURL: LUXE_URL });
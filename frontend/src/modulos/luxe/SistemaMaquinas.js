@@ -130,7 +130,7 @@ const SistemaMaquinas = () => {
             let response;
             if (activeTab === 'label') {
                 response = await api.post('/api/hardware/print/label/', {
-                    products: [{ name: 'PRUEBA ETIQUETA', code: '12345678', price: 9.99 }],
+                    test: true,
                     copies: 1,
                     printer_id: printer.id
                 }, { baseURL: LUXE_URL });
@@ -0,0 +1,32 @@
+// src/services/loyaltyReprocess.js
+import api from './api';
+
+const REPROCESS_URL = '/api/loyalty/config/earning-rules';
+const OPTIONS = { baseURL: '/api/luxe' };
+
+// Encola el reproceso de puntos y espera a que el job termine
+export async function runLoyaltyReprocess(dryRun = false) {
+  const res = await api.post(`${REPROCESS_URL}/reprocess_past_orders/`, { dry_run: dryRun }, OPTIONS);
+  let job = res.data;
+  while (['pending', 'running'].includes(job.job_status)) {
+    await new Promise(resolve => setTimeout(resolve, 2000));
+    const jobRes = await api.get(`${REPROCESS_URL}/reprocess_jobs/${job.job_id}/`, OPTIONS);
+    job = jobRes.data;
+  }
+  if (job.job_status === 'failed') {
+    throw new Error(job.message);
+  }
+  return job;
+}
+
+// Texto para confirmar a partir del resultado de una simulación
+export function describeReprocessPreview(job) {
+  const orders = job.summary?.orders || {};
+  return [
+    `Órdenes que ganan puntos: ${orders.added || 0}`,
+    `Órdenes con puntos distintos: ${orders.changed || 0}`,
+    `Órdenes que pierden puntos: ${(orders.removed || 0) + (orders.orphans || 0)}`,
+    `Cuentas afectadas: ${job.summary?.accounts_affected || 0}`,
+    `Diferencia total: ${job.summary?.points_delta || 0} puntos`,
+  ].join('\n');
+}
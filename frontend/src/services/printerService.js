@@ -39,10 +39,11 @@ class PrinterService {
     }
   }
 
-  async printLabels(products, copies = 1, printerId = null) {
+  // productIds: ids de producto; nombre, código y precio se leen en el servidor
+  async printLabels(productIds, copies = 1, printerId = null) {
     try {
       const response = await api.post(`${PRINTER_API_URL}/print/label/`, {
-        products: products,
+        product_ids: productIds,
         copies: copies,
         printer_id: printerId
       });
@@ -52,6 +53,16 @@ class PrinterService {
       throw error;
     }
   }
+
+  async getLabelBatch(batchId) {
+    const response = await api.get(`${PRINTER_API_URL}/print/label/batches/${batchId}/`);
+    return response.data;
+  }
+
+  async resumeLabelBatch(batchId) {
+    const response = await api.post(`${PRINTER_API_URL}/print/label/batches/${batchId}/resume/`);
+    return response.data;
+  }
 }
 
 const printerServiceInstance = new PrinterService();
@@ -4,7 +4,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from .models import (
     Customer, CustomerAddress, CustomerNote,
-    CustomerLoyalty, CustomerLoyaltyHistory, CustomerDevice
+    CustomerLoyalty, CustomerLoyaltyHistory, CustomerDevice, CustomerImportJob
 )
 
 class CustomerAddressInline(admin.TabularInline):
@@ -239,3 +239,11 @@ class CustomerDeviceAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['last_used', 'created_at']
+
+
+@admin.register(CustomerImportJob)
+class CustomerImportJobAdmin(admin.ModelAdmin):
+    list_display = ('original_filename', 'status', 'processed_rows', 'created_count', 'updated_count', 'error_count', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('original_filename', 'created_by')
+    readonly_fields = ('started_at', 'finished_at', 'errors')
@@ -0,0 +1,330 @@
+"""
+apps/customers/identity.py
+
+Identidad de clientes: resolución, detección de duplicados y fusión.
+
+La identidad se compara siempre sobre las columnas normalizadas que mantiene
+el trigger de la migración 0005 (email_normalized = lower(trim(email)),
+cedula_normalized, phone_normalized = solo dígitos), todas indexadas:
+
+- resolve_customer() busca por email, cédula y teléfono en una sola consulta
+  (OR de igualdades indexadas) y elige según la prioridad pedida.
+- find_duplicate_clusters() agrupa candidatos por claves de bloqueo (cédula,
+  email, últimos 9 dígitos del teléfono, nombre + fecha de nacimiento) con
+  una consulta GROUP BY por clave y une los grupos que comparten clientes.
+- merge_customers() mueve órdenes, direcciones, notas, cupones, usos de
+  descuento y puntos al cliente principal con UPDATEs por tabla y elimina
+  los duplicados.
+
+Los emails generados por el importador (@sincorreo.com) son únicos pero no
+identifican a nadie: no se usan como clave de bloqueo al buscar duplicados.
+"""
+
+import logging
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum, UniqueConstraint
+from django.db.models.functions import Length, Right
+
+from .models import Customer, CustomerAddress, CustomerLoyalty, CustomerLoyaltyHistory, CustomerNote
+from .search import digits_only, normalize_cedula, normalize_email, phone_variants
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_EMAIL_DOMAINS = ('sincorreo.com',)
+
+# Valores de relleno que llegan en formularios e integraciones
+INVALID_IDENTITY_VALUES = {'', 'none', 'null', 'undefined', '-', '.', '0000000000', '9999999999', '9999999999999'}
+
+MIN_PHONE_DIGITS = 7
+# Celulares y fijos de Ecuador: 9 dígitos sin el 0 ni el 593
+PHONE_KEY_DIGITS = 9
+
+DEFAULT_PRIORITY = ('cedula', 'email', 'phone')
+
+# Campos que el principal toma de un duplicado si los tiene vacíos
+FILL_FIELDS = ['cedula', 'phone', 'razon_social', 'birth_date', 'gender', 'address', 'city', 'state', 'zip_code']
+
+
+# ============================================================================
+# NORMALIZACIÓN
+# ============================================================================
+
+def is_placeholder_email(email):
+    return normalize_email(email).rsplit('@', 1)[-1] in PLACEHOLDER_EMAIL_DOMAINS
+
+
+def identity_keys(email=None, cedula=None, phone=None):
+    """Claves normalizadas válidas: {'email': ..., 'cedula': ..., 'phone': [...]}"""
+    keys = {}
+
+    email = normalize_email(email)
+    if '@' in email:
+        keys['email'] = email
+
+    if str(cedula or '').strip().lower() not in INVALID_IDENTITY_VALUES:
+        cedula = normalize_cedula(str(cedula))
+        if cedula and cedula.strip('0') and cedula.strip('9'):
+            keys['cedula'] = cedula
+
+    if str(phone or '').strip().lower() not in INVALID_IDENTITY_VALUES:
+        digits = digits_only(str(phone))
+        if len(digits) >= MIN_PHONE_DIGITS:
+            keys['phone'] = sorted(phone_variants(digits))
+
+    return keys
+
+
+# ============================================================================
+# RESOLUCIÓN
+# ============================================================================
+
+def identity_candidates(email=None, cedula=None, phone=None, queryset=None):
+    """
+    Clientes que coinciden con alguna de las claves (una consulta). Retorna
+    (clientes, claves); cada cliente queda con `matched_by` = campos que coinciden.
+    """
+    keys = identity_keys(email, cedula, phone)
+    condition = Q()
+    if 'email' in keys:
+        condition |= Q(email_normalized=keys['email'])
+    if 'cedula' in keys:
+        condition |= Q(cedula_normalized=keys['cedula'])
+    if 'phone' in keys:
+        condition |= Q(phone_normalized__in=keys['phone'])
+    if not condition:
+        return [], keys
+
+    queryset = queryset if queryset is not None else Customer.objects.all()
+    candidates = list(queryset.filter(condition).order_by('created_at')[:20])
+    for customer in candidates:
+        customer.matched_by = {
+            field for field, matches in (
+                ('email', customer.email_normalized == keys.get('email')),
+                ('cedula', customer.cedula_normalized == keys.get('cedula')),
+                ('phone', customer.phone_normalized in keys.get('phone', ())),
+            ) if matches
+        }
+    return candidates, keys
+
+
+def resolve_customer(email=None, cedula=None, phone=None, priority=DEFAULT_PRIORITY, queryset=None):
+    """
+    Cliente que corresponde a los datos recibidos, o None. Retorna
+    (cliente, campo_que_coincidió). `priority` define qué clave gana cuando
+    distintas claves apuntan a clientes distintos.
+    """
+    candidates, _ = identity_candidates(email, cedula, phone, queryset=queryset)
+    for field in priority:
+        for customer in candidates:
+            if field in customer.matched_by:
+                return customer, field
+    return None, None
+
+
+# ============================================================================
+# DETECCIÓN DE DUPLICADOS
+# ============================================================================
+
+def _blocking_groups(queryset):
+    """Grupos de ids que comparten cada clave de bloqueo (una consulta por clave)"""
+    real_email = ~Q(email_normalized='')
+    for domain in PLACEHOLDER_EMAIL_DOMAINS:
+        real_email &= ~Q(email_normalized__endswith=f'@{domain}')
+
+    blocks = {
+        'cedula': queryset.exclude(cedula_normalized='').values('cedula_normalized'),
+        'email': queryset.filter(real_email).values('email_normalized'),
+        'phone': queryset.annotate(phone_key=Right('phone_normalized', PHONE_KEY_DIGITS)).filter(
+            phone_normalized__regex=rf'^\d{{{MIN_PHONE_DIGITS},}}$'
+        ).values('phone_key'),
+        'name_birth_date': queryset.exclude(search_name='').filter(
+            birth_date__isnull=False, search_name__contains=' '
+        ).annotate(name_length=Length('search_name')).filter(name_length__gte=8).values('search_name', 'birth_date'),
+    }
+    for key, grouped in blocks.items():
+        rows = grouped.order_by().annotate(total=Count('id'), ids=ArrayAgg('id')).filter(total__gt=1)
+        for row in rows.iterator(chunk_size=2000):
+            yield key, row['ids']
+
+
+def find_duplicate_clusters(queryset=None, limit=None):
+    """
+    Clusters de posibles duplicados: [{'ids': [...], 'keys': [...]}]. Los
+    grupos de distintas claves que comparten clientes se unen (union-find).
+    """
+    queryset = queryset if queryset is not None else Customer.objects.all()
+
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    group_keys = []
+    for key, ids in _blocking_groups(queryset):
+        root = find(ids[0])
+        for other in ids[1:]:
+            parent[find(other)] = root
+        group_keys.append((ids[0], key))
+
+    clusters = {}
+    for node in list(parent):
+        clusters.setdefault(find(node), {'ids': [], 'keys': set()})['ids'].append(node)
+    for node, key in group_keys:
+        clusters[find(node)]['keys'].add(key)
+
+    result = sorted(
+        ({'ids': sorted(cluster['ids'], key=str), 'keys': sorted(cluster['keys'])} for cluster in clusters.values()),
+        key=lambda cluster: -len(cluster['ids'])
+    )
+    return result[:limit] if limit else result
+
+
+def choose_primary(customers):
+    """El que tiene email real y más órdenes; en empate, el más antiguo"""
+    return sorted(
+        customers,
+        key=lambda c: (is_placeholder_email(c.email), -c.total_orders, c.created_at),
+    )[0]
+
+
+# ============================================================================
+# FUSIÓN
+# ============================================================================
+
+def _customer_unique_sets(relation):
+    """Campos (sin el cliente) de cada clave única del modelo que incluye al cliente"""
+    model, field = relation.related_model, relation.field
+    unique_sets = [tuple(fields) for fields in model._meta.unique_together]
+    unique_sets += [
+        tuple(constraint.fields) for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.fields and constraint.condition is None
+    ]
+    return [
+        tuple(name for name in fields if name not in (field.name, field.attname))
+        for fields in unique_sets if field.name in fields or field.attname in fields
+    ]
+
+
+def _drop_conflicting_rows(relation, primary, duplicate_ids):
+    """
+    Borra las filas de los duplicados que violarían una clave única
+    (cliente, ...) al pasar al principal: las que ya tiene el principal y,
+    entre duplicados, todas menos la de menor pk.
+    """
+    model, field = relation.related_model, relation.field.name
+    manager = model._base_manager
+    for others in _customer_unique_sets(relation):
+        if not others:
+            continue
+        same_values = {name: OuterRef(name) for name in others}
+        in_primary = manager.filter(**{field: primary}, **same_values)
+        in_earlier_duplicate = manager.filter(
+            **{f'{field}__in': duplicate_ids}, pk__lt=OuterRef('pk'), **same_values
+        )
+        deleted, _ = manager.filter(**{f'{field}__in': duplicate_ids}).filter(
+            Exists(in_primary) | Exists(in_earlier_duplicate)
+        ).delete()
+        if deleted:
+            logger.info(f'Fusión {primary.pk}: {deleted} {model.__name__} repetidos descartados')
+
+
+def merge_customers(primary, duplicates, merged_by=''):
+    """
+    Fusiona `duplicates` en `primary` y los elimina. Las relaciones se mueven
+    con un UPDATE por tabla; los puntos de ambos sistemas de fidelidad se
+    suman en la cuenta del principal. Retorna el principal actualizado.
+    """
+    from apps.loyalty.models import LoyaltyAccount, PointTransaction
+    from .stats import reconcile_customer_stats
+
+    duplicate_ids = [c.pk for c in duplicates if c.pk != primary.pk]
+    if not duplicate_ids:
+        return primary
+
+    with transaction.atomic():
+        primary = Customer.objects.select_for_update().get(pk=primary.pk)
+        duplicates = list(Customer.objects.select_for_update().filter(pk__in=duplicate_ids).order_by('created_at'))
+        duplicate_ids = [c.pk for c in duplicates]
+
+        # Solo una dirección principal por tipo: la del cliente que queda
+        primary_defaults = primary.addresses.filter(is_default=True).values('address_type')
+        CustomerAddress.objects.filter(
+            customer_id__in=duplicate_ids, is_default=True, address_type__in=primary_defaults
+        ).update(is_default=False)
+
+        # Relaciones ForeignKey (órdenes, direcciones, notas, dispositivos,
+        # cupones, usos de descuento): un UPDATE por tabla. Antes se borran
+        # las filas que chocarían con una clave única que incluye al cliente
+        # (p. ej. el mismo dispositivo registrado en dos duplicados).
+        for relation in Customer._meta.related_objects:
+            if relation.one_to_many:
+                _drop_conflicting_rows(relation, primary, duplicate_ids)
+                relation.related_model._base_manager.filter(
+                    **{f'{relation.field.name}__in': duplicate_ids}
+                ).update(**{relation.field.name: primary})
+
+        # Fidelidad (app loyalty): mover transacciones y sumar saldos
+        accounts = LoyaltyAccount.objects.filter(customer_id__in=duplicate_ids)
+        totals = accounts.aggregate(balance=Sum('points_balance'), earned=Sum('total_points_earned'))
+        if totals['balance'] is not None:
+            account, _ = LoyaltyAccount.objects.get_or_create(customer=primary)
+            PointTransaction.objects.filter(account__in=accounts).update(account=account)
+            LoyaltyAccount.objects.filter(pk=account.pk).update(
+                points_balance=F('points_balance') + totals['balance'],
+                total_points_earned=F('total_points_earned') + totals['earned'],
+            )
+            accounts.delete()
+
+        # Fidelidad (sistema anterior de customers)
+        old_loyalty = CustomerLoyalty.objects.filter(customer_id__in=duplicate_ids)
+        old_totals = old_loyalty.aggregate(
+            balance=Sum('points_balance'),
+            earned=Sum('total_points_earned'),
+            redeemed=Sum('total_points_redeemed'),
+        )
+        if old_totals['balance'] is not None:
+            loyalty, _ = CustomerLoyalty.objects.get_or_create(customer=primary)
+            CustomerLoyaltyHistory.objects.filter(loyalty__in=old_loyalty).update(loyalty=loyalty)
+            CustomerLoyalty.objects.filter(pk=loyalty.pk).update(
+                points_balance=F('points_balance') + old_totals['balance'],
+                total_points_earned=F('total_points_earned') + old_totals['earned'],
+                total_points_redeemed=F('total_points_redeemed') + old_totals['redeemed'],
+            )
+            old_loyalty.delete()
+
+        # Datos de contacto que el principal no tiene (antes de borrar los
+        # duplicados se liberan los valores únicos)
+        fill = {}
+        for field in FILL_FIELDS:
+            if getattr(primary, field):
+                continue
+            for duplicate in duplicates:
+                if getattr(duplicate, field):
+                    fill[field] = getattr(duplicate, field)
+                    break
+
+        Customer.objects.filter(pk__in=duplicate_ids).delete()
+
+        if fill:
+            for field, value in fill.items():
+                setattr(primary, field, value)
+            primary.save(update_fields=list(fill) + ['updated_at'])
+
+        CustomerNote.objects.create(
+            customer=primary,
+            note_type='general',
+            content='Fusionado con: ' + ', '.join(f'{c.get_full_name()} <{c.email}>' for c in duplicates),
+            created_by_name=merged_by[:100],
+        )
+
+        reconcile_customer_stats(Customer.objects.filter(pk=primary.pk))
+
+    logger.info(f'Cliente {primary.pk}: fusionados {len(duplicate_ids)} duplicados')
+    primary.refresh_from_db()
+    return primary
@@ -0,0 +1,425 @@
+"""
+apps/customers/importer.py
+
+Motor de importación masiva de clientes desde Excel (formato del sistema
+anterior: DNI, Razón Social, Nombre, Correo, Teléfonos, Dirección,
+CUMPLEAÑOS).
+
+- Lee el archivo en modo streaming (openpyxl read_only).
+- Normaliza cédula y email con las mismas reglas del trigger de la
+  migración 0005 y empareja contra cedula_normalized / email_normalized.
+  Por bloque se hacen dos consultas IN (cédulas y emails que aún no están
+  en el mapa en memoria); el mapa también une las filas repetidas dentro
+  del archivo.
+- Igual que antes: se busca por cédula y luego por email, y a los clientes
+  existentes solo se les completan los campos vacíos.
+- Escribe por bloques con bulk_create / bulk_update. La señal post_save no
+  se dispara, así que el CustomerLoyalty de los nuevos se crea aquí. Si un
+  bloque falla por integridad (teléfono repetido, etc.) se reintenta fila
+  por fila para aislar los errores.
+"""
+
+import logging
+import re
+import uuid
+from datetime import date, datetime
+
+import openpyxl
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .kpis import invalidate_customer_stats
+from .models import Customer, CustomerLoyalty
+from .search import normalize_cedula, normalize_email
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Campo -> encabezado de la columna
+COLUMNS = {
+    'cedula': 'DNI',
+    'razon_social': 'Razón Social',
+    'name': 'Nombre',
+    'email': 'Correo',
+    'phone': 'Teléfonos',
+    'address': 'Dirección',
+    'birth_date': 'CUMPLEAÑOS',
+}
+
+# Campos que se completan en clientes existentes (solo si están vacíos)
+FILL_FIELDS = ['cedula', 'phone', 'razon_social', 'address', 'birth_date']
+
+# Mismo valor que usaba el importador anterior (contraseña no utilizable)
+IMPORTED_PASSWORD = '!Imported123'
+PLACEHOLDER_EMAIL_DOMAIN = 'sincorreo.com'
+
+LOAD_FIELDS = ['id', 'email', 'cedula_normalized', 'email_normalized'] + FILL_FIELDS
+
+PHONE_SEPARATORS = re.compile(r'[/,;|]')
+
+
+def _text(value, max_length=None):
+    """Texto de una celda; None, 'None' y 'nan' cuentan como vacío"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    if text.lower() in ('none', 'nan'):
+        return ''
+    return text[:max_length] if max_length else text
+
+
+def _cedula(value):
+    """
+    Cédula / RUC normalizada. Excel guarda las numéricas sin el cero inicial
+    (0912345678 -> 912345678): se completa si quedan con 9 o 12 dígitos.
+    """
+    cedula = normalize_cedula(_text(value))
+    if isinstance(value, (int, float)) and len(cedula) in (9, 12):
+        cedula = '0' + cedula
+    return cedula[:20]
+
+
+def _phone(value):
+    """Primer teléfono de la celda ('0991234567 / 042123456')"""
+    phone = PHONE_SEPARATORS.split(_text(value))[0].strip()
+    return phone[:20] or None
+
+
+def _birth_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    if not text:
+        return None
+    try:
+        from dateutil import parser
+        return parser.parse(text).date()
+    except (ValueError, OverflowError):
+        return None
+
+
+def _split_name(full_name):
+    """Mismo criterio del sistema anterior: 'APELLIDO1 APELLIDO2 NOMBRES'"""
+    parts = full_name.split()
+    if len(parts) >= 3:
+        return ' '.join(parts[2:]), f'{parts[0]} {parts[1]}'
+    if len(parts) == 2:
+        return parts[1], parts[0]
+    return '.', full_name
+
+
+class CustomerImporter:
+    """
+    Ejecuta una importación. `on_progress(importer)` se llama después de
+    cada bloque para reportar avance.
+    """
+
+    def __init__(self, file_obj, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+        self.file_obj = file_obj
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+
+        self.total_rows = 0
+        self.processed_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []
+        self._pending_errors = []
+
+        # Identidad normalizada -> id del cliente (BD o creado en esta importación)
+        self.by_cedula = {}
+        self.by_email = {}
+        self.headers = {}
+
+    # ------------------------------------------------------------------
+    # Filas
+    # ------------------------------------------------------------------
+
+    def _read_headers(self, row):
+        headers = {str(cell).strip(): idx for idx, cell in enumerate(row or []) if cell}
+        self.headers = {field: headers[title] for field, title in COLUMNS.items() if title in headers}
+        if not {'cedula', 'name', 'razon_social'} & set(self.headers):
+            raise ValueError(
+                'El archivo no tiene las columnas esperadas: ' + ', '.join(COLUMNS.values())
+            )
+
+    def _cell(self, row, field):
+        idx = self.headers.get(field)
+        if idx is None or idx >= len(row):
+            return None
+        return row[idx]
+
+    def _parse(self, row):
+        razon_social = _text(self._cell(row, 'razon_social'), 255)
+        full_name = _text(self._cell(row, 'name')) or razon_social or 'Cliente Sin Nombre'
+        first_name, last_name = _split_name(full_name)
+
+        email = normalize_email(_text(self._cell(row, 'email')))
+        if '@' not in email or len(email) > 254:
+            email = ''
+
+        return {
+            'cedula': _cedula(self._cell(row, 'cedula')),
+            'razon_social': razon_social or None,
+            'first_name': first_name[:50],
+            'last_name': last_name[:50],
+            'email': email,
+            'phone': _phone(self._cell(row, 'phone')),
+            'address': _text(self._cell(row, 'address')),
+            'birth_date': _birth_date(self._cell(row, 'birth_date')),
+        }
+
+    def _match(self, data):
+        """Mismo orden que el importador anterior: cédula, luego email"""
+        if data['cedula'] and data['cedula'] in self.by_cedula:
+            return self.by_cedula[data['cedula']]
+        if data['email']:
+            return self.by_email.get(data['email'])
+        return None
+
+    def _index(self, customer):
+        cedula = normalize_cedula(customer.cedula)
+        if cedula:
+            self.by_cedula.setdefault(cedula, customer.id)
+        email = normalize_email(customer.email)
+        if email:
+            self.by_email.setdefault(email, customer.id)
+
+    def _unindex(self, customer):
+        for index, key in ((self.by_cedula, normalize_cedula(customer.cedula)),
+                           (self.by_email, normalize_email(customer.email))):
+            if key and index.get(key) == customer.id:
+                del index[key]
+
+    def _load(self, parsed):
+        """
+        Clientes existentes para las identidades del bloque: una consulta IN
+        por cédulas y otra por emails (más los ya emparejados en bloques
+        anteriores que vuelven a aparecer).
+        """
+        cedulas = {data['cedula'] for _, data in parsed if data['cedula'] and data['cedula'] not in self.by_cedula}
+        emails = {data['email'] for _, data in parsed if data['email'] and data['email'] not in self.by_email}
+        known_ids = {self._match(data) for _, data in parsed} - {None}
+
+        loaded = {}
+        if cedulas:
+            for customer in Customer.objects.filter(cedula_normalized__in=cedulas).only(*LOAD_FIELDS):
+                loaded[customer.id] = customer
+        if emails or known_ids:
+            for customer in Customer.objects.filter(
+                Q(email_normalized__in=emails) | Q(id__in=known_ids)
+            ).only(*LOAD_FIELDS):
+                loaded[customer.id] = customer
+
+        for customer in loaded.values():
+            if customer.cedula_normalized:
+                self.by_cedula.setdefault(customer.cedula_normalized, customer.id)
+            if customer.email_normalized:
+                self.by_email.setdefault(customer.email_normalized, customer.id)
+        return loaded
+
+    @staticmethod
+    def _new_customer(data):
+        email = data['email']
+        if not email:
+            clean_name = ''.join(c for c in data['first_name'] if c.isalnum()).lower()[:40]
+            email = f'{clean_name}{uuid.uuid4().hex[:8]}@{PLACEHOLDER_EMAIL_DOMAIN}'
+        return Customer(
+            email=email,
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            cedula=data['cedula'] or None,
+            razon_social=data['razon_social'],
+            phone=data['phone'],
+            address=data['address'],
+            birth_date=data['birth_date'],
+            password=IMPORTED_PASSWORD,
+            customer_type='regular',
+            is_active=True,
+        )
+
+    @staticmethod
+    def _fill(customer, data):
+        """Completa los campos vacíos; retorna True si algo cambió"""
+        changed = False
+        for field in FILL_FIELDS:
+            value = data[field]
+            if value and not getattr(customer, field):
+                setattr(customer, field, value)
+                changed = True
+        return changed
+
+    # ------------------------------------------------------------------
+    # Bloques
+    # ------------------------------------------------------------------
+
+    def _process_chunk(self, rows):
+        parsed = []
+        for row_number, row in rows:
+            try:
+                parsed.append((row_number, self._parse(row)))
+            except Exception as e:
+                self._error(row_number, e)
+
+        loaded = self._load(parsed)
+        now = timezone.now()
+
+        to_create, to_update = {}, {}
+        for row_number, data in parsed:
+            try:
+                customer_id = self._match(data)
+                if customer_id is None:
+                    customer = self._new_customer(data)
+                    to_create[customer.id] = (row_number, customer)
+                    self.created += 1
+                else:
+                    pending = to_create.get(customer_id) or to_update.get(customer_id)
+                    customer = pending[1] if pending else loaded.get(customer_id)
+                    if customer is None:
+                        raise ValueError('El cliente emparejado ya no existe')
+                    if self.by_cedula.get(data['cedula'], customer_id) != customer_id:
+                        # Emparejado por email, pero la cédula ya es de otro cliente
+                        data = {**data, 'cedula': ''}
+                    if self._fill(customer, data):
+                        customer.updated_at = now
+                        if customer_id not in to_create:
+                            to_update[customer_id] = (row_number, customer)
+                        self.updated += 1
+                    else:
+                        self.unchanged += 1
+                self._index(customer)
+            except Exception as e:
+                self._error(row_number, e)
+
+        self._write(list(to_create.values()), list(to_update.values()))
+
+    @staticmethod
+    def _save(created, updated):
+        Customer.objects.bulk_create(created, batch_size=500)
+        CustomerLoyalty.objects.bulk_create(
+            [CustomerLoyalty(customer=customer) for customer in created], batch_size=500
+        )
+        Customer.objects.bulk_update(updated, FILL_FIELDS + ['updated_at'], batch_size=500)
+
+    def _write(self, to_create, to_update):
+        try:
+            with transaction.atomic():
+                self._save([c for _, c in to_create], [c for _, c in to_update])
+            return
+        except IntegrityError as e:
+            logger.warning(f'Bloque de importación de clientes con conflicto, reintentando por fila: {e}')
+
+        # Aislar las filas conflictivas sin perder el resto del bloque
+        for is_new, items in ((True, to_create), (False, to_update)):
+            for row_number, customer in items:
+                try:
+                    with transaction.atomic():
+                        self._save([customer] if is_new else [], [] if is_new else [customer])
+                except IntegrityError as e:
+                    self._unindex(customer)
+                    if is_new:
+                        self.created -= 1
+                    else:
+                        self.updated -= 1
+                    self._error(row_number, e)
+
+    def _error(self, row_number, error):
+        self._pending_errors.append({'row': row_number, 'error': str(error)})
+
+    def pop_errors(self):
+        """Errores acumulados desde la última llamada"""
+        errors, self._pending_errors = self._pending_errors, []
+        self.errors.extend(errors)
+        return errors
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def run(self):
+        workbook = openpyxl.load_workbook(self.file_obj, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            self.total_rows = max((sheet.max_row or 1) - 1, 0)
+
+            rows = sheet.iter_rows(values_only=True)
+            self._read_headers(next(rows, None))
+
+            chunk = []
+            for row_number, row in enumerate(rows, start=2):
+                if not any(cell not in (None, '') for cell in row):
+                    continue
+                chunk.append((row_number, row))
+                if len(chunk) >= self.chunk_size:
+                    self._run_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self._run_chunk(chunk)
+        finally:
+            workbook.close()
+
+        # bulk_create / bulk_update no disparan señales
+        invalidate_customer_stats()
+        return self
+
+    def _run_chunk(self, chunk):
+        self._process_chunk(chunk)
+        self.processed_rows += len(chunk)
+        self.total_rows = max(self.total_rows, self.processed_rows)
+        if self.on_progress:
+            self.on_progress(self)
+
+    @property
+    def summary(self):
+        return {
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'errors': len(self.errors) + len(self._pending_errors),
+        }
+
+
+def run_import_job(job):
+    """Ejecuta un CustomerImportJob actualizando su progreso"""
+    job.status = 'running'
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    def on_progress(importer):
+        job.total_rows = importer.total_rows
+        job.processed_rows = importer.processed_rows
+        job.created_count = importer.created
+        job.updated_count = importer.updated
+        job.unchanged_count = importer.unchanged
+        job.add_errors(importer.pop_errors())
+        job.save(update_fields=[
+            'total_rows', 'processed_rows', 'created_count', 'updated_count',
+            'unchanged_count', 'error_count', 'errors',
+        ])
+
+    try:
+        with job.file.open('rb') as file_obj:
+            importer = CustomerImporter(file_obj, on_progress=on_progress).run()
+        on_progress(importer)
+        job.status = 'completed'
+        job.message = (
+            f'Importación completada. {importer.created} creados, '
+            f'{importer.updated} actualizados, {importer.unchanged} sin cambios.'
+        )
+    except Exception as e:
+        logger.exception(f'Error en importación de clientes {job.id}')
+        job.status = 'failed'
+        job.message = f'Error procesando archivo: {e}'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'message', 'finished_at'])
+    return job
@@ -0,0 +1,114 @@
+"""
+apps/customers/kpis.py
+
+Indicadores del panel de clientes (admin/stats/).
+
+Conteos, métricas financieras y distribución por tipo y segmento RFM salen
+de una sola consulta con agregación condicional (COUNT/SUM ... FILTER). Las
+ciudades y los clientes top se piden aparte (GROUP BY y ORDER BY ... LIMIT). El
+resultado se guarda en caché por CUSTOMER_STATS_TIMEOUT segundos y las
+señales de Customer lo invalidan al crear, editar o eliminar clientes.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .models import Customer, SEGMENT_CHOICES
+
+logger = logging.getLogger(__name__)
+
+CUSTOMER_STATS_KEY = 'customers:stats'
+CUSTOMER_STATS_TIMEOUT = 60
+
+TOP_LIMIT = 10
+
+
+def compute_customer_stats():
+    today = timezone.localdate()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    aggregates = {
+        'total_customers': Count('id'),
+        'active_customers': Count('id', filter=Q(is_active=True)),
+        'inactive_customers': Count('id', filter=Q(is_active=False)),
+        'vip_customers': Count('id', filter=Q(is_vip=True)),
+        'new_today': Count('id', filter=Q(created_at__date=today)),
+        'new_this_week': Count('id', filter=Q(created_at__date__gte=week_ago)),
+        'new_this_month': Count('id', filter=Q(created_at__date__gte=month_ago)),
+        'total_revenue': Sum('total_spent'),
+        'avg_order_value': Avg('average_order_value'),
+        'avg_orders_per_customer': Avg('total_orders'),
+    }
+    # Distribución por tipo en la misma consulta (los tipos son fijos)
+    for customer_type, _ in Customer.CUSTOMER_TYPES:
+        type_filter = Q(customer_type=customer_type)
+        aggregates[f'{customer_type}__count'] = Count('id', filter=type_filter)
+        aggregates[f'{customer_type}__total_spent'] = Sum('total_spent', filter=type_filter)
+        aggregates[f'{customer_type}__avg_orders'] = Avg('total_orders', filter=type_filter)
+
+    # Segmentos RFM (calculados cada noche)
+    for segment, _ in SEGMENT_CHOICES:
+        aggregates[f'segment__{segment}'] = Count('id', filter=Q(segment=segment))
+
+    row = Customer.objects.order_by().aggregate(**aggregates)
+
+    type_distribution = [
+        {
+            'customer_type': customer_type,
+            'count': row[f'{customer_type}__count'],
+            'total_spent': row[f'{customer_type}__total_spent'],
+            'avg_orders': row[f'{customer_type}__avg_orders'],
+        }
+        for customer_type, _ in Customer.CUSTOMER_TYPES
+        if row[f'{customer_type}__count']
+    ]
+    type_distribution.sort(key=lambda item: -item['count'])
+
+    top_cities = Customer.objects.exclude(city='').values('city').annotate(
+        count=Count('id')
+    ).order_by('-count')[:TOP_LIMIT]
+
+    top_spenders = Customer.objects.order_by('-total_spent')[:TOP_LIMIT].values(
+        'id', 'email', 'first_name', 'last_name', 'total_spent', 'total_orders'
+    )
+
+    return {
+        'total_customers': row['total_customers'],
+        'active_customers': row['active_customers'],
+        'inactive_customers': row['inactive_customers'],
+        'vip_customers': row['vip_customers'],
+        'new_today': row['new_today'],
+        'new_this_week': row['new_this_week'],
+        'new_this_month': row['new_this_month'],
+        'total_revenue': float(row['total_revenue'] or 0),
+        'avg_order_value': float(row['avg_order_value'] or 0),
+        'avg_orders_per_customer': row['avg_orders_per_customer'] or 0,
+        'type_distribution': type_distribution,
+        'segment_distribution': [
+            {'segment': segment, 'label': label, 'count': row[f'segment__{segment}']}
+            for segment, label in SEGMENT_CHOICES
+        ],
+        'top_cities': list(top_cities),
+        'top_spenders': list(top_spenders),
+    }
+
+
+def get_customer_stats():
+    """Indicadores desde la caché; se recalculan si no hay entrada"""
+    stats = cache.get(CUSTOMER_STATS_KEY)
+    if stats is None:
+        stats = compute_customer_stats()
+        stats['generated_at'] = timezone.now().isoformat()
+        cache.set(CUSTOMER_STATS_KEY, stats, CUSTOMER_STATS_TIMEOUT)
+    return stats
+
+
+def invalidate_customer_stats():
+    """Descarta los indicadores en caché (al confirmar la transacción actual)"""
+    transaction.on_commit(lambda: cache.delete(CUSTOMER_STATS_KEY))
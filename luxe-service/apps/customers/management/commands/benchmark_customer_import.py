@@ -0,0 +1,84 @@
+import io
+import random
+import time
+
+import openpyxl
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.customers.importer import CustomerImporter, COLUMNS
+from apps.customers.models import Customer
+
+BENCHMARK_ADDRESS = 'Benchmark Importación'
+
+FIRST_NAMES = ['MARIA JOSE', 'JUAN CARLOS', 'ANA', 'LUIS', 'GABRIELA', 'JORGE', 'DANIELA', 'PEDRO']
+LAST_NAMES = ['ZAMBRANO', 'MACIAS', 'VERA', 'CEDEÑO', 'MENDOZA', 'LOOR', 'ALCIVAR', 'PINARGOTE']
+
+
+class Command(BaseCommand):
+    help = 'Genera un Excel sintético de clientes y mide el tiempo de importación'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Filas del archivo (ej. 100000)')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--runs', type=int, default=2, help='Corridas (la segunda mide filas sin cambios)')
+        parser.add_argument('--cleanup', action='store_true', help='Eliminar los clientes sintéticos y salir')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = Customer.objects.filter(address=BENCHMARK_ADDRESS).delete()
+            self.stdout.write(self.style.SUCCESS(f'✅ {deleted} registros eliminados'))
+            return
+
+        started = time.perf_counter()
+        payload = self._workbook(options['rows'])
+        self.stdout.write(
+            f"Archivo de {options['rows']} filas ({len(payload) / 1024 / 1024:.1f} MB) "
+            f"generado en {time.perf_counter() - started:.1f}s"
+        )
+
+        for run in range(1, options['runs'] + 1):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                importer = CustomerImporter(io.BytesIO(payload), chunk_size=options['chunk_size']).run()
+                elapsed = time.perf_counter() - started
+
+            summary = importer.summary
+            self.stdout.write(
+                f"Corrida {run}: {elapsed:.1f}s ({summary['processed_rows'] / elapsed:.0f} filas/s) | "
+                f"{summary['created']} creados, {summary['updated']} actualizados, "
+                f"{summary['unchanged']} sin cambios, {summary['errors']} errores | "
+                f"{len(queries)} consultas"
+            )
+
+        self.stdout.write(self.style.SUCCESS('✅ Listo. Use --cleanup para eliminar los datos sintéticos'))
+
+    def _workbook(self, rows):
+        """
+        Excel con las columnas del sistema anterior. Cédulas numéricas (sin el
+        cero inicial, como las exporta Excel), ~30% sin correo y ~1% de filas
+        repetidas con otro formato para medir la deduplicación.
+        """
+        rng = random.Random(42)
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet('Clientes')
+        sheet.append(list(COLUMNS.values()))
+        for i in range(rows):
+            n = i
+            if i and i % 100 == 0:
+                n = i - 50
+            cedula = 900000000 + n
+            name = f'{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}'
+            sheet.append([
+                cedula if n == i else f'0{cedula}',
+                '',
+                name,
+                f'Cliente.{n}@Benchmark.test' if n % 10 < 7 else '',
+                f'098{n:07d} / 042{n % 1000000:06d}',
+                BENCHMARK_ADDRESS,
+                f'{rng.randint(1960, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}' if n % 2 else None,
+            ])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return buffer.getvalue()
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:19
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+# Las columnas se calculan en la BD para que también las mantengan las
+# importaciones masivas (bulk_create / update) que no pasan por save().
+# phone: solo dígitos; cedula: dígitos y letras en mayúscula (pasaportes);
+# email: minúsculas; search_name: nombres, apellidos y razón social.
+SEARCH_TRIGGER_SQL = '''
+CREATE OR REPLACE FUNCTION customers_customer_search_columns() RETURNS trigger AS $$
+BEGIN
+    NEW.phone_normalized := left(regexp_replace(coalesce(NEW.phone, ''), '[^0-9]', '', 'g'), 20);
+    NEW.cedula_normalized := left(upper(regexp_replace(coalesce(NEW.cedula, ''), '[^0-9A-Za-z]', '', 'g')), 20);
+    NEW.email_normalized := lower(btrim(coalesce(NEW.email, '')));
+    NEW.search_name := lower(concat_ws(' ', NEW.first_name, NEW.last_name, NEW.razon_social));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER customers_customer_search_columns_trg
+    BEFORE INSERT OR UPDATE OF phone, cedula, email, first_name, last_name, razon_social
+    ON customers_customer
+    FOR EACH ROW EXECUTE FUNCTION customers_customer_search_columns();
+
+-- Backfill de clientes existentes
+UPDATE customers_customer SET email = email;
+'''
+
+DROP_SEARCH_TRIGGER_SQL = '''
+DROP TRIGGER IF EXISTS customers_customer_search_columns_trg ON customers_customer;
+DROP FUNCTION IF EXISTS customers_customer_search_columns();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0004_customer_razon_social_alter_customer_phone'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='customer',
+            name='cedula_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='email_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='phone_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='search_name',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_normalized'], name='customer_phone_norm_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['cedula_normalized'], name='customer_cedula_norm_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['email_normalized'], name='customer_email_norm_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_name'], name='customer_search_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGER_SQL, DROP_SEARCH_TRIGGER_SQL),
+    ]
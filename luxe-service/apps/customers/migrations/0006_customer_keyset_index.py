@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_customer_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['-total_spent', '-created_at', '-id'], name='customer_spent_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:26
+
+import apps.customers.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0006_customer_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerImportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file', models.FileField(upload_to=apps.customers.models.customer_import_path, verbose_name='Archivo')),
+                ('original_filename', models.CharField(blank=True, max_length=255, verbose_name='Nombre del archivo')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('completed', 'Completado'), ('failed', 'Fallido')], db_index=True, default='pending', max_length=20, verbose_name='Estado')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='Filas totales')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='Filas procesadas')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='Creados')),
+                ('updated_count', models.PositiveIntegerField(default=0, verbose_name='Actualizados')),
+                ('unchanged_count', models.PositiveIntegerField(default=0, verbose_name='Sin cambios')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Errores')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Errores por fila')),
+                ('message', models.TextField(blank=True, verbose_name='Mensaje')),
+                ('created_by', models.CharField(blank=True, max_length=100, verbose_name='Creado por')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Importación de Clientes',
+                'verbose_name_plural': 'Importaciones de Clientes',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0007_customer_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='rfm_frequency',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Puntaje F'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='rfm_monetary',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Puntaje M'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='rfm_recency',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Puntaje R'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='segment',
+            field=models.CharField(choices=[('champions', 'Campeones'), ('loyal', 'Leales'), ('new', 'Nuevos'), ('potential', 'Potenciales'), ('cant_lose', 'No se pueden perder'), ('at_risk', 'En riesgo'), ('hibernating', 'Hibernando'), ('lost', 'Perdidos'), ('no_orders', 'Sin compras')], default='no_orders', editable=False, max_length=20, verbose_name='Segmento RFM'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='segment_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Segmentado el'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='tier',
+            field=models.CharField(choices=[('diamond', 'Diamante'), ('platinum', 'Platino'), ('gold', 'Oro'), ('silver', 'Plata'), ('bronze', 'Bronce')], default='bronze', editable=False, max_length=20, verbose_name='Nivel por gasto'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['segment', '-total_spent', '-created_at', '-id'], name='customer_segment_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['tier', '-total_spent', '-created_at', '-id'], name='customer_tier_keyset_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils import timezone
+from django.contrib.postgres.indexes import GinIndex
 import uuid
 
 from django.contrib.auth.models import BaseUserManager
@@ -20,6 +21,39 @@ class CustomerManager(BaseUserManager):
         extra_fields.setdefault('is_vip', True)
         return self.create_user(email, password, **extra_fields)
 
+# Segmentos RFM (Recencia, Frecuencia, Monto)
+SEGMENT_CHOICES = [
+    ('champions', 'Campeones'),
+    ('loyal', 'Leales'),
+    ('new', 'Nuevos'),
+    ('potential', 'Potenciales'),
+    ('cant_lose', 'No se pueden perder'),
+    ('at_risk', 'En riesgo'),
+    ('hibernating', 'Hibernando'),
+    ('lost', 'Perdidos'),
+    ('no_orders', 'Sin compras'),
+]
+
+# Niveles por gasto total: (nivel, etiqueta, gasto mínimo)
+SPEND_TIERS = [
+    ('diamond', 'Diamante', 1000),
+    ('platinum', 'Platino', 300),
+    ('gold', 'Oro', 150),
+    ('silver', 'Plata', 80),
+    ('bronze', 'Bronce', 0),
+]
+TIER_CHOICES = [(tier, label) for tier, label, _ in SPEND_TIERS]
+
+
+def tier_for_spent(total_spent):
+    """Nivel correspondiente a un gasto total"""
+    spent = float(total_spent or 0)
+    for tier, _, minimum in SPEND_TIERS:
+        if spent >= minimum:
+            return tier
+    return 'bronze'
+
+
 class Customer(models.Model):
     """Cliente sin autenticación - solo información de contacto para pedidos"""
     CUSTOMER_TYPES = [
@@ -83,6 +117,18 @@ class Customer(models.Model):
     last_order_date = models.DateTimeField(null=True, blank=True, verbose_name='Último pedido')
     average_order_value = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Valor promedio de pedido')
     
+    # Segmentación RFM (calculada cada noche por apps/customers/segmentation.py)
+    segment = models.CharField(
+        max_length=20, choices=SEGMENT_CHOICES, default='no_orders', editable=False, verbose_name='Segmento RFM'
+    )
+    tier = models.CharField(
+        max_length=20, choices=TIER_CHOICES, default='bronze', editable=False, verbose_name='Nivel por gasto'
+    )
+    rfm_recency = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Puntaje R')
+    rfm_frequency = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Puntaje F')
+    rfm_monetary = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Puntaje M')
+    segment_updated_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Segmentado el')
+    
     # Marketing
     newsletter_subscribed = models.BooleanField(default=True, verbose_name='Suscrito al newsletter')
     marketing_emails = models.BooleanField(default=True, verbose_name='Acepta emails de marketing')
@@ -97,6 +143,12 @@ class Customer(models.Model):
     password = models.CharField(max_length=128, verbose_name='Contraseña', default='')
     last_login = models.DateTimeField(blank=True, null=True, verbose_name='Último inicio de sesión')
     
+    # Columnas normalizadas para búsqueda (mantenidas por trigger en la BD, ver migración 0005)
+    phone_normalized = models.CharField(max_length=20, blank=True, default='', editable=False)
+    cedula_normalized = models.CharField(max_length=20, blank=True, default='', editable=False)
+    email_normalized = models.CharField(max_length=254, blank=True, default='', editable=False)
+    search_name = models.TextField(blank=True, default='', editable=False)
+    
     objects = CustomerManager()
     
     USERNAME_FIELD = 'email'
@@ -112,6 +164,17 @@ class Customer(models.Model):
             models.Index(fields=['customer_type']),
             models.Index(fields=['is_vip']),
             models.Index(fields=['created_at']),
+            # Orden y paginación por cursor del listado admin
+            models.Index(fields=['-total_spent', '-created_at', '-id'], name='customer_spent_keyset_idx'),
+            # Listado filtrado por segmento / nivel (?segment=, ?tier=) en el mismo orden
+            models.Index(fields=['segment', '-total_spent', '-created_at', '-id'], name='customer_segment_keyset_idx'),
+            models.Index(fields=['tier', '-total_spent', '-created_at', '-id'], name='customer_tier_keyset_idx'),
+            # Prefijo (LIKE 'abc%') e igualdad sobre identidades normalizadas
+            models.Index(fields=['phone_normalized'], name='customer_phone_norm_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['cedula_normalized'], name='customer_cedula_norm_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['email_normalized'], name='customer_email_norm_idx', opclasses=['varchar_pattern_ops']),
+            # Nombres y razón social: búsqueda difusa por trigramas
+            GinIndex(fields=['search_name'], name='customer_search_name_trgm', opclasses=['gin_trgm_ops']),
         ]
     
     def __str__(self):
@@ -398,3 +461,68 @@ class CustomerDevice(models.Model):
     
     def __str__(self):
         return f'{self.get_device_type_display()} - {self.customer.get_full_name()}'
+
+
+def customer_import_path(instance, filename):
+    """Ruta de los archivos subidos para importación de clientes"""
+    return f'customers/imports/{instance.id}.xlsx'
+
+
+class CustomerImportJob(models.Model):
+    """Importación masiva de clientes desde Excel (ejecutada en Celery)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En proceso'),
+        ('completed', 'Completado'),
+        ('failed', 'Fallido'),
+    ]
+
+    # Máximo de errores por fila que se guardan en el job
+    MAX_ERRORS = 500
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file = models.FileField(upload_to=customer_import_path, verbose_name='Archivo')
+    original_filename = models.CharField(max_length=255, blank=True, verbose_name='Nombre del archivo')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        db_index=True,
+        verbose_name='Estado'
+    )
+
+    # Progreso
+    total_rows = models.PositiveIntegerField(default=0, verbose_name='Filas totales')
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name='Filas procesadas')
+    created_count = models.PositiveIntegerField(default=0, verbose_name='Creados')
+    updated_count = models.PositiveIntegerField(default=0, verbose_name='Actualizados')
+    unchanged_count = models.PositiveIntegerField(default=0, verbose_name='Sin cambios')
+    error_count = models.PositiveIntegerField(default=0, verbose_name='Errores')
+    errors = models.JSONField(default=list, blank=True, verbose_name='Errores por fila')
+    message = models.TextField(blank=True, verbose_name='Mensaje')
+
+    created_by = models.CharField(max_length=100, blank=True, verbose_name='Creado por')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Importación de Clientes'
+        verbose_name_plural = 'Importaciones de Clientes'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'Importación {self.original_filename or self.id} ({self.get_status_display()})'
+
+    @property
+    def progress(self):
+        if not self.total_rows:
+            return 0
+        return round(self.processed_rows * 100 / self.total_rows, 1)
+
+    def add_errors(self, row_errors):
+        """Acumula errores por fila respetando MAX_ERRORS"""
+        self.error_count += len(row_errors)
+        room = self.MAX_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(row_errors[:room])
@@ -0,0 +1,167 @@
+"""
+apps/customers/search.py
+
+Búsqueda de clientes para POS y administración.
+
+La consulta se clasifica antes de tocar la BD:
+
+1. Email (contiene '@'): prefijo sobre email_normalized.
+2. Identidad (solo dígitos, espacios, guiones o '+'): prefijo sobre
+   cedula_normalized y phone_normalized (índices btree varchar_pattern_ops).
+   Los teléfonos se prueban también con/sin el prefijo 593. Un prefijo
+   corto ('099') coincide con casi toda la tabla, así que cada rama de
+   prefijo se acota a PREFIX_CANDIDATES filas del índice antes de ordenar
+   por relevancia (search_customers). Sin ese tope (listado paginado del
+   admin) el teléfono solo se busca por prefijo desde
+   MIN_PHONE_PREFIX_DIGITS dígitos; con menos, exacto.
+3. Nombre: cada palabra debe aparecer en search_name (índice GIN pg_trgm);
+   si no hay resultados, similitud de trigramas para errores de tipeo.
+
+Las columnas normalizadas las mantiene un trigger (migración 0005).
+"""
+
+import re
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import Customer
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+MIN_IDENTITY_DIGITS = 3
+MIN_PHONE_PREFIX_DIGITS = 6
+PREFIX_CANDIDATES = 500
+TRIGRAM_THRESHOLD = 0.3
+
+IDENTITY_PATTERN = re.compile(r'^\+?[\d\s\-().]+$')
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Sin último login al final (en PostgreSQL los NULL van primero en DESC)
+RECENT_FIRST = F('last_login').desc(nulls_last=True)
+
+
+def digits_only(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def normalize_cedula(value):
+    return re.sub(r'[^0-9A-Za-z]', '', value or '').upper()
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def classify_query(query):
+    """'email' | 'identity' | 'name' | 'empty'"""
+    query = (query or '').strip()
+    if not query:
+        return 'empty'
+    if '@' in query:
+        return 'email'
+    if IDENTITY_PATTERN.match(query) and len(digits_only(query)) >= MIN_IDENTITY_DIGITS:
+        return 'identity'
+    return 'name'
+
+
+def phone_variants(digits):
+    """Teléfono local y con código de país: 0991234567 <-> 593991234567"""
+    variants = {digits}
+    if digits.startswith('593'):
+        variants.add('0' + digits[3:])
+    elif digits.startswith('0'):
+        variants.add('593' + digits[1:])
+    return variants
+
+
+def identity_filter(queryset, query, prefix_limit=None):
+    """
+    Retorna (condición, dígitos). Con `prefix_limit` la condición es un
+    pk IN (UNION de ramas con LIMIT): cada prefijo corta el rango del índice
+    en `prefix_limit` filas. Un OR de subconsultas no sirve: PostgreSQL las
+    evalúa como hashed subplan recorriendo la tabla completa.
+    """
+    digits = digits_only(query)
+    variants = phone_variants(digits)
+    exact = Q(cedula_normalized=digits) | Q(phone_normalized__in=variants)
+    prefixes = [Q(cedula_normalized__startswith=digits)] + [
+        Q(phone_normalized__startswith=variant) for variant in variants
+        if prefix_limit is not None or len(variant) >= MIN_PHONE_PREFIX_DIGITS
+    ]
+    if prefix_limit is None:
+        return reduce(or_, prefixes, exact), digits
+
+    # Las coincidencias exactas van siempre, aunque queden fuera del tope
+    branches = [queryset.filter(exact).order_by().values('pk')] + [
+        queryset.filter(prefix).order_by().values('pk')[:prefix_limit] for prefix in prefixes
+    ]
+    return Q(pk__in=branches[0].union(*branches[1:], all=True)), digits
+
+
+def filter_customers(queryset, query, prefix_limit=None):
+    """
+    Filtra un queryset de clientes según el tipo de consulta y agrega
+    `match_rank` para ordenar (mayor es mejor). Retorna (queryset, estrategia).
+    `prefix_limit` acota las ramas de prefijo de identidad (ver identity_filter).
+    """
+    query = (query or '').strip()
+    strategy = classify_query(query)
+
+    if strategy == 'empty':
+        return queryset.none(), strategy
+
+    if strategy == 'email':
+        email = normalize_email(query)
+        queryset = queryset.filter(email_normalized__startswith=email).annotate(
+            match_rank=Case(When(email_normalized=email, then=Value(1)), default=Value(0), output_field=IntegerField())
+        )
+        return queryset, strategy
+
+    if strategy == 'identity':
+        condition, digits = identity_filter(queryset, query, prefix_limit)
+        exact = Q(cedula_normalized=digits) | Q(phone_normalized__in=phone_variants(digits))
+        queryset = queryset.filter(condition).annotate(
+            match_rank=Case(When(exact, then=Value(1)), default=Value(0), output_field=IntegerField())
+        )
+        return queryset, strategy
+
+    words = [word.lower() for word in WORD_PATTERN.findall(query)]
+    if not words:
+        return queryset.none(), 'empty'
+    condition = Q()
+    for word in words:
+        condition &= Q(search_name__contains=word)
+    return queryset.filter(condition).annotate(
+        match_rank=TrigramWordSimilarity(query.lower(), 'search_name')
+    ), strategy
+
+
+def fuzzy_customers(queryset, query):
+    """Similitud de trigramas (errores de tipeo) sobre search_name"""
+    query = (query or '').strip().lower()
+    return queryset.filter(search_name__trigram_word_similar=query).annotate(
+        match_rank=TrigramWordSimilarity(query, 'search_name')
+    ).filter(match_rank__gte=TRIGRAM_THRESHOLD)
+
+
+def search_customers(query, queryset=None, limit=DEFAULT_LIMIT):
+    """
+    Retorna (clientes, estrategia) ordenados por relevancia.
+    estrategia: 'email' | 'identity' | 'name' | 'fuzzy' | 'empty'
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    queryset = queryset if queryset is not None else Customer.objects.all()
+
+    filtered, strategy = filter_customers(queryset, query, prefix_limit=PREFIX_CANDIDATES)
+    if strategy == 'empty':
+        return [], strategy
+
+    results = list(filtered.order_by('-match_rank', RECENT_FIRST)[:limit])
+    if not results and strategy == 'name':
+        results = list(fuzzy_customers(queryset, query).order_by('-match_rank', RECENT_FIRST)[:limit])
+        strategy = 'fuzzy' if results else strategy
+    return results, strategy
@@ -0,0 +1,226 @@
+"""
+apps/customers/segmentation.py
+
+Segmentación RFM (Recencia, Frecuencia, Monto) de clientes.
+
+1. Una consulta agrupada trae por cliente la fecha de la última orden
+   pagada, la cantidad de órdenes y el gasto (LEFT JOIN, así también vienen
+   los clientes sin compras), junto con los valores guardados. Se lee por
+   lotes y cada lote se convierte a arrays tipados (el id como 16 bytes):
+   no se guarda una tupla de objetos Python por cliente.
+2. Con NumPy se calculan en una pasada los puntajes 1-5 por quintiles, el
+   segmento (tabla R x F) y el nivel por gasto (SPEND_TIERS).
+3. Solo los clientes cuyo resultado cambió se escriben, por lotes, con un
+   UPDATE ... FROM unnest(arrays): bulk_update arma un CASE WHEN por campo
+   con una rama por fila y en lotes grandes se vuelve cuadrático.
+
+Los filtros ?segment= y ?tier= del listado admin usan índices sobre estas
+columnas. Se ejecuta cada noche (tarea segment_customers) y con el comando
+segment_customers.
+"""
+
+import logging
+import time
+import uuid
+from itertools import islice
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, Max, Q, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .kpis import invalidate_customer_stats
+from .models import Customer, SPEND_TIERS
+
+logger = logging.getLogger(__name__)
+
+FETCH_CHUNK_SIZE = 20_000
+UPDATE_BATCH_SIZE = 5000
+
+# Cortes de quintiles para los puntajes 1-5
+QUANTILES = [0.2, 0.4, 0.6, 0.8]
+
+# Orden de evaluación: el primer segmento cuya condición se cumple
+SEGMENT_RULES = [
+    ('champions', lambda r, f, m: (r >= 4) & (f >= 4)),
+    ('loyal', lambda r, f, m: (r >= 3) & (f >= 3)),
+    ('new', lambda r, f, m: (r >= 4) & (f == 1)),
+    ('potential', lambda r, f, m: r >= 3),
+    ('cant_lose', lambda r, f, m: (f >= 4) & (m >= 4)),
+    ('at_risk', lambda r, f, m: f >= 3),
+    ('hibernating', lambda r, f, m: r == 2),
+    ('lost', lambda r, f, m: r <= 1),
+]
+NO_ORDERS = 'no_orders'
+
+SEGMENTS = np.array([name for name, _ in SEGMENT_RULES] + [NO_ORDERS])
+
+# De menor a mayor gasto mínimo para np.searchsorted
+_TIER_NAMES = np.array([tier for tier, _, _ in reversed(SPEND_TIERS)])
+_TIER_MINIMUMS = np.array([minimum for _, _, minimum in reversed(SPEND_TIERS)], dtype=np.float64)
+
+RESULT_FIELDS = ['rfm_recency', 'rfm_frequency', 'rfm_monetary', 'segment', 'tier']
+
+# Valores guardados -> índices en SEGMENTS / _TIER_NAMES (-1 si no se reconoce)
+_SEGMENT_CODES = {name: code for code, name in enumerate(SEGMENTS)}
+_TIER_CODES = {name: code for code, name in enumerate(_TIER_NAMES)}
+
+
+# ============================================================================
+# CÁLCULO VECTORIZADO
+# ============================================================================
+
+def quantile_scores(values, higher_is_better=True):
+    """
+    Puntaje 1-5 por quintiles. Con muchos empates (la mayoría compra una
+    sola vez) los cortes se repiten y los empatados reciben el puntaje menor.
+    """
+    if not len(values):
+        return np.empty(0, dtype=np.int8)
+    edges = np.quantile(values, QUANTILES)
+    if higher_is_better:
+        return (1 + np.searchsorted(edges, values, side='left')).astype(np.int8)
+    # Recencia: menos días desde la última compra es mejor
+    return (5 - np.searchsorted(edges, values, side='right')).astype(np.int8)
+
+
+def score_customers(recency_days, frequency, monetary, has_orders):
+    """
+    Arrays de entrada alineados por cliente. Retorna (r, f, m, segmentos,
+    niveles) como int8; segmentos y niveles son índices en SEGMENTS y
+    _TIER_NAMES. Los clientes sin compras quedan con puntajes 0 y 'no_orders'.
+    """
+    count = len(has_orders)
+    r = np.zeros(count, dtype=np.int8)
+    f = np.zeros(count, dtype=np.int8)
+    m = np.zeros(count, dtype=np.int8)
+
+    buyers = np.flatnonzero(has_orders)
+    r[buyers] = quantile_scores(recency_days[buyers], higher_is_better=False)
+    f[buyers] = quantile_scores(frequency[buyers])
+    m[buyers] = quantile_scores(monetary[buyers])
+
+    conditions = [rule(r, f, m) & has_orders for _, rule in SEGMENT_RULES]
+    segments = np.select(conditions, np.arange(len(SEGMENT_RULES)), default=len(SEGMENT_RULES)).astype(np.int8)
+    tiers = (np.searchsorted(_TIER_MINIMUMS, monetary, side='right') - 1).astype(np.int8)
+    return r, f, m, segments, tiers
+
+
+# ============================================================================
+# LECTURA / ESCRITURA
+# ============================================================================
+
+def _fetch():
+    """Una fila por cliente con sus agregados de órdenes pagadas y el resultado guardado"""
+    paid = Q(orders__payment_status='paid')
+    return Customer.objects.order_by().annotate(
+        last_order_at=Max('orders__created_at', filter=paid),
+        order_count=Count('orders', filter=paid),
+        spent=Cast(Sum('orders__total', filter=paid), FloatField()),
+    ).values_list('id', 'last_order_at', 'order_count', 'spent', *RESULT_FIELDS)
+
+
+def _columns_batch(batch):
+    """Arrays tipados de un lote de filas de _fetch()"""
+    size = len(batch)
+
+    def column(dtype, values):
+        return np.fromiter(values, dtype=dtype, count=size)
+
+    return {
+        'id': column('S16', (row[0].bytes for row in batch)),
+        'last_epoch': column(np.float64, (row[1].timestamp() if row[1] else 0 for row in batch)),
+        'order_count': column(np.int32, (row[2] for row in batch)),
+        'spent': column(np.float64, (row[3] or 0 for row in batch)),
+        'rfm_recency': column(np.int8, (row[4] for row in batch)),
+        'rfm_frequency': column(np.int8, (row[5] for row in batch)),
+        'rfm_monetary': column(np.int8, (row[6] for row in batch)),
+        'segment': column(np.int8, (_SEGMENT_CODES.get(row[7], -1) for row in batch)),
+        'tier': column(np.int8, (_TIER_CODES.get(row[8], -1) for row in batch)),
+    }
+
+
+def _fetch_columns():
+    """Columnas de todos los clientes, leídas y convertidas por lotes"""
+    parts = {}
+    iterator = _fetch().iterator(chunk_size=FETCH_CHUNK_SIZE)
+    for batch in iter(lambda: list(islice(iterator, FETCH_CHUNK_SIZE)), []):
+        for name, values in _columns_batch(batch).items():
+            parts.setdefault(name, []).append(values)
+    return {name: np.concatenate(chunks) for name, chunks in parts.items()}
+
+
+def _write_results(ids, results, now):
+    """Escribe puntajes, segmento y nivel de los clientes `ids` (alineados con `results`)"""
+    r, f, m, segments, tiers = results
+    sql = f"""
+        UPDATE {Customer._meta.db_table} AS customer
+        SET rfm_recency = v.r,
+            rfm_frequency = v.f,
+            rfm_monetary = v.m,
+            segment = v.segment,
+            tier = v.tier,
+            segment_updated_at = %s
+        FROM unnest(%s::uuid[], %s::smallint[], %s::smallint[], %s::smallint[], %s::varchar[], %s::varchar[])
+            AS v(id, r, f, m, segment, tier)
+        WHERE customer.id = v.id
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+            batch = slice(start, start + UPDATE_BATCH_SIZE)
+            cursor.execute(sql, [
+                now,
+                # 'S16' recorta los bytes nulos finales al leer
+                [str(uuid.UUID(bytes=value.ljust(16, b'\0'))) for value in ids[batch].tolist()],
+                r[batch].tolist(),
+                f[batch].tolist(),
+                m[batch].tolist(),
+                SEGMENTS[segments[batch]].tolist(),
+                _TIER_NAMES[tiers[batch]].tolist(),
+            ])
+
+
+def segment_customers():
+    """Recalcula la segmentación de todos los clientes. Retorna un resumen."""
+    started = time.perf_counter()
+    now = timezone.now()
+
+    columns = _fetch_columns()
+    fetched = time.perf_counter()
+    if not columns:
+        return {'customers': 0, 'updated': 0, 'seconds': 0}
+
+    ids = columns['id']
+    order_count = columns['order_count']
+    recency_days = (now.timestamp() - columns['last_epoch']) / 86400
+    results = score_customers(recency_days, order_count, columns['spent'], order_count > 0)
+    scored = time.perf_counter()
+
+    # Solo los que cambiaron
+    changed = np.zeros(len(ids), dtype=bool)
+    for computed, field in zip(results, RESULT_FIELDS):
+        changed |= computed != columns[field]
+
+    to_update = np.flatnonzero(changed)
+    _write_results(ids[to_update], [values[to_update] for values in results], now)
+    written = time.perf_counter()
+
+    if len(to_update):
+        # El UPDATE directo no dispara señales
+        invalidate_customer_stats()
+
+    _, _, _, segments, _ = results
+    summary = {
+        'customers': len(ids),
+        'updated': len(to_update),
+        'fetch_seconds': round(fetched - started, 2),
+        'write_seconds': round(written - scored, 2),
+        'seconds': round(time.perf_counter() - started, 2),
+        'segments': {
+            str(SEGMENTS[code]): int(total)
+            for code, total in enumerate(np.bincount(segments, minlength=len(SEGMENTS))) if total
+        },
+    }
+    logger.info(f"Segmentación RFM: {summary['updated']}/{summary['customers']} clientes actualizados en {summary['seconds']}s")
+    return summary
@@ -3,7 +3,7 @@ from django.contrib.auth import authenticate
 from django.utils import timezone
 from .models import (
     Customer, CustomerAddress, CustomerNote, 
-    CustomerLoyalty, CustomerLoyaltyHistory, CustomerDevice
+    CustomerLoyalty, CustomerLoyaltyHistory, CustomerDevice, tier_for_spent
 )
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -21,11 +21,13 @@ class CustomerSerializer(serializers.ModelSerializer):
             'total_orders', 'total_spent', 'last_order_date', 'average_order_value',
             'newsletter_subscribed', 'marketing_emails', 'marketing_sms',
             'loyalty_points', 'customer_since_days',
+            'segment', 'tier', 'rfm_recency', 'rfm_frequency', 'rfm_monetary',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'total_orders', 'total_spent', 'last_order_date', 
-            'average_order_value', 'created_at', 'updated_at'
+            'average_order_value', 'segment', 'tier', 'rfm_recency', 'rfm_frequency',
+            'rfm_monetary', 'created_at', 'updated_at'
         ]
         extra_kwargs = {
             'email': {'required': True},
@@ -38,18 +40,15 @@ class CustomerSerializer(serializers.ModelSerializer):
         return obj.get_full_name()
     
     def get_calculated_tier(self, obj):
-        spent = float(obj.total_spent)
-        if spent >= 1000:
-            return 'diamond'
-        elif spent >= 300:
-            return 'platinum'
-        elif spent >= 150:
-            return 'gold'
-        elif spent >= 80:
-            return 'silver'
-        return 'bronze'
+        return self.tier_for_spent(obj.total_spent)
+    
+    @staticmethod
+    def tier_for_spent(total_spent):
+        # Mismos umbrales que la segmentación nocturna (SPEND_TIERS)
+        return tier_for_spent(total_spent)
     
     def get_loyalty_points(self, obj):
+        # Con select_related('loyalty_account', 'loyalty') no hace consultas extra
         # Intentar obtener del nuevo sistema de fidelidad (app loyalty)
         if hasattr(obj, 'loyalty_account'):
             return obj.loyalty_account.points_balance
@@ -63,6 +62,22 @@ class CustomerSerializer(serializers.ModelSerializer):
     def get_customer_since_days(self, obj):
         return obj.customer_since
 
+
+class CustomerListSerializer(CustomerSerializer):
+    """
+    Listado admin: las estadísticas vienen de annotate_current_stats()
+    (calculadas desde las órdenes si las guardadas están en 0).
+    """
+    total_orders = serializers.IntegerField(source='current_total_orders', read_only=True)
+    total_spent = serializers.DecimalField(max_digits=10, decimal_places=2, source='current_total_spent', read_only=True)
+    last_order_date = serializers.DateTimeField(source='current_last_order_date', read_only=True)
+    average_order_value = serializers.DecimalField(
+        max_digits=10, decimal_places=2, source='current_average_order_value', read_only=True
+    )
+
+    def get_calculated_tier(self, obj):
+        return self.tier_for_spent(obj.current_total_spent)
+
 class CustomerCreateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8, style={'input_type': 'password'}, required=False)
     password_confirmation = serializers.CharField(write_only=True, style={'input_type': 'password'}, required=False)
@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from .models import Customer, CustomerLoyalty
+from .kpis import invalidate_customer_stats
 
 @receiver(post_save, sender=Customer)
 def create_customer_loyalty(sender, instance, created, **kwargs):
@@ -20,3 +21,11 @@ def update_vip_status(sender, instance, **kwargs):
         instance.is_vip = True
     elif instance.total_spent < 1000 and instance.is_vip:
         instance.is_vip = False
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_stats_cache(sender, **kwargs):
+    """
+    Descartar los indicadores cacheados del panel de clientes
+    """
+    invalidate_customer_stats()
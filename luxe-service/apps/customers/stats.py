@@ -0,0 +1,181 @@
+"""
+apps/customers/stats.py
+
+Estadísticas de compra de los clientes (total_spent, total_orders,
+last_order_date, average_order_value).
+
+Los campos están desnormalizados en Customer y los mantiene la señal de
+órdenes (apps.orders.signals.update_customer_stats). Si quedan
+desactualizados (importaciones, reset-stats, órdenes editadas por SQL):
+
+- annotate_current_stats() calcula en la misma consulta del listado los
+  valores reales de los clientes con total_spent = 0 (subconsultas que
+  PostgreSQL solo evalúa para esas filas), sin escribir en un GET.
+- reconcile_customer_stats() corrige en segundo plano a todos los clientes
+  desactualizados con un solo UPDATE (tarea Celery nocturna y comando
+  recalculate_stats).
+"""
+
+import base64
+import json
+import logging
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import (
+    Case, Count, DateTimeField, DecimalField, ExpressionWrapper, F, IntegerField,
+    Max, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, NullIf
+from django.db.models.lookups import GreaterThanOrEqual
+
+from .kpis import invalidate_customer_stats
+from .models import Customer
+
+logger = logging.getLogger(__name__)
+
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+
+# Mismo umbral que la señal update_vip_status
+VIP_THRESHOLD = Decimal('1000')
+
+
+def _paid_orders():
+    """Órdenes pagadas del cliente de la consulta externa (mismo criterio que update_customer_stats)"""
+    from apps.orders.models import Order
+
+    return Order.objects.filter(customer=OuterRef('pk'), payment_status='paid').order_by().values('customer')
+
+
+def order_stats_subqueries():
+    """Subconsultas con el gasto, cantidad y última fecha reales del cliente"""
+    orders = _paid_orders()
+    spent = Coalesce(
+        Subquery(orders.annotate(value=Sum('total')).values('value'), output_field=MONEY),
+        Value(Decimal(0)),
+        output_field=MONEY,
+    )
+    count = Coalesce(Subquery(orders.annotate(value=Count('id')).values('value')), Value(0))
+    last_date = Subquery(orders.annotate(value=Max('created_at')).values('value'), output_field=DateTimeField())
+    return spent, count, last_date
+
+
+def _average(spent, count):
+    return Coalesce(
+        ExpressionWrapper(spent / NullIf(count, Value(0)), output_field=MONEY),
+        Value(Decimal(0)),
+        output_field=MONEY,
+    )
+
+
+# ============================================================================
+# LISTADO
+# ============================================================================
+
+def annotate_current_stats(queryset):
+    """
+    Agrega current_total_spent, current_total_orders, current_last_order_date
+    y current_average_order_value: los campos desnormalizados, o los calculados
+    desde las órdenes cuando total_spent es 0.
+    """
+    spent, count, last_date = order_stats_subqueries()
+    stale = Q(total_spent=0)
+
+    return queryset.annotate(
+        current_total_spent=Case(When(stale, then=spent), default=F('total_spent'), output_field=MONEY),
+        current_total_orders=Case(When(stale, then=count), default=F('total_orders'), output_field=IntegerField()),
+        current_last_order_date=Case(
+            When(stale, then=last_date), default=F('last_order_date'), output_field=DateTimeField()
+        ),
+    ).annotate(
+        current_average_order_value=Case(
+            When(stale, then=_average(F('current_total_spent'), F('current_total_orders'))),
+            default=F('average_order_value'),
+            output_field=MONEY,
+        ),
+    )
+
+
+# ============================================================================
+# PAGINACIÓN POR CURSOR (keyset)
+# ============================================================================
+
+# Orden estable del listado; el id desempata clientes con igual gasto y fecha
+KEYSET_ORDERING = ('-total_spent', '-created_at', '-id')
+
+
+def encode_cursor(customer):
+    payload = [str(customer.total_spent), customer.created_at.isoformat(), str(customer.id)]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Retorna (total_spent, created_at, id). Lanza ValueError si el cursor es inválido."""
+    try:
+        spent, created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return Decimal(spent), datetime.fromisoformat(created_at), uuid.UUID(pk)
+    except (TypeError, ValueError, InvalidOperation, UnicodeError):
+        raise ValueError('Cursor inválido')
+
+
+def keyset_page(queryset, cursor=None, page_size=20):
+    """
+    Página de clientes después del cursor en el orden KEYSET_ORDERING.
+    Retorna (clientes, next_cursor). Lanza ValueError si el cursor es inválido.
+    """
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+
+    if cursor:
+        spent, created_at, pk = decode_cursor(cursor)
+        # total_spent__lte acota el rango del índice; el OR resuelve los empates
+        queryset = queryset.filter(total_spent__lte=spent).filter(
+            Q(total_spent__lt=spent)
+            | Q(created_at__lt=created_at)
+            | Q(created_at=created_at, id__lt=pk)
+        )
+
+    # Una fila extra indica si hay página siguiente
+    rows = list(queryset[:page_size + 1])
+    customers = rows[:page_size]
+    next_cursor = encode_cursor(customers[-1]) if len(rows) > page_size else None
+    return customers, next_cursor
+
+
+# ============================================================================
+# RECONCILIACIÓN
+# ============================================================================
+
+def reconcile_customer_stats(queryset=None):
+    """
+    Recalcula desde las órdenes pagadas las estadísticas de los clientes cuyo
+    valor guardado no coincide, con un solo UPDATE. También ajusta is_vip
+    (update() no dispara la señal pre_save). Retorna la cantidad corregida.
+    """
+    queryset = queryset if queryset is not None else Customer.objects.all()
+    spent, count, last_date = order_stats_subqueries()
+
+    stale = queryset.annotate(
+        real_total_spent=spent,
+        real_total_orders=count,
+        real_last_order_date=last_date,
+    ).filter(
+        ~Q(total_spent=F('real_total_spent'))
+        | ~Q(total_orders=F('real_total_orders'))
+        | Q(last_order_date__isnull=True, real_last_order_date__isnull=False)
+        | Q(last_order_date__isnull=False, real_last_order_date__isnull=True)
+        | ~Q(last_order_date=F('real_last_order_date'))
+    )
+
+    updated = Customer.objects.filter(pk__in=stale.values('pk')).update(
+        total_spent=spent,
+        total_orders=count,
+        last_order_date=last_date,
+        average_order_value=_average(spent, count),
+        is_vip=Case(When(GreaterThanOrEqual(spent, Value(VIP_THRESHOLD)), then=Value(True)), default=Value(False)),
+    )
+    if updated:
+        # update() no dispara señales
+        invalidate_customer_stats()
+    logger.info(f'Estadísticas de clientes reconciliadas: {updated}')
+    return updated
@@ -0,0 +1,40 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def reconcile_customer_stats():
+    """Corrige las estadísticas de compra desactualizadas de los clientes"""
+    from .stats import reconcile_customer_stats as reconcile
+
+    updated = reconcile()
+    return f"Clientes con estadísticas corregidas: {updated}"
+
+
+@shared_task
+def import_customers_excel(job_id):
+    """
+    Ejecuta una importación de clientes encolada desde
+    import_customers_excel (admin/import-excel/).
+    """
+    from .importer import run_import_job
+    from .models import CustomerImportJob
+
+    job = CustomerImportJob.objects.filter(id=job_id, status='pending').first()
+    if not job:
+        return f"Importación {job_id} no encontrada o ya procesada."
+
+    job = run_import_job(job)
+    logger.info(f"Importación de clientes {job.id}: {job.status}. {job.message}")
+    return job.message
+
+
+@shared_task
+def segment_customers():
+    """Segmentación RFM nocturna de los clientes"""
+    from .segmentation import segment_customers as run_segmentation
+
+    summary = run_segmentation()
+    return f"Segmentación RFM: {summary['updated']}/{summary['customers']} clientes actualizados en {summary['seconds']}s"
@@ -44,9 +44,12 @@ urlpatterns = [
     # Listado y búsqueda
     path('admin/list/', views.admin_customer_list, name='admin-customer-list'),
     path('admin/import-excel/', views.import_customers_excel, name='import-customers-excel'),
+    path('admin/import-excel/jobs/<uuid:job_id>/', views.customer_import_job, name='customer-import-job'),
     path('admin/reset-stats/', views.reset_customer_stats, name='reset-customer-stats'),
     path('admin/search/', views.admin_search_customers, name='admin-search'),
     path('admin/stats/', views.admin_customer_stats, name='admin-stats'),
+    path('admin/duplicates/', views.admin_duplicate_customers, name='admin-duplicates'),
+    path('admin/merge/', views.admin_merge_customers, name='admin-merge'),
     
     # Operaciones por cliente
     path('sync/', views.sync_external_customer, name='public-sync'),
@@ -5,23 +5,34 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Sum, Avg, Q
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db.models import Count, Sum, Avg
 from django.utils import timezone
 from datetime import timedelta, datetime, date
 import logging
 
+from core.db_router import using_replica
+
 from .models import (
     Customer, CustomerAddress, CustomerNote, 
-    CustomerLoyalty, CustomerLoyaltyHistory, CustomerDevice
+    CustomerLoyalty, CustomerLoyaltyHistory, CustomerDevice, CustomerImportJob
 )
-import openpyxl
 import math
+from .importer import run_import_job
+from .search import search_customers, filter_customers, normalize_email
+from .identity import (
+    choose_primary, find_duplicate_clusters, identity_candidates, identity_keys, merge_customers, resolve_customer,
+)
+from .stats import annotate_current_stats, keyset_page
+from .kpis import get_customer_stats, invalidate_customer_stats
+from .tasks import import_customers_excel as import_customers_task
 from .serializers import (
     CustomerSerializer, CustomerCreateSerializer, CustomerUpdateSerializer,
     CustomerLoginSerializer, CustomerAddressSerializer, CustomerNoteSerializer,
     CustomerLoyaltySerializer, CustomerLoyaltyHistorySerializer, 
     CustomerDeviceSerializer, CustomerStatsSerializer, CustomerSearchSerializer,
-    POSCustomerSerializer
+    POSCustomerSerializer, CustomerListSerializer
 )
 
 logger = logging.getLogger(__name__)
@@ -73,13 +84,7 @@ def pos_customer_search(request):
     if len(query) < 2:
         return Response([])
 
-    customers = Customer.objects.filter(
-        Q(first_name__icontains=query) |
-        Q(last_name__icontains=query) |
-        Q(cedula__icontains=query) |
-        Q(phone__icontains=query) |
-        Q(email__icontains=query)
-    ).order_by('-last_login')[:20]
+    customers, _ = search_customers(query, limit=20)
 
     serializer = POSCustomerSerializer(customers, many=True)
     return Response(serializer.data)
@@ -161,11 +166,34 @@ def pos_register(request):
     Registro rápido desde POS.
     POST /api/customers/pos_register/
     """
+    # Si ya existe por cédula o email se devuelve ese cliente. El teléfono
+    # se comparte (casa, oficina): solo identifica si no vino cédula ni email;
+    # si no, las coincidencias por teléfono se informan como posibles duplicados.
+    candidates, keys = identity_candidates(
+        email=request.data.get('email'),
+        cedula=request.data.get('cedula'),
+        phone=request.data.get('phone'),
+    )
+    strong_keys = ('cedula', 'email') if keys.keys() & {'cedula', 'email'} else ('phone',)
+    for field in strong_keys:
+        for customer in candidates:
+            if field in customer.matched_by:
+                return Response(CustomerSerializer(customer).data, status=status.HTTP_200_OK)
+
+    possible_duplicates = [
+        {'id': str(c.id), 'name': c.get_full_name(), 'phone': c.phone}
+        for c in candidates if 'phone' in c.matched_by
+    ]
     serializer = POSCustomerSerializer(data=request.data)
     if serializer.is_valid():
         customer = serializer.save()
-        return Response(CustomerSerializer(customer).data, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = CustomerSerializer(customer).data
+        data['possible_duplicates'] = possible_duplicates
+        return Response(data, status=status.HTTP_201_CREATED)
+    errors = dict(serializer.errors)
+    if possible_duplicates:
+        errors['possible_duplicates'] = possible_duplicates
+    return Response(errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['GET'])
@@ -184,8 +212,8 @@ def search_by_cedula(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Buscar por cédula
-        customer = Customer.objects.filter(cedula=cedula).first()
+        # Cédula/RUC normalizada (índice sobre cedula_normalized)
+        customer, _ = resolve_customer(cedula=cedula)
         
         if customer:
             return Response({
@@ -600,7 +628,8 @@ def unregister_device(request, device_token):
 def admin_customer_list(request):
     """
     Listar todos los clientes (solo admin)
-    GET /api/customers/admin/list/
+    GET /api/customers/admin/list/?page_size=20&cursor=<next_cursor>
+    Filtros: type, active, vip, search, city, birthday_today, segment, tier
     """
     customer_type = request.query_params.get('type')
     is_active = request.query_params.get('active')
@@ -608,6 +637,8 @@ def admin_customer_list(request):
     search = request.query_params.get('search', '')
     city = request.query_params.get('city')
     birthday_today = request.query_params.get('birthday_today')
+    segment = request.query_params.get('segment')
+    tier = request.query_params.get('tier')
     
     queryset = Customer.objects.all()
     
@@ -617,14 +648,7 @@ def admin_customer_list(request):
         queryset = queryset.filter(birth_date__month=today.month, birth_date__day=today.day)
     
     if search:
-        queryset = queryset.filter(
-            Q(first_name__icontains=search) | 
-            Q(last_name__icontains=search) |
-            Q(email__icontains=search) |
-            Q(cedula__icontains=search) |
-            Q(phone__icontains=search) |
-            Q(razon_social__icontains=search)
-        ).distinct()
+        queryset, _ = filter_customers(queryset, search)
         
     if customer_type:
         queryset = queryset.filter(customer_type=customer_type)
@@ -639,52 +663,48 @@ def admin_customer_list(request):
 
     if city:
         queryset = queryset.filter(city__icontains=city)
+
+    # Segmentación RFM nocturna (índices por segmento / nivel)
+    if segment:
+        queryset = queryset.filter(segment=segment)
+
+    if tier:
+        queryset = queryset.filter(tier=tier)
     
-    # Paginación
-    page = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('page_size', 20))
-    start = (page - 1) * page_size
-    end = start + page_size
-    
-    total = queryset.count()
-    from django.db.models import Max
-    
-    customers = queryset.order_by('-total_spent', '-created_at')[start:end]
-    
-    # Lógica de sincronización: Si el gasto es 0 pero existen órdenes, recalculamos
-    for c in customers:
-        if c.total_spent == 0:
-            # Excluir canceladas para evitar ruido
-            paid_orders = c.orders.filter(payment_status='paid').exclude(status='cancelled')
-            if paid_orders.exists():
-                stats = paid_orders.aggregate(
-                    total_amnt=Sum('total'),
-                    order_count=Count('id'),
-                    last_date=Max('created_at')
-                )
-                c.total_spent = stats['total_amnt'] or 0
-                c.total_orders = stats['order_count'] or 0
-                c.last_order_date = stats['last_date']
-                
-                if c.total_orders > 0:
-                    c.average_order_value = c.total_spent / c.total_orders
-                else:
-                    c.average_order_value = 0
-                    
-                c.save(update_fields=['total_spent', 'total_orders', 'last_order_date', 'average_order_value'])
+    # Paginación por cursor: el cliente envía el next_cursor de la respuesta anterior
+    cursor = request.query_params.get('cursor')
+    try:
+        page_size = max(1, min(int(request.query_params.get('page_size', 20)), 100))
+    except ValueError:
+        page_size = 20
+
+    # El total solo se cuenta en la primera página
+    total = None if cursor else queryset.count()
+
+    # Una sola consulta: cuentas de fidelidad y gasto real de los clientes sin
+    # estadísticas (la corrección la hace la tarea reconcile_customer_stats)
+    queryset = annotate_current_stats(queryset.select_related('loyalty_account', 'loyalty'))
+    try:
+        customers, next_cursor = keyset_page(queryset, cursor, page_size)
+    except ValueError as e:
+        return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    serializer = CustomerSerializer(customers, many=True)
+    serializer = CustomerListSerializer(customers, many=True)
     
+    pagination = {
+        'page_size': page_size,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+    }
+    if total is not None:
+        pagination['total'] = total
+        pagination['total_pages'] = (total + page_size - 1) // page_size
+
     return Response({
         'status': 'success',
         'data': {
             'customers': serializer.data,
-            'pagination': {
-                'page': page,
-                'page_size': page_size,
-                'total': total,
-                'total_pages': (total + page_size - 1) // page_size
-            }
+            'pagination': pagination
         }
     })
 
@@ -703,6 +723,7 @@ def reset_customer_stats(request):
             average_order_value=0,
             last_order_date=None
         )
+        invalidate_customer_stats()
         return Response({
             'status': 'success',
             'message': 'Estadísticas de clientes reseteadas a 0 correctamente.'
@@ -717,142 +738,93 @@ def import_customers_excel(request):
     """
     Importar clientes desde archivo Excel
     POST /api/customers/admin/import-excel/
+
+    El archivo se guarda en un CustomerImportJob y se procesa en Celery; la
+    respuesta incluye job_id para consultar el avance en
+    admin/import-excel/jobs/<job_id>/. Con ?sync=true (o si no se puede
+    encolar) se procesa dentro de la petición.
     """
     if 'file' not in request.FILES:
         return Response({'status': 'error', 'message': 'No file provided'}, status=400)
     
     excel_file = request.FILES['file']
-    
-    try:
-        wb = openpyxl.load_workbook(excel_file)
-        ws = wb.active
-        
-        # Leer headers (primera fila)
-        headers = {}
-        header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True))
-        for idx, cell in enumerate(header_row):
-            if cell:
-                headers[str(cell).strip()] = idx
-        
-        success_count = 0
-        errors = []
-        
-        # Iterar sobre las filas de datos (row 2 en adelante)
-        for index, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-            try:
-                def get_val(col_name):
-                    if col_name in headers:
-                        val = row[headers[col_name]]
-                        if val is None or val == 'None' or val == '':
-                            return None
-                        return val
-                    return None
-
-                # 1. Extraer datos básicos
-                cedula = str(get_val('DNI') or '').strip()
-                if not cedula or cedula.lower() == 'nan':
-                    cedula = None
-                
-                razon_social = str(get_val('Razón Social') or '').strip()
-                if not razon_social or razon_social.lower() == 'nan':
-                    razon_social = None
-                    
-                nombre_completo = str(get_val('Nombre') or '').strip()
-                if not nombre_completo or nombre_completo.lower() == 'nan':
-                    nombre_completo = ''
-                
-                # Prioridad: Nombre > Razón Social
-                final_name = nombre_completo if nombre_completo else (razon_social if razon_social else 'Cliente Sin Nombre')
-                
-                # Separar Nombres y Apellidos
-                parts = final_name.split()
-                if len(parts) >= 3:
-                    last_name = f"{parts[0]} {parts[1]}"
-                    first_name = " ".join(parts[2:])
-                elif len(parts) == 2:
-                    last_name = parts[0]
-                    first_name = parts[1]
-                else:
-                    last_name = final_name
-                    first_name = "." 
-                
-                email = str(get_val('Correo') or '').strip()
-                if not email or '@' not in email or email.lower() == 'nan':
-                    import random
-                    suffix = random.randint(1000, 9999)
-                    clean_name = "".join(e for e in first_name if e.isalnum()).lower()
-                    email = f"{clean_name}{suffix}@sincorreo.com"
-                
-                phone = str(get_val('Teléfonos') or '').strip()
-                if not phone or phone.lower() == 'nan':
-                    phone = None
-                
-                address = str(get_val('Dirección') or '').strip()
-                if not address or address.lower() == 'nan':
-                    address = ''
-                
-                # Fecha cumpleaños
-                birth_date = None
-                cumple_raw = get_val('CUMPLEAÑOS')
-                if cumple_raw:
-                    if isinstance(cumple_raw, (datetime, date)):
-                        birth_date = cumple_raw
-                    else:
-                        # Try parsing string
-                        try:
-                            # Try common formats if string
-                            from dateutil import parser
-                            birth_date = parser.parse(str(cumple_raw)).date()
-                        except:
-                            pass 
-                
-                # 2. Verificar existencia
-                customer = None
-                if cedula:
-                    customer = Customer.objects.filter(cedula=cedula).first()
-                
-                if not customer:
-                    customer = Customer.objects.filter(email=email).first()
-                
-                # 3. Crear o Actualizar
-                if customer:
-                    if not customer.cedula and cedula: customer.cedula = cedula
-                    if not customer.phone and phone: customer.phone = phone
-                    if not customer.razon_social and razon_social: customer.razon_social = razon_social
-                    if not customer.address and address: customer.address = address
-                    if not customer.birth_date and birth_date: customer.birth_date = birth_date
-                    customer.save()
-                else:
-                    # Crear nuevo
-                    Customer.objects.create(
-                        email=email,
-                        first_name=first_name[:50],
-                        last_name=last_name[:50],
-                        cedula=cedula,
-                        razon_social=razon_social,
-                        phone=phone,
-                        address=address,
-                        birth_date=birth_date,
-                        password="!Imported123", # Password dummy
-                        customer_type='regular',
-                        is_active=True
-                    )
-                
-                success_count += 1
-                
-            except Exception as e:
-                errors.append(f"Fila {index}: {str(e)}")
-        
+    if not excel_file.name.lower().endswith('.xlsx'):
+        return Response({'status': 'error', 'message': 'Formato no válido. Use .xlsx'}, status=400)
+
+    job = CustomerImportJob.objects.create(
+        file=excel_file,
+        original_filename=excel_file.name[:255],
+        created_by=str(getattr(request.user, 'username', '') or '')[:100],
+    )
+
+    run_sync = request.query_params.get('sync', '').lower() in ('1', 'true')
+    if not run_sync:
+        try:
+            import_customers_task.delay(str(job.id))
+        except Exception as e:
+            logger.warning(f'No se pudo encolar la importación de clientes {job.id}, procesando en línea: {e}')
+            run_sync = True
+
+    if not run_sync:
         return Response({
-            'status': 'success', 
-            'message': f'Procesados {success_count} clientes.',
-            'errors': errors
-        })
-        
-    except Exception as e:
-        logger.error(f"Error importando excel: {str(e)}")
-        return Response({'status': 'error', 'message': str(e)}, status=500)
+            'status': 'success',
+            'message': 'Importación en proceso. Los clientes se actualizarán en unos momentos.',
+            'job_id': str(job.id),
+            'job_status': job.status,
+            'errors': []
+        }, status=status.HTTP_202_ACCEPTED)
 
+    job = run_import_job(job)
+    if job.status == 'failed':
+        return Response({'status': 'error', 'message': job.message, 'job_id': str(job.id)}, status=400)
+
+    return Response({
+        'status': 'success',
+        'message': job.message,
+        'job_id': str(job.id),
+        'job_status': job.status,
+        'errors': _format_import_errors(job.errors[:20])
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def customer_import_job(request, job_id):
+    """
+    Estado y avance de una importación de clientes
+    GET /api/customers/admin/import-excel/jobs/{job_id}/
+    """
+    job = CustomerImportJob.objects.filter(id=job_id).first()
+    if not job:
+        return Response({'status': 'error', 'message': 'Importación no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'status': 'success',
+        'data': {
+            'job_id': str(job.id),
+            'file': job.original_filename,
+            'status': job.status,
+            'message': job.message,
+            'progress': job.progress,
+            'total_rows': job.total_rows,
+            'processed_rows': job.processed_rows,
+            'stats': {
+                'created': job.created_count,
+                'updated': job.updated_count,
+                'unchanged': job.unchanged_count,
+                'errors': job.error_count,
+            },
+            'errors': _format_import_errors(job.errors[:100]),
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+        }
+    })
+
+
+def _format_import_errors(errors):
+    """Errores por fila en el formato de texto que muestra el frontend"""
+    return [f"Fila {error['row']}: {error['error']}" for error in errors]
 
 
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
@@ -1059,59 +1031,17 @@ def admin_add_loyalty_points(request, customer_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@using_replica()
 def admin_customer_stats(request):
     """
     Estadísticas generales de clientes (solo admin)
     GET /api/customers/admin/stats/
+
+    Cacheadas por CUSTOMER_STATS_TIMEOUT segundos (ver kpis.py).
     """
-    today = timezone.now().date()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-    
-    # Estadísticas básicas
-    stats = {
-        'total_customers': Customer.objects.count(),
-        'active_customers': Customer.objects.filter(is_active=True).count(),
-        'inactive_customers': Customer.objects.filter(is_active=False).count(),
-        'vip_customers': Customer.objects.filter(is_vip=True).count(),
-        
-        # Nuevos clientes
-        'new_today': Customer.objects.filter(created_at__date=today).count(),
-        'new_this_week': Customer.objects.filter(created_at__date__gte=week_ago).count(),
-        'new_this_month': Customer.objects.filter(created_at__date__gte=month_ago).count(),
-        
-        # Métricas financieras
-        'total_revenue': float(Customer.objects.aggregate(total=Sum('total_spent'))['total'] or 0),
-        'avg_order_value': float(Customer.objects.aggregate(avg=Avg('average_order_value'))['avg'] or 0),
-        'avg_orders_per_customer': Customer.objects.aggregate(avg=Avg('total_orders'))['avg'] or 0,
-    }
-    
-    # Distribución por tipo de cliente
-    type_distribution = Customer.objects.values('customer_type').annotate(
-        count=Count('id'),
-        total_spent=Sum('total_spent'),
-        avg_orders=Avg('total_orders')
-    ).order_by('-count')
-    
-    stats['type_distribution'] = list(type_distribution)
-    
-    # Clientes por ciudad (top 10)
-    top_cities = Customer.objects.exclude(city='').values('city').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-    
-    stats['top_cities'] = list(top_cities)
-    
-    # Clientes top por gasto (top 10)
-    top_spenders = Customer.objects.order_by('-total_spent')[:10].values(
-        'id', 'email', 'first_name', 'last_name', 'total_spent', 'total_orders'
-    )
-    
-    stats['top_spenders'] = list(top_spenders)
-    
     return Response({
         'status': 'success',
-        'data': stats
+        'data': get_customer_stats()
     })
 
 
@@ -1132,16 +1062,8 @@ def admin_search_customers(request):
     
     query = serializer.validated_data['query']
     
-    # Búsqueda en múltiples campos
-    customers = Customer.objects.filter(
-        Q(email__icontains=query) |
-        Q(phone__icontains=query) |
-        Q(first_name__icontains=query) |
-        Q(last_name__icontains=query) |
-        Q(cedula__icontains=query) |
-        Q(address__icontains=query) |
-        Q(city__icontains=query)
-    ).order_by('-created_at')[:50] 
+    # Email, cédula/teléfono o nombre según el tipo de consulta
+    customers, strategy = search_customers(query, limit=50)
     
     serializer = CustomerSerializer(customers, many=True)
     
@@ -1149,11 +1071,123 @@ def admin_search_customers(request):
         'status': 'success',
         'data': {
             'query': query,
-            'total_results': customers.count(),
+            'strategy': strategy,
+            'total_results': len(customers),
             'customers': serializer.data
         }
     })
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@using_replica()
+def admin_duplicate_customers(request):
+    """
+    Posibles clientes duplicados (solo admin)
+    GET /api/customers/admin/duplicates/?limit=50
+
+    Agrupados por cédula, email, teléfono o nombre + fecha de nacimiento
+    (ver identity.py). El primer cliente de cada grupo es el sugerido como principal.
+    """
+    try:
+        limit = min(max(int(request.query_params.get('limit', 50)), 1), 500)
+    except ValueError:
+        limit = 50
+
+    clusters = find_duplicate_clusters(limit=limit)
+    ids = [customer_id for cluster in clusters for customer_id in cluster['ids']]
+    customers = {
+        customer.id: customer
+        for customer in Customer.objects.filter(id__in=ids).only(
+            'id', 'email', 'first_name', 'last_name', 'cedula', 'phone', 'birth_date',
+            'total_orders', 'total_spent', 'created_at'
+        )
+    }
+
+    groups = []
+    for cluster in clusters:
+        members = [customers[customer_id] for customer_id in cluster['ids'] if customer_id in customers]
+        if len(members) < 2:
+            continue
+        primary = choose_primary(members)
+        members.sort(key=lambda c: c.pk != primary.pk)
+        groups.append({
+            'keys': cluster['keys'],
+            'customers': [
+                {
+                    'id': str(c.id),
+                    'email': c.email,
+                    'full_name': c.get_full_name(),
+                    'cedula': c.cedula,
+                    'phone': c.phone,
+                    'birth_date': c.birth_date,
+                    'total_orders': c.total_orders,
+                    'total_spent': float(c.total_spent),
+                    'created_at': c.created_at,
+                }
+                for c in members
+            ],
+        })
+
+    return Response({
+        'status': 'success',
+        'data': {
+            'total_groups': len(groups),
+            'groups': groups,
+        }
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def admin_merge_customers(request):
+    """
+    Fusionar clientes duplicados en uno (solo admin)
+    POST /api/customers/admin/merge/
+    {"primary_id": "...", "duplicate_ids": ["...", "..."]}
+
+    Órdenes, direcciones, notas, cupones y puntos pasan al principal y los
+    duplicados se eliminan.
+    """
+    primary_id = request.data.get('primary_id')
+    duplicate_ids = request.data.get('duplicate_ids') or []
+    if not primary_id or not isinstance(duplicate_ids, list) or not duplicate_ids:
+        return Response({
+            'status': 'error',
+            'message': 'primary_id y duplicate_ids son requeridos'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        primary = Customer.objects.get(id=primary_id)
+        duplicates = list(Customer.objects.filter(id__in=duplicate_ids).exclude(id=primary.id))
+    except (Customer.DoesNotExist, ValidationError):
+        return Response({
+            'status': 'error',
+            'message': 'Cliente no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if len(duplicates) != len(set(map(str, duplicate_ids)) - {str(primary.id)}):
+        return Response({
+            'status': 'error',
+            'message': 'Alguno de los duplicados no existe'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    merged_by = getattr(request.user, 'email', '') or getattr(request.user, 'username', '') or ''
+    try:
+        customer = merge_customers(primary, duplicates, merged_by=merged_by)
+    except IntegrityError as e:
+        logger.warning(f'Fusión de {primary.id} rechazada por la BD: {e}')
+        return Response({
+            'status': 'error',
+            'message': 'No se pudo fusionar: los clientes tienen datos que no pueden combinarse'
+        }, status=status.HTTP_409_CONFLICT)
+
+    return Response({
+        'status': 'success',
+        'message': f'{len(duplicates)} cliente(s) fusionado(s)',
+        'data': CustomerSerializer(customer).data
+    })
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def sync_external_customer(request):
@@ -1170,29 +1204,18 @@ def sync_external_customer(request):
         return Response({'status': 'error', 'message': 'Email requerido'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        # Valores inválidos para cédula/teléfono
-        invalid_values = ['', 'None', 'null', 'undefined', '-', '.', '0000000000']
-        
-        # 1. Búsqueda por EMAIL (Prioridad absoluta)
-        customer = Customer.objects.filter(email__iexact=email).first()
-        
-        # 2. Búsqueda por Cédula/Teléfono (Solo si no hay match por email)
-        if not customer:
-            
-            # Intentar por cédula
-            if cedula and str(cedula).strip() not in invalid_values:
-                potential = Customer.objects.filter(cedula=cedula).first()
-                if potential:
-                    # Solo usamos el match por cédula si el email coincide o está vacío
-                    if not potential.email or potential.email.lower() == email.lower():
-                        customer = potential
-            
-            # Intentar por teléfono
-            if not customer and phone and str(phone).strip() not in invalid_values:
-                potential = Customer.objects.filter(phone=phone).first()
-                if potential:
-                    if not potential.email or potential.email.lower() == email.lower():
-                        customer = potential
+        # Una consulta por email, cédula y teléfono normalizados. El email
+        # tiene prioridad; por cédula/teléfono solo se acepta un cliente sin
+        # email o con el mismo email.
+        email_normalized = normalize_email(email)
+        customer, _ = resolve_customer(
+            email=email,
+            cedula=cedula,
+            phone=phone,
+            priority=('email', 'cedula', 'phone'),
+            queryset=Customer.objects.filter(email_normalized__in=['', email_normalized]),
+        )
+        keys = identity_keys(cedula=cedula)
 
         # 3. Crear o actualizar cliente
         if customer:
@@ -1204,7 +1227,7 @@ def sync_external_customer(request):
             customer.city = data.get('city', customer.city) or customer.city
             
             # Actualizar cédula solo si no tiene una ya y el nuevo valor es válido
-            if cedula and cedula not in invalid_values and not customer.cedula:
+            if 'cedula' in keys and not customer.cedula:
                 customer.cedula = cedula
             
             # Actualizar fecha de nacimiento si se proporciona
@@ -1221,7 +1244,7 @@ def sync_external_customer(request):
                 first_name=data.get('first_name', ''),
                 last_name=data.get('last_name', ''),
                 phone=phone or '',
-                cedula=cedula if cedula and cedula not in invalid_values else None,
+                cedula=cedula if 'cedula' in keys else None,
                 address=data.get('address', ''),
                 city=data.get('city', ''),
                 birth_date=data.get('birth_date') or None
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0003_whatsapplog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maytapiconfig',
+            name='low_stock_alert_phones',
+            field=models.CharField(blank=True, default='', help_text='Números separados por coma que reciben el resumen de productos con stock bajo', max_length=255, verbose_name='Teléfonos Alerta Stock Bajo'),
+        ),
+        migrations.AlterField(
+            model_name='whatsapplog',
+            name='message_type',
+            field=models.CharField(choices=[('TEST', 'Prueba'), ('BIRTHDAY', 'Cumpleaños'), ('STOCK', 'Stock bajo'), ('OTHER', 'Otro')], default='OTHER', max_length=20, verbose_name='Tipo'),
+        ),
+    ]
@@ -46,6 +46,13 @@ class MaytapiConfig(models.Model):
         default="¡Feliz cumpleaños {name}! 🎉 En Luxe queremos celebrar contigo. Visítanos hoy y recibe un regalo especial de la casa. ¡Te esperamos!",
         help_text=_('Usa {name} para insertar el nombre del cliente.')
     )
+    low_stock_alert_phones = models.CharField(
+        _('Teléfonos Alerta Stock Bajo'),
+        max_length=255,
+        blank=True,
+        default='',
+        help_text=_('Números separados por coma que reciben el resumen de productos con stock bajo')
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -68,6 +75,7 @@ class MaytapiConfig(models.Model):
             existing.is_active = self.is_active
             existing.schedule_time = self.schedule_time
             existing.birthday_message_template = self.birthday_message_template
+            existing.low_stock_alert_phones = self.low_stock_alert_phones
             existing.save()
             return existing
         return super(MaytapiConfig, self).save(*args, **kwargs)
@@ -79,6 +87,7 @@ class WhatsAppLog(models.Model):
     TYPE_CHOICES = [
         ('TEST', 'Prueba'),
         ('BIRTHDAY', 'Cumpleaños'),
+        ('STOCK', 'Stock bajo'),
         ('OTHER', 'Otro'),
     ]
 
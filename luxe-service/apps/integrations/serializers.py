@@ -5,7 +5,7 @@ from .models import MaytapiConfig, WhatsAppLog
 class MaytapiConfigSerializer(serializers.ModelSerializer):
     class Meta:
         model = MaytapiConfig
-        fields = ['id', 'product_id', 'token', 'api_url', 'phone_id', 'is_active', 'schedule_time', 'birthday_message_template']
+        fields = ['id', 'product_id', 'token', 'api_url', 'phone_id', 'is_active', 'schedule_time', 'birthday_message_template', 'low_stock_alert_phones']
 
 class WhatsAppLogSerializer(serializers.ModelSerializer):
     class Meta:
@@ -62,15 +62,6 @@ def check_and_send_birthday_greetings():
         logger.info("No hay cumpleañeros hoy.")
         return 0
 
-    base_url = config.api_url.rstrip('/')
-    # Asumimos que necesitamos el phone_id. Si no, usamos fallback.
-    target_url = f"{base_url}/{config.phone_id}/sendMessage" if config.phone_id else f"{base_url}/sendMessage"
-    
-    headers = {
-        'x-maytapi-key': config.token,
-        'Content-Type': 'application/json'
-    }
-
     count = 0
     for customer in birthday_customers:
         if not customer.phone:
@@ -84,42 +75,52 @@ def check_and_send_birthday_greetings():
              
         message_text = template.replace("{name}", customer.first_name or "Cliente")
 
-        payload = {
-            "to_number": normalize_ec_phone(customer.phone), # Asegurar formato internacional
-            "type": "text",
-            "message": message_text
-        }
-
-        try:
-            logger.info(f"Enviando felicitación a {customer.first_name} ({customer.phone})")
-            response = requests.post(target_url, json=payload, headers=headers)
-            
-            status_text = 'sent' if response.status_code in [200, 201, 202] else 'failed'
-            
-            # Guardar Log
-            WhatsAppLog.objects.create(
-                phone_number=customer.phone,
-                message=message_text,
-                message_type='BIRTHDAY',
-                status=status_text,
-                response_data=response.text
-            )
-
-            if response.status_code in [200, 201, 202]:
-                count += 1
-            else:
-                logger.error(f"Fallo envío a {customer.phone}: {response.text}")
-
-        except Exception as e:
-            logger.error(f"Error enviando mensaje a cliente {customer.id}: {e}")
-            WhatsAppLog.objects.create(
-                phone_number=customer.phone,
-                message=message_text,
-                message_type='BIRTHDAY',
-                status='error',
-                response_data=str(e)
-            )
+        logger.info(f"Enviando felicitación a {customer.first_name} ({customer.phone})")
+        if send_whatsapp_text(config, customer.phone, message_text, message_type='BIRTHDAY'):
+            count += 1
 
     logger.info(f"Felicitaciones enviadas hoy: {count}")
     return count
 
+
+
+def send_whatsapp_text(config, phone, message, message_type='OTHER'):
+    """
+    Envía un mensaje de texto vía Maytapi y lo registra en WhatsAppLog.
+    Retorna True si la API aceptó el mensaje.
+    """
+    base_url = config.api_url.rstrip('/')
+    target_url = f"{base_url}/{config.phone_id}/sendMessage" if config.phone_id else f"{base_url}/sendMessage"
+    headers = {
+        'x-maytapi-key': config.token.strip(),
+        'Content-Type': 'application/json'
+    }
+    payload = {
+        "to_number": normalize_ec_phone(phone),
+        "type": "text",
+        "message": message
+    }
+
+    try:
+        response = requests.post(target_url, json=payload, headers=headers, timeout=15)
+        sent = response.status_code in [200, 201, 202]
+        WhatsAppLog.objects.create(
+            phone_number=phone,
+            message=message,
+            message_type=message_type,
+            status='sent' if sent else 'failed',
+            response_data=response.text
+        )
+        if not sent:
+            logger.error(f"Fallo envío a {phone}: {response.text}")
+        return sent
+    except Exception as e:
+        logger.error(f"Error enviando mensaje a {phone}: {e}")
+        WhatsAppLog.objects.create(
+            phone_number=phone,
+            message=message,
+            message_type=message_type,
+            status='error',
+            response_data=str(e)
+        )
+        return False
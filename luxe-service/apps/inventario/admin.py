@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Product, Size, Extra, Combo, ComboProduct, Color, ProductVariant
+from .models import Category, Product, Size, Extra, Combo, ComboProduct, Color, ProductVariant, InventoryImportJob, InventoryExportJob, PriceUpdate, PriceHistory
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -74,3 +74,28 @@ class ProductVariantAdmin(admin.ModelAdmin):
     def get_price_display(self, obj):
         return f"${obj.get_price()}"
     get_price_display.short_description = 'Precio Final'
+
+@admin.register(InventoryImportJob)
+class InventoryImportJobAdmin(admin.ModelAdmin):
+    list_display = ('original_filename', 'status', 'processed_rows', 'created_count', 'updated_count', 'error_count', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('original_filename', 'created_by')
+    readonly_fields = ('started_at', 'finished_at', 'errors')
+
+@admin.register(InventoryExportJob)
+class InventoryExportJobAdmin(admin.ModelAdmin):
+    list_display = ('format', 'status', 'row_count', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'format')
+
+@admin.register(PriceUpdate)
+class PriceUpdateAdmin(admin.ModelAdmin):
+    list_display = ('field', 'mode', 'value', 'rounding', 'affected_count', 'reason', 'created_by', 'created_at')
+    list_filter = ('field', 'mode')
+    search_fields = ('reason', 'created_by')
+
+@admin.register(PriceHistory)
+class PriceHistoryAdmin(admin.ModelAdmin):
+    list_display = ('product', 'field', 'old_value', 'new_value', 'created_at')
+    list_filter = ('field',)
+    search_fields = ('product__name', 'product__code')
+    raw_id_fields = ('product', 'price_update')
@@ -6,3 +6,6 @@ class InventarioConfig(AppConfig):
     name = 'apps.inventario'
     verbose_name = 'Inventario'
 
+    def ready(self):
+        # Señales de invalidación del snapshot del menú
+        import apps.inventario.signals
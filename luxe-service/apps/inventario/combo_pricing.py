@@ -0,0 +1,94 @@
+"""
+apps/inventario/combo_pricing.py
+
+Precio individual y ahorro de los combos calculados en la base de datos.
+
+annotate_combo_pricing() agrega a un queryset de Combo:
+    individual_total     suma de product.price * quantity (subconsulta)
+    savings              individual_total - price
+    savings_percentage   ahorro sobre individual_total (0 si no hay productos)
+    products_count       productos en el combo
+
+Al ser anotaciones se pueden ordenar y filtrar (?min_savings_percentage=20).
+Las respuestas de listado se guardan en caché bajo la versión del menú, que
+se incrementa al cambiar productos (precios) o combos.
+"""
+
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, NullIf, Round
+
+from .menu_snapshot import get_menu_version, MENU_SNAPSHOT_TIMEOUT
+from .models import ComboProduct
+
+COMBO_CACHE_KEY = 'combos:{version}:{name}:{params}'
+
+PRICING_ORDERING_FIELDS = ['individual_total', 'savings', 'savings_percentage']
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def annotate_combo_pricing(queryset):
+    """Anota precio individual, ahorro y conteo de productos (sin recorrer combos en Python)"""
+    combo_products = ComboProduct.objects.filter(combo=OuterRef('pk')).order_by().values('combo')
+
+    individual_total = combo_products.annotate(
+        total=Sum(F('product__price') * F('quantity'), output_field=MONEY)
+    ).values('total')
+    products_count = combo_products.annotate(total=Count('pk')).values('total')
+
+    return queryset.annotate(
+        individual_total=Coalesce(Subquery(individual_total, output_field=MONEY), Value(0), output_field=MONEY),
+        products_count=Coalesce(Subquery(products_count), Value(0)),
+    ).annotate(
+        savings=ExpressionWrapper(F('individual_total') - F('price'), output_field=MONEY),
+    ).annotate(
+        savings_percentage=Coalesce(
+            Round(
+                ExpressionWrapper(F('savings') * 100 / NullIf(F('individual_total'), Value(0)), output_field=MONEY),
+                2,
+                output_field=MONEY,
+            ),
+            Value(0),
+            output_field=MONEY,
+        ),
+    )
+
+
+def filter_by_savings(queryset, params):
+    """?min_savings=, ?min_savings_percentage=, ?max_savings_percentage="""
+    filters = {
+        'min_savings': 'savings__gte',
+        'min_savings_percentage': 'savings_percentage__gte',
+        'max_savings_percentage': 'savings_percentage__lte',
+    }
+    for param, lookup in filters.items():
+        try:
+            value = Decimal(params.get(param, ''))
+        except InvalidOperation:
+            continue
+        if not value.is_finite():
+            continue
+        queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+def cached_combo_data(request, name, build):
+    """
+    Datos de respuesta cacheados por versión del menú, host y parámetros de
+    la URL. Las imágenes salen con URL absoluta (build_absolute_uri), por eso
+    el esquema y el host forman parte de la clave.
+    `build` se llama solo si no hay entrada para la versión actual.
+    """
+    query = '&'.join(f'{k}={v}' for k, v in sorted(request.query_params.lists()))
+    params = hashlib.md5(f'{request.scheme}://{request.get_host()}?{query}'.encode()).hexdigest()
+    key = COMBO_CACHE_KEY.format(version=get_menu_version(), name=name, params=params)
+
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, MENU_SNAPSHOT_TIMEOUT)
+    return data
@@ -0,0 +1,190 @@
+"""
+apps/inventario/exporter.py
+
+Exportaciones de inventario (Excel y PDF) con memoria constante.
+
+- Los productos se leen con values_list().iterator() por bloques, sin
+  instanciar modelos ni cargar el catálogo completo.
+- El Excel se escribe con openpyxl en modo write_only y el PDF página a
+  página; ambos van a un archivo temporal que se envía por streaming
+  (FileResponse) o se sube a storage en una exportación en segundo plano.
+"""
+
+import logging
+import tempfile
+
+import openpyxl
+from django.core.files import File
+from django.utils import timezone
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from core.db_router import using_replica
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = (
+    'id', 'code', 'barcode', 'name', 'description', 'category__name',
+    'subgroup', 'brand', 'available_sizes', 'cost_price', 'last_purchase_cost',
+    'price', 'tax_rate', 'stock_quantity', 'min_stock_alert', 'track_stock',
+    'is_active', 'is_available', 'accounting_sales_account',
+    'accounting_cost_account', 'accounting_inventory_account',
+)
+
+EXCEL_HEADERS = [
+    'ID', 'Código', 'Código de Barras', 'Nombre', 'Descripción', 'Línea (Category)',
+    'Categoría (Subgroup)', 'Marca', 'Variantes (Ej: S-Rojo:2)', 'Costo Actual',
+    'Último Costo', 'Precio Venta', 'Impuesto (%)', 'Stock Actual',
+    'Mínimo Stock', 'Activo', 'Disponible',
+    'Cta. Ventas', 'Cta. Costos', 'Cta. Inventario'
+]
+
+CONTENT_TYPES = {
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+FILENAMES = {
+    'excel': 'inventario_completo.xlsx',
+    'pdf': 'inventario_luxe.pdf',
+}
+
+
+def export_rows():
+    """Productos como tuplas con nombre, leídos por bloques"""
+    return Product.objects.values_list(*EXPORT_FIELDS, named=True).iterator(chunk_size=CHUNK_SIZE)
+
+
+# ============================================================================
+# ESCRITORES
+# ============================================================================
+
+def write_excel(rows, fileobj):
+    """Escribe el Excel (mismas columnas que lee InventoryImporter)"""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Inventario")
+    ws.append(EXCEL_HEADERS)
+
+    count = 0
+    for p in rows:
+        ws.append([
+            str(p.id),
+            p.code or '',
+            p.barcode or '',
+            p.name,
+            p.description or '',
+            p.category__name or '-',
+            p.subgroup or '-',
+            p.brand or '-',
+            p.available_sizes or '',
+            float(p.cost_price) if p.cost_price else 0,
+            float(p.last_purchase_cost) if p.last_purchase_cost else 0,
+            float(p.price) if p.price else 0,
+            float(p.tax_rate) if p.tax_rate else 0,
+            p.stock_quantity if p.track_stock else 'N/A',
+            p.min_stock_alert if p.track_stock else 'N/A',
+            'Sí' if p.is_active else 'No',
+            'Sí' if p.is_available else 'No',
+            p.accounting_sales_account or '',
+            p.accounting_cost_account or '',
+            p.accounting_inventory_account or ''
+        ])
+        count += 1
+
+    wb.save(fileobj)
+    return count
+
+
+def write_pdf(rows, fileobj):
+    """Escribe el reporte PDF; cada página se comprime al cerrarse"""
+    p = canvas.Canvas(fileobj, pagesize=letter, pageCompression=1)
+    w, h = letter
+
+    def header():
+        y = h - 50
+        p.setFont("Helvetica-Bold", 16)
+        p.drawString(30, y, "Reporte de Inventario - Luxe")
+        y -= 30
+
+        p.setFont("Helvetica-Bold", 10)
+        p.drawString(30, y, "Nombre")
+        p.drawString(200, y, "Categoría")
+        p.drawString(350, y, "Precio")
+        p.drawString(420, y, "Stock")
+        p.drawString(500, y, "Estado")
+        p.setFont("Helvetica", 10)
+        return y - 20
+
+    y = header()
+    count = 0
+    for product in rows:
+        if y < 50:
+            p.showPage()
+            p.setFont("Helvetica", 10)
+            y = h - 50
+
+        name = product.name[:30] + "..." if len(product.name) > 30 else product.name
+        cat = product.category__name[:20] if product.category__name else "-"
+        stock = str(product.stock_quantity) if product.track_stock else "-"
+
+        p.drawString(30, y, name)
+        p.drawString(200, y, cat)
+        p.drawString(350, y, f"${product.price}")
+        p.drawString(420, y, stock)
+        p.drawString(500, y, "Activo" if product.is_active else "Inactivo")
+        y -= 15
+        count += 1
+
+    p.save()
+    return count
+
+
+WRITERS = {
+    'excel': write_excel,
+    'pdf': write_pdf,
+}
+
+
+def build_export(export_format):
+    """
+    Genera la exportación en un archivo temporal (leyendo de la réplica si
+    está disponible). Retorna (archivo posicionado al inicio, productos).
+    """
+    fileobj = tempfile.TemporaryFile()
+    try:
+        with using_replica():
+            count = WRITERS[export_format](export_rows(), fileobj)
+    except Exception:
+        fileobj.close()
+        raise
+    fileobj.seek(0)
+    return fileobj, count
+
+
+# ============================================================================
+# SEGUNDO PLANO
+# ============================================================================
+
+def run_export_job(job):
+    """Genera el archivo de un InventoryExportJob y lo guarda en storage"""
+    job.status = 'running'
+    job.save(update_fields=['status'])
+
+    try:
+        fileobj, count = build_export(job.format)
+        with fileobj:
+            job.file.save(FILENAMES[job.format], File(fileobj), save=False)
+        job.row_count = count
+        job.status = 'completed'
+        job.message = f'Exportación completada. {count} productos.'
+    except Exception as e:
+        logger.exception(f'Error en exportación de inventario {job.id}')
+        job.status = 'failed'
+        job.message = f'Error generando exportación: {e}'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'row_count', 'message', 'finished_at'])
+    return job
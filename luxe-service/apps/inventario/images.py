@@ -0,0 +1,233 @@
+"""
+apps/inventario/images.py
+
+Versiones redimensionadas (renditions) de las imágenes de categorías,
+productos y galería.
+
+Al subir una imagen, una tarea de Celery genera copias WebP y JPEG a los
+anchos de IMAGE_RENDITIONS_CONFIG y las guarda junto al original:
+
+    inventario/items/<id>.jpg
+    inventario/items/renditions/<id>-320w.<hash>.webp
+
+El hash del contenido en el nombre permite servirlas con Cache-Control
+inmutable. El resultado se guarda en `image_renditions` del modelo:
+
+    {'source': 'inventario/items/<id>.jpg', 'width': 2400, 'height': 1600,
+     'webp': {'320': '<nombre>', ...}, 'jpeg': {'320': '<nombre>', ...}}
+"""
+
+import hashlib
+import io
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Modelos con imagen y campo image_renditions
+RENDITION_MODELS = ('inventario.Category', 'inventario.Product', 'inventario.ProductImage')
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+# Ancho mínimo de la miniatura que se expone aparte del srcset
+THUMBNAIL_WIDTH = 320
+
+
+def _config(key, default):
+    return getattr(settings, 'IMAGE_RENDITIONS_CONFIG', {}).get(key, default)
+
+
+_storage = None
+
+
+def rendition_storage():
+    """
+    Storage para las renditions. En Spaces/S3 se usa una instancia con
+    Cache-Control de larga duración (los originales conservan el suyo).
+    """
+    global _storage
+    if _storage is None:
+        _storage = default_storage
+        try:
+            from storages.backends.s3boto3 import S3Boto3Storage
+        except ImportError:
+            S3Boto3Storage = None
+        if S3Boto3Storage is not None and isinstance(default_storage, S3Boto3Storage):
+            object_parameters = dict(getattr(settings, 'AWS_S3_OBJECT_PARAMETERS', {}))
+            object_parameters['CacheControl'] = _config('cache_control', 'public, max-age=31536000, immutable')
+            _storage = S3Boto3Storage(object_parameters=object_parameters)
+    return _storage
+
+
+def needs_renditions(image_field, renditions):
+    """True si hay imagen y sus renditions no corresponden al archivo actual"""
+    return bool(image_field) and (renditions or {}).get('source') != image_field.name
+
+
+def image_replaced(image_field):
+    """
+    True si se está subiendo un archivo nuevo (aún sin guardar en el storage).
+    upload_to genera siempre <id>.<ext> y S3 sobrescribe, así que al reemplazar
+    la foto el nombre no cambia y `source` no basta para detectarlo.
+    """
+    return bool(image_field) and not getattr(image_field, '_committed', True)
+
+
+# ============================================================================
+# GENERACIÓN
+# ============================================================================
+
+def _target_widths(width):
+    """Anchos configurados menores al original (sin ampliar)"""
+    widths = [w for w in sorted(_config('widths', [160, 320, 640, 1280])) if w < width]
+    return widths or [width]
+
+
+def _encode(image, image_format):
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        # JPEG no soporta transparencia: se compone sobre blanco
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode in ('RGBA', 'LA'):
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+
+    buffer = io.BytesIO()
+    options = {'quality': _config('quality', 80)}
+    if image_format == 'jpeg':
+        options.update(optimize=True, progressive=True)
+    else:
+        options['method'] = 4
+    image.save(buffer, PIL_FORMATS[image_format], **options)
+    return buffer.getvalue()
+
+
+def generate_renditions(image_field):
+    """
+    Genera y guarda las renditions de un ImageField. Retorna el diccionario
+    para `image_renditions`.
+    """
+    storage = rendition_storage()
+    directory, filename = os.path.split(image_field.name)
+    stem = os.path.splitext(filename)[0]
+
+    with image_field.storage.open(image_field.name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        image.load()
+
+    renditions = {'source': image_field.name, 'width': image.width, 'height': image.height}
+    for image_format in _config('formats', ['webp', 'jpeg']):
+        renditions[image_format] = {}
+
+    for width in _target_widths(image.width):
+        if width == image.width:
+            resized = image
+        else:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+
+        for image_format in _config('formats', ['webp', 'jpeg']):
+            content = _encode(resized, image_format)
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            name = os.path.join(
+                directory, 'renditions', f'{stem}-{width}w.{digest}.{EXTENSIONS[image_format]}'
+            )
+            # Mismo contenido, mismo nombre: no se vuelve a subir
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(content))
+            renditions[image_format][str(width)] = name
+
+    return renditions
+
+
+def _rendition_names(renditions):
+    names = set()
+    for image_format in PIL_FORMATS:
+        names.update((renditions or {}).get(image_format, {}).values())
+    return names
+
+
+def process_image(model_label, pk, force=False):
+    """
+    Genera las renditions de una instancia y las guarda con update() (sin
+    disparar señales). Elimina las renditions anteriores que ya no se usan.
+    Retorna True si se generaron.
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only('pk', 'image', 'image_renditions').first()
+    if instance is None or not instance.image:
+        return False
+    if not force and not needs_renditions(instance.image, instance.image_renditions):
+        return False
+
+    previous = _rendition_names(instance.image_renditions)
+    renditions = generate_renditions(instance.image)
+    model.objects.filter(pk=pk).update(image_renditions=renditions)
+
+    storage = rendition_storage()
+    for name in previous - _rendition_names(renditions):
+        try:
+            storage.delete(name)
+        except Exception as e:
+            logger.warning(f'No se pudo eliminar rendition {name}: {e}')
+
+    from .menu_snapshot import bump_menu_version
+    bump_menu_version()
+    return True
+
+
+def delete_renditions(renditions):
+    """Elimina los archivos de renditions (al borrar la instancia)"""
+    storage = rendition_storage()
+    for name in _rendition_names(renditions):
+        try:
+            storage.delete(name)
+        except Exception as e:
+            logger.warning(f'No se pudo eliminar rendition {name}: {e}')
+
+
+# ============================================================================
+# SERIALIZACIÓN
+# ============================================================================
+
+def rendition_urls(renditions, request=None):
+    """
+    Formato para el frontend:
+        {'webp': '<url> 320w, <url> 640w', 'jpeg': '...',
+         'thumbnail': '<url WebP de ~320px>', 'width': 2400, 'height': 1600}
+    None si la imagen aún no tiene renditions o quedaron obsoletas.
+    """
+    if not renditions or not renditions.get('source'):
+        return None
+
+    storage = rendition_storage()
+
+    def url(name):
+        value = storage.url(name)
+        if request is not None and value.startswith('/'):
+            value = request.build_absolute_uri(value)
+        return value
+
+    data = {'width': renditions.get('width'), 'height': renditions.get('height')}
+    for image_format in PIL_FORMATS:
+        by_width = sorted(
+            ((int(width), name) for width, name in renditions.get(image_format, {}).items())
+        )
+        if not by_width:
+            continue
+        data[image_format] = ', '.join(f'{url(name)} {width}w' for width, name in by_width)
+        if 'thumbnail' not in data:
+            thumbnail = next((name for width, name in by_width if width >= THUMBNAIL_WIDTH), by_width[-1][1])
+            data['thumbnail'] = url(thumbnail)
+    return data
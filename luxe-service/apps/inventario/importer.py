@@ -0,0 +1,462 @@
+"""
+apps/inventario/importer.py
+
+Motor de importación masiva de inventario desde Excel.
+
+- Lee el archivo en modo streaming (openpyxl read_only) sin cargar todas
+  las filas en memoria.
+- Precarga en pocas consultas los mapas barcode/código/nombre -> producto y
+  nombre -> categoría; el emparejamiento de filas no consulta la BD.
+- Compara contra los valores actuales y escribe por bloques con
+  bulk_create / bulk_update; las filas sin cambios no se tocan.
+- Si un bloque falla por integridad, se reintenta fila por fila para
+  aislar los errores.
+
+Formato de columnas (igual al exportado por InventoryExportExcelView):
+0 Id, 1 Código, 2 Código de barras, 3 Nombre, 4 Descripción, 5 Línea
+(categoría), 6 Subgrupo, 7 Marca, 8 Tallas, 9 Costo, 10 Costo última
+compra, 11 Precio, 12 IVA, 13 Stock, 17-19 Cuentas contables.
+"""
+
+import logging
+import random
+import string
+import uuid
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CATEGORY_NAME = 'Importados'
+
+UPDATE_FIELDS = [
+    'name', 'category', 'price', 'code', 'barcode',
+    'cost_price', 'last_purchase_cost', 'tax_rate',
+    'accounting_sales_account', 'accounting_cost_account', 'accounting_inventory_account',
+    'line', 'subgroup', 'brand', 'description', 'available_sizes',
+    'track_stock', 'stock_quantity', 'is_available',
+]
+
+TWO_PLACES = Decimal('0.01')
+
+
+def _cell(row, idx):
+    try:
+        return row[idx]
+    except IndexError:
+        return None
+
+
+def _to_decimal(value):
+    if value is None or value == '':
+        return Decimal('0.00')
+    try:
+        return Decimal(str(value).replace(',', '.').strip()).quantize(TWO_PLACES)
+    except (InvalidOperation, ValueError):
+        return Decimal('0.00')
+
+
+def _to_tax(value):
+    """IVA como '15%', 15 o 0.15 -> 15.00"""
+    if value is None:
+        return Decimal('0.00')
+    tax = _to_decimal(str(value).replace('%', ''))
+    if 0 < tax < 1:
+        tax = (tax * 100).quantize(TWO_PLACES)
+    return tax
+
+
+def _to_stock(value):
+    """Retorna (stock, tiene_stock). 'N/A' o vacío = no controla stock"""
+    if value is None or str(value).strip().lower() == 'n/a':
+        return 0, False
+    try:
+        return max(int(float(str(value).replace(',', '.'))), 0), True
+    except ValueError:
+        return 0, False
+
+
+def _text(value, max_length=None):
+    text = str(value).strip() if value is not None else ''
+    return text[:max_length] if max_length else text
+
+
+def _code(value, max_length):
+    """Códigos numéricos de Excel llegan como float (123.0)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()[:max_length] or None
+
+
+class InventoryImporter:
+    """
+    Ejecuta una importación. `on_progress(importer)` se llama después de
+    cada bloque para reportar avance.
+    """
+
+    def __init__(self, file_obj, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+        self.file_obj = file_obj
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+
+        self.total_rows = 0
+        self.processed_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []
+        self._pending_errors = []
+
+        # Productos con tallas nuevas o modificadas (sincronizar variantes)
+        self.variant_updates = []
+
+    # ------------------------------------------------------------------
+    # Precarga
+    # ------------------------------------------------------------------
+
+    def _preload(self):
+        self.categories = {
+            name.lower(): category_id
+            for category_id, name in Category.objects.values_list('id', 'name')
+        }
+        self.category_slugs = set(Category.objects.values_list('slug', flat=True))
+
+        self.by_barcode, self.by_code, self.by_name = {}, {}, {}
+        for product_id, barcode, code, name in Product.objects.values_list(
+            'id', 'barcode', 'code', 'name'
+        ).iterator(chunk_size=5000):
+            if barcode:
+                self.by_barcode[barcode] = product_id
+            if code:
+                self.by_code[code] = product_id
+            if name:
+                self.by_name.setdefault(name.lower(), product_id)
+
+    def _category_id(self, linea):
+        """Id de la categoría por nombre (sin distinguir mayúsculas); se crea si falta"""
+        name = _text(linea, 100) or DEFAULT_CATEGORY_NAME
+        category_id = self.categories.get(name.lower())
+        if category_id is None:
+            base_slug = name.lower().replace(' ', '-')[:90] or 'importados'
+            slug = base_slug
+            while slug in self.category_slugs:
+                slug = f'{base_slug}-{uuid.uuid4().hex[:6]}'
+            category = Category.objects.create(
+                name=name,
+                slug=slug,
+                description='Categoría para productos importados' if name == DEFAULT_CATEGORY_NAME else ''
+            )
+            category_id = category.id
+            self.categories[name.lower()] = category_id
+            self.category_slugs.add(slug)
+        return category_id
+
+    def _new_code(self):
+        """Código de 8 dígitos no usado (misma regla que Product.save)"""
+        while True:
+            code = ''.join(random.choices(string.digits, k=8))
+            if code not in self.by_code:
+                return code
+
+    # ------------------------------------------------------------------
+    # Filas
+    # ------------------------------------------------------------------
+
+    def _parse(self, row):
+        stock, has_stock = _to_stock(_cell(row, 13))
+        return {
+            'code': _code(_cell(row, 1), 50),
+            'barcode': _code(_cell(row, 2), 100),
+            'name': _text(_cell(row, 3), 200),
+            'description': _text(_cell(row, 4)),
+            'line': _text(_cell(row, 5), 100),
+            'subgroup': _text(_cell(row, 6), 100),
+            'brand': _text(_cell(row, 7), 100),
+            'available_sizes': _text(_cell(row, 8), 200),
+            'cost_price': _to_decimal(_cell(row, 9)),
+            'last_purchase_cost': _to_decimal(_cell(row, 10)),
+            'price': _to_decimal(_cell(row, 11)),
+            'tax_rate': _to_tax(_cell(row, 12)),
+            'stock': stock,
+            'has_stock': has_stock,
+            'accounting_sales_account': _text(_cell(row, 17), 50),
+            'accounting_cost_account': _text(_cell(row, 18), 50),
+            'accounting_inventory_account': _text(_cell(row, 19), 50),
+        }
+
+    def _match(self, data):
+        """Mismo orden que el importador original: barcode, código, nombre"""
+        if data['barcode'] and data['barcode'] in self.by_barcode:
+            return self.by_barcode[data['barcode']]
+        if data['code'] and data['code'] in self.by_code:
+            return self.by_code[data['code']]
+        return self.by_name.get(data['name'].lower())
+
+    def _check_unique(self, data, product_id):
+        """Evita que un bloque completo falle por un código repetido"""
+        for field, index in (('barcode', self.by_barcode), ('code', self.by_code)):
+            value = data[field]
+            owner = index.get(value) if value else None
+            if owner is not None and owner != product_id:
+                raise ValueError(f'{field} "{value}" ya pertenece a otro producto')
+
+    @staticmethod
+    def _apply(product, data, category_id):
+        """Asigna los valores de la fila; retorna True si algo cambió"""
+        values = {
+            'name': data['name'],
+            'category_id': category_id,
+            'price': data['price'],
+            'cost_price': data['cost_price'],
+            'last_purchase_cost': data['last_purchase_cost'],
+            'tax_rate': data['tax_rate'],
+            'accounting_sales_account': data['accounting_sales_account'],
+            'accounting_cost_account': data['accounting_cost_account'],
+            'accounting_inventory_account': data['accounting_inventory_account'],
+            'line': data['line'],
+            'subgroup': data['subgroup'],
+            'brand': data['brand'],
+            'description': data['description'],
+            'available_sizes': data['available_sizes'],
+        }
+        if data['code']:
+            values['code'] = data['code']
+        if data['barcode']:
+            values['barcode'] = data['barcode']
+        if data['has_stock']:
+            values['track_stock'] = True
+            values['stock_quantity'] = data['stock']
+
+        track_stock = values.get('track_stock', product.track_stock)
+        stock = values.get('stock_quantity', product.stock_quantity)
+        if track_stock:
+            # Misma regla que Product.save()
+            values['is_available'] = stock > 0
+
+        changed = False
+        for field, value in values.items():
+            current = getattr(product, field)
+            if isinstance(current, float):
+                current = Decimal(str(current)).quantize(TWO_PLACES)
+            if current != value:
+                setattr(product, field, value)
+                changed = True
+        return changed
+
+    def _index(self, product):
+        if product.barcode:
+            self.by_barcode[product.barcode] = product.id
+        if product.code:
+            self.by_code[product.code] = product.id
+        self.by_name.setdefault(product.name.lower(), product.id)
+
+    def _unindex(self, product):
+        for index, key in ((self.by_barcode, product.barcode), (self.by_code, product.code),
+                           (self.by_name, product.name.lower())):
+            if key and index.get(key) == product.id:
+                del index[key]
+
+    # ------------------------------------------------------------------
+    # Bloques
+    # ------------------------------------------------------------------
+
+    def _process_chunk(self, rows):
+        parsed = []
+        for row_number, row in rows:
+            try:
+                data = self._parse(row)
+                if not data['name']:
+                    continue
+                parsed.append((row_number, data, self._match(data)))
+            except Exception as e:
+                self._error(row_number, e)
+
+        existing = Product.objects.in_bulk(
+            {product_id for _, _, product_id in parsed if product_id is not None}
+        )
+
+        to_create, to_update = {}, {}
+        for row_number, data, product_id in parsed:
+            try:
+                self._check_unique(data, product_id)
+                category_id = self._category_id(data['line'])
+
+                if product_id is None:
+                    product = Product(slug=self._new_slug(data['name']), is_active=True, is_available=True)
+                    self._apply(product, data, category_id)
+                    if not product.code:
+                        product.code = self._new_code()
+                    to_create[product.id] = (row_number, product)
+                    self._index(product)
+                    self.created += 1
+                    changed_sizes = bool(product.available_sizes)
+                else:
+                    pending = to_create.get(product_id) or to_update.get(product_id)
+                    product = pending[1] if pending else existing.get(product_id)
+                    if product is None:
+                        raise ValueError('El producto emparejado ya no existe')
+                    previous_sizes = product.available_sizes
+                    if self._apply(product, data, category_id):
+                        product.updated_at = timezone.now()
+                        if product_id not in to_create:
+                            to_update[product_id] = (row_number, product)
+                        self.updated += 1
+                    else:
+                        self.unchanged += 1
+                    self._index(product)
+                    changed_sizes = product.available_sizes != previous_sizes
+
+                if changed_sizes:
+                    self.variant_updates.append(product)
+            except Exception as e:
+                self._error(row_number, e)
+
+        self._write(list(to_create.values()), list(to_update.values()))
+
+    def _new_slug(self, name):
+        base_slug = name.lower().replace(' ', '-').replace('/', '-')[:150]
+        return f'{base_slug}-{uuid.uuid4().hex[:6]}'
+
+    def _write(self, to_create, to_update):
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_create([product for _, product in to_create], batch_size=500)
+                Product.objects.bulk_update(
+                    [product for _, product in to_update], UPDATE_FIELDS + ['updated_at'], batch_size=500
+                )
+            return
+        except IntegrityError as e:
+            logger.warning(f'Bloque de importación con conflicto, reintentando por fila: {e}')
+
+        # Aislar las filas conflictivas sin perder el resto del bloque
+        for is_new, items in ((True, to_create), (False, to_update)):
+            for row_number, product in items:
+                try:
+                    with transaction.atomic():
+                        if is_new:
+                            Product.objects.bulk_create([product])
+                        else:
+                            Product.objects.bulk_update([product], UPDATE_FIELDS + ['updated_at'])
+                except IntegrityError as e:
+                    self._unindex(product)
+                    if is_new:
+                        self.created -= 1
+                    else:
+                        self.updated -= 1
+                    if product in self.variant_updates:
+                        self.variant_updates.remove(product)
+                    self._error(row_number, e)
+
+    def _error(self, row_number, error):
+        self._pending_errors.append({'row': row_number, 'error': str(error)})
+
+    def pop_errors(self):
+        """Errores acumulados desde la última llamada"""
+        errors, self._pending_errors = self._pending_errors, []
+        self.errors.extend(errors)
+        return errors
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _sync_variants(self):
+        from .variants import sync_variants
+        try:
+            sync_variants(self.variant_updates)
+        except Exception as e:
+            self._error('-', f'Tallas del bloque: {e}')
+        self.variant_updates = []
+
+    def run(self):
+        self._preload()
+
+        workbook = openpyxl.load_workbook(self.file_obj, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            self.total_rows = max((sheet.max_row or 1) - 1, 0)
+
+            chunk = []
+            for row_number, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+                chunk.append((row_number, row))
+                if len(chunk) >= self.chunk_size:
+                    self._run_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self._run_chunk(chunk)
+        finally:
+            workbook.close()
+
+        self._finish()
+        return self
+
+    def _run_chunk(self, chunk):
+        self._process_chunk(chunk)
+        self._sync_variants()
+        self.processed_rows += len(chunk)
+        self.total_rows = max(self.total_rows, self.processed_rows)
+        if self.on_progress:
+            self.on_progress(self)
+
+    def _finish(self):
+        # bulk_create / bulk_update no disparan señales: invalidar cachés
+        from .menu_snapshot import bump_menu_version
+        from .scan_index import publish_invalidation
+        bump_menu_version()
+        publish_invalidation(None)
+
+    @property
+    def summary(self):
+        return {
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'errors': len(self.errors) + len(self._pending_errors),
+        }
+
+
+def run_import_job(job):
+    """Ejecuta un InventoryImportJob actualizando su progreso"""
+    job.status = 'running'
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    def on_progress(importer):
+        job.total_rows = importer.total_rows
+        job.processed_rows = importer.processed_rows
+        job.created_count = importer.created
+        job.updated_count = importer.updated
+        job.unchanged_count = importer.unchanged
+        job.add_errors(importer.pop_errors())
+        job.save(update_fields=[
+            'total_rows', 'processed_rows', 'created_count', 'updated_count',
+            'unchanged_count', 'error_count', 'errors',
+        ])
+
+    try:
+        with job.file.open('rb') as file_obj:
+            importer = InventoryImporter(file_obj, on_progress=on_progress).run()
+        on_progress(importer)
+        job.status = 'completed'
+        job.message = (
+            f'Importación completada. {importer.updated} actualizados, '
+            f'{importer.created} creados, {importer.unchanged} sin cambios.'
+        )
+    except Exception as e:
+        logger.exception(f'Error en importación de inventario {job.id}')
+        job.status = 'failed'
+        job.message = f'Error procesando archivo: {e}'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'message', 'finished_at'])
+    return job
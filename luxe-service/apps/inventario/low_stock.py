@@ -0,0 +1,189 @@
+"""
+apps/inventario/low_stock.py
+
+Productos y variantes con stock bajo (stock <= min_stock_alert del
+producto) ordenados por velocidad de venta, y alertas por WhatsApp.
+
+- Productos: el filtro coincide con el índice parcial product_low_stock_idx,
+  por lo que la consulta no recorre todo el catálogo.
+- Variantes: usan el mínimo de su producto (variant_active_stock_idx).
+- Velocidad: unidades vendidas en los últimos LOW_STOCK_CONFIG['velocity_days']
+  días (órdenes no canceladas), agregadas en una sola consulta.
+- Alertas: low_stock_alerted_at evita repetir un ítem hasta que se reponga.
+"""
+
+import logging
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .models import Product, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+LOW_STOCK_PRODUCT = Q(track_stock=True, is_active=True, stock_quantity__lte=F('min_stock_alert'))
+LOW_STOCK_VARIANT = Q(
+    is_active=True,
+    product__track_stock=True,
+    product__is_active=True,
+    stock_quantity__lte=F('product__min_stock_alert'),
+)
+
+
+def _config(key, default):
+    return getattr(settings, 'LOW_STOCK_CONFIG', {}).get(key, default)
+
+
+def _sales_by(field, ids, since):
+    """{id: unidades vendidas desde `since`} para product_id o variant_id"""
+    from apps.orders.models import OrderItem
+
+    if not ids:
+        return {}
+    rows = OrderItem.objects.filter(
+        **{f'{field}__in': ids},
+        order__created_at__gte=since,
+    ).exclude(
+        order__status='cancelled'
+    ).order_by().values(field).annotate(units=Sum('quantity'))
+    return {row[field]: row['units'] or 0 for row in rows}
+
+
+def low_stock_items(days=None):
+    """
+    Lista de ítems con stock bajo ordenada por velocidad de venta (desc) y
+    días de cobertura (asc). Cada ítem:
+        {type, product_id, variant_id, name, code, stock, min_stock,
+         sold, daily_velocity, days_of_cover, suggested_reorder}
+    """
+    days = days or _config('velocity_days', 30)
+    cover_days = _config('reorder_cover_days', 14)
+    since = timezone.now() - timedelta(days=days)
+
+    products = list(
+        Product.objects.filter(LOW_STOCK_PRODUCT).order_by().values(
+            'id', 'name', 'code', 'stock_quantity', 'min_stock_alert'
+        )
+    )
+    variants = list(
+        ProductVariant.objects.filter(LOW_STOCK_VARIANT).order_by().values(
+            'id', 'product_id', 'product__name', 'sku', 'size__name', 'color__name',
+            'stock_quantity', 'product__min_stock_alert'
+        )
+    )
+
+    product_sales = _sales_by('product_id', [row['id'] for row in products], since)
+    variant_sales = _sales_by('variant_id', [row['id'] for row in variants], since)
+
+    def item(item_type, product_id, variant_id, name, code, stock, min_stock, sold):
+        velocity = sold / days
+        # Reponer para cubrir cover_days de ventas más el mínimo
+        target = math.ceil(velocity * cover_days) + min_stock
+        return {
+            'type': item_type,
+            'product_id': str(product_id),
+            'variant_id': str(variant_id) if variant_id else None,
+            'name': name,
+            'code': code,
+            'stock': stock,
+            'min_stock': min_stock,
+            'sold': sold,
+            'daily_velocity': round(velocity, 2),
+            'days_of_cover': round(stock / velocity, 1) if velocity else None,
+            'suggested_reorder': max(target - stock, 0),
+        }
+
+    items = [
+        item('product', row['id'], None, row['name'], row['code'],
+             row['stock_quantity'], row['min_stock_alert'], product_sales.get(row['id'], 0))
+        for row in products
+    ]
+    for row in variants:
+        label = ' / '.join(filter(None, [row['size__name'], row['color__name']]))
+        items.append(item(
+            'variant', row['product_id'], row['id'],
+            f"{row['product__name']} ({label})" if label else row['product__name'],
+            row['sku'], row['stock_quantity'], row['product__min_stock_alert'],
+            variant_sales.get(row['id'], 0),
+        ))
+
+    items.sort(key=lambda i: (
+        -i['daily_velocity'],
+        i['days_of_cover'] if i['days_of_cover'] is not None else math.inf,
+        i['stock'],
+    ))
+    return items
+
+
+# ============================================================================
+# ALERTAS
+# ============================================================================
+
+def reset_replenished():
+    """Limpia la marca de alerta de los ítems que ya se repusieron"""
+    products = Product.objects.filter(low_stock_alerted_at__isnull=False).exclude(LOW_STOCK_PRODUCT).update(
+        low_stock_alerted_at=None
+    )
+    variants = ProductVariant.objects.filter(low_stock_alerted_at__isnull=False).exclude(LOW_STOCK_VARIANT).update(
+        low_stock_alerted_at=None
+    )
+    return products + variants
+
+
+def build_alert_message(items, max_items):
+    lines = [f"⚠️ Stock bajo en Luxe: {len(items)} producto(s)"]
+    for i in items[:max_items]:
+        code = f" [{i['code']}]" if i['code'] else ''
+        lines.append(f"• {i['name']}{code}: {i['stock']} (mín. {i['min_stock']}), reponer {i['suggested_reorder']}")
+    if len(items) > max_items:
+        lines.append(f"… y {len(items) - max_items} más. Ver inventario > stock bajo.")
+    return '\n'.join(lines)
+
+
+def send_low_stock_alerts():
+    """
+    Envía un solo mensaje por destinatario con los ítems que bajaron del
+    mínimo desde la última alerta. Retorna el número de ítems alertados.
+    """
+    from apps.integrations.models import MaytapiConfig
+    from apps.integrations.utils import send_whatsapp_text
+
+    reset_replenished()
+
+    config = MaytapiConfig.objects.first()
+    phones = [p.strip() for p in (config.low_stock_alert_phones if config else '').split(',') if p.strip()]
+    if not config or not config.is_active or not config.token or not phones:
+        logger.info("Alertas de stock bajo sin destinatarios o Maytapi inactivo.")
+        return 0
+
+    pending_products = set(
+        Product.objects.filter(LOW_STOCK_PRODUCT, low_stock_alerted_at__isnull=True).values_list('id', flat=True)
+    )
+    pending_variants = set(
+        ProductVariant.objects.filter(LOW_STOCK_VARIANT, low_stock_alerted_at__isnull=True).values_list('id', flat=True)
+    )
+    if not pending_products and not pending_variants:
+        return 0
+
+    product_keys = {str(pk) for pk in pending_products}
+    variant_keys = {str(pk) for pk in pending_variants}
+    items = [
+        i for i in low_stock_items()
+        if (i['type'] == 'product' and i['product_id'] in product_keys)
+        or (i['type'] == 'variant' and i['variant_id'] in variant_keys)
+    ]
+    message = build_alert_message(items, _config('alert_max_items', 30))
+
+    sent = [send_whatsapp_text(config, phone, message, message_type='STOCK') for phone in phones]
+    if not any(sent):
+        # Se reintenta en la próxima ejecución
+        return 0
+
+    now = timezone.now()
+    Product.objects.filter(id__in=pending_products).update(low_stock_alerted_at=now)
+    ProductVariant.objects.filter(id__in=pending_variants).update(low_stock_alerted_at=now)
+    logger.info(f"Alerta de stock bajo enviada: {len(items)} ítems a {sum(sent)} destinatario(s)")
+    return len(items)
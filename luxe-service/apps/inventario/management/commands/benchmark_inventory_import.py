@@ -0,0 +1,93 @@
+import io
+import random
+import time
+
+import openpyxl
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.inventario.importer import InventoryImporter
+from apps.inventario.models import Category, Product
+
+BENCHMARK_LINE = 'Benchmark Importación'
+
+SIZES = ['', '', 'S, M, L', 'M:2, L:3', '38, 39, 40']
+
+
+class Command(BaseCommand):
+    help = 'Genera un Excel sintético de inventario y mide el tiempo de importación'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Filas del archivo (ej. 50000)')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--runs', type=int, default=2, help='Corridas (la segunda mide filas sin cambios)')
+        parser.add_argument('--cleanup', action='store_true', help='Eliminar los productos sintéticos y salir')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = Product.objects.filter(line=BENCHMARK_LINE).delete()
+            Category.objects.filter(name=BENCHMARK_LINE).delete()
+            self.stdout.write(self.style.SUCCESS(f'✅ {deleted} registros eliminados'))
+            return
+
+        started = time.perf_counter()
+        payload = self._workbook(options['rows'])
+        self.stdout.write(
+            f"Archivo de {options['rows']} filas ({len(payload) / 1024 / 1024:.1f} MB) "
+            f"generado en {time.perf_counter() - started:.1f}s"
+        )
+
+        for run in range(1, options['runs'] + 1):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                importer = InventoryImporter(io.BytesIO(payload), chunk_size=options['chunk_size']).run()
+                elapsed = time.perf_counter() - started
+
+            summary = importer.summary
+            self.stdout.write(
+                f"Corrida {run}: {elapsed:.1f}s ({summary['processed_rows'] / elapsed:.0f} filas/s) | "
+                f"{summary['created']} creados, {summary['updated']} actualizados, "
+                f"{summary['unchanged']} sin cambios, {summary['errors']} errores | "
+                f"{len(queries)} consultas"
+            )
+
+        self.stdout.write(self.style.SUCCESS('✅ Listo. Use --cleanup para eliminar los datos sintéticos'))
+
+    def _workbook(self, rows):
+        """Excel con el mismo formato que InventoryExportExcelView (write_only)"""
+        rng = random.Random(42)
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet('Inventario')
+        sheet.append([
+            'ID', 'Código', 'Código de Barras', 'Nombre', 'Descripción', 'Línea (Category)',
+            'Categoría (Subgroup)', 'Marca', 'Variantes (Ej: S-Rojo:2)', 'Costo Actual',
+            'Último Costo', 'Precio Venta', 'Impuesto (%)', 'Stock Actual',
+            'Mínimo Stock', 'Activo', 'Disponible',
+            'Cta. Ventas', 'Cta. Costos', 'Cta. Inventario'
+        ])
+        for i in range(rows):
+            cost = round(rng.uniform(1, 80), 2)
+            sheet.append([
+                '',
+                f'BMI{i:07d}',
+                f'789{i:010d}',
+                f'Producto benchmark {i}',
+                '',
+                BENCHMARK_LINE,
+                f'Grupo {i % 50}',
+                f'Marca {i % 20}',
+                rng.choice(SIZES),
+                cost,
+                cost,
+                round(cost * 1.6, 2),
+                15,
+                rng.randint(0, 40),
+                5,
+                'Sí',
+                'Sí',
+                '', '', '',
+            ])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return buffer.getvalue()
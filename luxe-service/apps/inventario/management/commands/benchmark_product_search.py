@@ -0,0 +1,131 @@
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.inventario.models import Category, Product
+from apps.inventario.search import search_products
+
+BENCHMARK_CATEGORY_SLUG = 'benchmark-busqueda'
+
+NOUNS = [
+    'camiseta', 'pantalón', 'chaqueta', 'zapato', 'bolso', 'vestido', 'falda', 'gorra',
+    'bufanda', 'cinturón', 'calcetín', 'sudadera', 'blusa', 'abrigo', 'sandalia', 'mochila',
+    'hamburguesa', 'pizza', 'ensalada', 'jugo', 'café', 'empanada', 'torta', 'helado',
+]
+ADJECTIVES = [
+    'clásico', 'deportivo', 'elegante', 'casual', 'premium', 'básico', 'estampado',
+    'rayado', 'liso', 'doble', 'grande', 'pequeño', 'especial', 'vintage', 'moderno',
+]
+COLORS = ['negro', 'blanco', 'azul', 'rojo', 'verde', 'gris', 'beige', 'rosado', 'morado']
+BRANDS = ['Luxe', 'Andina', 'Pacífico', 'Sierra', 'Quito Wear', 'Costa', 'Amazonía', 'Galápagos']
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia (p50/p95/p99) de la búsqueda de productos sobre un catálogo sembrado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Productos sintéticos a crear (ej. 100000)')
+        parser.add_argument('--queries', type=int, default=500, help='Consultas a medir')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--cleanup', action='store_true', help='Eliminar los productos sintéticos y salir')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+
+        if options['cleanup']:
+            deleted, _ = Product.objects.filter(category__slug=BENCHMARK_CATEGORY_SLUG).delete()
+            Category.objects.filter(slug=BENCHMARK_CATEGORY_SLUG).delete()
+            self.stdout.write(self.style.SUCCESS(f'✅ {deleted} registros eliminados'))
+            return
+
+        if options['seed']:
+            self._seed(options['seed'], rng)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE inventario_product')
+
+        samples = list(
+            Product.objects.filter(category__slug=BENCHMARK_CATEGORY_SLUG)
+            .values_list('name', 'barcode', 'code')[:2000]
+        )
+        if not samples:
+            samples = list(Product.objects.values_list('name', 'barcode', 'code')[:2000])
+        if not samples:
+            self.stdout.write(self.style.ERROR('❌ No hay productos; use --seed 100000'))
+            return
+
+        total = Product.objects.count()
+        self.stdout.write(f'Catálogo: {total:,} productos — {options["queries"]} consultas')
+
+        timings = {}
+        for _ in range(options['queries']):
+            kind, query = self._make_query(rng, samples)
+            started = time.perf_counter()
+            results, strategy = search_products(query, limit=options['limit'])
+            elapsed = (time.perf_counter() - started) * 1000
+            timings.setdefault(kind, []).append(elapsed)
+            timings.setdefault('todas', []).append(elapsed)
+
+        for kind, values in timings.items():
+            values.sort()
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+            self.stdout.write(
+                f'{kind:<18} n={len(values):<5} p50={statistics.median(values):7.1f} ms  '
+                f'p95={p95:7.1f} ms  p99={p99:7.1f} ms'
+            )
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
+
+    def _make_query(self, rng, samples):
+        name, barcode, code = rng.choice(samples)
+        roll = rng.random()
+        if roll < 0.3 and (barcode or code):
+            return 'código exacto', barcode or code
+        words = name.split()
+        if roll < 0.7:
+            # Escritura parcial: primeras palabras con la última incompleta
+            count = rng.randint(1, min(3, len(words)))
+            partial = words[:count]
+            partial[-1] = partial[-1][:max(3, len(partial[-1]) - rng.randint(0, 3))]
+            return 'texto parcial', ' '.join(partial)
+        # Error de tipeo: se intercambian dos letras de una palabra
+        word = list(rng.choice(words))
+        if len(word) > 3:
+            i = rng.randint(0, len(word) - 2)
+            word[i], word[i + 1] = word[i + 1], word[i]
+        return 'con error', ''.join(word)
+
+    def _seed(self, count, rng):
+        category, _ = Category.objects.get_or_create(
+            slug=BENCHMARK_CATEGORY_SLUG,
+            defaults={'name': 'Benchmark búsqueda', 'is_active': False}
+        )
+        self.stdout.write(f'Sembrando {count:,} productos...')
+        started = time.perf_counter()
+        batch = []
+        for i in range(count):
+            name = f'{rng.choice(NOUNS).capitalize()} {rng.choice(ADJECTIVES)} {rng.choice(COLORS)}'
+            suffix = uuid.uuid4().hex[:10]
+            batch.append(Product(
+                category=category,
+                name=name,
+                slug=f'bench-{suffix}',
+                code=f'BX{suffix.upper()}',
+                barcode=f'{rng.randrange(10 ** 12, 10 ** 13)}{i % 10}',
+                description=f'{name} de la marca {rng.choice(BRANDS)}',
+                brand=rng.choice(BRANDS),
+                price=Decimal(rng.randint(100, 20000)) / 100,
+                is_active=False,
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            Product.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f'Sembrado en {time.perf_counter() - started:.1f}s')
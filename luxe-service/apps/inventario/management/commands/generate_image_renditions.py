@@ -0,0 +1,53 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.inventario.images import RENDITION_MODELS, process_image
+
+
+class Command(BaseCommand):
+    help = 'Genera las versiones redimensionadas (WebP/JPEG) de las imágenes existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', choices=[label.split('.')[1].lower() for label in RENDITION_MODELS],
+            help='Procesar solo un modelo (category, product, productimage)'
+        )
+        parser.add_argument('--force', action='store_true', help='Regenerar aunque ya estén al día')
+        parser.add_argument('--async', dest='use_celery', action='store_true', help='Encolar en Celery en lugar de procesar aquí')
+
+    def handle(self, *args, **options):
+        labels = [
+            label for label in RENDITION_MODELS
+            if not options['model'] or label.split('.')[1].lower() == options['model']
+        ]
+
+        for label in labels:
+            model = apps.get_model(label)
+            pending = [
+                pk for pk, image, renditions in model.objects.exclude(image='').exclude(image__isnull=True)
+                .values_list('pk', 'image', 'image_renditions').iterator()
+                if options['force'] or (renditions or {}).get('source') != image
+            ]
+            self.stdout.write(f'{label}: {len(pending)} imágenes pendientes')
+
+            started = time.perf_counter()
+            done = failed = 0
+            for pk in pending:
+                if options['use_celery']:
+                    from apps.inventario.tasks import generate_image_renditions
+                    generate_image_renditions.delay(label, str(pk), force=options['force'])
+                    done += 1
+                    continue
+                try:
+                    if process_image(label, pk, force=options['force']):
+                        done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'  ⚠️ {pk}: {e}'))
+
+            verb = 'encoladas' if options['use_celery'] else 'generadas'
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {label}: {done} {verb}, {failed} con error ({time.perf_counter() - started:.1f}s)'
+            ))
@@ -0,0 +1,136 @@
+"""
+apps/inventario/menu_snapshot.py
+
+Snapshot versionado del menú público.
+
+El menú completo se arma con pocas consultas (anotaciones + prefetch) y se
+guarda serializado en caché bajo la versión actual. Las señales de inventario
+incrementan la versión; los clientes con la misma versión reciben 304.
+"""
+
+import json
+import logging
+import time
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q
+
+from .models import Category, SubCategory, Product, Size, Extra, ProductImage, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+MENU_VERSION_KEY = 'menu:version'
+MENU_SNAPSHOT_KEY = 'menu:snapshot:{version}'
+MENU_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+# ============================================================================
+# VERSIÓN
+# ============================================================================
+
+def get_menu_version():
+    """Versión actual del menú (se inicializa con un timestamp)"""
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        # El timestamp evita reutilizar ETags viejos si la caché se vacía
+        cache.add(MENU_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+def bump_menu_version():
+    """Invalida el snapshot actual incrementando la versión"""
+    try:
+        version = cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        version = get_menu_version()
+    logger.debug('Versión de menú: %s', version)
+    return version
+
+
+def menu_etag(version):
+    return f'"menu-{version}"'
+
+
+# ============================================================================
+# CONSTRUCCIÓN
+# ============================================================================
+
+def _menu_products():
+    """Productos activos y disponibles con todo lo que serializa ProductListSerializer"""
+    return Product.objects.filter(
+        is_active=True,
+        is_available=True,
+        category__is_active=True,
+    ).select_related(
+        'category', 'subcategory'
+    ).annotate(
+        has_active_sizes=Exists(Size.objects.filter(product=OuterRef('pk'), is_active=True)),
+        has_active_extras=Exists(Extra.objects.filter(products=OuterRef('pk'), is_active=True)),
+    ).prefetch_related(
+        Prefetch('images', queryset=ProductImage.objects.order_by('display_order', 'created_at')),
+        Prefetch('variants', queryset=ProductVariant.objects.select_related('size__product', 'color')),
+    ).order_by('display_order', 'name')
+
+
+def build_menu_snapshot():
+    """
+    Arma el menú completo: categorías, subcategorías y productos en 5 consultas
+    (categorías, subcategorías, productos, imágenes y variantes).
+    """
+    from .serializers import CategorySerializer, SubCategorySerializer, ProductListSerializer
+
+    categories = list(
+        Category.objects.filter(is_active=True).annotate(
+            active_products_count=Count(
+                'products', filter=Q(products__is_active=True, products__is_available=True)
+            )
+        ).order_by('display_order')
+    )
+
+    subcategories_by_category = {}
+    subcategories = SubCategory.objects.filter(
+        is_active=True, category__is_active=True
+    ).annotate(
+        active_products_count=Count('products', filter=Q(products__is_active=True))
+    ).order_by('display_order')
+    for subcategory in subcategories:
+        subcategories_by_category.setdefault(subcategory.category_id, []).append(subcategory)
+
+    products_by_category = {}
+    for product in _menu_products():
+        products_by_category.setdefault(product.category_id, []).append(product)
+
+    context = {'subcategories_by_category': subcategories_by_category}
+    data = []
+    for category in categories:
+        category_data = CategorySerializer(category, context=context).data
+        category_data['products'] = ProductListSerializer(
+            products_by_category.get(category.id, []),
+            many=True
+        ).data
+        data.append(category_data)
+
+    return data
+
+
+def get_menu_snapshot(version=None):
+    """
+    Retorna (version, json) del menú. Si no hay snapshot para la versión
+    actual se construye y se guarda.
+    """
+    version = version or get_menu_version()
+    key = MENU_SNAPSHOT_KEY.format(version=version)
+
+    payload = cache.get(key)
+    if payload is None:
+        started = time.perf_counter()
+        payload = json.dumps(build_menu_snapshot(), cls=DjangoJSONEncoder)
+        cache.set(key, payload, MENU_SNAPSHOT_TIMEOUT)
+        logger.info(
+            'Snapshot de menú v%s generado en %.0f ms (%s bytes)',
+            version, (time.perf_counter() - started) * 1000, len(payload)
+        )
+
+    return version, payload
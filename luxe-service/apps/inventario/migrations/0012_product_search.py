@@ -0,0 +1,84 @@
+# Generated by Django 5.0.1 on 2026-10-19 05:56
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# El vector se arma en la BD para que también lo actualicen los imports
+# masivos (bulk_create / update) que no pasan por Product.save().
+# Pesos: A = nombre, código y código de barras; B = marca, línea, subgrupo
+# y categoría; C = descripción e ingredientes.
+SEARCH_TRIGGER_SQL = '''
+CREATE OR REPLACE FUNCTION inventario_product_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('spanish', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.code, '') || ' ' || coalesce(NEW.barcode, '')), 'A') ||
+        setweight(to_tsvector('spanish',
+            coalesce(NEW.brand, '') || ' ' || coalesce(NEW.line, '') || ' ' || coalesce(NEW.subgroup, '') || ' ' ||
+            coalesce((SELECT c.name FROM inventario_category c WHERE c.id = NEW.category_id), '')
+        ), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(NEW.description, '') || ' ' || coalesce(NEW.ingredients, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER inventario_product_search_vector_trg
+    BEFORE INSERT OR UPDATE OF name, code, barcode, brand, line, subgroup, description, ingredients, category_id
+    ON inventario_product
+    FOR EACH ROW EXECUTE FUNCTION inventario_product_search_vector();
+
+-- Renombrar una categoría recalcula el vector de sus productos
+CREATE OR REPLACE FUNCTION inventario_category_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE inventario_product SET category_id = category_id WHERE category_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER inventario_category_search_vector_trg
+    AFTER UPDATE OF name ON inventario_category
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION inventario_category_search_vector();
+
+-- Backfill de productos existentes
+UPDATE inventario_product SET name = name;
+'''
+
+DROP_SEARCH_TRIGGER_SQL = '''
+DROP TRIGGER IF EXISTS inventario_category_search_vector_trg ON inventario_category;
+DROP FUNCTION IF EXISTS inventario_category_search_vector();
+DROP TRIGGER IF EXISTS inventario_product_search_vector_trg ON inventario_product;
+DROP FUNCTION IF EXISTS inventario_product_search_vector();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0011_product_available_sizes_product_brand'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='product_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['code'], name='product_code_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGER_SQL, DROP_SEARCH_TRIGGER_SQL),
+    ]
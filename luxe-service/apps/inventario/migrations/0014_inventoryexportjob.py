@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:03
+
+import apps.inventario.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0013_inventoryimportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('format', models.CharField(choices=[('excel', 'Excel'), ('pdf', 'PDF')], max_length=10, verbose_name='Formato')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('completed', 'Completado'), ('failed', 'Fallido')], db_index=True, default='pending', max_length=20, verbose_name='Estado')),
+                ('file', models.FileField(blank=True, upload_to=apps.inventario.models.inventory_export_path, verbose_name='Archivo')),
+                ('row_count', models.PositiveIntegerField(default=0, verbose_name='Productos exportados')),
+                ('message', models.TextField(blank=True, verbose_name='Mensaje')),
+                ('created_by', models.CharField(blank=True, max_length=100, verbose_name='Creado por')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Exportación de Inventario',
+                'verbose_name_plural': 'Exportaciones de Inventario',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
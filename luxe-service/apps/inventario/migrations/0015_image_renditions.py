@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0014_inventoryexportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Generadas por apps.inventario.images', verbose_name='Versiones redimensionadas'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Generadas por apps.inventario.images', verbose_name='Versiones redimensionadas'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Generadas por apps.inventario.images', verbose_name='Versiones redimensionadas'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:18
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0016_low_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceUpdate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('field', models.CharField(choices=[('price', 'Precio Venta'), ('cost_price', 'Costo Actual'), ('last_purchase_cost', 'Costo Última Compra'), ('tax_rate', 'IVA %')], max_length=30, verbose_name='Campo')),
+                ('mode', models.CharField(choices=[('percent', 'Porcentaje'), ('absolute', 'Monto fijo'), ('set', 'Valor exacto')], max_length=20, verbose_name='Tipo de ajuste')),
+                ('value', models.DecimalField(decimal_places=4, max_digits=12, verbose_name='Valor')),
+                ('rounding', models.CharField(blank=True, max_length=20, verbose_name='Redondeo')),
+                ('filters', models.JSONField(blank=True, default=dict, verbose_name='Filtros')),
+                ('reason', models.CharField(blank=True, max_length=255, verbose_name='Motivo')),
+                ('affected_count', models.PositiveIntegerField(default=0, verbose_name='Productos afectados')),
+                ('created_by', models.CharField(blank=True, max_length=100, verbose_name='Creado por')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Actualización de Precios',
+                'verbose_name_plural': 'Actualizaciones de Precios',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('field', models.CharField(choices=[('price', 'Precio Venta'), ('cost_price', 'Costo Actual'), ('last_purchase_cost', 'Costo Última Compra'), ('tax_rate', 'IVA %')], max_length=30, verbose_name='Campo')),
+                ('old_value', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor anterior')),
+                ('new_value', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor nuevo')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='inventario.product', verbose_name='Producto')),
+                ('price_update', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='history', to='inventario.priceupdate', verbose_name='Actualización masiva')),
+            ],
+            options={
+                'verbose_name': 'Historial de Precio',
+                'verbose_name_plural': 'Historial de Precios',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['product', '-created_at'], name='price_history_product_idx')],
+            },
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models import F, Q
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 import uuid
 import os
 import random
@@ -33,6 +36,13 @@ class Category(models.Model):
         null=True,
         verbose_name='Imagen'
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Versiones redimensionadas',
+        help_text='Generadas por apps.inventario.images'
+    )
     
     # Color para UI (opcional)
     color = models.CharField(
@@ -124,6 +134,13 @@ class ProductImage(models.Model):
         upload_to=product_gallery_image_path,
         verbose_name='Imagen'
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Versiones redimensionadas',
+        help_text='Generadas por apps.inventario.images'
+    )
     is_active = models.BooleanField(default=True, verbose_name='Activa')
     display_order = models.PositiveIntegerField(default=0, verbose_name='Orden')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -165,6 +182,13 @@ class Product(models.Model):
         blank=True,
         null=True
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Versiones redimensionadas',
+        help_text='Generadas por apps.inventario.images'
+    )
     
     # Precio base (precio del tamaño regular/único)
     price = models.DecimalField(
@@ -209,6 +233,8 @@ class Product(models.Model):
     track_stock = models.BooleanField(default=False, verbose_name='Controlar Stock')
     stock_quantity = models.PositiveIntegerField(default=0, verbose_name='Cantidad en Stock')
     min_stock_alert = models.PositiveIntegerField(default=5, verbose_name='Alerta Stock Bajo')
+    # Última alerta de stock bajo enviada (se limpia al reponer, ver low_stock.py)
+    low_stock_alerted_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     # Auditoría
     created_at = models.DateTimeField(auto_now_add=True)
@@ -235,6 +261,9 @@ class Product(models.Model):
     accounting_cost_account = models.CharField(max_length=50, blank=True, verbose_name='Cuenta Costos (Venta)')
     accounting_inventory_account = models.CharField(max_length=50, blank=True, verbose_name='Cuenta Inventario (Activo)')
     # ------------------------------------------------
+
+    # Búsqueda de texto completo (mantenido por trigger en la BD, ver migración 0012)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         verbose_name = 'Producto'
@@ -244,6 +273,15 @@ class Product(models.Model):
             models.Index(fields=['category', 'is_active', 'is_available']),
             models.Index(fields=['is_featured']),
             models.Index(fields=['slug']),
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            GinIndex(fields=['name'], name='product_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['code'], name='product_code_trgm', opclasses=['gin_trgm_ops']),
+            # Índice parcial: solo productos con stock bajo
+            models.Index(
+                fields=['stock_quantity'],
+                name='product_low_stock_idx',
+                condition=Q(track_stock=True, is_active=True, stock_quantity__lte=F('min_stock_alert')),
+            ),
         ]
     
     def __str__(self):
@@ -390,11 +428,15 @@ class ProductVariant(models.Model):
     )
     
     is_active = models.BooleanField(default=True, verbose_name='Activa')
+    low_stock_alerted_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     class Meta:
         verbose_name = 'Variante de Producto'
         verbose_name_plural = 'Variantes de Productos'
         unique_together = ['product', 'size', 'color']
+        indexes = [
+            models.Index(fields=['product', 'stock_quantity'], name='variant_active_stock_idx', condition=Q(is_active=True)),
+        ]
         
     def __str__(self):
         parts = [self.product.name]
@@ -548,3 +590,180 @@ class ComboProduct(models.Model):
     
     def __str__(self):
         return f'{self.combo.name} - {self.product.name} (x{self.quantity})'
+
+
+def inventory_import_path(instance, filename):
+    """Ruta de los archivos subidos para importación"""
+    return os.path.join('inventario', 'imports', f'{instance.id}.xlsx')
+
+
+class InventoryImportJob(models.Model):
+    """Importación masiva de inventario desde Excel (ejecutada en Celery)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En proceso'),
+        ('completed', 'Completado'),
+        ('failed', 'Fallido'),
+    ]
+
+    # Máximo de errores por fila que se guardan en el job
+    MAX_ERRORS = 500
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file = models.FileField(upload_to=inventory_import_path, verbose_name='Archivo')
+    original_filename = models.CharField(max_length=255, blank=True, verbose_name='Nombre del archivo')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        db_index=True,
+        verbose_name='Estado'
+    )
+
+    # Progreso
+    total_rows = models.PositiveIntegerField(default=0, verbose_name='Filas totales')
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name='Filas procesadas')
+    created_count = models.PositiveIntegerField(default=0, verbose_name='Creados')
+    updated_count = models.PositiveIntegerField(default=0, verbose_name='Actualizados')
+    unchanged_count = models.PositiveIntegerField(default=0, verbose_name='Sin cambios')
+    error_count = models.PositiveIntegerField(default=0, verbose_name='Errores')
+    errors = models.JSONField(default=list, blank=True, verbose_name='Errores por fila')
+    message = models.TextField(blank=True, verbose_name='Mensaje')
+
+    created_by = models.CharField(max_length=100, blank=True, verbose_name='Creado por')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Importación de Inventario'
+        verbose_name_plural = 'Importaciones de Inventario'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'Importación {self.original_filename or self.id} ({self.get_status_display()})'
+
+    @property
+    def progress(self):
+        if not self.total_rows:
+            return 0
+        return round(self.processed_rows * 100 / self.total_rows, 1)
+
+    def add_errors(self, row_errors):
+        """Acumula errores por fila respetando MAX_ERRORS"""
+        self.error_count += len(row_errors)
+        room = self.MAX_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(row_errors[:room])
+
+
+def inventory_export_path(instance, filename):
+    """Ruta de los archivos generados por exportaciones en segundo plano"""
+    return os.path.join('inventario', 'exports', f'{instance.id}.{instance.extension}')
+
+
+class InventoryExportJob(models.Model):
+    """Exportación de inventario generada en Celery y guardada en storage"""
+    FORMAT_CHOICES = [
+        ('excel', 'Excel'),
+        ('pdf', 'PDF'),
+    ]
+    STATUS_CHOICES = InventoryImportJob.STATUS_CHOICES
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, verbose_name='Formato')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        db_index=True,
+        verbose_name='Estado'
+    )
+    file = models.FileField(upload_to=inventory_export_path, blank=True, verbose_name='Archivo')
+    row_count = models.PositiveIntegerField(default=0, verbose_name='Productos exportados')
+    message = models.TextField(blank=True, verbose_name='Mensaje')
+
+    created_by = models.CharField(max_length=100, blank=True, verbose_name='Creado por')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Exportación de Inventario'
+        verbose_name_plural = 'Exportaciones de Inventario'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'Exportación {self.get_format_display()} ({self.get_status_display()})'
+
+    @property
+    def extension(self):
+        return 'xlsx' if self.format == 'excel' else 'pdf'
+
+
+class PriceUpdate(models.Model):
+    """Actualización masiva de precios o costos (ver repricing.py)"""
+    FIELD_CHOICES = [
+        ('price', 'Precio Venta'),
+        ('cost_price', 'Costo Actual'),
+        ('last_purchase_cost', 'Costo Última Compra'),
+        ('tax_rate', 'IVA %'),
+    ]
+    MODE_CHOICES = [
+        ('percent', 'Porcentaje'),
+        ('absolute', 'Monto fijo'),
+        ('set', 'Valor exacto'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    field = models.CharField(max_length=30, choices=FIELD_CHOICES, verbose_name='Campo')
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, verbose_name='Tipo de ajuste')
+    value = models.DecimalField(max_digits=12, decimal_places=4, verbose_name='Valor')
+    rounding = models.CharField(max_length=20, blank=True, verbose_name='Redondeo')
+    filters = models.JSONField(default=dict, blank=True, verbose_name='Filtros')
+    reason = models.CharField(max_length=255, blank=True, verbose_name='Motivo')
+    affected_count = models.PositiveIntegerField(default=0, verbose_name='Productos afectados')
+
+    created_by = models.CharField(max_length=100, blank=True, verbose_name='Creado por')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Actualización de Precios'
+        verbose_name_plural = 'Actualizaciones de Precios'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.get_field_display()} {self.get_mode_display()} {self.value} ({self.affected_count} productos)'
+
+
+class PriceHistory(models.Model):
+    """Valor anterior y nuevo de un precio/costo por producto"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='price_history',
+        verbose_name='Producto'
+    )
+    price_update = models.ForeignKey(
+        PriceUpdate,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='history',
+        verbose_name='Actualización masiva'
+    )
+    field = models.CharField(max_length=30, choices=PriceUpdate.FIELD_CHOICES, verbose_name='Campo')
+    old_value = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Valor anterior')
+    new_value = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Valor nuevo')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Historial de Precio'
+        verbose_name_plural = 'Historial de Precios'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', '-created_at'], name='price_history_product_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.field}: {self.old_value} → {self.new_value}'
@@ -0,0 +1,286 @@
+"""
+apps/inventario/repricing.py
+
+Actualización masiva de precios, costos o IVA.
+
+Una regla indica el campo, el ajuste y los productos afectados:
+
+    {'field': 'price', 'mode': 'percent', 'value': 10, 'rounding': '0.05',
+     'filters': {'category': '<uuid>', 'brand': 'Nike'}, 'reason': '...'}
+
+El nuevo valor se calcula en SQL (una expresión sobre la columna), por lo
+que la vista previa y la aplicación no recorren productos en Python: se
+aplica con un solo UPDATE, se guarda un PriceHistory por producto con
+bulk_create y se invalida el menú una vez.
+"""
+
+import logging
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Sum, Value
+from django.db.models.functions import Ceil, Greatest, Round
+from django.utils import timezone
+
+from .models import Product, PriceUpdate, PriceHistory
+
+logger = logging.getLogger(__name__)
+
+FIELDS = dict(PriceUpdate.FIELD_CHOICES)
+MODES = dict(PriceUpdate.MODE_CHOICES)
+
+# Redondeo del valor final
+ROUNDING_CHOICES = {
+    '0.01': 'Centavos',
+    '0.05': 'Múltiplos de 0.05',
+    '0.10': 'Múltiplos de 0.10',
+    '1': 'Entero',
+    '0.99': 'Terminado en .99',
+}
+
+# Filtros de la regla -> lookup sobre Product
+UUID_FILTERS = ('category', 'subcategory', 'product_ids')
+FILTER_LOOKUPS = {
+    'category': 'category_id__in',
+    'subcategory': 'subcategory_id__in',
+    'brand': 'brand__in',
+    'line': 'line__in',
+    'subgroup': 'subgroup__in',
+    'product_ids': 'id__in',
+}
+
+HISTORY_BATCH_SIZE = 2000
+PREVIEW_LIMIT = 50
+
+WORK = DecimalField(max_digits=18, decimal_places=6)
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+
+# Tope del IVA además de la precisión de la columna
+MAX_TAX_RATE = Decimal('100')
+
+
+def _column_max(model_field):
+    """Mayor valor que entra en la columna numeric(max_digits, decimal_places)"""
+    places = model_field.decimal_places
+    return Decimal(10) ** (model_field.max_digits - places) - Decimal(10) ** -places
+
+
+# Máximo admitido por campo: el UPDATE fallaría (numeric field overflow) si
+# algún valor nuevo lo supera
+FIELD_LIMITS = {field: _column_max(Product._meta.get_field(field)) for field in FIELDS}
+FIELD_LIMITS['tax_rate'] = min(FIELD_LIMITS['tax_rate'], MAX_TAX_RATE)
+VALUE_LIMIT = _column_max(PriceUpdate._meta.get_field('value'))
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple)):
+        return [v for v in value if v not in (None, '')]
+    return [value] if value not in (None, '') else []
+
+
+def parse_rule(data):
+    """Valida y normaliza una regla. Lanza ValueError con un mensaje para el usuario."""
+    field = data.get('field', 'price')
+    if field not in FIELDS:
+        raise ValueError(f"Campo inválido: {field}. Opciones: {', '.join(FIELDS)}")
+
+    mode = data.get('mode')
+    if mode not in MODES:
+        raise ValueError(f"Tipo de ajuste inválido: {mode}. Opciones: {', '.join(MODES)}")
+
+    try:
+        value = Decimal(str(data.get('value')))
+    except (InvalidOperation, TypeError):
+        raise ValueError('El valor del ajuste debe ser numérico')
+    if not value.is_finite():
+        raise ValueError('El valor del ajuste debe ser numérico')
+    if mode == 'percent' and value <= -100:
+        raise ValueError('El porcentaje debe ser mayor a -100')
+    if mode == 'set' and value < 0:
+        raise ValueError('El valor no puede ser negativo')
+    if abs(value) > VALUE_LIMIT or value != value.quantize(Decimal('0.0001')):
+        raise ValueError(f'El valor del ajuste debe estar entre -{VALUE_LIMIT} y {VALUE_LIMIT} con hasta 4 decimales')
+    if mode == 'set' and value > FIELD_LIMITS[field]:
+        raise ValueError(f'{FIELDS[field]}: el valor máximo es {FIELD_LIMITS[field]}')
+
+    rounding = str(data.get('rounding') or '0.01')
+    if rounding not in ROUNDING_CHOICES:
+        raise ValueError(f"Redondeo inválido: {rounding}. Opciones: {', '.join(ROUNDING_CHOICES)}")
+
+    raw_filters = data.get('filters') or {}
+    filters = {}
+    for key in FILTER_LOOKUPS:
+        values = [str(v) for v in _as_list(raw_filters.get(key))]
+        if key in UUID_FILTERS:
+            try:
+                values = [str(uuid.UUID(v)) for v in values]
+            except ValueError:
+                raise ValueError(f'Filtro {key}: id inválido')
+        if values:
+            filters[key] = values
+    if 'is_active' in raw_filters and raw_filters['is_active'] is not None:
+        filters['is_active'] = str(raw_filters['is_active']).lower() in ('1', 'true')
+
+    return {
+        'field': field,
+        'mode': mode,
+        'value': value,
+        'rounding': rounding,
+        'filters': filters,
+        'reason': str(data.get('reason') or '')[:255],
+    }
+
+
+# ============================================================================
+# EXPRESIONES SQL
+# ============================================================================
+
+def new_value_expression(rule):
+    """Expresión del nuevo valor a partir de la columna actual"""
+    current = F(rule['field'])
+    value = rule['value']
+
+    if rule['mode'] == 'percent':
+        factor = (Decimal(100) + value) / Decimal(100)
+        expr = ExpressionWrapper(current * Value(factor), output_field=WORK)
+    elif rule['mode'] == 'absolute':
+        expr = ExpressionWrapper(current + Value(value), output_field=WORK)
+    else:
+        expr = Value(value, output_field=WORK)
+
+    rounding = rule['rounding']
+    if rounding == '0.05':
+        expr = ExpressionWrapper(Round(expr * Value(20), output_field=WORK) / Value(20), output_field=WORK)
+    elif rounding == '0.10':
+        expr = Round(expr, 1, output_field=WORK)
+    elif rounding == '1':
+        expr = Round(expr, 0, output_field=WORK)
+    elif rounding == '0.99':
+        expr = ExpressionWrapper(Ceil(expr, output_field=WORK) - Value(Decimal('0.01')), output_field=WORK)
+    else:
+        expr = Round(expr, 2, output_field=WORK)
+
+    # Nunca negativo
+    return Greatest(expr, Value(Decimal(0)), output_field=MONEY)
+
+
+def check_limit(field, max_new_value):
+    """ValueError si algún valor nuevo no entra en la columna (o supera el IVA máximo)"""
+    if max_new_value is not None and max_new_value > FIELD_LIMITS[field]:
+        raise ValueError(
+            f'{FIELDS[field]}: la regla da valores de hasta {max_new_value}; '
+            f'el máximo permitido es {FIELD_LIMITS[field]}'
+        )
+
+
+def rule_queryset(rule):
+    """Productos que cumplen los filtros y cuyo valor cambia con la regla"""
+    queryset = Product.objects.all()
+    for key, values in rule['filters'].items():
+        if key == 'is_active':
+            queryset = queryset.filter(is_active=values)
+        else:
+            queryset = queryset.filter(**{FILTER_LOOKUPS[key]: values})
+    return queryset.exclude(**{rule['field']: new_value_expression(rule)}).order_by()
+
+
+# ============================================================================
+# VISTA PREVIA / APLICACIÓN
+# ============================================================================
+
+def preview(rule, limit=PREVIEW_LIMIT):
+    """
+    Cantidad de productos afectados, totales y una muestra con valor anterior
+    y nuevo. ValueError si algún valor nuevo excede el máximo del campo.
+    """
+    field = rule['field']
+    queryset = rule_queryset(rule).annotate(new_value=new_value_expression(rule))
+
+    totals = queryset.aggregate(
+        count=Count('id'),
+        old_total=Sum(field),
+        new_total=Sum('new_value'),
+        max_new=Max('new_value'),
+    )
+    check_limit(field, totals['max_new'])
+    sample = [
+        {
+            'id': str(row['id']),
+            'code': row['code'],
+            'name': row['name'],
+            'old_value': row[field],
+            'new_value': row['new_value'],
+        }
+        for row in queryset.order_by('name').values('id', 'code', 'name', field, 'new_value')[:limit]
+    ]
+    return {
+        'field': field,
+        'affected_count': totals['count'],
+        'old_total': totals['old_total'] or 0,
+        'new_total': totals['new_total'] or 0,
+        'sample': sample,
+    }
+
+
+def apply_rule(rule, created_by=''):
+    """
+    Aplica la regla con un UPDATE y guarda el historial. Retorna el
+    PriceUpdate, o None si ningún valor cambia. ValueError (sin cambios)
+    si algún valor nuevo excede el máximo del campo.
+    """
+    field = rule['field']
+    expr = new_value_expression(rule)
+
+    with transaction.atomic():
+        # Bloquea las filas para que el historial coincida con lo actualizado
+        rows = list(
+            rule_queryset(rule).select_for_update().annotate(new_value=expr).values_list('id', field, 'new_value')
+        )
+
+        if not rows:
+            return None
+        check_limit(field, max(new_value for _, _, new_value in rows))
+
+        price_update = PriceUpdate.objects.create(
+            field=field,
+            mode=rule['mode'],
+            value=rule['value'],
+            rounding=rule['rounding'],
+            filters=rule['filters'],
+            reason=rule['reason'],
+            affected_count=len(rows),
+            created_by=created_by[:100],
+        )
+
+        now = timezone.now()
+        rule_queryset(rule).update(**{field: expr, 'updated_at': now})
+
+        PriceHistory.objects.bulk_create(
+            (
+                PriceHistory(
+                    product_id=product_id,
+                    price_update=price_update,
+                    field=field,
+                    old_value=old_value,
+                    new_value=new_value,
+                    created_at=now,
+                )
+                for product_id, old_value, new_value in rows
+            ),
+            batch_size=HISTORY_BATCH_SIZE,
+        )
+
+        # update() no dispara señales
+        transaction.on_commit(_invalidate)
+
+    logger.info(f'Actualización de {field}: {len(rows)} productos ({price_update.id})')
+    return price_update
+
+
+def _invalidate():
+    from .menu_snapshot import bump_menu_version
+    from .scan_index import publish_invalidation
+
+    bump_menu_version()
+    publish_invalidation(None)
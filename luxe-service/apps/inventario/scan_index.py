@@ -0,0 +1,342 @@
+"""
+apps/inventario/scan_index.py
+
+Índice en memoria para escaneo en caja: código de barras / código de
+producto / SKU de variante -> unidad vendible (producto o variante con
+precio, stock e IVA).
+
+Cada worker mantiene su propio índice:
+- se precarga al iniciar el worker (luxe_service/wsgi.py),
+- un hilo por worker aplica las invalidaciones por Redis pub/sub publicadas
+  por las señales de Product, ProductVariant y Size, y hace la
+  reconstrucción periódica de respaldo (nunca en el hilo de la petición),
+- si un código no está en el índice se consulta la BD y se agrega.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+
+from .models import Product, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'inventario:scan-index'
+FULL_REBUILD_MESSAGE = '*'
+
+# Reconstrucción completa de respaldo por si se pierde algún mensaje
+REBUILD_SECONDS = 60 * 30
+# Espera máxima por mensaje antes de revisar si toca reconstruir
+LISTEN_TIMEOUT_SECONDS = 30
+
+
+def normalize_code(code):
+    return (code or '').strip().upper()
+
+
+def _redis_url():
+    """URL de Redis de la caché (None si la caché no es Redis, p. ej. en DEBUG)"""
+    cache_config = settings.CACHES.get('default', {})
+    if 'redis' in cache_config.get('BACKEND', '').lower():
+        return cache_config.get('LOCATION')
+    return None
+
+
+class ScanIndex:
+    """Diccionario código -> unidad vendible"""
+
+    PRODUCT_FIELDS = (
+        'id', 'name', 'code', 'barcode', 'price', 'tax_rate',
+        'stock_quantity', 'track_stock', 'is_available',
+    )
+    VARIANT_FIELDS = (
+        'id', 'sku', 'stock_quantity', 'price_override',
+        'size__name', 'size__price_adjustment', 'color__name',
+        'product_id', 'product__name', 'product__price', 'product__tax_rate',
+        'product__track_stock', 'product__is_available',
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.keys_by_product = {}
+        self.built_at = None
+        self._listener = None
+        # Productos invalidados durante una reconstrucción (None = no hay una en curso)
+        self._pending = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ------------------------------------------------------------------
+    # Construcción de entradas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _product_entry(row):
+        return {
+            'type': 'product',
+            'product_id': str(row['id']),
+            'variant_id': None,
+            'name': row['name'],
+            'code': row['code'],
+            'barcode': row['barcode'],
+            'sku': None,
+            'size': None,
+            'color': None,
+            'price': str(row['price']),
+            'tax_rate': str(row['tax_rate']),
+            'stock_quantity': row['stock_quantity'],
+            'track_stock': row['track_stock'],
+            'is_available': row['is_available'],
+        }
+
+    @staticmethod
+    def _variant_entry(row):
+        # Misma regla que ProductVariant.get_price()
+        if row['price_override'] is not None:
+            price = row['price_override']
+        elif row['size__price_adjustment'] is not None:
+            price = row['product__price'] + row['size__price_adjustment']
+        else:
+            price = row['product__price']
+
+        label = ' / '.join(filter(None, [row['size__name'], row['color__name']]))
+        return {
+            'type': 'variant',
+            'product_id': str(row['product_id']),
+            'variant_id': str(row['id']),
+            'name': f"{row['product__name']} ({label})" if label else row['product__name'],
+            'code': None,
+            'barcode': None,
+            'sku': row['sku'],
+            'size': row['size__name'],
+            'color': row['color__name'],
+            'price': str(price),
+            'tax_rate': str(row['product__tax_rate']),
+            'stock_quantity': row['stock_quantity'],
+            'track_stock': row['product__track_stock'],
+            'is_available': row['product__is_available'] and (
+                not row['product__track_stock'] or row['stock_quantity'] > 0
+            ),
+        }
+
+    @classmethod
+    def _load(cls, product_ids=None):
+        """Lee productos y variantes activos; retorna [(clave, entrada)]"""
+        products = Product.objects.filter(is_active=True)
+        variants = ProductVariant.objects.filter(is_active=True, product__is_active=True)
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+            variants = variants.filter(product_id__in=product_ids)
+
+        pairs = []
+        for row in products.values(*cls.PRODUCT_FIELDS).iterator(chunk_size=5000):
+            entry = cls._product_entry(row)
+            for key in (row['barcode'], row['code']):
+                if key:
+                    pairs.append((normalize_code(key), entry))
+        for row in variants.values(*cls.VARIANT_FIELDS).iterator(chunk_size=5000):
+            if row['sku']:
+                pairs.append((normalize_code(row['sku']), cls._variant_entry(row)))
+        return pairs
+
+    # ------------------------------------------------------------------
+    # Mantenimiento
+    # ------------------------------------------------------------------
+
+    def rebuild(self):
+        """
+        Reconstruye el índice completo y lo reemplaza de una vez. Los productos
+        invalidados mientras se leía la BD se vuelven a cargar después del
+        reemplazo (la lectura pudo ser anterior al cambio).
+        """
+        started = time.perf_counter()
+        with self._lock:
+            self._pending = set()
+        try:
+            entries, keys_by_product = {}, {}
+            for key, entry in self._load():
+                entries[key] = entry
+                keys_by_product.setdefault(entry['product_id'], set()).add(key)
+
+            with self._lock:
+                self.entries, self.keys_by_product = entries, keys_by_product
+                self.built_at = time.time()
+                pending = self._pending
+        finally:
+            with self._lock:
+                self._pending = None
+
+        for product_id in pending:
+            self.refresh_product(product_id)
+
+        logger.info(
+            'Índice de escaneo: %s códigos en %.0f ms',
+            len(entries), (time.perf_counter() - started) * 1000
+        )
+
+    def refresh_product(self, product_id):
+        """Recarga las entradas de un producto (y sus variantes)"""
+        pairs = self._load([product_id])
+        product_id = str(product_id)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.add(product_id)
+            for key in self.keys_by_product.pop(product_id, ()):
+                # Un código compartido puede pertenecer ahora a otro producto
+                if self.entries.get(key, {}).get('product_id') == product_id:
+                    del self.entries[key]
+            keys = set()
+            for key, entry in pairs:
+                self.entries[key] = entry
+                keys.add(key)
+            if keys:
+                self.keys_by_product[product_id] = keys
+
+    def handle_invalidation(self, message):
+        if message == FULL_REBUILD_MESSAGE:
+            self.rebuild()
+        else:
+            self.refresh_product(message)
+
+    def _rebuild_due(self):
+        return self.built_at is None or time.time() - self.built_at > REBUILD_SECONDS
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def lookup(self, code):
+        """Retorna (entrada, origen) o (None, None). origen: 'index' | 'db'"""
+        key = normalize_code(code)
+        if not key:
+            return None, None
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry, 'index'
+
+        # Fallo del índice: código recién creado o índice desactualizado
+        product_id = (
+            Product.objects.filter(is_active=True)
+            .filter(Q(barcode=code.strip()) | Q(code=code.strip()))
+            .values_list('id', flat=True).first()
+            or ProductVariant.objects.filter(is_active=True, sku__iexact=code.strip())
+            .values_list('product_id', flat=True).first()
+        )
+        if product_id is None:
+            return None, None
+
+        self.refresh_product(product_id)
+        return self.entries.get(key), 'db'
+
+    # ------------------------------------------------------------------
+    # Redis pub/sub
+    # ------------------------------------------------------------------
+
+    def start_listener(self):
+        """
+        Hilo que aplica las invalidaciones publicadas por cualquier worker y
+        reconstruye el índice cada REBUILD_SECONDS (o si aún no existe).
+        """
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            target = self._listen if _redis_url() else self._rebuild_periodically
+            self._listener = threading.Thread(target=target, name='scan-index-listener', daemon=True)
+        self._listener.start()
+
+    def _rebuild_if_due(self):
+        if self._rebuild_due():
+            close_old_connections()
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.error(f'Error reconstruyendo el índice de escaneo: {e}')
+
+    def _rebuild_periodically(self):
+        """Sin Redis (DEBUG): solo la reconstrucción periódica"""
+        while True:
+            self._rebuild_if_due()
+            time.sleep(LISTEN_TIMEOUT_SECONDS)
+
+    def _listen(self):
+        import redis
+
+        backoff = 1
+        connected_before = False
+        while True:
+            try:
+                client = redis.Redis.from_url(_redis_url())
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                if connected_before:
+                    # Pudieron perderse mensajes mientras no había conexión
+                    close_old_connections()
+                    self.rebuild()
+                connected_before = True
+                backoff = 1
+
+                while True:
+                    self._rebuild_if_due()
+                    message = pubsub.get_message(timeout=LISTEN_TIMEOUT_SECONDS)
+                    if message is None:
+                        continue
+                    data = message.get('data')
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    close_old_connections()
+                    try:
+                        self.handle_invalidation(data)
+                    except Exception as e:
+                        logger.error(f'Error aplicando invalidación de escaneo {data}: {e}')
+            except Exception as e:
+                logger.warning(f'Suscripción del índice de escaneo caída: {e}; reintento en {backoff}s')
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+scan_index = ScanIndex()
+
+_publisher = None
+
+
+def publish_invalidation(product_id=None):
+    """
+    Notifica a todos los workers que un producto cambió (None = reconstruir
+    todo). Sin Redis se aplica solo en el proceso actual.
+    """
+    message = str(product_id) if product_id is not None else FULL_REBUILD_MESSAGE
+    url = _redis_url()
+    if url:
+        global _publisher
+        try:
+            if _publisher is None:
+                import redis
+                _publisher = redis.Redis.from_url(url)
+            _publisher.publish(INVALIDATION_CHANNEL, message)
+            return
+        except Exception as e:
+            logger.warning(f'No se pudo publicar invalidación de escaneo: {e}')
+
+    if scan_index.built_at is not None:
+        scan_index.handle_invalidation(message)
+
+
+def warm_scan_index():
+    """Precarga el índice y arranca la suscripción (inicio del worker)"""
+    try:
+        scan_index.rebuild()
+    except Exception as e:
+        # Sin BD al arrancar: lo construye el hilo de mantenimiento
+        logger.warning(f'No se pudo precargar el índice de escaneo: {e}')
+    finally:
+        close_old_connections()
+    scan_index.start_listener()
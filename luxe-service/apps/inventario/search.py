@@ -0,0 +1,105 @@
+"""
+apps/inventario/search.py
+
+Búsqueda de productos para POS y tienda.
+
+1. Código de barras / código exacto: lookup directo por índice único.
+2. Texto completo: search_vector (tsvector 'spanish' mantenido por trigger)
+   con SearchRank y prefijo en la última palabra para búsqueda mientras se
+   escribe.
+3. Difuso: similitud de trigramas sobre nombre y código (índices pg_trgm)
+   para errores de tipeo, solo si el texto completo no llena el límite.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .models import Product
+
+SEARCH_CONFIG = 'spanish'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Un solo token alfanumérico con al menos un dígito: código o código de barras
+CODE_PATTERN = re.compile(r'^[A-Za-z0-9\-_.]*\d[A-Za-z0-9\-_.]*$')
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+TRIGRAM_THRESHOLD = 0.3
+
+
+def looks_like_code(query):
+    return bool(CODE_PATTERN.match(query))
+
+
+def build_search_query(query):
+    """
+    tsquery con AND entre palabras y prefijo (:*) en la última para la
+    búsqueda mientras se escribe: 'hamburguesa dob' -> 'hamburguesa & dob:*'
+    """
+    words = WORD_PATTERN.findall(query)
+    if not words:
+        return None
+    terms = words[:-1] + [f'{words[-1]}:*']
+    return SearchQuery(' & '.join(terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def exact_code_match(queryset, query):
+    """Lookup por barcode o code (índices únicos)"""
+    return list(queryset.filter(Q(barcode=query) | Q(code=query))[:2])
+
+
+def apply_full_text(queryset, query, order_by_rank=True):
+    """Filtra (y por defecto ordena) un queryset por relevancia, sin límite"""
+    search_query = build_search_query(query)
+    if search_query is None:
+        return queryset.none()
+    queryset = queryset.filter(search_vector=search_query)
+    if order_by_rank:
+        queryset = queryset.annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', 'name')
+    return queryset
+
+
+def search_products(query, queryset=None, limit=DEFAULT_LIMIT):
+    """
+    Retorna (productos, estrategia) ordenados por relevancia.
+    estrategia: 'exact' | 'fulltext' | 'fuzzy' | 'fulltext+fuzzy'
+    """
+    query = (query or '').strip()
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    queryset = queryset if queryset is not None else Product.objects.defer('search_vector')
+
+    if not query:
+        return [], 'empty'
+
+    if looks_like_code(query):
+        matches = exact_code_match(queryset, query)
+        if matches:
+            return matches, 'exact'
+
+    results = list(apply_full_text(queryset, query)[:limit])
+    strategy = 'fulltext'
+
+    if len(results) < limit:
+        found_ids = [product.id for product in results]
+        fuzzy = queryset.annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(query, 'name'),
+                TrigramWordSimilarity(query, 'code'),
+            )
+        ).filter(
+            Q(name__trigram_word_similar=query) | Q(code__trigram_word_similar=query),
+            similarity__gte=TRIGRAM_THRESHOLD,
+        ).exclude(
+            id__in=found_ids
+        ).order_by('-similarity', 'name')[:limit - len(results)]
+        fuzzy = list(fuzzy)
+        if fuzzy:
+            results.extend(fuzzy)
+            strategy = 'fulltext+fuzzy' if found_ids else 'fuzzy'
+
+    return results, strategy
@@ -1,12 +1,24 @@
 from rest_framework import serializers
 from .models import Category, Product, Size, Extra, Combo, ComboProduct, SubCategory, ProductImage, Color, ProductVariant
+from .images import rendition_urls
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """
+    srcset WebP/JPEG y miniatura de las versiones redimensionadas de la
+    imagen (None mientras se generan).
+    """
+    def to_representation(self, value):
+        return rendition_urls(value, self.context.get('request'))
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
     """Serializer para imágenes de producto"""
+    image_srcset = ImageRenditionsField(source='image_renditions')
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'is_active', 'display_order', 'created_at']
+        fields = ['id', 'image', 'image_srcset', 'is_active', 'display_order', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
@@ -15,11 +27,12 @@ class CategorySerializer(serializers.ModelSerializer):
     products_count = serializers.SerializerMethodField()
     
     subcategories = serializers.SerializerMethodField()
+    image_srcset = ImageRenditionsField(source='image_renditions')
 
     class Meta:
         model = Category
         fields = [
-            'id', 'name', 'slug', 'description', 'image',
+            'id', 'name', 'slug', 'description', 'image', 'image_srcset',
             'color', 'icon', 'is_active', 'display_order',
             'products_count', 'subcategories', 'created_at', 'updated_at'
         ]
@@ -27,11 +40,18 @@ class CategorySerializer(serializers.ModelSerializer):
     
     def get_products_count(self, obj):
         """Cuenta productos activos en la categoría"""
+        # Anotado por el snapshot del menú para evitar una consulta por fila
+        if hasattr(obj, 'active_products_count'):
+            return obj.active_products_count
         return obj.products.filter(is_active=True, is_available=True).count()
 
     def get_subcategories(self, obj):
         """Retorna subcategorías activas"""
-        subcats = obj.subcategories.filter(is_active=True).order_by('display_order')
+        subcategories_by_category = self.context.get('subcategories_by_category')
+        if subcategories_by_category is not None:
+            subcats = subcategories_by_category.get(obj.id, [])
+        else:
+            subcats = obj.subcategories.filter(is_active=True).order_by('display_order')
         return SubCategorySerializer(subcats, many=True).data
 
 
@@ -48,6 +68,8 @@ class SubCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
     def get_products_count(self, obj):
+        if hasattr(obj, 'active_products_count'):
+            return obj.active_products_count
         return obj.products.filter(is_active=True).count()
 
 
@@ -107,12 +129,13 @@ class ProductListSerializer(serializers.ModelSerializer):
     has_extras = serializers.SerializerMethodField()
     images = ProductImageSerializer(many=True, read_only=True)
     variants = ProductVariantSerializer(many=True, read_only=True)
+    image_srcset = ImageRenditionsField(source='image_renditions')
     
     class Meta:
         model = Product
         fields = [
             'id', 'category', 'category_name', 'subcategory', 'subcategory_name', 'name', 'slug', 'code', 'barcode',
-            'description', 'image', 'images', 'price', 'cost_price', 'tax_rate', 'calories',
+            'description', 'image', 'image_srcset', 'images', 'price', 'cost_price', 'tax_rate', 'calories',
             'is_active', 'is_available', 'is_featured', 'is_new',
             'prep_time', 'display_order', 'has_sizes', 'has_extras', 'variants',
             'track_stock', 'stock_quantity', 'min_stock_alert',
@@ -123,10 +146,14 @@ class ProductListSerializer(serializers.ModelSerializer):
     
     def get_has_sizes(self, obj):
         """Indica si el producto tiene tamaños"""
+        if hasattr(obj, 'has_active_sizes'):
+            return obj.has_active_sizes
         return obj.sizes.filter(is_active=True).exists()
     
     def get_has_extras(self, obj):
         """Indica si el producto tiene extras"""
+        if hasattr(obj, 'has_active_extras'):
+            return obj.has_active_extras
         return obj.extras.filter(is_active=True).exists()
 
 
@@ -139,12 +166,13 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     variants = ProductVariantSerializer(many=True, read_only=True)
     is_available_now = serializers.SerializerMethodField()
+    image_srcset = ImageRenditionsField(source='image_renditions')
     
     class Meta:
         model = Product
         fields = [
             'id', 'category', 'subcategory', 'name', 'slug', 'code', 'barcode', 'description',
-            'image', 'images', 'price', 'cost_price', 'last_purchase_cost', 'tax_rate', 'calories',
+            'image', 'image_srcset', 'images', 'price', 'cost_price', 'last_purchase_cost', 'tax_rate', 'calories',
             'ingredients', 'allergens',
             'is_active', 'is_available', 'is_featured', 'is_new',
             'prep_time', 'display_order', 'sizes', 'extras', 'variants',
@@ -212,53 +240,44 @@ class ComboProductSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class ComboListSerializer(serializers.ModelSerializer):
+class ComboPricingMixin(serializers.Serializer):
+    """
+    Precio individual y ahorro desde las anotaciones de annotate_combo_pricing
+    (ComboViewSet las agrega al queryset).
+    """
+    products_count = serializers.IntegerField(read_only=True)
+    total_individual_price = serializers.FloatField(source='individual_total', read_only=True)
+    savings = serializers.FloatField(read_only=True)
+    savings_percentage = serializers.FloatField(read_only=True)
+
+
+class ComboListSerializer(ComboPricingMixin, serializers.ModelSerializer):
     """Serializer para listado de combos"""
-    products_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Combo
         fields = [
             'id', 'name', 'slug', 'description', 'image',
             'price', 'is_active', 'is_featured', 'display_order',
-            'products_count', 'created_at'
+            'products_count', 'total_individual_price', 'savings',
+            'savings_percentage', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
-    
-    def get_products_count(self, obj):
-        """Cuenta productos en el combo"""
-        return obj.combo_products.count()
 
 
-class ComboDetailSerializer(serializers.ModelSerializer):
+class ComboDetailSerializer(ComboPricingMixin, serializers.ModelSerializer):
     """Serializer detallado para combos"""
     combo_products = ComboProductSerializer(many=True, read_only=True)
-    total_individual_price = serializers.SerializerMethodField()
-    savings = serializers.SerializerMethodField()
     
     class Meta:
         model = Combo
         fields = [
             'id', 'name', 'slug', 'description', 'image',
             'price', 'is_active', 'is_featured', 'display_order',
-            'combo_products', 'total_individual_price', 'savings',
-            'created_at', 'updated_at'
+            'combo_products', 'products_count', 'total_individual_price',
+            'savings', 'savings_percentage', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
-    
-    def get_total_individual_price(self, obj):
-        """Calcula precio si se compraran los productos por separado"""
-        total = sum(
-            cp.product.price * cp.quantity 
-            for cp in obj.combo_products.all()
-        )
-        return float(total)
-    
-    def get_savings(self, obj):
-        """Calcula el ahorro del combo"""
-        individual_price = self.get_total_individual_price(obj)
-        savings = individual_price - float(obj.price)
-        return round(savings, 2)
 
 
 class ComboCreateUpdateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,104 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .menu_snapshot import bump_menu_version
+from .scan_index import publish_invalidation
+from .images import image_replaced, needs_renditions, delete_renditions
+from .models import Category, SubCategory, Product, Size, Extra, ProductImage, ProductVariant, Color, Combo, ComboProduct
+
+logger = logging.getLogger(__name__)
+
+# Combo y ComboProduct: los listados de combos se cachean con la misma versión
+MENU_MODELS = (Category, SubCategory, Product, Size, Extra, ProductImage, ProductVariant, Color, Combo, ComboProduct)
+
+
+def invalidate_menu(sender, **kwargs):
+    """
+    Invalida el snapshot del menú cuando cambia algo que aparece en él.
+    Se difiere al commit para que el nuevo snapshot lea los datos guardados.
+    """
+    transaction.on_commit(bump_menu_version)
+
+
+for model in MENU_MODELS:
+    post_save.connect(invalidate_menu, sender=model, dispatch_uid=f'menu_save_{model.__name__}')
+    post_delete.connect(invalidate_menu, sender=model, dispatch_uid=f'menu_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Extra.products.through)
+def invalidate_menu_on_extra_products(sender, action, **kwargs):
+    """Asociar o quitar extras cambia has_extras de los productos"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_menu_version)
+
+
+# ============================================================================
+# ÍNDICE DE ESCANEO
+# ============================================================================
+
+@receiver([post_save, post_delete], sender=Product, dispatch_uid='scan_index_product')
+def invalidate_scan_product(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: publish_invalidation(product_id))
+
+
+@receiver([post_save, post_delete], sender=ProductVariant, dispatch_uid='scan_index_variant')
+@receiver([post_save, post_delete], sender=Size, dispatch_uid='scan_index_size')
+def invalidate_scan_product_children(sender, instance, **kwargs):
+    """Variantes y tamaños cambian SKU, stock o precio de su producto"""
+    product_id = instance.product_id
+    transaction.on_commit(lambda: publish_invalidation(product_id))
+
+
+# ============================================================================
+# VERSIONES REDIMENSIONADAS DE IMÁGENES
+# ============================================================================
+
+@receiver(pre_save, sender=Category, dispatch_uid='renditions_replaced_category')
+@receiver(pre_save, sender=Product, dispatch_uid='renditions_replaced_product')
+@receiver(pre_save, sender=ProductImage, dispatch_uid='renditions_replaced_product_image')
+def mark_replaced_image(sender, instance, **kwargs):
+    """
+    Una foto nueva con el mismo nombre deja sus renditions como obsoletas
+    (source vacío). Se conservan los nombres para que process_image borre
+    los archivos viejos al generar los nuevos.
+    """
+    instance._image_replaced = image_replaced(instance.image)
+    if instance._image_replaced and instance.image_renditions:
+        instance.image_renditions = {**instance.image_renditions, 'source': None}
+
+
+@receiver(post_save, sender=Category, dispatch_uid='renditions_category')
+@receiver(post_save, sender=Product, dispatch_uid='renditions_product')
+@receiver(post_save, sender=ProductImage, dispatch_uid='renditions_product_image')
+def enqueue_image_renditions(sender, instance, **kwargs):
+    """Encola la generación cuando la imagen cambió (o aún no tiene renditions)"""
+    # save(update_fields=...) sin image_renditions no guarda el source vacío: se fuerza
+    replaced = getattr(instance, '_image_replaced', False)
+    if not replaced and not needs_renditions(instance.image, instance.image_renditions):
+        return
+
+    model_label = sender._meta.label
+    pk = str(instance.pk)
+
+    def enqueue():
+        from .tasks import generate_image_renditions
+        try:
+            generate_image_renditions.delay(model_label, pk, force=replaced)
+        except Exception as e:
+            # Sin broker: las genera el comando generate_image_renditions
+            logger.warning(f'No se pudo encolar renditions de {model_label} {pk}: {e}')
+
+    transaction.on_commit(enqueue)
+
+
+@receiver(post_delete, sender=Category, dispatch_uid='renditions_delete_category')
+@receiver(post_delete, sender=Product, dispatch_uid='renditions_delete_product')
+@receiver(post_delete, sender=ProductImage, dispatch_uid='renditions_delete_product_image')
+def remove_image_renditions(sender, instance, **kwargs):
+    renditions = instance.image_renditions
+    if renditions:
+        transaction.on_commit(lambda: delete_renditions(renditions))
@@ -0,0 +1,55 @@
+from celery import shared_task
+import logging
+
+from .models import InventoryImportJob, InventoryExportJob
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def import_inventory_excel(job_id):
+    """
+    Ejecuta una importación de inventario encolada desde
+    InventoryImportExcelView.
+    """
+    from .importer import run_import_job
+
+    job = InventoryImportJob.objects.filter(id=job_id, status='pending').first()
+    if not job:
+        return f"Importación {job_id} no encontrada o ya procesada."
+
+    job = run_import_job(job)
+    logger.info(f"Importación {job.id}: {job.status}. {job.message}")
+    return job.message
+
+
+@shared_task
+def export_inventory(job_id):
+    """Genera una exportación de inventario solicitada con ?background=true"""
+    from .exporter import run_export_job
+
+    job = InventoryExportJob.objects.filter(id=job_id, status='pending').first()
+    if not job:
+        return f"Exportación {job_id} no encontrada o ya procesada."
+
+    job = run_export_job(job)
+    logger.info(f"Exportación {job.id}: {job.status}. {job.message}")
+    return job.message
+
+
+@shared_task
+def generate_image_renditions(model_label, pk, force=False):
+    """Genera las versiones redimensionadas de una imagen recién subida"""
+    from .images import process_image
+
+    generated = process_image(model_label, pk, force=force)
+    return f"Renditions {model_label} {pk}: {'generadas' if generated else 'sin cambios'}"
+
+
+@shared_task
+def send_low_stock_alerts():
+    """Resumen periódico por WhatsApp de productos que bajaron del mínimo"""
+    from .low_stock import send_low_stock_alerts as send_alerts
+
+    count = send_alerts()
+    return f"Ítems con stock bajo alertados: {count}"
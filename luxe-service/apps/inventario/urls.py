@@ -21,6 +21,9 @@ urlpatterns = [
     path('health/', views.health_check, name='health-check'),
     path('test-auth/', views.test_auth_view, name='test-auth'),
     path('test-staff/', views.test_staff_view, name='test-staff'),
+
+    # Escaneo POS (índice en memoria)
+    path('scan/', views.scan_product, name='scan-product'),
     
     # Configuración Global (priority before router)
     path('config/accounts/bulk-update/', BulkUpdateAccountsView.as_view(), name='bulk-update-accounts'),
@@ -32,5 +35,12 @@ urlpatterns = [
     # Inventario
     path('inventory/export/excel/', views.InventoryExportExcelView.as_view(), name='inventory-export-excel'),
     path('inventory/export/pdf/', views.InventoryExportPDFView.as_view(), name='inventory-export-pdf'),
+    path('inventory/export/jobs/<uuid:job_id>/', views.InventoryExportJobView.as_view(), name='inventory-export-job'),
+    path('inventory/low-stock/', views.InventoryLowStockView.as_view(), name='inventory-low-stock'),
     path('inventory/import/excel/', views.InventoryImportExcelView.as_view(), name='inventory-import-excel'),
+    path('inventory/import/jobs/<uuid:job_id>/', views.InventoryImportJobView.as_view(), name='inventory-import-job'),
+    path('inventory/repricing/', views.InventoryPriceUpdateListView.as_view(), name='inventory-repricing'),
+    path('inventory/repricing/preview/', views.InventoryRepricingPreviewView.as_view(), name='inventory-repricing-preview'),
+    path('inventory/repricing/apply/', views.InventoryRepricingApplyView.as_view(), name='inventory-repricing-apply'),
+    path('inventory/price-history/<uuid:product_id>/', views.InventoryPriceHistoryView.as_view(), name='inventory-price-history'),
 ]
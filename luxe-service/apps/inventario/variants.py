@@ -0,0 +1,205 @@
+"""
+apps/inventario/variants.py
+
+Sincronización de variantes (talla/color/stock) a partir del texto
+`available_sizes` de los productos, p. ej. "S-Rojo:2, M-Rojo:3, L".
+
+Se calcula en memoria el conjunto deseado de variantes para todos los
+productos recibidos y se aplica con operaciones por lotes: tallas y colores
+faltantes con bulk_create(ignore_conflicts=True), variantes con un insert,
+un update y un delete. Lo usan el importador de Excel y el endpoint de
+productos.
+"""
+
+import re
+
+from django.db import transaction
+
+from .models import Product, Size, Color, ProductVariant
+
+VARIANT_PATTERN = re.compile(r'^([^-:]+)(?:-([^:]+))?(?::(\d+))?$')
+
+# Con más productos que esto se reconstruye el índice de escaneo completo
+FULL_SCAN_REBUILD_THRESHOLD = 50
+
+
+def parse_available_sizes(value):
+    """
+    "S-Rojo:2, M" -> [('S', 'Rojo', 2), ('M', None, None)]
+    Los tokens inválidos se ignoran; un par talla/color repetido conserva el
+    último stock.
+    """
+    parsed = {}
+    for item in (value or '').split(','):
+        match = VARIANT_PATTERN.match(item.strip())
+        if not match:
+            continue
+        size_str, color_str, stock_str = match.groups()
+        size_name = size_str.strip()[:50].title() if size_str and size_str.strip() else None
+        color_name = color_str.strip()[:50].title() if color_str and color_str.strip() else None
+        parsed[(size_name, color_name)] = int(stock_str) if stock_str is not None else None
+    return [(size, color, stock) for (size, color), stock in parsed.items()]
+
+
+def _variant_sku(product, size_name, color_name):
+    """Misma regla que ProductVariant.save()"""
+    base = product.code if product.code else str(product.id)[:5]
+    attrs = ""
+    if size_name:
+        attrs += f"-S{size_name[:2].upper()}"
+    if color_name:
+        attrs += f"-C{color_name[:2].upper()}"
+    return f"{base}{attrs}"
+
+
+def _resolve_sizes(desired):
+    """{(product_id, nombre): size_id}; crea las tallas faltantes"""
+    product_ids = list(desired)
+    names = {size for items in desired.values() for size, _, _ in items if size}
+    if not names:
+        return {}
+
+    def fetch():
+        return {
+            (product_id, name): size_id
+            for size_id, product_id, name in Size.objects.filter(
+                product_id__in=product_ids, name__in=names
+            ).values_list('id', 'product_id', 'name')
+        }
+
+    sizes = fetch()
+    missing = []
+    for product_id, items in desired.items():
+        for display_order, (size, _, _) in enumerate(items):
+            if size and (product_id, size) not in sizes:
+                missing.append(Size(product_id=product_id, name=size, display_order=display_order))
+                sizes[(product_id, size)] = None
+    if missing:
+        Size.objects.bulk_create(missing, ignore_conflicts=True)
+        sizes = fetch()
+    return sizes
+
+
+def _resolve_colors(desired):
+    """{nombre: color_id}; crea los colores faltantes"""
+    names = {color for items in desired.values() for _, color, _ in items if color}
+    if not names:
+        return {}
+
+    colors = Color.objects.in_bulk(names, field_name='name')
+    missing = names - set(colors)
+    if missing:
+        Color.objects.bulk_create(
+            [Color(name=name, hex_code='#CCCCCC') for name in missing], ignore_conflicts=True
+        )
+        colors = Color.objects.in_bulk(names, field_name='name')
+    return {name: color.id for name, color in colors.items()}
+
+
+def sync_variants(products):
+    """
+    Sincroniza las variantes de varios productos con su `available_sizes`.
+    Productos sin tallas válidas no se modifican. Si alguna variante trae
+    stock, el producto pasa a controlar stock con la suma de sus variantes.
+
+    Retorna {'created': n, 'updated': n, 'deleted': n}.
+    """
+    products = {product.id: product for product in products}
+    desired = {
+        product_id: items
+        for product_id, items in (
+            (product_id, parse_available_sizes(product.available_sizes))
+            for product_id, product in products.items()
+        )
+        if items
+    }
+    stats = {'created': 0, 'updated': 0, 'deleted': 0}
+    if not desired:
+        return stats
+
+    with transaction.atomic():
+        sizes = _resolve_sizes(desired)
+        colors = _resolve_colors(desired)
+
+        existing = {}
+        for variant_id, product_id, size_id, color_id, stock in ProductVariant.objects.filter(
+            product_id__in=list(desired)
+        ).values_list('id', 'product_id', 'size_id', 'color_id', 'stock_quantity'):
+            existing[(product_id, size_id, color_id)] = (variant_id, stock)
+
+        to_create, to_update, keep = [], [], set()
+        stock_products = []
+        for product_id, items in desired.items():
+            product = products[product_id]
+            total_stock, has_stock = 0, False
+            for size, color, stock in items:
+                if stock is not None:
+                    has_stock = True
+                    total_stock += stock
+                key = (product_id, sizes.get((product_id, size)) if size else None, colors.get(color) if color else None)
+                stock = stock or 0
+
+                if key in existing:
+                    variant_id, current_stock = existing[key]
+                    keep.add(variant_id)
+                    if current_stock != stock:
+                        to_update.append(ProductVariant(id=variant_id, stock_quantity=stock))
+                else:
+                    to_create.append(ProductVariant(
+                        product_id=product_id, size_id=key[1], color_id=key[2],
+                        stock_quantity=stock, sku=_variant_sku(product, size, color),
+                    ))
+
+            if has_stock:
+                product.track_stock = True
+                product.stock_quantity = total_stock
+                product.is_available = total_stock > 0
+                stock_products.append(product)
+
+        stale = [
+            variant_id for variant_id, _ in existing.values() if variant_id not in keep
+        ]
+        if stale:
+            _, deleted = ProductVariant.objects.filter(id__in=stale).delete()
+            stats['deleted'] = deleted.get(ProductVariant._meta.label, 0)
+        if to_update:
+            stats['updated'] = ProductVariant.objects.bulk_update(to_update, ['stock_quantity'])
+        if to_create:
+            _dedupe_skus(to_create)
+            ProductVariant.objects.bulk_create(to_create)
+            stats['created'] = len(to_create)
+        if stock_products:
+            Product.objects.bulk_update(stock_products, ['track_stock', 'stock_quantity', 'is_available'])
+
+        # Las operaciones por lotes no disparan señales
+        product_ids = list(desired)
+        transaction.on_commit(lambda: _invalidate(product_ids))
+
+    return stats
+
+
+def _dedupe_skus(variants):
+    """Evita choques del SKU generado (único) agregando un sufijo"""
+    taken = set(
+        ProductVariant.objects.filter(sku__in=[variant.sku for variant in variants])
+        .values_list('sku', flat=True)
+    )
+    for variant in variants:
+        sku, suffix = variant.sku, 2
+        while sku in taken:
+            sku = f'{variant.sku}-{suffix}'
+            suffix += 1
+        variant.sku = sku[:100]
+        taken.add(variant.sku)
+
+
+def _invalidate(product_ids):
+    from .menu_snapshot import bump_menu_version
+    from .scan_index import publish_invalidation
+
+    bump_menu_version()
+    if len(product_ids) > FULL_SCAN_REBUILD_THRESHOLD:
+        publish_invalidation(None)
+    else:
+        for product_id in product_ids:
+            publish_invalidation(product_id)
@@ -1,9 +1,10 @@
 from rest_framework import viewsets, status, filters
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Prefetch
+from django.http import HttpResponse, HttpResponseNotModified
 
 from core.permissions import require_authentication, require_staff
 from .models import Category, Product, Size, Extra, Combo, ComboProduct, SubCategory
@@ -21,7 +22,16 @@ from .serializers import (
     ComboDetailSerializer,
     ComboCreateUpdateSerializer,
 )
-from .views_inventory import InventoryExportExcelView, InventoryExportPDFView, InventoryImportExcelView
+from .views_inventory import (
+    InventoryExportExcelView, InventoryExportPDFView, InventoryImportExcelView, InventoryImportJobView,
+    InventoryExportJobView, InventoryLowStockView, InventoryRepricingPreviewView,
+    InventoryRepricingApplyView, InventoryPriceUpdateListView, InventoryPriceHistoryView,
+)
+from .menu_snapshot import get_menu_version, get_menu_snapshot, menu_etag
+from .scan_index import scan_index
+from .variants import sync_variants
+from .combo_pricing import annotate_combo_pricing, filter_by_savings, cached_combo_data, PRICING_ORDERING_FIELDS
+from .search import search_products, apply_full_text, exact_code_match, looks_like_code, DEFAULT_LIMIT
 
 
 # ============================================================================
@@ -59,6 +69,34 @@ def test_staff_view(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def scan_product(request):
+    """
+    Resuelve un código escaneado (barcode, código o SKU de variante) a la
+    unidad vendible desde el índice en memoria del worker.
+    GET /api/menu/scan/?code=7861234567890
+    """
+    code = request.query_params.get('code', '').strip()
+    if not code:
+        return Response(
+            {'error': 'El parámetro "code" es requerido'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Sin wsgi.py (runserver) el hilo arranca en la primera consulta; mientras
+    # no haya índice, lookup() resuelve contra la BD
+    scan_index.start_listener()
+    entry, source = scan_index.lookup(code)
+    if entry is None:
+        return Response(
+            {'error': 'Producto no encontrado', 'code': code},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return Response({**entry, 'source': source})
+
+
 @api_view(['GET'])
 def health_check(request):
     """
@@ -160,72 +198,25 @@ from .serializers import (
 
 # ... (Previous imports remain same)
 
-def parse_and_create_variants(product, available_sizes_str):
-    import re
-    from .models import Size, Color, ProductVariant
-    if not available_sizes_str:
-        return
-    
-    items = [x.strip() for x in available_sizes_str.split(',') if x.strip()]
-    if not items:
-        return
-        
-    pattern = re.compile(r'^([^-:]+)(?:-([^:]+))?(?::(\d+))?$')
-    
-    total_stock = 0
-    has_stock = False
-    
-    processed_variants = []
-    
-    display_order = 0
-    for item in items:
-        match = pattern.match(item)
-        if not match:
-            continue
-            
-        size_str, color_str, stock_str = match.groups()
-        
-        size_obj = None
-        if size_str:
-            size_name = size_str.strip()[:50].title()
-            size_obj, _ = Size.objects.get_or_create(
-                product=product, name=size_name,
-                defaults={'display_order': display_order}
-            )
-            
-        color_obj = None
-        if color_str:
-            color_name = color_str.strip()[:50].title()
-            color_obj, _ = Color.objects.get_or_create(
-                name=color_name,
-                defaults={'hex_code': '#CCCCCC'}
-            )
-            
-        stock_val = int(stock_str) if stock_str else 0
-        if stock_str is not None:
-            has_stock = True
-            total_stock += stock_val
-            
-        variant, created = ProductVariant.objects.get_or_create(
-            product=product,
-            size=size_obj,
-            color=color_obj,
-            defaults={'stock_quantity': stock_val}
-        )
-        if not created:
-            variant.stock_quantity = stock_val
-            variant.save()
-            
-        processed_variants.append(variant.id)
-        display_order += 1
-        
-    ProductVariant.objects.filter(product=product).exclude(id__in=processed_variants).delete()
-    
-    if has_stock:
-        product.track_stock = True
-        product.stock_quantity = total_stock
-        product.save(update_fields=['track_stock', 'stock_quantity'])
 
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ?search= sobre el índice de texto completo en lugar de icontains.
+    Un código exacto devuelve solo ese producto.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        if looks_like_code(query):
+            matches = exact_code_match(queryset, query)
+            if matches:
+                return queryset.filter(id__in=[product.id for product in matches])
+
+        # Un ?ordering= explícito tiene prioridad sobre la relevancia
+        return apply_full_text(queryset, query, order_by_rank='ordering' not in request.query_params)
 
 
 class ProductViewSet(viewsets.ModelViewSet):
@@ -234,9 +225,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     """
     queryset = Product.objects.all()
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
     filterset_fields = ['category', 'subcategory', 'is_active', 'is_available', 'is_featured', 'is_new']
-    search_fields = ['name', 'description', 'ingredients', 'code', 'barcode']
     ordering_fields = ['display_order', 'name', 'price', 'created_at']
     ordering = ['category__display_order', 'display_order', 'name']
     lookup_field = 'pk'
@@ -247,7 +237,7 @@ class ProductViewSet(viewsets.ModelViewSet):
             'sizes',
             'extras',
             'images'  # Prefetch images
-        )
+        ).defer('search_vector')
         # ... (Rest of get_queryset logic remains the same)
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
@@ -281,7 +271,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         for image in images:
             ProductImage.objects.create(product=product, image=image)
             
-        parse_and_create_variants(product, product.available_sizes)
+        sync_variants([product])
             
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -298,7 +288,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         for image in images:
             ProductImage.objects.create(product=instance, image=image)
 
-        parse_and_create_variants(instance, instance.available_sizes)
+        sync_variants([instance])
 
         if getattr(instance, '_prefetched_objects_cache', None):
             instance._prefetched_objects_cache = {}
@@ -378,24 +368,31 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def search(self, request):
-        """Búsqueda avanzada de productos"""
-        query = request.query_params.get('q', '')
+        """
+        Búsqueda de productos por relevancia.
+        Códigos de barras / códigos exactos se resuelven por índice único;
+        el resto usa texto completo y, si faltan resultados, trigramas.
+        ?q=texto&limit=20
+        """
+        query = request.query_params.get('q', '').strip()
         
         if not query:
             return Response(
                 {'error': 'El parámetro "q" es requerido'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        products = self.get_queryset().filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(ingredients__icontains=query) |
-            Q(category__name__icontains=query)
-        ).distinct()
+
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            limit = DEFAULT_LIMIT
+
+        products, strategy = search_products(query, queryset=self.get_queryset(), limit=limit)
         
         serializer = ProductListSerializer(products, many=True)
-        return Response(serializer.data)
+        response = Response(serializer.data)
+        response['X-Search-Strategy'] = strategy
+        return response
 
 
 class SizeViewSet(viewsets.ModelViewSet):
@@ -545,18 +542,22 @@ class ComboViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
     filterset_fields = ['is_active', 'is_featured']
     search_fields = ['name', 'description']
-    ordering_fields = ['display_order', 'name', 'price', 'created_at']
+    ordering_fields = ['display_order', 'name', 'price', 'created_at'] + PRICING_ORDERING_FIELDS
     ordering = ['display_order', 'name']
     lookup_field = 'pk'  # ← CAMBIADO de 'slug' a 'pk'
     
     def get_queryset(self):
-        """Optimiza queries"""
-        queryset = super().get_queryset().prefetch_related(
-            Prefetch(
-                'combo_products',
-                queryset=ComboProduct.objects.select_related('product')
+        """Optimiza queries: precio individual y ahorro se anotan en SQL"""
+        queryset = annotate_combo_pricing(super().get_queryset())
+        
+        # Listados y ahorro no serializan los productos del combo
+        if self.action not in ('list', 'featured', 'calculate_savings'):
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'combo_products',
+                    queryset=ComboProduct.objects.select_related('product')
+                )
             )
-        )
         
         # Filtros adicionales
         min_price = self.request.query_params.get('min_price')
@@ -567,7 +568,7 @@ class ComboViewSet(viewsets.ModelViewSet):
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
         
-        return queryset
+        return filter_by_savings(queryset, self.request.query_params)
     
     def get_serializer_class(self):
         """Retorna el serializer apropiado"""
@@ -577,16 +578,24 @@ class ComboViewSet(viewsets.ModelViewSet):
             return ComboCreateUpdateSerializer
         return ComboDetailSerializer
     
+    def list(self, request, *args, **kwargs):
+        """Listado cacheado con la versión del menú"""
+        data = cached_combo_data(
+            request, 'list', lambda: super(ComboViewSet, self).list(request, *args, **kwargs).data
+        )
+        return Response(data)
+    
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Obtiene combos destacados"""
-        combos = self.get_queryset().filter(
-            is_featured=True,
-            is_active=True
-        )[:10]
+        def build():
+            combos = self.get_queryset().filter(
+                is_featured=True,
+                is_active=True
+            )[:10]
+            return ComboListSerializer(combos, many=True).data
         
-        serializer = ComboListSerializer(combos, many=True)
-        return Response(serializer.data)
+        return Response(cached_combo_data(request, 'featured', build))
     
     @action(detail=True, methods=['get'])
     def products(self, request, pk=None):  # ← CAMBIADO slug a pk
@@ -609,28 +618,28 @@ class ComboViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def calculate_savings(self, request):
-        """Calcula ahorro de todos los combos"""
-        combos = self.get_queryset().filter(is_active=True)
-        
-        data = []
-        for combo in combos:
-            individual_price = sum(
-                cp.product.price * cp.quantity 
-                for cp in combo.combo_products.all()
-            )
-            savings = individual_price - combo.price
-            savings_percentage = (savings / individual_price * 100) if individual_price > 0 else 0
-            
-            data.append({
-                'id': combo.id,
-                'name': combo.name,
-                'combo_price': float(combo.price),
-                'individual_price': float(individual_price),
-                'savings': float(savings),
-                'savings_percentage': round(savings_percentage, 2)
-            })
-        
-        return Response(data)
+        """
+        Calcula ahorro de todos los combos activos (una sola consulta).
+        Acepta ?ordering= y los filtros de ahorro, p. ej.
+        ?min_savings_percentage=20&ordering=-savings_percentage
+        """
+        def build():
+            combos = self.filter_queryset(self.get_queryset()).filter(is_active=True)
+            return [
+                {
+                    'id': combo['id'],
+                    'name': combo['name'],
+                    'combo_price': float(combo['price']),
+                    'individual_price': float(combo['individual_total']),
+                    'savings': float(combo['savings']),
+                    'savings_percentage': float(combo['savings_percentage'])
+                }
+                for combo in combos.values(
+                    'id', 'name', 'price', 'individual_total', 'savings', 'savings_percentage'
+                )
+            ]
+        
+        return Response(cached_combo_data(request, 'savings', build))
 
 
 class MenuViewSet(viewsets.ViewSet):
@@ -643,26 +652,23 @@ class MenuViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def full(self, request):
         """
-        Obtiene el menú completo con todas las categorías y productos
+        Obtiene el menú completo con todas las categorías y productos.
+        Se sirve desde el snapshot versionado; si el cliente ya tiene la
+        versión actual (If-None-Match) responde 304 sin tocar la BD.
         """
-        categories = Category.objects.filter(is_active=True).order_by('display_order')
-        
-        data = []
-        for category in categories:
-            category_data = CategorySerializer(category).data
-            # Explicitly filter active products
-            products = category.products.filter(
-                is_active=True,
-                is_available=True
-            ).prefetch_related('sizes', 'extras', 'images').order_by('display_order', 'name')
-            
-            category_data['products'] = ProductListSerializer(
-                products,
-                many=True
-            ).data
-            data.append(category_data)
-        
-        return Response(data)
+        version = get_menu_version()
+        etag = menu_etag(version)
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            version, payload = get_menu_snapshot(version)
+            response = HttpResponse(payload, content_type='application/json')
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        return response
     
     @action(detail=False, methods=['get'])
     def summary(self, request):
@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from .models import Product
+from .menu_snapshot import bump_menu_version
 
 class BulkUpdateAccountsView(APIView):
     """
@@ -30,6 +31,8 @@ class BulkUpdateAccountsView(APIView):
             
         # Actualizar todos los productos
         count = Product.objects.update(**update_data)
+        # update() no dispara señales: invalidar el menú manualmente
+        bump_menu_version()
         
         return Response({
             'message': f'Se actualizaron las cuentas contables de {count} productos.',
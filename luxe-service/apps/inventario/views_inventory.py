@@ -2,339 +2,267 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser
 from rest_framework import status
-from django.http import HttpResponse # For file download
-from .models import Product, Category
-from .serializers import ProductListSerializer
+from rest_framework.pagination import PageNumberPagination
+from django.http import FileResponse
+from core.db_router import using_replica
+from .models import InventoryImportJob, InventoryExportJob, PriceUpdate, PriceHistory
+from .importer import run_import_job
+from .exporter import build_export, run_export_job, CONTENT_TYPES, FILENAMES
+from .low_stock import low_stock_items
+from .repricing import parse_rule, preview, apply_rule
+from .tasks import import_inventory_excel, export_inventory
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+def export_response(request, export_format):
+    """
+    Descarga directa por streaming, o con ?background=true crea un
+    InventoryExportJob (catálogos muy grandes) y retorna su id.
+    """
+    if request.query_params.get('background', '').lower() not in ('1', 'true'):
+        fileobj, _ = build_export(export_format)
+        return FileResponse(
+            fileobj,
+            as_attachment=True,
+            filename=FILENAMES[export_format],
+            content_type=CONTENT_TYPES[export_format],
+        )
+
+    job = InventoryExportJob.objects.create(
+        format=export_format,
+        created_by=str(getattr(request.user, 'username', '') or '')[:100],
+    )
+    try:
+        export_inventory.delay(str(job.id))
+    except Exception as e:
+        logger.warning(f'No se pudo encolar la exportación {job.id}, procesando en línea: {e}')
+        run_export_job(job)
+
+    return Response({
+        'message': 'Exportación en proceso. Consulte el estado para descargar el archivo.',
+        'job_id': str(job.id),
+        'status': job.status,
+    }, status=status.HTTP_202_ACCEPTED)
 
-import openpyxl
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-import io
 
 class InventoryExportExcelView(APIView):
     """Exporta inventario a Excel"""
+    @using_replica()
     def get(self, request):
-        products = Product.objects.all().select_related('category')
-        
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Inventario"
-        
-        # Headers completos
-        headers = [
-            'ID', 'Código', 'Código de Barras', 'Nombre', 'Descripción', 'Línea (Category)', 
-            'Categoría (Subgroup)', 'Marca', 'Variantes (Ej: S-Rojo:2)', 'Costo Actual', 
-            'Último Costo', 'Precio Venta', 'Impuesto (%)', 'Stock Actual', 
-            'Mínimo Stock', 'Activo', 'Disponible',
-            'Cta. Ventas', 'Cta. Costos', 'Cta. Inventario'
-        ]
-        ws.append(headers)
-        
-        for p in products:
-            ws.append([
-                str(p.id),
-                p.code or '',
-                p.barcode or '',
-                p.name,
-                p.description or '',
-                p.category.name if p.category else '-',
-                p.subgroup or '-',
-                p.brand or '-',
-                p.available_sizes or '',
-                float(p.cost_price) if p.cost_price else 0,
-                float(p.last_purchase_cost) if p.last_purchase_cost else 0,
-                float(p.price) if p.price else 0,
-                float(p.tax_rate) if p.tax_rate else 0,
-                p.stock_quantity if p.track_stock else 'N/A',
-                p.min_stock_alert if p.track_stock else 'N/A',
-                'Sí' if p.is_active else 'No',
-                'Sí' if p.is_available else 'No',
-                p.accounting_sales_account or '',
-                p.accounting_cost_account or '',
-                p.accounting_inventory_account or ''
-            ])
-            
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="inventario_completo.xlsx"'
-        
-        wb.save(response)
-        return response
+        return export_response(request, 'excel')
 
 class InventoryExportPDFView(APIView):
     """Exporta inventario a PDF"""
+    @using_replica()
+    def get(self, request):
+        return export_response(request, 'pdf')
+
+class InventoryExportJobView(APIView):
+    """Estado de una exportación en segundo plano y URL del archivo"""
+
+    def get(self, request, job_id):
+        job = InventoryExportJob.objects.filter(id=job_id).first()
+        if not job:
+            return Response({'error': 'Exportación no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'job_id': str(job.id),
+            'format': job.format,
+            'status': job.status,
+            'message': job.message,
+            'row_count': job.row_count,
+            'file_url': job.file.url if job.file else None,
+            'created_at': job.created_at,
+            'finished_at': job.finished_at,
+        })
+
+class InventoryLowStockView(APIView):
+    """
+    Productos y variantes con stock bajo, ordenados por velocidad de venta.
+    GET /api/menu/inventory/low-stock/?days=30&page=1&page_size=50
+    """
+    @using_replica()
     def get(self, request):
-        products = Product.objects.all().select_related('category')
-        
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        w, h = letter
-        
-        y = h - 50
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(30, y, "Reporte de Inventario - Luxe")
-        y -= 30
-        
-        p.setFont("Helvetica-Bold", 10)
-        p.drawString(30, y, "Nombre")
-        p.drawString(200, y, "Categoría")
-        p.drawString(350, y, "Precio")
-        p.drawString(420, y, "Stock")
-        p.drawString(500, y, "Estado")
-        y -= 20
-        
-        p.setFont("Helvetica", 10)
-        for product in products:
-            if y < 50:
-                p.showPage()
-                y = h - 50
-                p.setFont("Helvetica", 10)
-                
-            name = product.name[:30] + "..." if len(product.name) > 30 else product.name
-            cat = product.category.name[:20] if product.category else "-"
-            price = f"${product.price}"
-            stock = str(product.stock_quantity) if product.track_stock else "-"
-            status_txt = "Activo" if product.is_active else "Inactivo"
-            
-            p.drawString(30, y, name)
-            p.drawString(200, y, cat)
-            p.drawString(350, y, price)
-            p.drawString(420, y, stock)
-            p.drawString(500, y, status_txt)
-            y -= 15
-            
-        p.save()
-        buffer.seek(0)
-        
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="inventario_luxe.pdf"'
-        return response
+        try:
+            days = int(request.query_params.get('days', 0)) or None
+        except ValueError:
+            return Response({'error': 'days debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+        if days is not None and not 1 <= days <= 365:
+            return Response({'error': 'days debe estar entre 1 y 365'}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = PageNumberPagination()
+        paginator.page_size_query_param = 'page_size'
+        paginator.max_page_size = 200
+        page = paginator.paginate_queryset(low_stock_items(days), request, view=self)
+        return paginator.get_paginated_response(page)
 
 class InventoryImportExcelView(APIView):
-    """Importa inventario desde Excel"""
+    """
+    Importa inventario desde Excel.
+
+    El archivo se guarda en un InventoryImportJob y se procesa en Celery;
+    la respuesta incluye job_id para consultar el avance en
+    inventory/import/jobs/<job_id>/. Con ?sync=true (o si no se puede
+    encolar) se procesa dentro de la petición.
+    """
     parser_classes = [MultiPartParser]
-    
 
     def post(self, request):
-        from .views import parse_and_create_variants
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No se proporcionó archivo'}, status=status.HTTP_400_BAD_REQUEST)
-        
+
         if not file.name.endswith('.xlsx'):
-             return Response({'error': 'Formato no válido. Use .xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': 'Formato no válido. Use .xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = InventoryImportJob.objects.create(
+            file=file,
+            original_filename=file.name[:255],
+            created_by=str(getattr(request.user, 'username', '') or '')[:100],
+        )
+
+        run_sync = request.query_params.get('sync', '').lower() in ('1', 'true')
+        if not run_sync:
+            try:
+                import_inventory_excel.delay(str(job.id))
+            except Exception as e:
+                logger.warning(f'No se pudo encolar la importación {job.id}, procesando en línea: {e}')
+                run_sync = True
+
+        if not run_sync:
+            return Response({
+                'message': 'Importación en proceso. El inventario se actualizará en unos momentos.',
+                'job_id': str(job.id),
+                'status': job.status,
+                'errors': []
+            }, status=status.HTTP_202_ACCEPTED)
+
+        job = run_import_job(job)
+        if job.status == 'failed':
+            return Response({'error': job.message, 'job_id': str(job.id)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'message': job.message,
+            'job_id': str(job.id),
+            'stats': {
+                'updated': job.updated_count,
+                'created': job.created_count,
+                'unchanged': job.unchanged_count,
+            },
+            'errors': format_import_errors(job.errors[:20])
+        })
+
+
+class InventoryImportJobView(APIView):
+    """Estado y avance de una importación de inventario"""
+
+    def get(self, request, job_id):
+        job = InventoryImportJob.objects.filter(id=job_id).first()
+        if not job:
+            return Response({'error': 'Importación no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'job_id': str(job.id),
+            'file': job.original_filename,
+            'status': job.status,
+            'message': job.message,
+            'progress': job.progress,
+            'total_rows': job.total_rows,
+            'processed_rows': job.processed_rows,
+            'stats': {
+                'updated': job.updated_count,
+                'created': job.created_count,
+                'unchanged': job.unchanged_count,
+                'errors': job.error_count,
+            },
+            'errors': format_import_errors(job.errors[:100]),
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+        })
+
+
+class InventoryRepricingPreviewView(APIView):
+    """
+    Vista previa de una actualización masiva de precios (no modifica nada).
+    POST {"field": "price", "mode": "percent", "value": 10, "rounding": "0.05",
+          "filters": {"category": "<uuid>", "brand": "Nike"}}
+    """
+
+    def post(self, request):
+        try:
+            rule = parse_rule(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # data_only=True recupera el VALOR de la celda de fórmulas, no la fórmula en sí.
-            wb = openpyxl.load_workbook(file, data_only=True)
-            ws = wb.active
-            
-            count_updated = 0
-            count_created = 0
-            errors = []
-            
-            # Skip header
-            rows = list(ws.rows)
-            if not rows:
-                 return Response({'error': 'Archivo vacío'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Get or create generic category for imports if needed
-            default_category, _ = Category.objects.get_or_create(
-                name="Importados",
-                defaults={'slug': 'importados', 'description': 'Categoría para productos importados'}
-            )
-                 
-            for idx, row in enumerate(rows[1:], start=2):
-                # Mapeo basado en imagen del usuario y descripción:
-                # 0: Id
-                # 1: Código del Producto (sku)
-                # 2: Código de Barras (nuevo)
-                # 3: Descripcion (nombre)
-                # 4: Linea -> Category
-                # 5: Categoria -> SubCategory? (usaremos lógica simple)
-                # 8: Totales Existentes (Stock)
-                # 9: Precio1 (Price)
-                # 14: Costo Actual (cost_price)
-                # 15: Costo ultima compra (last_purchase_cost)
-                # 17: IVA (tax_rate) - Asumiendo formato "15%" o "0.15"
-                # 18: Cuenta Contable (Ventas?) -> accounting_sales_account
-                # 19: Cuenta Contable (Costos?) -> accounting_cost_account
-                # 20: Cuenta Contable Inventarios -> accounting_inventory_account
-
-                try:
-                    # Safe cell reading
-                    def get_val(idx):
-                        try:
-                            return row[idx].value
-                        except IndexError:
-                            return None
-
-                    cell_id = get_val(0)
-                    cell_code = get_val(1)
-                    cell_barcode = get_val(2)
-                    cell_name = get_val(3)
-                    cell_desc = get_val(4) or ''
-                    cell_linea = get_val(5) or ''
-                    cell_subgrupo = get_val(6) or ''
-                    cell_brand = get_val(7) or '' # Marca
-                    cell_sizes = get_val(8) or ''
-                    
-                    cell_cost = get_val(9)
-                    cell_last_cost = get_val(10)
-                    cell_price = get_val(11)
-                    cell_tax = get_val(12)
-                    
-                    cell_stock = get_val(13)
-                    
-                    acc_sales = get_val(17) or ''
-                    acc_cost = get_val(18) or ''
-                    acc_inv = get_val(19) or ''
-
-                    if not cell_name:
-                        continue
-                    
-                    # 1. CATEGORÍA
-                    # Usamos 'Linea' como categoría principal si existe, sino 'Importados'
-                    category = default_category
-                    if cell_linea:
-                        category_slug = str(cell_linea).lower().strip().replace(' ', '-')[:90]
-                        category, _ = Category.objects.get_or_create(
-                            name=str(cell_linea).strip(),
-                            defaults={'slug': category_slug}
-                        )
-
-                    # 2. MATCH PRODUCT
-                    product = None
-                    
-                    # Search by Barcode first (if exists)
-                    if cell_barcode:
-                        product = Product.objects.filter(barcode=str(cell_barcode)).first()
-                    
-                    # Search by Code (SKU)
-                    if not product and cell_code:
-                        product = Product.objects.filter(code=str(cell_code)).first()
-
-                    # Search by Name (last resort)
-                    if not product and cell_name:
-                        product = Product.objects.filter(name__iexact=str(cell_name)).first()
-                    
-                    # 3. PREPARE DATA
-                    
-                    # Precio
-                    price_val = 0
-                    if cell_price is not None:
-                        try:
-                            price_val = float(str(cell_price).replace(',', '.'))
-                        except ValueError:
-                            pass
-                            
-                    # Costos
-                    cost_val = 0
-                    if cell_cost is not None:
-                        try:
-                            cost_val = float(str(cell_cost).replace(',', '.'))
-                        except ValueError:
-                            pass
-                    
-                    last_cost_val = 0
-                    if cell_last_cost is not None:
-                         try:
-                            last_cost_val = float(str(cell_last_cost).replace(',', '.'))
-                         except ValueError:
-                            pass
-
-                    # Tax (IVA)
-                    tax_val = 0
-                    if cell_tax is not None:
-                        try:
-                            # Puede venir como "15%" o 0.15
-                            val_str = str(cell_tax).replace('%', '').replace(',', '.')
-                            tax_val = float(val_str)
-                            # Si es > 1 (ej 15), es porcentaje literal. Si es < 1 (0.15), es decimal.
-                            if tax_val > 1: # es 12 o 15
-                                pass # se guarda como 15.00
-                            elif 0 < tax_val < 1:
-                                tax_val = tax_val * 100
-                        except ValueError:
-                            pass
-
-                    # Stock
-                    stock_val = 0
-                    has_stock = False
-                    if cell_stock is not None and str(cell_stock).lower() != 'n/a':
-                         try:
-                            stock_val = int(float(str(cell_stock).replace(',', '.')))
-                            has_stock = True # Even if 0, we track it
-                         except ValueError:
-                            pass
-
-                    # 4. CREATE OR UPDATE
-                    is_new = False
-                    if not product:
-                        is_new = True
-                        base_slug = str(cell_name).lower().replace(' ', '-').replace('/', '-')[:150]
-                        import uuid
-                        unique_slug = f"{base_slug}-{uuid.uuid4().hex[:6]}"
-                        
-                        product = Product(
-                            slug=unique_slug,
-                            is_active=True,
-                            is_available=True
-                        )
-                    
-                    # Update fields
-                    product.name = str(cell_name)[:200]
-                    product.category = category
-                    product.price = price_val
-                    
-                    if cell_code:
-                        product.code = str(cell_code)[:50]
-                    if cell_barcode:
-                        product.barcode = str(cell_barcode)[:100]
-                        
-                    product.cost_price = cost_val
-                    product.last_purchase_cost = last_cost_val
-                    product.tax_rate = tax_val
-                    
-                    product.accounting_sales_account = str(acc_sales)[:50]
-                    product.accounting_cost_account = str(acc_cost)[:50]
-                    product.accounting_inventory_account = str(acc_inv)[:50]
-                    
-                    product.line = str(cell_linea)[:100]
-                    product.subgroup = str(cell_subgrupo)[:100]
-                    product.brand = str(cell_brand)[:100]
-                    product.description = str(cell_desc)
-                    product.available_sizes = str(cell_sizes)[:200]
-                    
-                    # Stock logic
-                    # User wants to UPDATE stock, likely replace or add? 
-                    # Usually imports are snapshots. Let's set it.
-                    if has_stock:
-                        product.track_stock = True
-                        product.stock_quantity = stock_val
-                        if stock_val > 0:
-                            product.is_available = True
-                    
-                    product.save()
-                    parse_and_create_variants(product, product.available_sizes)
-                    
-                    if is_new:
-                        count_created += 1
-                    else:
-                        count_updated += 1
-
-                except Exception as row_error:
-                    print(f"Error procesando fila {row}: {row_error}")
-                    errors.append(f"Fila {idx}: {str(row_error)}")
-                    continue
-                
+            return Response(preview(rule))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class InventoryRepricingApplyView(APIView):
+    """Aplica una actualización masiva de precios (mismo payload que la vista previa)"""
+
+    def post(self, request):
+        try:
+            rule = parse_rule(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            price_update = apply_rule(rule, created_by=str(getattr(request.user, 'username', '') or ''))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if price_update is None:
             return Response({
-                'message': f'Importación completada. {count_updated} actualizados, {count_created} creados.',
-                'stats': {'updated': count_updated, 'created': count_created},
-                'errors': errors[:20] if errors else []
+                'message': 'Ningún producto cambia con esta regla.',
+                'affected_count': 0
             })
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return Response({'error': f'Error procesando archivo: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
+        return Response({
+            'message': f'Se actualizaron {price_update.affected_count} productos.',
+            'update_id': str(price_update.id),
+            'affected_count': price_update.affected_count
+        })
+
+
+class InventoryPriceUpdateListView(APIView):
+    """Historial de actualizaciones masivas de precios"""
+
+    def get(self, request):
+        paginator = PageNumberPagination()
+        paginator.page_size_query_param = 'page_size'
+        paginator.max_page_size = 100
+        updates = PriceUpdate.objects.values(
+            'id', 'field', 'mode', 'value', 'rounding', 'filters', 'reason',
+            'affected_count', 'created_by', 'created_at'
+        )
+        page = paginator.paginate_queryset(updates, request, view=self)
+        return paginator.get_paginated_response(page)
+
+
+class InventoryPriceHistoryView(APIView):
+    """Cambios de precio/costo de un producto (?field=price)"""
+
+    def get(self, request, product_id):
+        history = PriceHistory.objects.filter(product_id=product_id)
+        field = request.query_params.get('field')
+        if field:
+            history = history.filter(field=field)
+
+        paginator = PageNumberPagination()
+        paginator.page_size_query_param = 'page_size'
+        paginator.max_page_size = 100
+        page = paginator.paginate_queryset(
+            history.values('id', 'field', 'old_value', 'new_value', 'price_update_id', 'created_at'),
+            request, view=self
+        )
+        return paginator.get_paginated_response(page)
+
+
+def format_import_errors(errors):
+    """Errores por fila en el formato de texto que muestra el frontend"""
+    return [f"Fila {error['row']}: {error['error']}" for error in errors]
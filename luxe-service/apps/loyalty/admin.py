@@ -5,7 +5,8 @@ from .models import (
     RewardRule, 
     LoyaltyAccount, 
     PointTransaction, 
-    UserCoupon
+    UserCoupon,
+    LoyaltyReprocessJob
 )
 
 @admin.register(LoyaltyProgramConfig)
@@ -42,3 +43,9 @@ class UserCouponAdmin(admin.ModelAdmin):
     list_filter = ('is_used', 'created_at')
     search_fields = ('code', 'customer__first_name')
 
+
+@admin.register(LoyaltyReprocessJob)
+class LoyaltyReprocessJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'dry_run', 'status', 'processed_orders', 'total_orders', 'created_at', 'finished_at')
+    list_filter = ('status', 'dry_run')
+    readonly_fields = ('cursor_created_at', 'cursor_order_id', 'summary', 'message', 'started_at', 'finished_at')
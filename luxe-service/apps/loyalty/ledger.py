@@ -0,0 +1,159 @@
+"""
+apps/loyalty/ledger.py
+
+Libro de puntos: cada movimiento es una PointTransaction más un UPDATE con
+F() sobre el saldo materializado de la cuenta, en la misma transacción.
+
+- Los débitos son condicionales (WHERE points_balance >= costo): dos canjes
+  simultáneos no pueden dejar el saldo negativo ni perder actualizaciones.
+- Los puntos de una orden se registran una sola vez: la restricción única
+  (related_order_id, transaction_type) reemplaza el exists() previo.
+- ledger_discrepancies() compara los saldos con la suma del libro y
+  recompute_balances() los corrige (comando reconcile_loyalty_ledger).
+"""
+
+import logging
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import LoyaltyAccount, PointTransaction
+
+logger = logging.getLogger(__name__)
+
+EARN = 'EARN'
+REDEEM = 'REDEEM'
+
+
+class InsufficientPoints(Exception):
+    """El saldo de la cuenta no alcanza para el débito"""
+
+
+class DuplicateMovement(Exception):
+    """La orden ya tiene un movimiento de ese tipo"""
+
+
+# ============================================================================
+# MOVIMIENTOS
+# ============================================================================
+
+def account_for_customer(customer_id):
+    """Id de la cuenta del cliente, creándola si no existe (seguro ante concurrencia)"""
+    account_id = LoyaltyAccount.objects.filter(customer_id=customer_id).values_list('id', flat=True).first()
+    if account_id is None:
+        LoyaltyAccount.objects.bulk_create([LoyaltyAccount(customer_id=customer_id)], ignore_conflicts=True)
+        account_id = LoyaltyAccount.objects.filter(customer_id=customer_id).values_list('id', flat=True).get()
+    return account_id
+
+
+def record_movement(account_id, points, transaction_type, description, related_order_id=None):
+    """
+    Registra un movimiento y actualiza el saldo. Los débitos solo se aplican
+    si el saldo alcanza (InsufficientPoints); un movimiento repetido para la
+    misma orden lanza DuplicateMovement. Retorna la PointTransaction.
+    """
+    accounts = LoyaltyAccount.objects.filter(pk=account_id)
+    changes = {'points_balance': F('points_balance') + points}
+    if transaction_type == EARN:
+        changes['total_points_earned'] = F('total_points_earned') + points
+
+    with transaction.atomic():
+        if points < 0:
+            accounts = accounts.filter(points_balance__gte=-points)
+        if points and not accounts.update(**changes):
+            raise InsufficientPoints(f'Saldo insuficiente para debitar {-points} puntos')
+        try:
+            with transaction.atomic():
+                return PointTransaction.objects.create(
+                    account_id=account_id,
+                    transaction_type=transaction_type,
+                    points=points,
+                    description=description[:255],
+                    related_order_id=str(related_order_id) if related_order_id else None,
+                )
+        except IntegrityError:
+            raise DuplicateMovement(f'La orden {related_order_id} ya tiene un movimiento {transaction_type}')
+
+
+def award_order_points(order, points):
+    """Acredita los puntos de una orden una sola vez. Retorna False si ya estaban."""
+    try:
+        with transaction.atomic():
+            record_movement(
+                account_for_customer(order.customer_id),
+                points,
+                EARN,
+                f"Ganancia por Orden #{order.order_number}",
+                related_order_id=order.id,
+            )
+    except DuplicateMovement:
+        return False
+    return True
+
+
+def redeem_points(account_id, cost, description):
+    """Debita `cost` puntos (InsufficientPoints si no alcanzan). Retorna el saldo nuevo."""
+    with transaction.atomic():
+        record_movement(account_id, -cost, REDEEM, description)
+        return LoyaltyAccount.objects.filter(pk=account_id).values_list('points_balance', flat=True).get()
+
+
+# ============================================================================
+# CONCILIACIÓN
+# ============================================================================
+
+def _ledger_sum(**filters):
+    return Coalesce(
+        Subquery(
+            PointTransaction.objects.filter(account=OuterRef('pk'), **filters)
+            .order_by().values('account').annotate(total=Sum('points')).values('total')
+        ),
+        Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def ledger_discrepancies():
+    """Cuentas cuyo saldo o total ganado no coincide con la suma del libro"""
+    return LoyaltyAccount.objects.annotate(
+        ledger_balance=_ledger_sum(),
+        ledger_earned=_ledger_sum(transaction_type=EARN),
+    ).filter(
+        ~Q(points_balance=F('ledger_balance')) | ~Q(total_points_earned=F('ledger_earned'))
+    )
+
+
+def recompute_balances():
+    """
+    Saldo = suma de todas las transacciones; ganado = suma de las EARN.
+    Un UPDATE ... FROM con la agregación por cuenta; solo toca las cuentas
+    que cambian. Retorna la cantidad de cuentas actualizadas.
+
+    Antes se bloquean las cuentas (FOR UPDATE, en orden de id): un movimiento
+    en curso termina primero y el UPDATE, que en READ COMMITTED toma una
+    instantánea nueva, ya incluye su transacción. Sin el bloqueo, un canje que
+    confirma mientras corre la agregación queda pisado por el total viejo.
+    """
+    accounts = LoyaltyAccount._meta.db_table
+    transactions = PointTransaction._meta.db_table
+    sql = f"""
+        UPDATE {accounts} AS account
+        SET points_balance = totals.balance,
+            total_points_earned = totals.earned,
+            updated_at = NOW()
+        FROM (
+            SELECT a.id,
+                   COALESCE(SUM(t.points), 0) AS balance,
+                   COALESCE(SUM(t.points) FILTER (WHERE t.transaction_type = %s), 0) AS earned
+            FROM {accounts} a
+            LEFT JOIN {transactions} t ON t.account_id = a.id
+            GROUP BY a.id
+        ) AS totals
+        WHERE account.id = totals.id
+          AND (account.points_balance <> totals.balance OR account.total_points_earned <> totals.earned)
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'SELECT id FROM {accounts} ORDER BY id FOR UPDATE')
+        cursor.execute(sql, [EARN])
+        return cursor.rowcount
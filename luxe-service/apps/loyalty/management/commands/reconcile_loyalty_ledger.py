@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from apps.loyalty.ledger import ledger_discrepancies, recompute_balances
+
+
+class Command(BaseCommand):
+    help = 'Verifica que el saldo de cada cuenta de fidelidad coincida con su libro de transacciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Corregir los saldos con la suma del libro')
+        parser.add_argument('--limit', type=int, default=20, help='Cuentas a mostrar')
+
+    def handle(self, *args, **options):
+        discrepancies = ledger_discrepancies()
+        total = discrepancies.count()
+        if not total:
+            self.stdout.write(self.style.SUCCESS('✅ Todos los saldos coinciden con el libro'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'{total} cuentas no coinciden con el libro:'))
+        rows = discrepancies.values(
+            'id', 'customer__email', 'points_balance', 'ledger_balance', 'total_points_earned', 'ledger_earned'
+        ).order_by('id')[:options['limit']]
+        for row in rows:
+            self.stdout.write(
+                f"  Cuenta {row['id']} ({row['customer__email']}): saldo {row['points_balance']} "
+                f"vs libro {row['ledger_balance']}, ganado {row['total_points_earned']} vs libro {row['ledger_earned']}"
+            )
+
+        if options['fix']:
+            updated = recompute_balances()
+            self.stdout.write(self.style.SUCCESS(f'✅ {updated} cuentas corregidas'))
+        else:
+            self.stdout.write('Use --fix para corregir los saldos')
@@ -0,0 +1,117 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import F, Sum
+
+from apps.customers.models import Customer
+from apps.loyalty.ledger import (
+    InsufficientPoints,
+    account_for_customer,
+    record_movement,
+    recompute_balances,
+    redeem_points,
+)
+from apps.loyalty.models import LoyaltyAccount, PointTransaction
+
+STRESS_ADDRESS = 'Prueba de Concurrencia Fidelidad'
+
+
+class Command(BaseCommand):
+    help = (
+        'Lanza canjes de puntos en paralelo contra una cuenta sintética y verifica que '
+        'no se pierdan actualizaciones ni el saldo quede negativo'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Hilos (conexiones) en paralelo')
+        parser.add_argument('--redemptions', type=int, default=200, help='Canjes a intentar')
+        parser.add_argument('--balance', type=int, default=1000, help='Saldo inicial de la cuenta')
+        parser.add_argument('--cost', type=int, default=30, help='Puntos por canje')
+        parser.add_argument(
+            '--recompute', action='store_true',
+            help='Recalcular los saldos desde el libro en paralelo con los canjes',
+        )
+        parser.add_argument('--keep', action='store_true', help='No eliminar el cliente sintético al terminar')
+
+    def handle(self, *args, **options):
+        balance, cost = options['balance'], options['cost']
+        customer = Customer.objects.create(
+            email=f'stress-{uuid.uuid4().hex[:12]}@sincorreo.com',
+            first_name='PRUEBA',
+            last_name='CONCURRENCIA',
+            address=STRESS_ADDRESS,
+        )
+        account_id = account_for_customer(customer.pk)
+        record_movement(account_id, balance, 'ADJUSTMENT', 'Saldo inicial de prueba')
+
+        def redeem(_):
+            close_old_connections()
+            try:
+                redeem_points(account_id, cost, 'Canje de prueba')
+                return True
+            except InsufficientPoints:
+                return False
+            finally:
+                close_old_connections()
+
+        done = threading.Event()
+        recomputes = []
+
+        def recompute():
+            # Misma situación que el reproceso o reconcile --fix corriendo en vivo.
+            # Se desfasa el total ganado para que la cuenta entre al UPDATE (como
+            # tras insertar puntos EARN); el saldo no se toca.
+            close_old_connections()
+            try:
+                while not done.is_set():
+                    LoyaltyAccount.objects.filter(pk=account_id).update(total_points_earned=F('total_points_earned') + 1)
+                    recomputes.append(recompute_balances())
+            finally:
+                close_old_connections()
+
+        recomputer = threading.Thread(target=recompute) if options['recompute'] else None
+        try:
+            started = time.perf_counter()
+            if recomputer:
+                recomputer.start()
+            try:
+                with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                    results = list(pool.map(redeem, range(options['redemptions'])))
+            finally:
+                done.set()
+                if recomputer:
+                    recomputer.join()
+            elapsed = time.perf_counter() - started
+
+            succeeded = sum(results)
+            expected = min(options['redemptions'], balance // cost)
+            account = LoyaltyAccount.objects.get(pk=account_id)
+            ledger = PointTransaction.objects.filter(account_id=account_id).aggregate(total=Sum('points'))['total']
+
+            self.stdout.write(
+                f"{options['redemptions']} canjes con {options['workers']} hilos en {elapsed:.2f}s: "
+                f"{succeeded} aplicados, {len(results) - succeeded} rechazados | "
+                f"saldo {account.points_balance}, libro {ledger}"
+                + (f" | {len(recomputes)} recálculos en paralelo" if recomputer else '')
+            )
+
+            errors = []
+            if succeeded != expected:
+                errors.append(f'se esperaban {expected} canjes aplicados y hubo {succeeded}')
+            if account.points_balance != balance - succeeded * cost:
+                errors.append(f'saldo {account.points_balance} != {balance - succeeded * cost}')
+            if account.points_balance != ledger:
+                errors.append(f'saldo {account.points_balance} != libro {ledger}')
+            if account.points_balance < 0:
+                errors.append('saldo negativo')
+            if errors:
+                raise CommandError('❌ ' + '; '.join(errors))
+
+            self.stdout.write(self.style.SUCCESS('✅ Sin actualizaciones perdidas: saldo y libro coinciden'))
+        finally:
+            if not options['keep']:
+                customer.delete()
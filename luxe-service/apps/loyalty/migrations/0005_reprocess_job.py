@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:37
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loyalty', '0004_rewardrule_is_birthday_reward'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoyaltyReprocessJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('dry_run', models.BooleanField(default=False, verbose_name='Simulación')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('completed', 'Completado'), ('failed', 'Fallido')], db_index=True, default='pending', max_length=20, verbose_name='Estado')),
+                ('total_orders', models.PositiveIntegerField(default=0, verbose_name='Órdenes totales')),
+                ('processed_orders', models.PositiveIntegerField(default=0, verbose_name='Órdenes procesadas')),
+                ('cursor_created_at', models.DateTimeField(blank=True, null=True)),
+                ('cursor_order_id', models.UUIDField(blank=True, null=True)),
+                ('summary', models.JSONField(blank=True, default=dict, verbose_name='Resumen')),
+                ('message', models.TextField(blank=True, verbose_name='Mensaje')),
+                ('created_by', models.CharField(blank=True, max_length=100, verbose_name='Creado por')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Reproceso de Puntos',
+                'verbose_name_plural': 'Reprocesos de Puntos',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pointtransaction',
+            index=models.Index(fields=['related_order_id', 'transaction_type'], name='point_tx_order_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:39
+
+from django.db import migrations, models
+
+# Antes de la restricción única se eliminan los movimientos repetidos por
+# orden (se conserva el primero). Los saldos se corrigen después con
+# `manage.py reconcile_loyalty_ledger --fix`.
+DEDUPLICATE_SQL = """
+DELETE FROM loyalty_pointtransaction t
+USING loyalty_pointtransaction first
+WHERE t.related_order_id IS NOT NULL
+  AND t.related_order_id = first.related_order_id
+  AND t.transaction_type = first.transaction_type
+  AND t.id > first.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loyalty', '0005_reprocess_job'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DEDUPLICATE_SQL, migrations.RunSQL.noop),
+        migrations.RemoveIndex(
+            model_name='pointtransaction',
+            name='point_tx_order_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='pointtransaction',
+            constraint=models.UniqueConstraint(fields=('related_order_id', 'transaction_type'), name='point_tx_order_type_uniq'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:40
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0008_customer_rfm_segments'),
+        ('loyalty', '0006_point_transaction_order_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usercoupon',
+            index=models.Index(django.db.models.functions.text.Upper('code'), name='usercoupon_code_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loyalty', '0007_usercoupon_code_upper_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loyaltyreprocessjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último avance'),
+        ),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+import uuid
+from datetime import timedelta
+
+from django.db import connection, models
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
@@ -226,6 +231,11 @@ class PointTransaction(models.Model):
         verbose_name = _("Transacción de Puntos")
         verbose_name_plural = _("Transacciones de Puntos")
         ordering = ['-created_at']
+        constraints = [
+            # Un movimiento de cada tipo por orden (las transacciones sin orden
+            # tienen related_order_id NULL y no chocan entre sí)
+            models.UniqueConstraint(fields=['related_order_id', 'transaction_type'], name='point_tx_order_type_uniq'),
+        ]
 
 
 class UserCoupon(models.Model):
@@ -252,7 +262,105 @@ class UserCoupon(models.Model):
     class Meta:
         verbose_name = _("Cupón de Usuario")
         verbose_name_plural = _("Cupones de Usuario")
+        indexes = [
+            # Búsqueda por código sin distinguir mayúsculas (code__iexact)
+            models.Index(Upper('code'), name='usercoupon_code_upper_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.code} ({self.customer})"
+
+    @classmethod
+    def consume(cls, code):
+        """
+        Marca como usado el cupón con ese código en un solo UPDATE condicional
+        (is_used = FALSE) y retorna el cupón, o None si no existe o ya se usó.
+        Con dos ventas simultáneas solo una obtiene el cupón. El código es
+        único solo respetando mayúsculas: la subconsulta toma un único cupón
+        (LIMIT 1) y salta el que otra venta tenga bloqueado.
+        """
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET is_used = TRUE, used_at = %s "
+                f"WHERE is_used = FALSE AND id = ("
+                f"  SELECT id FROM {table} WHERE UPPER(code) = UPPER(%s) AND is_used = FALSE "
+                f"  ORDER BY created_at LIMIT 1 FOR UPDATE SKIP LOCKED"
+                f") RETURNING id",
+                [timezone.now(), code],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return cls.objects.select_related('reward_rule').get(pk=row[0])
+
+
+
+class LoyaltyReprocessJob(models.Model):
+    """
+    Recálculo de los puntos EARN de todas las órdenes pagadas (en Celery).
+    Avanza por lotes de órdenes y guarda el cursor, así un job interrumpido
+    se puede reanudar. En modo simulación solo calcula las diferencias.
+
+    Cada lote guardado actualiza heartbeat_at: un job 'running' sin avance
+    en STALE_AFTER se considera interrumpido (worker caído) y se puede
+    reanudar; uno que sigue avanzando no.
+    """
+    STALE_AFTER = timedelta(minutes=10)
+
+    STATUS_CHOICES = (
+        ('pending', _('Pendiente')),
+        ('running', _('En proceso')),
+        ('completed', _('Completado')),
+        ('failed', _('Fallido')),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    dry_run = models.BooleanField(default=False, verbose_name=_("Simulación"))
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        db_index=True,
+        verbose_name=_("Estado")
+    )
+
+    # Progreso y cursor (created_at, id de la última orden procesada)
+    total_orders = models.PositiveIntegerField(default=0, verbose_name=_("Órdenes totales"))
+    processed_orders = models.PositiveIntegerField(default=0, verbose_name=_("Órdenes procesadas"))
+    cursor_created_at = models.DateTimeField(null=True, blank=True)
+    cursor_order_id = models.UUIDField(null=True, blank=True)
+
+    summary = models.JSONField(default=dict, blank=True, verbose_name=_("Resumen"))
+    message = models.TextField(blank=True, verbose_name=_("Mensaje"))
+
+    created_by = models.CharField(max_length=100, blank=True, verbose_name=_("Creado por"))
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Último avance"))
+
+    class Meta:
+        verbose_name = _("Reproceso de Puntos")
+        verbose_name_plural = _("Reprocesos de Puntos")
+        ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.code} ({self.user})"
+        mode = 'Simulación' if self.dry_run else 'Reproceso'
+        return f"{mode} {self.id} ({self.get_status_display()})"
+
+    @classmethod
+    def resumable(cls):
+        """Fallidos, o en proceso sin avance reciente"""
+        cutoff = timezone.now() - cls.STALE_AFTER
+        return cls.objects.filter(
+            models.Q(status='failed')
+            | models.Q(status='running', heartbeat_at__lt=cutoff)
+            | models.Q(status='running', heartbeat_at__isnull=True, started_at__lt=cutoff)
+        )
 
+    @property
+    def progress(self):
+        if not self.total_orders:
+            return 0
+        return round(self.processed_orders * 100 / self.total_orders, 1)
@@ -0,0 +1,245 @@
+"""
+apps/loyalty/reprocess.py
+
+Recálculo de los puntos ganados (EARN) de todas las órdenes pagadas.
+
+Las órdenes se recorren por lotes en orden (created_at, id) y los puntos se
+calculan en memoria con la tabla compilada de reglas (rules.py). Por lote,
+en una transacción corta:
+
+1. se crean con bulk_create las cuentas que falten,
+2. se borran las transacciones EARN de esas órdenes y se insertan las nuevas
+   con bulk_create,
+3. se guarda el cursor del job, así un job interrumpido continúa desde el
+   último lote confirmado.
+
+Al terminar se borran las EARN de órdenes que ya no están pagadas y los
+saldos se recalculan con un solo UPDATE ... FROM agrupado. Mientras tanto
+las tablas de fidelidad no quedan bloqueadas más que lo que dura un lote.
+
+En modo simulación (dry_run) no se escribe nada: el resumen del job trae
+cuántas órdenes ganan, cambian o pierden puntos y los clientes con mayor
+diferencia de saldo.
+"""
+
+import logging
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import CharField, Count, Exists, OuterRef, Q, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .ledger import recompute_balances
+from .models import LoyaltyAccount, PointTransaction
+from .rules import get_rule_table, order_channel
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+DIFF_TOP = 50
+
+EARN = 'EARN'
+
+
+# ============================================================================
+# ÓRDENES Y PUNTOS
+# ============================================================================
+
+def _paid_orders():
+    from apps.orders.models import Order
+
+    return Order.objects.filter(payment_status='paid', customer__isnull=False)
+
+
+def _order_chunks(cursor_created_at=None, cursor_order_id=None):
+    """Lotes de órdenes pagadas después del cursor (keyset sobre created_at, id)"""
+    orders = _paid_orders().order_by('created_at', 'id')
+    while True:
+        chunk = orders
+        if cursor_created_at is not None:
+            chunk = chunk.filter(
+                Q(created_at__gt=cursor_created_at) |
+                Q(created_at=cursor_created_at, id__gt=cursor_order_id)
+            )
+        rows = list(chunk.values_list(
+            'id', 'customer_id', 'total', 'source', 'order_number', 'created_at'
+        )[:CHUNK_SIZE])
+        if not rows:
+            return
+        yield rows
+        cursor_order_id, cursor_created_at = rows[-1][0], rows[-1][5]
+
+
+def _points(rows, table):
+    """{order_id: (customer_id, puntos, order_number)} con los puntos de cada orden"""
+    return {
+        order_id: (customer_id, table.points_for(total or 0, order_channel(source)), order_number)
+        for order_id, customer_id, total, source, order_number, _ in rows
+    }
+
+
+def _orphan_earn_transactions():
+    """EARN de órdenes que ya no están pagadas o no tienen cliente"""
+    paid_order = _paid_orders().annotate(
+        id_text=Cast('id', CharField())
+    ).filter(id_text=OuterRef('related_order_id'))
+    return PointTransaction.objects.filter(transaction_type=EARN).exclude(Exists(paid_order))
+
+
+# ============================================================================
+# ESCRITURA
+# ============================================================================
+
+def _account_ids(customer_ids):
+    """{customer_id: account_id}, creando las cuentas que falten"""
+    accounts = dict(
+        LoyaltyAccount.objects.filter(customer_id__in=customer_ids).values_list('customer_id', 'id')
+    )
+    missing = set(customer_ids) - set(accounts)
+    if missing:
+        LoyaltyAccount.objects.bulk_create(
+            [LoyaltyAccount(customer_id=customer_id) for customer_id in missing],
+            ignore_conflicts=True,
+        )
+        accounts.update(
+            LoyaltyAccount.objects.filter(customer_id__in=missing).values_list('customer_id', 'id')
+        )
+    return accounts
+
+
+def _write_chunk(points):
+    """Reemplaza las EARN de las órdenes del lote. Retorna (transacciones, puntos)"""
+    earning = {order_id: value for order_id, value in points.items() if value[1] > 0}
+    accounts = _account_ids({customer_id for customer_id, _, _ in earning.values()})
+
+    PointTransaction.objects.filter(
+        transaction_type=EARN,
+        related_order_id__in=[str(order_id) for order_id in points],
+    ).delete()
+    PointTransaction.objects.bulk_create([
+        PointTransaction(
+            account_id=accounts[customer_id],
+            transaction_type=EARN,
+            points=order_points,
+            description=f"Ganancia por Orden #{order_number}",
+            related_order_id=str(order_id),
+        )
+        for order_id, (customer_id, order_points, order_number) in earning.items()
+    ], batch_size=CHUNK_SIZE, ignore_conflicts=True)  # una acreditación en vivo pudo ganar la carrera
+    return len(earning), sum(value[1] for value in earning.values())
+
+
+# ============================================================================
+# JOB
+# ============================================================================
+
+def _save_progress(job, rows, **summary):
+    job.processed_orders += len(rows)
+    job.cursor_order_id, job.cursor_created_at = rows[-1][0], rows[-1][5]
+    for key, value in summary.items():
+        job.summary[key] = job.summary.get(key, 0) + value
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=['processed_orders', 'cursor_order_id', 'cursor_created_at', 'summary', 'heartbeat_at'])
+
+
+def _reprocess(job, table):
+    for rows in _order_chunks(job.cursor_created_at, job.cursor_order_id):
+        with transaction.atomic():
+            created, awarded = _write_chunk(_points(rows, table))
+            _save_progress(job, rows, transactions_created=created, points_awarded=awarded)
+
+    with transaction.atomic():
+        removed, _ = _orphan_earn_transactions().delete()
+        accounts_updated = recompute_balances()
+
+    job.summary.update(orphan_transactions_removed=removed, accounts_updated=accounts_updated)
+    return (
+        f"Reproceso completado. {job.processed_orders} órdenes, "
+        f"{job.summary.get('points_awarded', 0)} puntos otorgados, {accounts_updated} cuentas actualizadas."
+    )
+
+
+def _simulate(job, table):
+    """Diferencias contra las EARN actuales sin escribir (siempre desde el inicio)"""
+    job.processed_orders = 0
+    job.cursor_created_at = job.cursor_order_id = None
+    job.summary = {}
+    outcomes = Counter()
+    deltas = defaultdict(int)
+
+    for rows in _order_chunks():
+        points = _points(rows, table)
+        current = dict(
+            PointTransaction.objects.filter(
+                transaction_type=EARN, related_order_id__in=[str(order_id) for order_id in points]
+            ).order_by().values('related_order_id').annotate(total=Sum('points')).values_list('related_order_id', 'total')
+        )
+        for order_id, (customer_id, new, _) in points.items():
+            old = current.get(str(order_id), 0)
+            if old == new:
+                outcomes['unchanged'] += 1
+                continue
+            outcomes['added' if not old else 'removed' if not new else 'changed'] += 1
+            deltas[customer_id] += new - old
+        _save_progress(job, rows)
+
+    orphans = _orphan_earn_transactions().order_by().values('account__customer_id').annotate(
+        total=Sum('points'), count=Count('id')
+    )
+    for row in orphans:
+        deltas[row['account__customer_id']] -= row['total']
+        outcomes['orphans'] += row['count']
+
+    top = sorted((item for item in deltas.items() if item[1]), key=lambda item: -abs(item[1]))[:DIFF_TOP]
+    balances = {
+        row['customer_id']: row
+        for row in LoyaltyAccount.objects.filter(customer_id__in=[customer_id for customer_id, _ in top]).values(
+            'customer_id', 'points_balance', 'customer__email', 'customer__first_name', 'customer__last_name'
+        )
+    }
+    job.summary = {
+        'orders': dict(outcomes),
+        'points_delta': sum(deltas.values()),
+        'accounts_affected': sum(1 for delta in deltas.values() if delta),
+        'top_changes': [
+            {
+                'customer_id': str(customer_id),
+                'email': balances.get(customer_id, {}).get('customer__email', ''),
+                'name': ' '.join(filter(None, (
+                    balances.get(customer_id, {}).get('customer__first_name'),
+                    balances.get(customer_id, {}).get('customer__last_name'),
+                ))),
+                'current_balance': balances.get(customer_id, {}).get('points_balance', 0),
+                'delta': delta,
+            }
+            for customer_id, delta in top
+        ],
+    }
+    return (
+        f"Simulación: {outcomes['added']} órdenes ganan puntos, {outcomes['changed']} cambian, "
+        f"{outcomes['removed'] + outcomes['orphans']} pierden; diferencia total {job.summary['points_delta']} puntos."
+    )
+
+
+def run_reprocess_job(job):
+    """Ejecuta (o reanuda desde su cursor) un LoyaltyReprocessJob"""
+    job.status = 'running'
+    job.started_at = job.started_at or timezone.now()
+    job.heartbeat_at = timezone.now()
+    job.total_orders = _paid_orders().count()
+    job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'total_orders'])
+
+    try:
+        table = get_rule_table()
+        job.message = _simulate(job, table) if job.dry_run else _reprocess(job, table)
+        job.status = 'completed'
+    except Exception as e:
+        logger.exception(f'Error en reproceso de puntos {job.id}')
+        job.status = 'failed'
+        job.message = f'Error reprocesando puntos: {e}'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'message', 'summary', 'finished_at'])
+    logger.info(f'Reproceso de puntos {job.id}: {job.status}. {job.message}')
+    return job
@@ -0,0 +1,179 @@
+"""
+apps/loyalty/rules.py
+
+Tabla compilada de reglas de obtención de puntos.
+
+Las reglas activas se leen una vez (configuración + reglas con su tipo) y se
+compilan por canal (WEB, POS, ALL) en tuplas ordenadas por monto mínimo; la
+regla que aplica a un monto se encuentra con búsqueda binaria. Cada proceso
+guarda la tabla en memoria junto con la versión con la que se construyó; la
+versión vive en Redis y la incrementan las señales de EarningRule,
+EarningRuleType y LoyaltyProgramConfig. Calcular puntos cuesta una lectura de
+la versión y ninguna consulta a la BD.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+
+from .models import EarningRule, LoyaltyProgramConfig
+
+logger = logging.getLogger(__name__)
+
+RULES_VERSION_KEY = 'loyalty:rules:version'
+
+CHANNELS = ('WEB', 'POS', 'ALL')
+ORDER_SOURCE_CHANNELS = {'web': 'WEB', 'pos': 'POS'}
+
+# Paso por defecto de las reglas "por monto" sin amount_step
+DEFAULT_AMOUNT_STEP = Decimal('15')
+
+
+# ============================================================================
+# VERSIÓN
+# ============================================================================
+
+def get_rules_version():
+    """Versión actual de las reglas (se inicializa con un timestamp)"""
+    version = cache.get(RULES_VERSION_KEY)
+    if version is None:
+        cache.add(RULES_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(RULES_VERSION_KEY)
+    return version
+
+
+def bump_rules_version():
+    """Obliga a todos los procesos a recompilar la tabla"""
+    try:
+        version = cache.incr(RULES_VERSION_KEY)
+    except ValueError:
+        version = get_rules_version()
+    logger.debug('Versión de reglas de fidelidad: %s', version)
+    return version
+
+
+# ============================================================================
+# TABLA COMPILADA
+# ============================================================================
+
+class CompiledRule:
+    """Regla lista para aplicar: el tipo ya está resuelto a 'por monto' o 'fija'"""
+
+    __slots__ = ('id', 'name', 'order_source', 'threshold', 'points', 'step')
+
+    def __init__(self, rule):
+        self.id = rule.id
+        self.name = rule.name
+        self.order_source = rule.order_source
+        self.threshold = rule.min_order_value
+        self.points = rule.points_to_award
+        # step None = puntos fijos por factura
+        self.step = self._step(rule)
+
+    @staticmethod
+    def _step(rule):
+        code = (rule.rule_type.code or '').upper() if rule.rule_type else ''
+        name = (rule.rule_type.name or '').upper() if rule.rule_type else ''
+        has_step = bool(rule.amount_step and rule.amount_step > 0)
+        if 'MONTO' in code or 'AMOUNT' in code or 'MONTO' in name or has_step:
+            return rule.amount_step if has_step else DEFAULT_AMOUNT_STEP
+        return None
+
+    def points_for(self, amount):
+        if self.step is None:
+            return self.points
+        return int(amount / self.step) * self.points
+
+    def __repr__(self):
+        return f'<CompiledRule {self.name} {self.order_source} >= {self.threshold}>'
+
+
+class RuleTable:
+    """
+    Reglas por canal ordenadas por (monto mínimo, específica del canal). Para
+    un monto aplica la última regla cuyo mínimo no lo supera: la de umbral
+    más alto y, en empate, la del canal antes que la de 'ALL'.
+    """
+
+    def __init__(self, rules, is_active=True, version=None):
+        self.is_active = is_active
+        self.version = version
+        self._thresholds = {}
+        self._rules = {}
+        for channel in CHANNELS:
+            applicable = [rule for rule in rules if rule.order_source in (channel, 'ALL')]
+            applicable.sort(key=lambda rule: (rule.threshold, rule.order_source == channel, -rule.id))
+            self._rules[channel] = tuple(applicable)
+            self._thresholds[channel] = tuple(rule.threshold for rule in applicable)
+
+    @classmethod
+    def build(cls, version=None):
+        config = LoyaltyProgramConfig.objects.only('is_active').first()
+        rules = [
+            CompiledRule(rule)
+            for rule in EarningRule.objects.filter(is_active=True).select_related('rule_type')
+        ]
+        return cls(rules, is_active=config.is_active if config else True, version=version)
+
+    def best_rule(self, amount, channel='ALL'):
+        thresholds = self._thresholds.get(channel, self._thresholds['ALL'])
+        index = bisect.bisect_right(thresholds, amount) - 1
+        if index < 0:
+            return None
+        return self._rules.get(channel, self._rules['ALL'])[index]
+
+    def points_for(self, amount, channel='ALL'):
+        if not self.is_active:
+            return 0
+        rule = self.best_rule(amount, channel)
+        return rule.points_for(amount) if rule else 0
+
+    def rules(self, channel='ALL'):
+        return self._rules[channel]
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def get_rule_table():
+    """Tabla del proceso; se recompila solo si cambió la versión en Redis"""
+    global _table
+    version = get_rules_version()
+    table = _table
+    if table is None or table.version != version:
+        with _lock:
+            if _table is None or _table.version != version:
+                _table = RuleTable.build(version=version)
+                logger.info(f'Reglas de fidelidad compiladas (versión {version}, {len(_table.rules())} reglas ALL)')
+            table = _table
+    return table
+
+
+# ============================================================================
+# CÁLCULO
+# ============================================================================
+
+def order_channel(source):
+    return ORDER_SOURCE_CHANNELS.get(source, 'ALL')
+
+
+def to_amount(value):
+    """Decimal >= 0 o None si el valor no es un monto"""
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+    return amount if amount.is_finite() and amount >= 0 else None
+
+
+def points_for_amount(amount, source=None, table=None):
+    amount = to_amount(amount)
+    if amount is None:
+        return 0
+    table = table or get_rule_table()
+    return table.points_for(amount, order_channel(source))
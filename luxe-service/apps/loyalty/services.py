@@ -1,7 +1,9 @@
 import logging
+import uuid
 from django.db import transaction
-from django.core.exceptions import ObjectDoesNotExist
-from .models import EarningRule, LoyaltyAccount, PointTransaction, LoyaltyProgramConfig
+from .ledger import REDEEM, award_order_points, record_movement, redeem_points
+from .models import LoyaltyAccount, UserCoupon
+from .rules import points_for_amount
 
 logger = logging.getLogger(__name__)
 
@@ -12,119 +14,55 @@ class LoyaltyService:
         Calcula los puntos que se ganarían por una orden dada.
         REGLA DE NEGOCIO: Solo se aplica la regla con el monto mínimo (umbral) más alto 
         que el cliente haya superado, FILTRANDO por el canal de venta (Web vs POS).
+
+        Las reglas salen de la tabla compilada del proceso (ver rules.py), sin
+        consultas a la BD.
         """
-        config = LoyaltyProgramConfig.objects.first()
-        if config and not config.is_active:
-            logger.info("Loyalty program is inactive.")
-            return 0
-            
         if not order:
             return 0
-
-        try:
-            amount = float(order.total)
-        except (ValueError, TypeError):
-            return 0
-            
-        # Determinar el canal de la orden para filtrar reglas
-        # Asumimos que order.source existe (agregado anteriormente). Si no, fallback a ALL.
-        # Mapeo: 'web' -> 'WEB', 'pos' -> 'POS', otros -> 'ALL'
-        order_source_code = 'ALL'
-        if hasattr(order, 'source'):
-             if order.source == 'web':
-                 order_source_code = 'WEB'
-             elif order.source == 'pos':
-                 order_source_code = 'POS'
-        
-        # Filtramos reglas activas que coincidan con el canal O sean para todos
-        active_rules = EarningRule.objects.filter(
-            is_active=True, 
-            order_source__in=[order_source_code, 'ALL']
-        ).select_related('rule_type')
-        
-        # 1. Encontrar todas las reglas que el monto supera
-        applicable_rules = []
-        for rule in active_rules:
-            if amount >= float(rule.min_order_value):
-                applicable_rules.append(rule)
-        
-        if not applicable_rules:
-            return 0
-            
-        # 2. Seleccionar la MEJOR regla (la que tenga el min_order_value más alto)
-        # IMPORTANTE: Si hay empate en montos, priorizamos la regla específica del canal sobre 'ALL'
-        # Sort priority: 1. Min Value (Desc), 2. is Specific channel (WEB/POS > ALL)
-        def sort_key(r):
-            source_priority = 1 if r.order_source == order_source_code else 0
-            return (float(r.min_order_value), source_priority)
-
-        applicable_rules.sort(key=sort_key, reverse=True)
-        best_rule = applicable_rules[0]
-        
-        logger.info(f"Applying best rule: {best_rule.name} (Source: {best_rule.order_source}, Threshold: {best_rule.min_order_value}) for amount {amount}")
-
-        # 3. Calcular puntos según el tipo de esa única regla (Hardcodeado a petición)
-        points_to_earn = 0
-        
-        code = best_rule.rule_type.code.upper() if best_rule.rule_type and best_rule.rule_type.code else ''
-        nombre = best_rule.rule_type.name.upper() if best_rule.rule_type and best_rule.rule_type.name else ''
-        
-        # Hardcodeamos dos lógicas principales: "Por Monto" (acumulable por cada X dolares) y "Por Factura Total" (fijo)
-        # Determinamos si es por monto verificando si el nombre o código hace referencia, o si configuró el amount_step en la BD.
-        es_por_monto = (
-            'MONTO' in code or 'AMOUNT' in code or 
-            'MONTO' in nombre or 
-            (best_rule.amount_step and best_rule.amount_step > 0)
-        )
-
-        if es_por_monto:
-            # REGLA 1: POR MONTO (ej: 1 punto por cada $15)
-            step = float(best_rule.amount_step) if best_rule.amount_step and best_rule.amount_step > 0 else 15.0
-            multiplier = int(amount / step)
-            points_to_earn = (multiplier * best_rule.points_to_award)
-        else:
-            # REGLA 2: POR FACTURA TOTAL (ej: un puntaje fijo solo por enviar la factura mayor al min_order_value)
-            points_to_earn = best_rule.points_to_award
-        
-        return points_to_earn
+        return points_for_amount(order.total, getattr(order, 'source', None))
 
     @staticmethod
     def award_points_for_order(order):
         """
         Otorga puntos a un usuario cuando una orden es pagada.
         """
-        if not order or not order.customer:
-            return
-            
-        # Check if points already awarded for this order
-        if PointTransaction.objects.filter(related_order_id=str(order.id), transaction_type='EARN').exists():
+        if not order or not order.customer_id:
             return
 
-        # Ensure order total is refreshed/correct
+        # Primero las reglas (en memoria): sin puntos no hace falta consultar nada
         points_to_earn = LoyaltyService.calculate_points_to_earn(order)
         
         if points_to_earn <= 0:
             return
 
+        # La restricción única (related_order_id, transaction_type) evita
+        # acreditar dos veces la misma orden
         try:
-            with transaction.atomic():
-                # Get or Create Loyalty Account linked to Customer
-                account, created = LoyaltyAccount.objects.get_or_create(customer=order.customer)
-                
-                # Update balance
-                account.points_balance += points_to_earn
-                account.total_points_earned += points_to_earn
-                account.save()
-                
-                # Record transaction
-                PointTransaction.objects.create(
-                    account=account,
-                    transaction_type='EARN',
-                    points=points_to_earn,
-                    description=f"Ganancia por Orden #{order.order_number}",
-                    related_order_id=str(order.id)
-                )
-                logger.info(f"Awarded {points_to_earn} points to {order.customer} for order {order.order_number}")
+            if award_order_points(order, points_to_earn):
+                logger.info(f"Awarded {points_to_earn} points to customer {order.customer_id} for order {order.order_number}")
         except Exception as e:
             logger.error(f"Error awarding loyalty points: {str(e)}")
 
+    @staticmethod
+    def redeem_reward(account, reward, free=False):
+        """
+        Canjea una recompensa: debita los puntos (condicional, ver ledger.py)
+        y emite el cupón en la misma transacción. Lanza InsufficientPoints si
+        el saldo no alcanza. Retorna (cupón, saldo nuevo).
+        """
+        with transaction.atomic():
+            if free:
+                # Registro de canje gratuito (0 puntos)
+                record_movement(account.pk, 0, REDEEM, f"Canje de Cumpleaños: {reward.name}")
+                balance = LoyaltyAccount.objects.filter(pk=account.pk).values_list('points_balance', flat=True).get()
+            else:
+                balance = redeem_points(account.pk, reward.points_cost, f"Canje de recompensa: {reward.name}")
+
+            coupon = UserCoupon.objects.create(
+                customer_id=account.customer_id,
+                reward_rule=reward,
+                code=f"LUXE-{uuid.uuid4().hex[:8].upper()}"
+            )
+        account.points_balance = balance
+        return coupon, balance
@@ -1,8 +1,25 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from apps.orders.models import Order
+from .models import EarningRule, EarningRuleType, LoyaltyProgramConfig
+from .rules import bump_rules_version
 from .services import LoyaltyService
 
+# Modelos que forman la tabla compilada de reglas (rules.py)
+RULE_MODELS = (EarningRule, EarningRuleType, LoyaltyProgramConfig)
+
+
+def invalidate_rule_table(sender, **kwargs):
+    """Los procesos recompilan la tabla al ver la nueva versión (tras el commit)"""
+    transaction.on_commit(bump_rules_version)
+
+
+for model in RULE_MODELS:
+    post_save.connect(invalidate_rule_table, sender=model, dispatch_uid=f'loyalty_rules_save_{model.__name__}')
+    post_delete.connect(invalidate_rule_table, sender=model, dispatch_uid=f'loyalty_rules_delete_{model.__name__}')
+
+
 @receiver(post_save, sender=Order)
 def award_points_on_payment(sender, instance, created, **kwargs):
     """
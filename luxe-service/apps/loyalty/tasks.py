@@ -0,0 +1,26 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def reprocess_loyalty_points(job_id):
+    """
+    Ejecuta un reproceso de puntos encolado desde reprocess_past_orders.
+    Un job interrumpido (fallido) se reanuda desde su cursor.
+    """
+    from django.utils import timezone
+
+    from .models import LoyaltyReprocessJob
+    from .reprocess import run_reprocess_job
+
+    # Se toma el job con un UPDATE condicional: una tarea repetida no lo corre dos veces
+    claimed = LoyaltyReprocessJob.objects.filter(id=job_id, status='pending').update(
+        status='running', heartbeat_at=timezone.now(),
+    )
+    if not claimed:
+        return f"Reproceso {job_id} no encontrado o ya procesado."
+
+    job = run_reprocess_job(LoyaltyReprocessJob.objects.get(id=job_id))
+    return job.message
@@ -1,15 +1,16 @@
+import logging
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db import transaction
 from .models import (
     LoyaltyProgramConfig, 
     EarningRule, 
     EarningRuleType,
     RewardRule, 
     LoyaltyAccount, 
-    PointTransaction, 
-    UserCoupon
+    UserCoupon,
+    LoyaltyReprocessJob
 )
 from .serializers import (
     LoyaltyAccountSerializer,
@@ -20,6 +21,12 @@ from .serializers import (
     UserCouponSerializer
 )
 from .services import LoyaltyService
+from .ledger import InsufficientPoints
+from .rules import points_for_amount
+from .reprocess import run_reprocess_job
+from .tasks import reprocess_loyalty_points
+
+logger = logging.getLogger(__name__)
 
 class LoyaltyAdminViewSet(viewsets.ModelViewSet):
     """
@@ -31,44 +38,84 @@ class LoyaltyAdminViewSet(viewsets.ModelViewSet):
     def reprocess_past_orders(self, request):
         """
         REINICIA Y RECALCULA todos los puntos desde cero basados en las órdenes pagadas.
+        Body: { "dry_run": true } para solo ver las diferencias.
+
+        Se ejecuta en Celery como LoyaltyReprocessJob (ver reprocess.py); la
+        respuesta trae job_id para consultar el avance en reprocess_jobs/<job_id>/.
+        Con ?sync=true (o si no se puede encolar) se procesa dentro de la petición.
         """
-        from apps.orders.models import Order
-        from django.db.models import Sum
-        
-        try:
-            with transaction.atomic():
-                # 1. Eliminar todas las transacciones de tipo 'EARN' (Ganancia)
-                PointTransaction.objects.filter(transaction_type='EARN').delete()
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        if not dry_run and LoyaltyReprocessJob.objects.filter(
+            dry_run=False, status__in=['pending', 'running']
+        ).exists():
+            return Response({"error": "Ya hay un reproceso de puntos en curso"}, status=status.HTTP_409_CONFLICT)
 
-                # 2. Resetear todas las cuentas
-                # Para cada cuenta, recalculamos el balance basado en lo que queda (canjes, etc)
-                # y reseteamos el total ganado.
-                accounts = LoyaltyAccount.objects.all()
-                for account in accounts:
-                    # El balance actual es la suma de transacciones que NO son EARN (ajustes manuales, canjes)
-                    other_tx_sum = PointTransaction.objects.filter(
-                        account=account
-                    ).exclude(transaction_type='EARN').aggregate(total=Sum('points'))['total'] or 0
-                    
-                    account.points_balance = other_tx_sum
-                    account.total_points_earned = 0
-                    account.save()
+        job = LoyaltyReprocessJob.objects.create(
+            dry_run=dry_run,
+            created_by=str(getattr(request.user, 'username', '') or '')[:100],
+        )
+        return self._start_reprocess(request, job)
 
-                # 3. Reprocesar todas las órdenes pagadas
-                paid_orders = Order.objects.filter(payment_status='paid').order_by('created_at')
-                
-                processed_count = 0
-                for order in paid_orders:
-                    LoyaltyService.award_points_for_order(order)
-                    processed_count += 1
-                
-            return Response({
-                "message": "Sincronización completa: Puntos reiniciados y recalculados",
-                "orders_processed": processed_count,
-                "accounts_updated": accounts.count()
-            })
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    @action(detail=False, methods=['GET'], url_path=r'reprocess_jobs/(?P<job_id>[0-9a-f-]+)')
+    def reprocess_job(self, request, job_id=None):
+        """Estado, avance y resumen de un reproceso de puntos"""
+        job = LoyaltyReprocessJob.objects.filter(id=job_id).first()
+        if not job:
+            return Response({"error": "Reproceso no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self._job_data(job))
+
+    @action(detail=False, methods=['POST'], url_path=r'reprocess_jobs/(?P<job_id>[0-9a-f-]+)/resume')
+    def resume_reprocess_job(self, request, job_id=None):
+        """
+        Reanuda desde su cursor un reproceso fallido o interrumpido (en proceso
+        pero sin avance en LoyaltyReprocessJob.STALE_AFTER). Uno que sigue
+        avanzando no se toca: dos workers sobre el mismo cursor duplicarían
+        el avance y competirían por los mismos lotes.
+        """
+        job = LoyaltyReprocessJob.objects.filter(id=job_id).first()
+        if not job:
+            return Response({"error": "Reproceso no encontrado"}, status=status.HTTP_404_NOT_FOUND)
+        # UPDATE condicional: de dos reanudaciones simultáneas solo una pasa
+        if not LoyaltyReprocessJob.resumable().filter(id=job.id).update(status='pending'):
+            return Response(
+                {"error": "El reproceso no es reanudable (sigue en curso o ya terminó)", **self._job_data(job)},
+                status=status.HTTP_409_CONFLICT,
+            )
+        job.refresh_from_db()
+        return self._start_reprocess(request, job)
+
+    def _start_reprocess(self, request, job):
+        run_sync = request.query_params.get('sync', '').lower() in ('1', 'true')
+        if not run_sync:
+            try:
+                reprocess_loyalty_points.delay(str(job.id))
+            except Exception as e:
+                logger.warning(f'No se pudo encolar el reproceso de puntos {job.id}, procesando en línea: {e}')
+                run_sync = True
+
+        if not run_sync:
+            return Response(self._job_data(job), status=status.HTTP_202_ACCEPTED)
+
+        job = run_reprocess_job(job)
+        if job.status == 'failed':
+            return Response({"error": job.message, **self._job_data(job)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(self._job_data(job))
+
+    @staticmethod
+    def _job_data(job):
+        return {
+            "job_id": str(job.id),
+            "job_status": job.status,
+            "dry_run": job.dry_run,
+            "message": job.message,
+            "progress": job.progress,
+            "total_orders": job.total_orders,
+            "orders_processed": job.processed_orders,
+            "accounts_updated": job.summary.get('accounts_updated', 0),
+            "summary": job.summary,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+        }
 
 class EarningRuleTypeViewSet(LoyaltyAdminViewSet):
     queryset = EarningRuleType.objects.all()
@@ -108,8 +155,8 @@ class LoyaltyAccountViewSet(viewsets.ReadOnlyModelViewSet):
             
         try:
             # Buscar cliente por cédula
-            from apps.customers.models import Customer
-            customer = Customer.objects.filter(cedula=cedula).first()
+            from apps.customers.identity import resolve_customer
+            customer, _ = resolve_customer(cedula=cedula)
             
             if not customer:
                  return Response({"error": "Cliente no encontrado"}, status=404)
@@ -128,10 +175,10 @@ class LoyaltyAccountViewSet(viewsets.ReadOnlyModelViewSet):
     def calculate_earning_preview(self, request):
         """
         Calcula cuántos puntos ganaría una orden ficticia.
-        Body: { "total_amount": 100.00 }
+        Body: { "total_amount": 100.00, "source": "web" | "pos" (opcional) }
         """
         amount = request.data.get('total_amount')
-        points = LoyaltyService.calculate_points_to_earn(amount)
+        points = points_for_amount(amount, request.data.get('source'))
         return Response({"points_to_earn": points})
 
     @action(detail=False, methods=['POST'])
@@ -169,39 +216,11 @@ class LoyaltyAccountViewSet(viewsets.ReadOnlyModelViewSet):
             
             is_free_redemption = True
 
-        if not is_free_redemption and account.points_balance < reward.points_cost:
+        # El débito es condicional: sin saldo suficiente no se descuenta nada
+        try:
+            coupon, _ = LoyaltyService.redeem_reward(account, reward, free=is_free_redemption)
+        except InsufficientPoints:
             return Response({"error": "Puntos insuficientes"}, status=400)
-
-        with transaction.atomic():
-            if not is_free_redemption:
-                # Deduct points
-                account.points_balance -= reward.points_cost
-                account.save()
-                
-                # Record transaction
-                PointTransaction.objects.create(
-                    account=account,
-                    transaction_type='REDEEM',
-                    points=-reward.points_cost,
-                    description=f"Canje de recompensa: {reward.name}"
-                )
-            else:
-                 # Registro de canje gratuito (0 puntos)
-                 PointTransaction.objects.create(
-                    account=account,
-                    transaction_type='REDEEM',
-                    points=0,
-                    description=f"Canje de Cumpleaños: {reward.name}"
-                 )
-            
-            # Issue Coupon
-            import uuid
-            code = f"LUXE-{uuid.uuid4().hex[:8].upper()}"
-            coupon = UserCoupon.objects.create(
-                customer=account.customer,
-                reward_rule=reward,
-                code=code
-            )
             
         return Response(UserCouponSerializer(coupon).data)
 
@@ -219,8 +238,8 @@ class LoyaltyAccountViewSet(viewsets.ReadOnlyModelViewSet):
         
         try:
             # Buscar cliente por cédula
-            from apps.customers.models import Customer
-            customer = Customer.objects.filter(cedula=cedula).first()
+            from apps.customers.identity import resolve_customer
+            customer, _ = resolve_customer(cedula=cedula)
             
             if not customer:
                 return Response({"error": "Cliente no encontrado"}, status=404)
@@ -251,47 +270,19 @@ class LoyaltyAccountViewSet(viewsets.ReadOnlyModelViewSet):
             
             is_free_redemption = True
 
-        if not is_free_redemption and account.points_balance < reward.points_cost:
+        try:
+            coupon, balance = LoyaltyService.redeem_reward(account, reward, free=is_free_redemption)
+        except InsufficientPoints:
+            account.refresh_from_db(fields=['points_balance'])
             return Response({
                 "error": f"Puntos insuficientes. Necesitas {reward.points_cost} puntos, tienes {account.points_balance}"
             }, status=400)
-
-        with transaction.atomic():
-            if not is_free_redemption:
-                # Deducir puntos
-                account.points_balance -= reward.points_cost
-                account.save()
-                
-                # Registrar transacción
-                PointTransaction.objects.create(
-                    account=account,
-                    transaction_type='REDEEM',
-                    points=-reward.points_cost,
-                    description=f"Canje de recompensa: {reward.name}"
-                )
-            else:
-                # Registro de canje gratuito
-                 PointTransaction.objects.create(
-                    account=account,
-                    transaction_type='REDEEM',
-                    points=0,
-                    description=f"Canje de Cumpleaños: {reward.name}"
-                 )
-            
-            # Generar cupón con código único
-            import uuid
-            code = f"LUXE-{uuid.uuid4().hex[:8].upper()}"
-            coupon = UserCoupon.objects.create(
-                customer=customer,
-                reward_rule=reward,
-                code=code
-            )
         
         return Response({
             "success": True,
             "message": f"¡Felicidades! Has canjeado '{reward.name}'" if not is_free_redemption else f"¡Feliz Cumpleaños! Disfruta tu '{reward.name}'",
             "coupon": UserCouponSerializer(coupon).data,
-            "new_balance": account.points_balance
+            "new_balance": balance
         })
 
 
@@ -8,6 +8,7 @@ import logging
 from .models import Order, OrderItem, OrderItemExtra, DeliveryInfo, OrderStatusHistory
 from apps.inventario.serializers import ProductListSerializer, SizeSerializer, ExtraSerializer, ColorSerializer, ProductVariantSerializer
 from apps.customers.serializers import CustomerSerializer
+from apps.customers.identity import resolve_customer
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -393,7 +394,7 @@ class OrderCreateSerializer(serializers.Serializer):
             if customer:
                 validated_data['customer'] = customer
         elif customer_email:
-            customer = Customer.objects.filter(email__iexact=customer_email).first()
+            customer, _ = resolve_customer(email=customer_email)
             if customer:
                 validated_data['customer'] = customer
 
@@ -439,20 +440,21 @@ class OrderCreateSerializer(serializers.Serializer):
         is_user_coupon = False
 
         if discount_code:
-            # Intentar con Cupón de Fidelidad primero
-            coupon = UserCoupon.objects.filter(code__iexact=discount_code, is_used=False).first()
+            # Intentar con Cupón de Fidelidad primero. consume() lo marca como
+            # usado en un UPDATE condicional: un cupón sirve para una sola orden
+            coupon = UserCoupon.consume(discount_code)
             if coupon:
-                coupon.is_used = True
-                coupon.used_at = timezone.now()
-                coupon.save()
                 applied_discount_object = coupon
                 is_user_coupon = True
                 logger.info(f"Cupón de Fidelidad {discount_code} marcado como usado.")
+            elif UserCoupon.objects.filter(code__iexact=discount_code).exists():
+                raise serializers.ValidationError({'discount_code': 'Este cupón ya fue utilizado'})
             else:
                 # Intentar con Descuento estándar
                 discount = Discount.objects.filter(code__iexact=discount_code).first()
                 if discount:
-                    discount.use_discount()
+                    if not discount.use_discount():
+                        raise serializers.ValidationError({'discount_code': 'Descuento agotado'})
                     applied_discount_object = discount
                     is_user_coupon = False
                     logger.info(f"Descuento POS {discount_code} uso incrementado.")
@@ -540,8 +542,9 @@ class OrderCreateSerializer(serializers.Serializer):
                         calculated_discount = rule.discount_value
             # Si es Descuento Estándar (POS)
             else:
-                # Usar el método calculate_discount del modelo
-                calculated_discount = applied_discount_object.calculate_discount(order.subtotal)
+                # Sobre las líneas elegibles (producto/categoría, compra X lleva Y)
+                from apps.pos.discount_engine import discount_for_order
+                calculated_discount = discount_for_order(applied_discount_object, order)
             
             # Asignar el descuento calculado a la orden
             if calculated_discount > 0:
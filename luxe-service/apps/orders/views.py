@@ -8,6 +8,7 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 
 from core.permissions import require_authentication, require_staff
+from core.db_router import using_replica
 from .models import Order, OrderItem, OrderItemExtra, DeliveryInfo, OrderStatusHistory
 from .serializers import (
     OrderListSerializer,
@@ -333,6 +334,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @using_replica()
     def stats(self, request):
         """
         Obtiene estadísticas de órdenes
@@ -385,6 +387,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @using_replica()
     def sales_by_period(self, request):
         """
         Obtiene ventas agrupadas por período
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+class PaymentsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.payments'
+    verbose_name = 'Pagos'
+
+    def ready(self):
+        try:
+            import apps.payments.signals
+        except ImportError:
+            pass
@@ -134,33 +134,10 @@ class ExchangeRate(models.Model):
         Raises:
             ValueError: Si no existe tasa de cambio
         """
-        # Si son la misma moneda, no hay conversión
-        if from_currency_code == to_currency_code:
-            return Decimal(amount)
-        
-        try:
-            # Intentar conversión directa
-            rate = cls.objects.get(
-                from_currency__code=from_currency_code,
-                to_currency__code=to_currency_code,
-                is_active=True
-            )
-            return Decimal(amount) * rate.rate
-        
-        except cls.DoesNotExist:
-            # Intentar conversión inversa
-            try:
-                rate = cls.objects.get(
-                    from_currency__code=to_currency_code,
-                    to_currency__code=from_currency_code,
-                    is_active=True
-                )
-                return Decimal(amount) / rate.rate
-            
-            except cls.DoesNotExist:
-                raise ValueError(
-                    f'No hay tasa de cambio disponible de {from_currency_code} a {to_currency_code}'
-                )
+        from .rates import convert
+
+        # Tabla en memoria con inversas y cruzadas (rates.py)
+        return convert(amount, from_currency_code, to_currency_code)
     
     @classmethod
     def get_rate(cls, from_currency_code, to_currency_code):
@@ -170,26 +147,29 @@ class ExchangeRate(models.Model):
         Returns:
             Decimal: Tasa de cambio o None si no existe
         """
-        if from_currency_code == to_currency_code:
-            return Decimal('1.0000')
-        
-        try:
-            rate = cls.objects.get(
-                from_currency__code=from_currency_code,
-                to_currency__code=to_currency_code,
-                is_active=True
-            )
-            return rate.rate
-        except cls.DoesNotExist:
-            try:
-                rate = cls.objects.get(
-                    from_currency__code=to_currency_code,
-                    to_currency__code=from_currency_code,
-                    is_active=True
-                )
-                return Decimal('1') / rate.rate
-            except cls.DoesNotExist:
-                return None
+        from .rates import get_rate
+
+        return get_rate(from_currency_code, to_currency_code)
+    
+    @classmethod
+    def convert_many(cls, amounts, from_currency_codes, to_currency_code):
+        """
+        Convierte varios montos a una moneda con una sola lectura de la tabla
+        
+        Args:
+            amounts: Montos a convertir
+            from_currency_codes: Código común o uno por monto
+            to_currency_code: Código de moneda destino
+        
+        Returns:
+            list: Montos convertidos, en el mismo orden
+        
+        Raises:
+            ValueError: Si falta alguna tasa de cambio
+        """
+        from .rates import convert_many
+
+        return convert_many(amounts, from_currency_codes, to_currency_code)
 
 
 class PaymentMethod(models.Model):
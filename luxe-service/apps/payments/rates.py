@@ -0,0 +1,163 @@
+"""
+apps/payments/rates.py
+
+Tabla de tasas de cambio en memoria.
+
+Las tasas activas se leen en una consulta y se expanden a un dict
+(desde, hacia) -> Decimal con:
+
+1. las tasas directas,
+2. las inversas (1 / tasa) de los pares que no tienen tasa directa,
+3. las cruzadas a través de la moneda por defecto (A -> USD -> B) para los
+   pares que siguen sin tasa.
+
+Cada proceso guarda la tabla junto con la versión con la que se construyó;
+la versión vive en Redis y la incrementan las señales de ExchangeRate y
+Currency (signals.py). Convertir un monto no consulta la BD.
+"""
+
+import logging
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import cache
+
+from .models import Currency, ExchangeRate
+
+logger = logging.getLogger(__name__)
+
+RATES_VERSION_KEY = 'payments:rates:version'
+
+ONE = Decimal('1.0000')
+
+
+# ============================================================================
+# VERSIÓN
+# ============================================================================
+
+def get_rates_version():
+    """Versión actual de las tasas (se inicializa con un timestamp)"""
+    version = cache.get(RATES_VERSION_KEY)
+    if version is None:
+        cache.add(RATES_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(RATES_VERSION_KEY)
+    return version
+
+
+def bump_rates_version():
+    """Obliga a todos los procesos a reconstruir la tabla de tasas"""
+    try:
+        version = cache.incr(RATES_VERSION_KEY)
+    except ValueError:
+        version = get_rates_version()
+    logger.debug('Versión de tasas de cambio: %s', version)
+    return version
+
+
+# ============================================================================
+# TABLA
+# ============================================================================
+
+class RateTable:
+    """Tasas (desde, hacia) con inversas y cruzadas ya resueltas"""
+
+    def __init__(self, direct, default_code=None, version=None):
+        self.version = version
+        self.default_code = default_code
+        self.rates = dict(direct)
+
+        for (from_code, to_code), rate in direct.items():
+            self.rates.setdefault((to_code, from_code), ONE / rate)
+
+        if default_code:
+            to_default = {a: rate for (a, b), rate in self.rates.items() if b == default_code}
+            from_default = {b: rate for (a, b), rate in self.rates.items() if a == default_code}
+            for from_code, rate_in in to_default.items():
+                for to_code, rate_out in from_default.items():
+                    if from_code != to_code:
+                        self.rates.setdefault((from_code, to_code), rate_in * rate_out)
+
+    @classmethod
+    def build(cls, version=None):
+        # Una tasa <= 0 (guardada sin validadores) se ignora: ese par queda sin
+        # conversión en vez de romper la tabla entera
+        direct = {
+            (from_code, to_code): rate
+            for from_code, to_code, rate in ExchangeRate.objects.filter(is_active=True, rate__gt=0).order_by().values_list(
+                'from_currency__code', 'to_currency__code', 'rate'
+            )
+        }
+        default_code = Currency.objects.filter(is_default=True, is_active=True).values_list('code', flat=True).first()
+        return cls(direct, default_code=default_code, version=version)
+
+    def get(self, from_code, to_code):
+        """Tasa o None si no hay forma de convertir"""
+        if from_code == to_code:
+            return ONE
+        return self.rates.get((from_code, to_code))
+
+    def convert(self, amount, from_code, to_code):
+        amount = Decimal(amount)
+        if from_code == to_code:
+            return amount
+        rate = self.rates.get((from_code, to_code))
+        if rate is None:
+            raise ValueError(f'No hay tasa de cambio disponible de {from_code} a {to_code}')
+        return amount * rate
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def get_rate_table():
+    """Tabla del proceso; se reconstruye solo si cambió la versión en Redis"""
+    global _table
+    version = get_rates_version()
+    table = _table
+    if table is None or table.version != version:
+        with _lock:
+            if _table is None or _table.version != version:
+                _table = RateTable.build(version=version)
+                logger.info(f'Tasas de cambio cargadas (versión {version}, {len(_table.rates)} pares)')
+            table = _table
+    return table
+
+
+# ============================================================================
+# CONVERSIÓN
+# ============================================================================
+
+def get_rate(from_code, to_code):
+    return get_rate_table().get(from_code, to_code)
+
+
+def convert(amount, from_code, to_code):
+    """Convierte un monto; ValueError si no hay tasa"""
+    return get_rate_table().convert(amount, from_code, to_code)
+
+
+def convert_many(amounts, from_codes, to_code):
+    """
+    Convierte montos en distintas monedas a `to_code` con una sola lectura
+    de la tabla. `from_codes` es un código para todos o uno por monto.
+    Los montos se agrupan por moneda y cada grupo se multiplica por su tasa
+    en un solo paso (NumPy sobre Decimal, sin perder precisión).
+    ValueError si falta alguna tasa.
+    """
+    table = get_rate_table()
+    amounts = np.asarray([Decimal(amount) for amount in amounts], dtype=object)
+    codes = np.full(len(amounts), from_codes, dtype=object) if isinstance(from_codes, str) else np.asarray(from_codes, dtype=object)
+    if len(codes) != len(amounts):
+        raise ValueError('Se requiere un código de moneda por monto')
+
+    converted = np.empty(len(amounts), dtype=object)
+    for code in set(codes):
+        rate = table.get(code, to_code)
+        if rate is None:
+            raise ValueError(f'No hay tasa de cambio disponible de {code} a {to_code}')
+        group = codes == code
+        converted[group] = amounts[group] * rate
+    return converted.tolist()
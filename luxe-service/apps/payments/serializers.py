@@ -7,6 +7,7 @@ from .models import (
     SplitPayment, Refund, CashRegister, CashMovement
 )
 from apps.orders.serializers import OrderListSerializer
+from .rates import get_rate_table
 
 
 class CurrencySerializer(serializers.ModelSerializer):
@@ -178,12 +179,13 @@ class PaymentDetailSerializer(serializers.ModelSerializer):
     
     def get_amount_in_default_currency(self, obj):
         """Convierte el monto a la moneda por defecto"""
-        default_currency = Currency.get_default()
-        if not default_currency or obj.currency.code == default_currency.code:
+        # Moneda por defecto y tasas desde la tabla en memoria: sin consultas por pago
+        table = get_rate_table()
+        if not table.default_code or obj.currency.code == table.default_code:
             return float(obj.amount)
         
         try:
-            converted = obj.get_amount_in_currency(default_currency.code)
+            converted = table.convert(obj.amount, obj.currency.code, table.default_code)
             return float(converted)
         except ValueError:
             return None
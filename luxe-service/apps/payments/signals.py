@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from .models import Currency, ExchangeRate
+from .rates import bump_rates_version
+
+# Modelos que forman la tabla de tasas en memoria (rates.py)
+RATE_MODELS = (ExchangeRate, Currency)
+
+
+def invalidate_rate_table(sender, **kwargs):
+    """Los procesos reconstruyen la tabla al ver la nueva versión (tras el commit)"""
+    transaction.on_commit(bump_rates_version)
+
+
+for model in RATE_MODELS:
+    post_save.connect(invalidate_rate_table, sender=model, dispatch_uid=f'payments_rates_save_{model.__name__}')
+    post_delete.connect(invalidate_rate_table, sender=model, dispatch_uid=f'payments_rates_delete_{model.__name__}')
@@ -6,8 +6,10 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Sum, Count, Q, Avg
 from django.utils import timezone
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 
 from core.permissions import require_authentication, require_staff
+from .rates import get_rate_table
 from .models import (
     Currency, ExchangeRate, PaymentMethod, Payment,
     Refund, CashRegister, CashMovement
@@ -202,6 +204,16 @@ class ExchangeRateViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        try:
+            rate_value = Decimal(str(rate_value))
+        except (InvalidOperation, ValueError):
+            rate_value = None
+        if rate_value is None or not rate_value.is_finite() or rate_value <= 0:
+            return Response(
+                {'error': 'rate debe ser un número mayor a 0'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         try:
             from_currency = Currency.objects.get(code=from_code)
             to_currency = Currency.objects.get(code=to_code)
@@ -520,6 +532,17 @@ class PaymentViewSet(viewsets.ModelViewSet):
         
         stats['by_currency'] = list(by_currency)
         
+        # Equivalente de cada total en la moneda por defecto (tabla en memoria)
+        rates = get_rate_table()
+        if rates.default_code:
+            for row in stats['by_currency']:
+                try:
+                    row['total_in_default_currency'] = float(
+                        rates.convert(row['total_amount'], row['currency__code'], rates.default_code)
+                    )
+                except ValueError:
+                    row['total_in_default_currency'] = None
+        
         # Total en moneda específica o por defecto
         if currency_code:
             total_data = queryset.filter(
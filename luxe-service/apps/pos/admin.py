@@ -106,6 +106,8 @@ class DiscountAdmin(admin.ModelAdmin):
                 'discount_type',
                 'apply_to',
                 'discount_value',
+                'buy_quantity',
+                'get_quantity',
                 'minimum_purchase',
                 'maximum_discount',
             )
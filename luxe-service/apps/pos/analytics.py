@@ -0,0 +1,560 @@
+"""
+apps/pos/analytics.py
+
+Cubo de ventas en memoria para consultas analíticas ad-hoc.
+
+Mantiene una instantánea columnar (arrays NumPy) de los items de órdenes
+pagadas con las dimensiones codificadas por diccionario. Las agrupaciones,
+filtros y rankings se resuelven con operaciones vectorizadas sin volver a
+consultar la base de datos.
+
+La carga y los refrescos corren en un hilo de fondo por worker (arrancado
+en luxe_service/wsgi.py); las consultas solo leen la instantánea actual y
+responden 503 mientras no exista. Un candado en Redis evita que varios
+workers hagan la carga completa (~100 s, cientos de MB) al mismo tiempo.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import date
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, TruncDate
+
+from core.db_router import using_replica
+
+logger = logging.getLogger(__name__)
+
+PAID_STATUSES = ['delivered', 'completed']
+
+# Dimensiones codificadas por diccionario (id externo -> código entero)
+ENCODED_DIMENSIONS = ('product', 'category', 'brand', 'payment_method')
+# Dimensiones numéricas que se guardan tal cual
+NUMERIC_DIMENSIONS = ('day', 'month', 'hour', 'weekday')
+DIMENSIONS = ENCODED_DIMENSIONS + NUMERIC_DIMENSIONS
+
+METRICS = ('quantity', 'revenue', 'cost', 'margin', 'items', 'orders')
+# 'orders' requiere contar pares únicos (ordenamiento); se pide explícitamente
+DEFAULT_METRICS = ('quantity', 'revenue', 'cost', 'margin', 'items')
+
+# Filas por lote al leer de la BD (cursor del servidor y conversión a arrays)
+FETCH_CHUNK_SIZE = 20_000
+
+# Tamaño máximo del espacio de grupos para agregar con arrays densos
+MAX_DENSE_GROUPS = 5_000_000
+
+UNKNOWN_LABEL = 'Sin definir'
+
+_COLUMN_DTYPES = {
+    'order': np.int32,
+    'product': np.int32,
+    'category': np.int32,
+    'brand': np.int32,
+    'payment_method': np.int32,
+    'day': np.int32,
+    'month': np.int32,
+    'hour': np.int8,
+    'weekday': np.int8,
+    'quantity': np.int32,
+    'revenue': np.int64,
+    'cost': np.int64,
+}
+
+
+def _config(key, default):
+    return getattr(settings, 'ANALYTICS_CONFIG', {}).get(key, default)
+
+
+class _Dictionary:
+    """Codificación id externo <-> código entero contiguo"""
+
+    def __init__(self):
+        self.codes = {}
+        self.keys = []
+        self.labels = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def encode(self, key, label=None):
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.keys)
+            self.codes[key] = code
+            self.keys.append(key)
+            self.labels.append(label if label is not None else key)
+        elif label is not None:
+            # Mantener el nombre más reciente (renombres de producto/categoría)
+            self.labels[code] = label
+        return code
+
+    def lookup(self, keys):
+        """Códigos de las claves conocidas (las desconocidas se ignoran)"""
+        return [self.codes[k] for k in keys if k in self.codes]
+
+
+class SalesCube:
+    """
+    Instantánea columnar de ventas por item.
+
+    Cada fila es un OrderItem de una orden pagada. Los montos se guardan en
+    centavos enteros para que las sumas sean exactas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.dictionaries = {dim: _Dictionary() for dim in ENCODED_DIMENSIONS}
+        self.orders = _Dictionary()
+        self.columns = self._empty_columns()
+        self.watermark = None
+        self.loaded_at = None
+        self.refreshed_at = None
+        self.last_refresh_ms = None
+        # Versión de reconstrucción con la que se hizo la última carga completa
+        self.rebuild_version = None
+        self.refresh_requested = False
+
+    @staticmethod
+    def _empty_columns():
+        return {name: np.empty(0, dtype=dtype) for name, dtype in _COLUMN_DTYPES.items()}
+
+    def __len__(self):
+        return len(self.columns['order'])
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def _fetch(self, dictionaries, orders, order_filter=None):
+        """Lee los items desde la BD y los convierte en columnas"""
+        from apps.orders.models import OrderItem
+        from apps.payments.models import Payment, PaymentMethod
+
+        order_filter = order_filter or {}
+
+        # Método del último pago completado de la orden, resuelto en SQL (índice
+        # sobre order_id) para no mantener un dict por orden en memoria
+        last_payment_method = Subquery(
+            Payment.objects.filter(order_id=OuterRef('order_id'), status='completed')
+            .order_by('-created_at').values('payment_method_id')[:1]
+        )
+        method_names = dict(PaymentMethod.objects.values_list('id', 'name'))
+
+        rows = OrderItem.objects.filter(
+            order__status__in=PAID_STATUSES,
+            **{f'order__{k}': v for k, v in order_filter.items()}
+        ).annotate(
+            sale_day=TruncDate('order__created_at'),
+            sale_hour=ExtractHour('order__created_at'),
+            sale_weekday=ExtractIsoWeekDay('order__created_at'),
+            payment_method_id=last_payment_method,
+        ).values_list(
+            'order_id', 'product_id', 'product__name',
+            'product__category_id', 'product__category__name', 'product__brand',
+            'sale_day', 'sale_hour', 'sale_weekday',
+            'quantity', 'line_total', 'unit_cost', 'payment_method_id',
+        )
+
+        encoders = (
+            orders.encode,
+            dictionaries['product'].encode,
+            dictionaries['category'].encode,
+            dictionaries['brand'].encode,
+            dictionaries['payment_method'].encode,
+        )
+
+        # Cada lote se convierte a arrays tipados y se descarta: en memoria
+        # solo quedan las columnas NumPy, no listas de objetos Python por fila
+        parts = {name: [] for name in _COLUMN_DTYPES}
+        iterator = rows.iterator(chunk_size=FETCH_CHUNK_SIZE)
+        for batch in iter(lambda: list(islice(iterator, FETCH_CHUNK_SIZE)), []):
+            for name, values in self._encode_batch(batch, encoders, method_names).items():
+                parts[name].append(values)
+
+        return {
+            name: np.concatenate(chunks) if chunks else np.empty(0, dtype=_COLUMN_DTYPES[name])
+            for name, chunks in parts.items()
+        }
+
+    @staticmethod
+    def _encode_batch(batch, encoders, method_names):
+        """Columnas tipadas de un lote de filas (ver values_list en _fetch)"""
+        encode_order, encode_product, encode_category, encode_brand, encode_method = encoders
+        size = len(batch)
+
+        def column(name, values):
+            return np.fromiter(values, dtype=_COLUMN_DTYPES[name], count=size)
+
+        return {
+            'order': column('order', (encode_order(row[0]) for row in batch)),
+            'product': column('product', (encode_product(row[1], row[2]) for row in batch)),
+            'category': column('category', (encode_category(row[3], row[4] or UNKNOWN_LABEL) for row in batch)),
+            'brand': column('brand', (encode_brand(row[5] or '', row[5] or UNKNOWN_LABEL) for row in batch)),
+            'payment_method': column('payment_method', (
+                encode_method(row[12], method_names.get(row[12]) or UNKNOWN_LABEL) for row in batch
+            )),
+            'day': column('day', (row[6].toordinal() for row in batch)),
+            'month': column('month', (row[6].year * 12 + row[6].month - 1 for row in batch)),
+            'hour': column('hour', (row[7] for row in batch)),
+            'weekday': column('weekday', (row[8] for row in batch)),
+            'quantity': column('quantity', (row[9] for row in batch)),
+            'revenue': column('revenue', (int((row[10] or 0) * 100) for row in batch)),
+            'cost': column('cost', (int((row[11] or 0) * row[9] * 100) for row in batch)),
+        }
+
+    @staticmethod
+    def _current_watermark():
+        from apps.orders.models import Order
+        return Order.objects.aggregate(last=Max('updated_at'))['last']
+
+    @using_replica()
+    def load(self):
+        """Reconstruye el cubo completo"""
+        started = time.perf_counter()
+        with self._lock:
+            dictionaries = {dim: _Dictionary() for dim in ENCODED_DIMENSIONS}
+            orders = _Dictionary()
+            # El watermark se toma antes de leer: lo que cambie durante la
+            # carga se vuelve a procesar en el siguiente refresh incremental.
+            watermark = self._current_watermark()
+            columns = self._fetch(dictionaries, orders)
+            # Las consultas en curso siguen usando la instantánea anterior
+            self.dictionaries, self.orders, self.columns = dictionaries, orders, columns
+            self.watermark = watermark
+            self.loaded_at = self.refreshed_at = time.time()
+            self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info('Cubo de ventas cargado: %s filas en %s ms', len(self), self.last_refresh_ms)
+
+    @using_replica()
+    def refresh(self):
+        """
+        Refresco incremental: reemplaza las filas de las órdenes modificadas
+        desde el último watermark (nuevas, pagadas, anuladas o editadas).
+        """
+        if self.watermark is None:
+            return self.load()
+
+        from apps.orders.models import Order
+
+        started = time.perf_counter()
+        with self._lock:
+            watermark = self._current_watermark()
+            changed_ids = list(
+                Order.objects.filter(updated_at__gte=self.watermark).values_list('id', flat=True)
+            )
+
+            if changed_ids:
+                stale_codes = self.orders.lookup(changed_ids)
+                if stale_codes:
+                    keep = ~np.isin(self.columns['order'], np.asarray(stale_codes, dtype=np.int32))
+                    columns = {name: col[keep] for name, col in self.columns.items()}
+                else:
+                    columns = self.columns
+
+                fresh = self._fetch(self.dictionaries, self.orders, {'id__in': changed_ids})
+                self.columns = {
+                    name: np.concatenate([columns[name], fresh[name]]) for name in columns
+                }
+
+            self.watermark = watermark
+            self.refreshed_at = time.time()
+            self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        if changed_ids:
+            logger.info(
+                'Cubo de ventas actualizado: %s órdenes, %s filas en %s ms',
+                len(changed_ids), len(self), self.last_refresh_ms
+            )
+
+    @property
+    def is_ready(self):
+        return self.loaded_at is not None
+
+    @classmethod
+    def from_arrays(cls, columns, labels=None):
+        """Construye un cubo a partir de columnas ya codificadas (benchmarks)"""
+        cube = cls()
+        cube.columns = {
+            name: np.asarray(columns[name], dtype=dtype) for name, dtype in _COLUMN_DTYPES.items()
+        }
+        labels = labels or {}
+        for dim in ENCODED_DIMENSIONS:
+            size = int(cube.columns[dim].max()) + 1 if len(cube.columns[dim]) else 0
+            for code in range(size):
+                key = labels.get(dim, {}).get(code, code)
+                cube.dictionaries[dim].encode(key, str(key))
+        cube.loaded_at = cube.refreshed_at = time.time()
+        return cube
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def _mask(self, columns, filters):
+        """Máscara booleana de filas que cumplen los filtros (None = todas)"""
+        mask = None
+
+        def combine(current, condition):
+            return condition if current is None else current & condition
+
+        for dim in ENCODED_DIMENSIONS:
+            values = filters.get(dim)
+            if values:
+                codes = self.dictionaries[dim].lookup(values)
+                mask = combine(mask, np.isin(columns[dim], np.asarray(codes, dtype=np.int32)))
+
+        for dim in ('hour', 'weekday'):
+            values = filters.get(dim)
+            if values:
+                mask = combine(mask, np.isin(columns[dim], np.asarray(values, dtype=np.int8)))
+
+        if filters.get('date_from'):
+            mask = combine(mask, columns['day'] >= filters['date_from'].toordinal())
+        if filters.get('date_to'):
+            mask = combine(mask, columns['day'] <= filters['date_to'].toordinal())
+
+        return mask
+
+    def _cardinality(self, dim, column):
+        """(offset, tamaño) del rango de códigos de una dimensión"""
+        if dim in ENCODED_DIMENSIONS:
+            return 0, max(len(self.dictionaries[dim]), int(column.max()) + 1 if len(column) else 1)
+        if dim == 'hour':
+            return 0, 24
+        if dim == 'weekday':
+            return 0, 8
+        if not len(column):
+            return 0, 1
+        low = int(column.min())
+        return low, int(column.max()) - low + 1
+
+    def _label(self, dim, value):
+        if dim in ENCODED_DIMENSIONS:
+            dictionary = self.dictionaries[dim]
+            key = dictionary.keys[value]
+            result = {dim: dictionary.labels[value]}
+            if dim != 'brand':
+                result[f'{dim}_id'] = str(key) if key is not None else None
+            return result
+        if dim == 'day':
+            return {dim: date.fromordinal(int(value)).isoformat()}
+        if dim == 'month':
+            year, month = divmod(int(value), 12)
+            return {dim: f'{year:04d}-{month + 1:02d}'}
+        return {dim: int(value)}
+
+    def query(self, group_by=(), metrics=DEFAULT_METRICS, filters=None, order_by=None, top=None, ascending=False):
+        """
+        Agrupa y agrega el cubo.
+
+        group_by: dimensiones de DIMENSIONS (cualquier combinación)
+        filters: {dim: [valores]} más date_from / date_to
+        top: devuelve solo los k grupos con mayor (o menor) order_by
+        """
+        filters = filters or {}
+        metrics = list(metrics) or list(DEFAULT_METRICS)
+        order_by = order_by or metrics[0]
+        needed = set(metrics) | {order_by}
+
+        # Se toma una referencia a las columnas actuales: un refresh concurrente
+        # reemplaza el dict completo, nunca muta los arrays.
+        columns = self.columns
+        mask = self._mask(columns, filters)
+
+        def column(name):
+            return columns[name] if mask is None else columns[name][mask]
+
+        n = len(columns['order']) if mask is None else int(np.count_nonzero(mask))
+
+        # Código de grupo por combinación de dimensiones. Como los códigos son
+        # densos, el producto de cardinalidades es el espacio de grupos y
+        # bincount agrega sin ordenar.
+        offsets, sizes, codes = [], [], []
+        for dim in group_by:
+            values = column(dim)
+            offset, size = self._cardinality(dim, values)
+            offsets.append(offset)
+            sizes.append(size)
+            codes.append(values.astype(np.int64) - offset if offset else values)
+
+        space = int(np.prod(sizes, dtype=np.int64)) if group_by else 1
+        group_keys = None
+        if not group_by:
+            groups = np.zeros(n, dtype=np.int64)
+        elif space <= MAX_DENSE_GROUPS:
+            groups = np.ravel_multi_index(codes, sizes) if n else np.empty(0, dtype=np.int64)
+        else:
+            # Espacio demasiado grande para un array denso: se compacta con unique
+            combined = np.ravel_multi_index(codes, sizes) if n else np.empty(0, dtype=np.int64)
+            group_keys, groups = np.unique(combined, return_inverse=True)
+            groups = groups.ravel()
+            space = len(group_keys)
+
+        items = np.bincount(groups, minlength=space)
+        values = {'items': items.astype(np.float64)}
+        if needed & {'quantity'}:
+            values['quantity'] = np.bincount(groups, weights=column('quantity'), minlength=space)
+        if needed & {'revenue', 'margin'}:
+            values['revenue'] = np.bincount(groups, weights=column('revenue'), minlength=space) / 100
+        if needed & {'cost', 'margin'}:
+            values['cost'] = np.bincount(groups, weights=column('cost'), minlength=space) / 100
+        if 'margin' in needed:
+            values['margin'] = values['revenue'] - values['cost']
+        if 'orders' in needed:
+            # Órdenes distintas por grupo: pares únicos (grupo, orden)
+            order_codes = column('order')
+            n_orders = max(len(self.orders), int(order_codes.max()) + 1 if n else 1)
+            pairs = np.sort(groups * n_orders + order_codes)
+            if len(pairs):
+                pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+            values['orders'] = np.bincount(pairs // n_orders, minlength=space).astype(np.float64)
+
+        # Solo grupos con filas; argpartition evita ordenar todos para el top-k
+        present = np.flatnonzero(items) if group_by else np.zeros(1, dtype=np.int64)
+        ranking = values[order_by][present]
+        if not ascending:
+            ranking = -ranking
+        if top and top < len(present):
+            index = np.argpartition(ranking, top)[:top]
+            index = index[np.argsort(ranking[index], kind='stable')]
+        else:
+            index = np.argsort(ranking, kind='stable')
+        selected_groups = present[index]
+
+        if group_by:
+            keys = selected_groups if group_keys is None else group_keys[selected_groups]
+            positions = np.unravel_index(keys, sizes)
+        results = []
+        for i, group in enumerate(selected_groups):
+            item = {}
+            for d, dim in enumerate(group_by):
+                item.update(self._label(dim, int(positions[d][i]) + offsets[d]))
+            for metric in metrics:
+                value = values[metric][group]
+                item[metric] = int(value) if metric in ('quantity', 'items', 'orders') else round(float(value), 2)
+            results.append(item)
+
+        return {
+            'rows_scanned': n,
+            'groups': int(len(present)),
+            'results': results,
+        }
+
+    def status(self):
+        return {
+            'ready': self.is_ready,
+            'rows': len(self),
+            'orders': len(self.orders),
+            'products': len(self.dictionaries['product']),
+            'memory_bytes': int(sum(col.nbytes for col in self.columns.values())),
+            'loaded_at': self.loaded_at,
+            'refreshed_at': self.refreshed_at,
+            'last_refresh_ms': self.last_refresh_ms,
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+        }
+
+
+# ============================================================================
+# INSTANCIA POR PROCESO
+# ============================================================================
+
+REBUILD_VERSION_KEY = 'pos:sales-cube:rebuild'
+LOAD_LOCK_KEY = 'pos:sales-cube:loading'
+# Expira solo si el worker que carga muere a mitad de camino
+LOAD_LOCK_SECONDS = 15 * 60
+# Espera máxima del hilo entre revisiones
+MAINTENANCE_TICK_SECONDS = 5
+
+_cube = None
+_cube_lock = threading.Lock()
+_maintainer = None
+_wake = threading.Event()
+
+
+def get_rebuild_version():
+    """Versión de reconstrucción pedida (se inicializa con un timestamp)"""
+    version = cache.get(REBUILD_VERSION_KEY)
+    if version is None:
+        cache.add(REBUILD_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(REBUILD_VERSION_KEY)
+    return version
+
+
+def _maintain(cube):
+    """
+    Un paso del mantenimiento: carga completa si no hay cubo, si venció
+    full_rebuild_seconds o si se pidió una reconstrucción; si no, refresco
+    incremental cada refresh_seconds (o cuando se pidió).
+    """
+    now = time.time()
+    rebuild_version = get_rebuild_version()
+    if (
+        not cube.is_ready
+        or rebuild_version != cube.rebuild_version
+        or now - cube.loaded_at > _config('full_rebuild_seconds', 6 * 3600)
+    ):
+        # Otro worker está cargando: se reintenta en el siguiente paso
+        if not cache.add(LOAD_LOCK_KEY, os.getpid(), LOAD_LOCK_SECONDS):
+            return
+        try:
+            cube.load()
+            cube.rebuild_version = rebuild_version
+        finally:
+            cache.delete(LOAD_LOCK_KEY)
+    elif cube.refresh_requested or now - cube.refreshed_at > _config('refresh_seconds', 60):
+        cube.refresh_requested = False
+        cube.refresh()
+
+
+def _maintain_forever(cube):
+    while True:
+        try:
+            _maintain(cube)
+        except Exception as e:
+            logger.error(f'Error manteniendo el cubo de ventas: {e}')
+        finally:
+            close_old_connections()
+        _wake.wait(MAINTENANCE_TICK_SECONDS)
+        _wake.clear()
+
+
+def get_sales_cube():
+    """
+    Cubo del proceso (cada worker mantiene el suyo). Nunca carga en el hilo
+    de la petición: puede devolver un cubo aún vacío (is_ready False).
+    """
+    global _cube, _maintainer
+    if _maintainer is None:
+        with _cube_lock:
+            if _maintainer is None:
+                _cube = SalesCube()
+                _maintainer = threading.Thread(
+                    target=_maintain_forever, args=(_cube,), name='sales-cube', daemon=True
+                )
+                _maintainer.start()
+    return _cube
+
+
+def request_cube_refresh(full=False):
+    """
+    Pide un refresco incremental al worker actual o, con full=True, una
+    reconstrucción completa a todos los workers (versión en Redis).
+    """
+    cube = get_sales_cube()
+    if full:
+        try:
+            cache.incr(REBUILD_VERSION_KEY)
+        except ValueError:
+            get_rebuild_version()
+            cache.incr(REBUILD_VERSION_KEY)
+    else:
+        cube.refresh_requested = True
+    _wake.set()
+    return cube
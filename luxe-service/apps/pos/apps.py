@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+class PosConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.pos'
+    verbose_name = 'Punto de Venta'
+
+    def ready(self):
+        try:
+            import apps.pos.signals
+        except ImportError:
+            pass
@@ -0,0 +1,349 @@
+"""
+apps/pos/discount_engine.py
+
+Evaluación de descuentos sobre carritos completos.
+
+Los descuentos activos se cargan en una sola consulta (los ids de productos y
+categorías aplicables vienen como arrays por subconsulta) y se compilan con
+frozensets. Cada proceso guarda la tabla junto con la versión con la que se
+armó; la versión vive en Redis y la incrementan las señales de Discount y de
+sus relaciones (signals.py). Los usos (current_uses) se cambian con UPDATE y
+no invalidan la tabla: los límites se verifican con una consulta agrupada al
+evaluar.
+
+evaluate_cart() recorre las líneas del carrito una vez para todos los
+descuentos candidatos y calcula el monto de cada uno, incluido buy_x_get_y:
+de cada grupo de buy_quantity + get_quantity unidades aplicables, las
+get_quantity más baratas tienen discount_value % de descuento (100 = gratis).
+"""
+
+import logging
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q
+from django.utils import timezone
+
+from .models import Discount
+
+logger = logging.getLogger(__name__)
+
+DISCOUNTS_VERSION_KEY = 'pos:discounts:version'
+
+CENT = Decimal('0.01')
+
+
+# ============================================================================
+# VERSIÓN
+# ============================================================================
+
+def get_discounts_version():
+    """Versión actual de los descuentos (se inicializa con un timestamp)"""
+    version = cache.get(DISCOUNTS_VERSION_KEY)
+    if version is None:
+        cache.add(DISCOUNTS_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(DISCOUNTS_VERSION_KEY)
+    return version
+
+
+def bump_discounts_version():
+    """Obliga a todos los procesos a recompilar la tabla de descuentos"""
+    try:
+        version = cache.incr(DISCOUNTS_VERSION_KEY)
+    except ValueError:
+        version = get_discounts_version()
+    logger.debug('Versión de descuentos: %s', version)
+    return version
+
+
+# ============================================================================
+# TABLA COMPILADA
+# ============================================================================
+
+class CompiledDiscount:
+    """Descuento con sus productos/categorías como frozensets"""
+
+    FIELDS = (
+        'id', 'code', 'name', 'discount_type', 'apply_to', 'discount_value',
+        'minimum_purchase', 'maximum_discount', 'max_uses', 'max_uses_per_customer',
+        'current_uses', 'valid_from', 'valid_until', 'valid_days', 'valid_hours',
+        'buy_quantity', 'get_quantity', 'is_public',
+    )
+
+    __slots__ = FIELDS + ('product_ids', 'category_ids', 'hours')
+
+    def __init__(self, row):
+        for field in self.FIELDS:
+            setattr(self, field, row[field])
+        self.valid_days = frozenset(row['valid_days'] or ())
+        self.product_ids = frozenset(row['product_ids'] or ())
+        self.category_ids = frozenset(row['category_ids'] or ())
+        hours = row['valid_hours'] or {}
+        self.hours = (hours['start'], hours['end']) if 'start' in hours and 'end' in hours else None
+
+    def check_schedule(self, now):
+        """(válido, mensaje) por período, día y hora; mismos mensajes que Discount.is_valid"""
+        if now < self.valid_from:
+            return False, 'Descuento aún no válido'
+        if now > self.valid_until:
+            return False, 'Descuento expirado'
+        local = timezone.localtime(now)
+        if self.valid_days and local.weekday() not in self.valid_days:
+            return False, 'Descuento no válido hoy'
+        if self.hours and not (self.hours[0] <= local.strftime('%H:%M') <= self.hours[1]):
+            return False, f'Descuento válido solo de {self.hours[0]} a {self.hours[1]}'
+        return True, 'Descuento válido'
+
+    def applies_to(self, product_id, category_id):
+        # Las líneas sin producto (monto global del carrito) cuentan para todos
+        if self.apply_to == 'order' or product_id is None:
+            return True
+        if self.apply_to == 'product':
+            return product_id in self.product_ids
+        if self.apply_to == 'category':
+            return category_id in self.category_ids
+        return False
+
+    @property
+    def has_limits(self):
+        return bool(self.max_uses or self.max_uses_per_customer)
+
+    def __repr__(self):
+        return f'<CompiledDiscount {self.code} {self.discount_type}/{self.apply_to}>'
+
+
+class DiscountTable:
+    """Descuentos activos y no vencidos al compilar, por id y por código"""
+
+    def __init__(self, discounts, version=None):
+        self.version = version
+        self.by_id = {discount.id: discount for discount in discounts}
+        self.by_code = {discount.code.upper(): discount for discount in discounts}
+
+    @classmethod
+    def build(cls, version=None):
+        products = Discount.applicable_products.through.objects.filter(
+            discount_id=OuterRef('pk')
+        ).values('product_id')
+        categories = Discount.applicable_categories.through.objects.filter(
+            discount_id=OuterRef('pk')
+        ).values('category_id')
+        rows = Discount.objects.filter(
+            is_active=True, valid_until__gte=timezone.now()
+        ).order_by().annotate(
+            product_ids=ArraySubquery(products),
+            category_ids=ArraySubquery(categories),
+        ).values(*CompiledDiscount.FIELDS, 'product_ids', 'category_ids')
+        return cls([CompiledDiscount(row) for row in rows], version=version)
+
+    def get(self, code):
+        return self.by_code.get((code or '').strip().upper())
+
+    def public(self):
+        return [discount for discount in self.by_id.values() if discount.is_public]
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def get_discount_table():
+    """Tabla del proceso; se recompila solo si cambió la versión en Redis"""
+    global _table
+    version = get_discounts_version()
+    table = _table
+    if table is None or table.version != version:
+        with _lock:
+            if _table is None or _table.version != version:
+                _table = DiscountTable.build(version=version)
+                logger.info(f'Descuentos compilados (versión {version}, {len(_table.by_id)} activos)')
+            table = _table
+    return table
+
+
+# ============================================================================
+# EVALUACIÓN
+# ============================================================================
+
+class CartLine:
+    """Línea del carrito; product_id None = monto global sin detalle"""
+
+    __slots__ = ('product_id', 'category_id', 'quantity', 'unit_price')
+
+    def __init__(self, product_id, category_id, quantity, unit_price):
+        self.product_id = product_id
+        self.category_id = category_id
+        self.quantity = int(quantity)
+        self.unit_price = Decimal(str(unit_price))
+
+    @property
+    def total(self):
+        return self.unit_price * self.quantity
+
+
+class DiscountResult:
+    __slots__ = ('discount', 'valid', 'message', 'amount', 'eligible_amount')
+
+    def __init__(self, discount, valid, message, amount=Decimal('0'), eligible_amount=Decimal('0')):
+        self.discount = discount
+        self.valid = valid
+        self.message = message
+        self.amount = amount
+        self.eligible_amount = eligible_amount
+
+
+def cart_lines(items):
+    """
+    CartLines desde [{'product_id', 'quantity', 'unit_price', 'category_id'?}].
+    Las categorías que falten se buscan en una sola consulta.
+    """
+    from apps.inventario.models import Product
+
+    missing = {item['product_id'] for item in items if item.get('product_id') and not item.get('category_id')}
+    categories = dict(Product.objects.filter(id__in=missing).values_list('id', 'category_id')) if missing else {}
+    return [
+        CartLine(
+            item.get('product_id'),
+            item.get('category_id') or categories.get(item.get('product_id')),
+            item.get('quantity', 1),
+            item['unit_price'],
+        )
+        for item in items
+    ]
+
+
+def usage_counts(discounts, customer_id=None):
+    """{id: (usos totales, usos del cliente)} en una consulta agrupada"""
+    limited = [discount.id for discount in discounts if discount.has_limits]
+    if not limited:
+        return {}
+    discounts = Discount.objects.filter(id__in=limited).order_by()
+    if not customer_id:
+        return {discount_id: (current, 0) for discount_id, current in discounts.values_list('id', 'current_uses')}
+    rows = discounts.annotate(
+        customer_uses=Count('usages', filter=Q(usages__customer_id=customer_id))
+    ).values_list('id', 'current_uses', 'customer_uses')
+    return {discount_id: (current, customer) for discount_id, current, customer in rows}
+
+
+def _buy_x_get_y(discount, units):
+    """Descuento sobre las get_quantity unidades más baratas de cada grupo"""
+    buy, get = discount.buy_quantity or 0, discount.get_quantity or 0
+    if buy < 1 or get < 1:
+        return Decimal('0')
+    free_units = (sum(quantity for _, quantity in units) // (buy + get)) * get
+    free_total = Decimal('0')
+    for price, quantity in sorted(units, key=lambda unit: unit[0]):
+        if free_units <= 0:
+            break
+        taken = min(quantity, free_units)
+        free_total += price * taken
+        free_units -= taken
+    return free_total * discount.discount_value / 100
+
+
+def _amount(discount, eligible, units):
+    if discount.discount_type == 'percentage':
+        amount = eligible * discount.discount_value / 100
+    elif discount.discount_type == 'fixed_amount':
+        amount = discount.discount_value
+    elif discount.discount_type == 'buy_x_get_y':
+        amount = _buy_x_get_y(discount, units)
+    else:
+        amount = Decimal('0')
+    if discount.maximum_discount:
+        amount = min(amount, discount.maximum_discount)
+    return min(amount, eligible).quantize(CENT)
+
+
+def evaluate_cart(lines, customer_id=None, codes=(), include_public=False, now=None, table=None):
+    """
+    Evalúa los descuentos de `codes` (y los públicos si include_public) sobre
+    el carrito en una pasada. Retorna DiscountResults, el mayor monto primero.
+    Consultas: la de usos (solo si algún candidato tiene límites).
+    """
+    now = now or timezone.now()
+    table = table or get_discount_table()
+
+    candidates = {}
+    for code in codes:
+        discount = table.get(code)
+        if discount:
+            candidates[discount.id] = discount
+    if include_public:
+        candidates.update((discount.id, discount) for discount in table.public())
+
+    results = {}
+    for discount in candidates.values():
+        valid, message = discount.check_schedule(now)
+        results[discount.id] = DiscountResult(discount, valid, message)
+
+    uses = usage_counts([d for d in candidates.values() if results[d.id].valid], customer_id)
+    for discount_id, (current_uses, customer_uses) in uses.items():
+        discount, result = candidates[discount_id], results[discount_id]
+        if discount.max_uses and current_uses >= discount.max_uses:
+            result.valid, result.message = False, 'Descuento agotado'
+        elif customer_id and discount.max_uses_per_customer and customer_uses >= discount.max_uses_per_customer:
+            result.valid, result.message = False, 'Has alcanzado el límite de usos de este descuento'
+
+    active = [results[discount_id].discount for discount_id in results if results[discount_id].valid]
+    eligible = {discount.id: Decimal('0') for discount in active}
+    units = {discount.id: [] for discount in active if discount.discount_type == 'buy_x_get_y'}
+    cart_total = Decimal('0')
+
+    # Una pasada por el carrito para todos los descuentos
+    for line in lines:
+        line_total = line.total
+        cart_total += line_total
+        for discount in active:
+            if discount.applies_to(line.product_id, line.category_id):
+                eligible[discount.id] += line_total
+                if discount.id in units:
+                    units[discount.id].append((line.unit_price, line.quantity))
+
+    for discount in active:
+        result = results[discount.id]
+        if discount.minimum_purchase and cart_total < discount.minimum_purchase:
+            result.valid, result.message = False, f'Compra mínima requerida: ${discount.minimum_purchase}'
+            continue
+        result.eligible_amount = eligible[discount.id]
+        result.amount = _amount(discount, eligible[discount.id], units.get(discount.id, ()))
+        if not result.amount and discount.apply_to != 'order':
+            result.message = 'Ningún producto del carrito aplica a este descuento'
+
+    return sorted(results.values(), key=lambda result: (not result.valid, -result.amount))
+
+
+def order_lines(order):
+    """
+    Líneas de una orden a precio sin IVA (como Order.subtotal), en una
+    consulta. Requiere que calculate_totals() haya guardado line_total.
+    """
+    lines = []
+    rows = order.items.values_list('product_id', 'product__category_id', 'quantity', 'line_total', 'product__tax_rate')
+    for product_id, category_id, quantity, line_total, tax_rate in rows:
+        tax_rate = tax_rate or Decimal('0')
+        if 0 < tax_rate < 1:
+            tax_rate *= 100
+        base = (line_total or Decimal('0')) / (1 + tax_rate / 100)
+        lines.append(CartLine(product_id, category_id, quantity, base / quantity if quantity else base))
+    return lines
+
+
+def discount_for_order(discount, order):
+    """Monto de un Discount sobre las líneas de la orden (sin validar vigencia ni usos)"""
+    compiled = get_discount_table().by_id.get(discount.id)
+    if compiled is None:
+        # Inactivo o vencido: cálculo anterior sobre el subtotal
+        return discount.calculate_discount(order.subtotal)
+    lines = order_lines(order)
+    eligible = Decimal('0')
+    units = []
+    for line in lines:
+        if compiled.applies_to(line.product_id, line.category_id):
+            eligible += line.total
+            units.append((line.unit_price, line.quantity))
+    return _amount(compiled, eligible, units)
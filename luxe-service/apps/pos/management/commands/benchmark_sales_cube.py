@@ -0,0 +1,109 @@
+import resource
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from apps.pos.analytics import SalesCube
+
+
+class Command(BaseCommand):
+    help = 'Mide el cubo de ventas en memoria con datos sintéticos o cargándolo desde la BD (--from-db)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5_000_000, help='Filas sintéticas')
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--categories', type=int, default=60)
+        parser.add_argument('--brands', type=int, default=300)
+        parser.add_argument('--days', type=int, default=730)
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por consulta')
+        parser.add_argument('--from-db', action='store_true', help='Cargar el cubo desde la BD en vez de sintético')
+
+    def handle(self, *args, **options):
+        cube = self._load_from_db() if options['from_db'] else self._synthetic(options)
+        self._run_queries(cube, options['repeat'])
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
+
+    def _load_from_db(self):
+        """Carga completa (consultas + conversión a columnas) y memoria pico del proceso"""
+        self.stdout.write('Cargando el cubo desde la BD...')
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        cube = SalesCube()
+        cube.load()
+        elapsed = time.perf_counter() - started
+        rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        status = cube.status()
+        self.stdout.write(
+            f'Cubo cargado en {elapsed:.1f}s — {len(cube):,} filas, '
+            f'{status["memory_bytes"] / 1024 / 1024:.0f} MB en columnas, '
+            f'pico del proceso +{(rss_peak - rss_before) / 1024:.0f} MB'
+        )
+        return cube
+
+    def _synthetic(self, options):
+        rows = options['rows']
+        rng = np.random.default_rng(42)
+
+        self.stdout.write(f'Generando {rows:,} filas sintéticas...')
+        started = time.perf_counter()
+
+        # Cada producto pertenece a una categoría y marca fija
+        product_category = rng.integers(0, options['categories'], options['products'])
+        product_brand = rng.integers(0, options['brands'], options['products'])
+        product_price = rng.integers(100, 20000, options['products'])
+
+        # Popularidad sesgada (pocos productos concentran la mayoría de ventas)
+        product = (rng.zipf(1.3, rows) - 1) % options['products']
+        quantity = rng.integers(1, 5, rows)
+        revenue = product_price[product] * quantity
+        first_day = 739000
+        day = first_day + rng.integers(0, options['days'], rows)
+        month = day // 30
+
+        cube = SalesCube.from_arrays({
+            'order': np.arange(rows) // 3,
+            'product': product,
+            'category': product_category[product],
+            'brand': product_brand[product],
+            'payment_method': rng.integers(0, 6, rows),
+            'day': day,
+            'month': month,
+            'hour': rng.integers(8, 23, rows),
+            'weekday': (day % 7) + 1,
+            'quantity': quantity,
+            'revenue': revenue,
+            'cost': (revenue * 0.6).astype(np.int64),
+        })
+        status = cube.status()
+        self.stdout.write(
+            f'Cubo listo en {time.perf_counter() - started:.1f}s — '
+            f'{status["memory_bytes"] / 1024 / 1024:.0f} MB'
+        )
+        return cube
+
+    def _run_queries(self, cube, repeat):
+        queries = [
+            ('Total general', {}),
+            ('Top 20 productos por ingreso', {'group_by': ['product'], 'top': 20}),
+            ('Categoría × hora', {'group_by': ['category', 'hour'], 'metrics': ['revenue', 'quantity']}),
+            ('Marca por margen (top 50)', {'group_by': ['brand'], 'order_by': 'margin', 'top': 50}),
+            ('Día de semana × método de pago con órdenes', {
+                'group_by': ['weekday', 'payment_method'], 'metrics': ['revenue', 'orders'],
+            }),
+            ('Ventas diarias de 3 categorías', {
+                'group_by': ['day'], 'metrics': ['revenue'],
+                'filters': {'category': [0, 1, 2]},
+            }),
+        ]
+
+        for title, params in queries:
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                result = cube.query(**params)
+                timings.append((time.perf_counter() - t0) * 1000)
+            self.stdout.write(
+                f'{title:<45} {np.median(timings):8.1f} ms (mediana)  '
+                f'{result["groups"]:>7} grupos'
+            )
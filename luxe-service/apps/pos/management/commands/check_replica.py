@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.orders.models import Order
+from core.db_router import (
+    REPLICA_DB_ALIAS, replica_configured, replica_health, using_replica,
+)
+
+
+class Command(BaseCommand):
+    help = 'Verifica la réplica de lectura (reporting): conexión, retraso y enrutamiento'
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            self.stdout.write(self.style.WARNING(
+                '⚠️ DATABASE_REPLICA_URL no está configurada: todas las lecturas van a la principal'
+            ))
+            return
+
+        settings_dict = connections[REPLICA_DB_ALIAS].settings_dict
+        self.stdout.write(f"Réplica: {settings_dict.get('HOST')}:{settings_dict.get('PORT')}/{settings_dict.get('NAME')}")
+
+        started = time.perf_counter()
+        healthy = replica_health.check()
+        elapsed = (time.perf_counter() - started) * 1000
+
+        if healthy:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Réplica disponible — retraso {replica_health.lag:.1f}s ({elapsed:.0f} ms)'
+            ))
+        else:
+            self.stdout.write(self.style.ERROR(f'❌ Réplica descartada: {replica_health.error}'))
+
+        with using_replica():
+            queryset = Order.objects.all()
+            count = queryset.count()
+            self.stdout.write(f'Lectura de prueba servida por "{queryset.db}": {count} órdenes')
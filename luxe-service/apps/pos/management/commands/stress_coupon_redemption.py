@@ -0,0 +1,91 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from apps.customers.models import Customer
+from apps.loyalty.models import UserCoupon
+from apps.pos.models import Discount
+
+STRESS_ADDRESS = 'Prueba de Concurrencia Cupones'
+
+
+class Command(BaseCommand):
+    help = (
+        'Consume en paralelo un cupón de fidelidad y un descuento con límite de usos y '
+        'verifica que el cupón se use una sola vez y el descuento no pase su límite'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Hilos (conexiones) en paralelo')
+        parser.add_argument('--attempts', type=int, default=100, help='Intentos por código')
+        parser.add_argument('--max-uses', type=int, default=10, help='Límite de usos del descuento')
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8].upper()
+        customer = Customer.objects.create(
+            email=f'stress-{suffix.lower()}@sincorreo.com',
+            first_name='PRUEBA',
+            last_name='CUPONES',
+            address=STRESS_ADDRESS,
+        )
+        coupon = UserCoupon.objects.create(customer=customer, code=f'STRESS-{suffix}')
+        now = timezone.now()
+        discount = Discount.objects.create(
+            code=f'STRESS_{suffix}',
+            name='Prueba de concurrencia',
+            discount_type='fixed_amount',
+            discount_value=1,
+            max_uses=options['max_uses'],
+            valid_from=now - timedelta(days=1),
+            valid_until=now + timedelta(days=1),
+            is_public=False,
+        )
+
+        def consume_coupon(_):
+            close_old_connections()
+            try:
+                # En minúsculas: la búsqueda no distingue mayúsculas
+                with transaction.atomic():
+                    return UserCoupon.consume(coupon.code.lower()) is not None
+            finally:
+                close_old_connections()
+
+        def use_discount(_):
+            close_old_connections()
+            try:
+                with transaction.atomic():
+                    return Discount.objects.get(code__iexact=discount.code).use_discount()
+            finally:
+                close_old_connections()
+
+        try:
+            errors = []
+            for label, worker, expected in (
+                ('Cupón', consume_coupon, 1),
+                ('Descuento', use_discount, min(options['max_uses'], options['attempts'])),
+            ):
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                    succeeded = sum(pool.map(worker, range(options['attempts'])))
+                self.stdout.write(
+                    f"{label}: {options['attempts']} intentos con {options['workers']} hilos en "
+                    f"{time.perf_counter() - started:.2f}s, {succeeded} aplicados (esperados {expected})"
+                )
+                if succeeded != expected:
+                    errors.append(f'{label}: {succeeded} aplicados, se esperaban {expected}')
+
+            discount.refresh_from_db()
+            if discount.current_uses != min(options['max_uses'], options['attempts']):
+                errors.append(f'current_uses = {discount.current_uses}')
+            if errors:
+                raise CommandError('❌ ' + '; '.join(errors))
+
+            self.stdout.write(self.style.SUCCESS('✅ Cupón usado una sola vez y descuento dentro de su límite'))
+        finally:
+            discount.delete()
+            customer.delete()
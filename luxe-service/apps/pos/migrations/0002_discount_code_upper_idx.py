@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:40
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0017_price_history'),
+        ('pos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='discount',
+            index=models.Index(django.db.models.functions.text.Upper('code'), name='discount_code_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:44
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0002_discount_code_upper_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='discount',
+            name='buy_quantity',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Solo para Compra X lleva Y', null=True, verbose_name='Unidades a Comprar (X)'),
+        ),
+        migrations.AddField(
+            model_name='discount',
+            name='get_quantity',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Solo para Compra X lleva Y: las Y unidades más baratas de cada grupo de X + Y', null=True, verbose_name='Unidades con Descuento (Y)'),
+        ),
+        migrations.AlterField(
+            model_name='discount',
+            name='discount_value',
+            field=models.DecimalField(decimal_places=2, help_text='Porcentaje (0-100) o monto fijo según tipo. En Compra X lleva Y: % de descuento de las unidades Y (100 = gratis)', max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Valor del Descuento'),
+        ),
+    ]
@@ -24,6 +24,7 @@ import calendar
 
 # <<<< CORRECCIÓN: IMPORTAR FUNCIONES DE AGREGACIÓN >>>>
 from django.db.models import Sum, Count, Avg, F, Q
+from django.db.models.functions import Upper
 
 
 # ============================================================================
@@ -330,9 +331,23 @@ class Discount(models.Model):
         decimal_places=2,
         validators=[MinValueValidator(0)],
         verbose_name='Valor del Descuento',
-        help_text='Porcentaje (0-100) o monto fijo según tipo'
+        help_text='Porcentaje (0-100) o monto fijo según tipo. En Compra X lleva Y: % de descuento de las unidades Y (100 = gratis)'
     )
-    
+
+    # ============ COMPRA X LLEVA Y ============
+    buy_quantity = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Unidades a Comprar (X)',
+        help_text='Solo para Compra X lleva Y'
+    )
+    get_quantity = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Unidades con Descuento (Y)',
+        help_text='Solo para Compra X lleva Y: las Y unidades más baratas de cada grupo de X + Y'
+    )
+
     # ============ LÍMITES ============
     minimum_purchase = models.DecimalField(
         max_digits=10,
@@ -442,6 +457,8 @@ class Discount(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['code']),
+            # Búsqueda por código sin distinguir mayúsculas (code__iexact)
+            models.Index(Upper('code'), name='discount_code_upper_idx'),
             models.Index(fields=['is_active', 'valid_from', 'valid_until']),
             models.Index(fields=['discount_type']),
         ]
@@ -484,13 +501,13 @@ class Discount(models.Model):
         
         # Verificar día de la semana
         if self.valid_days:
-            current_day = now.weekday()
+            current_day = timezone.localtime(now).weekday()
             if current_day not in self.valid_days:
                 return False, 'Descuento no válido hoy'
         
         # Verificar hora del día
         if self.valid_hours and 'start' in self.valid_hours and 'end' in self.valid_hours:
-            current_time = now.time().strftime('%H:%M')
+            current_time = timezone.localtime(now).strftime('%H:%M')
             start_time = self.valid_hours['start']
             end_time = self.valid_hours['end']
             
@@ -514,7 +531,7 @@ class Discount(models.Model):
         elif self.discount_type == 'fixed_amount':
             discount = self.discount_value
         else:
-            # Para buy_x_get_y se calcula en el view según lógica específica
+            # buy_x_get_y depende de las líneas: discount_engine.evaluate_cart
             discount = Decimal('0')
         
         # Aplicar límite máximo si existe
@@ -527,9 +544,17 @@ class Discount(models.Model):
         return discount
     
     def use_discount(self):
-        """Incrementa el contador de usos"""
-        self.current_uses += 1
-        self.save(update_fields=['current_uses'])
+        """
+        Registra un uso con un UPDATE condicional (current_uses < max_uses):
+        dos ventas simultáneas no pueden pasar el límite. Retorna False si
+        el descuento ya está agotado.
+        """
+        updated = Discount.objects.filter(
+            Q(max_uses__isnull=True) | Q(max_uses=0) | Q(current_uses__lt=F('max_uses')),
+            pk=self.pk,
+        ).update(current_uses=F('current_uses') + 1)
+        self.refresh_from_db(fields=['current_uses'])
+        return bool(updated)
     
     def applies_to_product(self, product):
         """
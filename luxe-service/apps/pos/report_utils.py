@@ -11,11 +11,14 @@ from datetime import datetime, timedelta, date
 from decimal import Decimal
 import calendar
 
+from core.db_router import using_replica
+
 
 class ReportGenerator:
     """Clase para generar diferentes tipos de reportes"""
     
     @staticmethod
+    @using_replica()
     def generate_daily_report(target_date=None, generated_by='system'):
         """
         Genera reporte detallado para un día específico.
@@ -210,6 +213,7 @@ class ReportGenerator:
             )
     
     @staticmethod
+    @using_replica()
     def generate_weekly_report(start_date=None, generated_by='system'):
         """Genera reporte semanal"""
         if start_date is None:
@@ -254,6 +258,7 @@ class ReportGenerator:
         return weekly_report
     
     @staticmethod
+    @using_replica()
     def generate_monthly_report(year=None, month=None, generated_by='system'):
         """Genera reporte mensual"""
         now = timezone.now()
@@ -303,6 +308,7 @@ class ReportGenerator:
         return monthly_report
     
     @staticmethod
+    @using_replica()
     def generate_shift_report(target_date=None):
         """Genera reporte consolidado de turnos por día"""
         if target_date is None:
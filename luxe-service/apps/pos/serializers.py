@@ -6,6 +6,7 @@ Serializers para el módulo POS (Punto de Venta)
 
 from rest_framework import serializers
 from .models import Shift, Discount, DiscountUsage, Table, DailySummary
+from .analytics import DIMENSIONS, METRICS, DEFAULT_METRICS
 from datetime import timedelta, date 
 from decimal import Decimal # Mantener esta importación si se usa en lógica de validación, aunque no en la serialización simple.
 
@@ -203,6 +204,8 @@ class DiscountSerializer(serializers.ModelSerializer):
             'discount_type',
             'apply_to',
             'discount_value',
+            'buy_quantity',
+            'get_quantity',
             'minimum_purchase',
             'maximum_discount',
             'max_uses',
@@ -232,13 +235,20 @@ class DiscountSerializer(serializers.ModelSerializer):
         is_valid, _ = obj.is_valid()
         return is_valid
     
+    @staticmethod
+    def _related_count(obj, name):
+        # Con prefetch_related (vista active) se cuenta sin consultar
+        if name in getattr(obj, '_prefetched_objects_cache', {}):
+            return len(getattr(obj, name).all())
+        return getattr(obj, name).count()
+
     def get_applicable_products_count(self, obj):
         """Cantidad de productos aplicables"""
-        return obj.applicable_products.count()
+        return self._related_count(obj, 'applicable_products')
     
     def get_applicable_categories_count(self, obj):
         """Cantidad de categorías aplicables"""
-        return obj.applicable_categories.count()
+        return self._related_count(obj, 'applicable_categories')
     
     def get_usage_percentage(self, obj):
         """Porcentaje de uso si tiene límite"""
@@ -259,6 +269,8 @@ class DiscountCreateUpdateSerializer(serializers.ModelSerializer):
             'discount_type',
             'apply_to',
             'discount_value',
+            'buy_quantity',
+            'get_quantity',
             'minimum_purchase',
             'maximum_discount',
             'max_uses',
@@ -301,6 +313,18 @@ class DiscountCreateUpdateSerializer(serializers.ModelSerializer):
                     'discount_value': 'El porcentaje no puede ser mayor a 100'
                 })
         
+        # Compra X lleva Y: cantidades obligatorias, valor = % de las unidades Y
+        if data.get('discount_type') == 'buy_x_get_y':
+            for field in ('buy_quantity', 'get_quantity'):
+                if not data.get(field):
+                    raise serializers.ValidationError({
+                        field: 'Requerido para Compra X lleva Y (mínimo 1)'
+                    })
+            if data.get('discount_value', 0) > 100:
+                raise serializers.ValidationError({
+                    'discount_value': 'El porcentaje de las unidades Y no puede ser mayor a 100'
+                })
+        
         # Validar que tenga productos o categorías si aplica
         if data.get('apply_to') in ['product', 'category']:
             products = data.get('applicable_products', [])
@@ -326,6 +350,15 @@ class DiscountCreateUpdateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class DiscountCartItemSerializer(serializers.Serializer):
+    """Línea del carrito para evaluar descuentos por producto/categoría"""
+    
+    product_id = serializers.UUIDField()
+    category_id = serializers.UUIDField(required=False, allow_null=True)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+
+
 class DiscountValidateSerializer(serializers.Serializer):
     """Serializer para validar un descuento"""
     
@@ -337,6 +370,8 @@ class DiscountValidateSerializer(serializers.Serializer):
         required=True,
         min_value=0
     )
+    # Opcional: sin líneas el descuento se evalúa sobre order_amount completo
+    items = DiscountCartItemSerializer(many=True, required=False)
 
 
 # ============================================================================
@@ -611,3 +646,58 @@ class DateRangeSerializer(serializers.Serializer):
             })
         
         return data
+
+
+# ============================================================================
+# ANALÍTICA (CUBO DE VENTAS)
+# ============================================================================
+
+class CommaSeparatedListField(serializers.ListField):
+    """Lista que acepta valores separados por coma en query params"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [item.strip() for item in data.split(',') if item.strip()]
+        elif isinstance(data, list) and len(data) == 1 and isinstance(data[0], str):
+            data = [item.strip() for item in data[0].split(',') if item.strip()]
+        return super().to_internal_value(data)
+
+
+class SalesAnalyticsQuerySerializer(serializers.Serializer):
+    """Parámetros de consulta del cubo de ventas"""
+
+    group_by = CommaSeparatedListField(
+        child=serializers.ChoiceField(choices=DIMENSIONS), required=False, default=list
+    )
+    metrics = CommaSeparatedListField(
+        child=serializers.ChoiceField(choices=METRICS), required=False, default=list
+    )
+    order_by = serializers.ChoiceField(choices=METRICS, required=False)
+    ascending = serializers.BooleanField(required=False, default=False)
+    top = serializers.IntegerField(required=False, min_value=1, max_value=10000, default=50)
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    product = CommaSeparatedListField(child=serializers.UUIDField(), required=False)
+    category = CommaSeparatedListField(child=serializers.UUIDField(), required=False)
+    brand = CommaSeparatedListField(child=serializers.CharField(), required=False)
+    payment_method = CommaSeparatedListField(child=serializers.UUIDField(), required=False)
+    hour = CommaSeparatedListField(
+        child=serializers.IntegerField(min_value=0, max_value=23), required=False
+    )
+    weekday = CommaSeparatedListField(
+        child=serializers.IntegerField(min_value=1, max_value=7), required=False
+    )
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError({
+                'date_from': 'La fecha de inicio debe ser menor o igual a la fecha de fin'
+            })
+        if len(set(data['group_by'])) != len(data['group_by']):
+            raise serializers.ValidationError({'group_by': 'Dimensiones repetidas'})
+        if not data['metrics']:
+            data['metrics'] = list(DEFAULT_METRICS)
+        if data.get('order_by') and data['order_by'] not in data['metrics']:
+            data['metrics'].append(data['order_by'])
+        return data
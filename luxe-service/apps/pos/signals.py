@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from .discount_engine import bump_discounts_version
+from .models import Discount
+
+
+def invalidate_discount_table(sender, **kwargs):
+    """Los procesos recompilan la tabla de descuentos al ver la nueva versión (tras el commit)"""
+    if kwargs.get('action', 'post_').startswith('post_'):
+        transaction.on_commit(bump_discounts_version)
+
+
+post_save.connect(invalidate_discount_table, sender=Discount, dispatch_uid='pos_discounts_save')
+post_delete.connect(invalidate_discount_table, sender=Discount, dispatch_uid='pos_discounts_delete')
+
+for relation in (Discount.applicable_products, Discount.applicable_categories):
+    m2m_changed.connect(
+        invalidate_discount_table,
+        sender=relation.through,
+        dispatch_uid=f'pos_discounts_m2m_{relation.field.name}',
+    )
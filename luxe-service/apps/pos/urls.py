@@ -12,6 +12,7 @@ from .views import (
     DiscountViewSet,
     TableViewSet,
     DailySummaryViewSet,
+    SalesAnalyticsViewSet,
 )
 
 # Router para los ViewSets
@@ -22,6 +23,7 @@ router.register(r'shifts', ShiftViewSet, basename='shift')
 router.register(r'discounts', DiscountViewSet, basename='discount')
 router.register(r'tables', TableViewSet, basename='table')
 router.register(r'daily-summaries', DailySummaryViewSet, basename='daily-summary')
+router.register(r'analytics', SalesAnalyticsViewSet, basename='sales-analytics')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -9,6 +9,7 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.db.models import Sum, Count, Prefetch 
 from datetime import datetime, timedelta, date
 from decimal import Decimal
@@ -19,6 +20,10 @@ from apps.orders.models import Order, OrderItem
 from apps.orders.serializers import OrderReportDetailSerializer
 
 from .models import Shift, Discount, DiscountUsage, Table, DailySummary
+from .analytics import get_sales_cube, request_cube_refresh
+from .discount_engine import CartLine, cart_lines, evaluate_cart, get_discount_table
+from core.db_router import using_replica
+from core.permissions import require_staff
 from .serializers import (
     ShiftSerializer,
     ShiftCreateSerializer,
@@ -35,6 +40,7 @@ from .serializers import (
     ReportRequestSerializer,
     CloseDaySerializer,
     DateRangeSerializer,
+    SalesAnalyticsQuerySerializer,
 )
 
 
@@ -269,38 +275,36 @@ class DiscountViewSet(viewsets.ModelViewSet):
         customer_id = serializer.validated_data.get('customer_id')
         order_amount = Decimal(str(serializer.validated_data['order_amount']))
         
-        # 1. Intentar buscar en Descuentos Estándar
-        discount = Discount.objects.filter(code__iexact=code).first()
-        
-        if discount:
-            customer = None
-            if customer_id:
-                from apps.customers.models import Customer
-                try:
-                    customer = Customer.objects.get(id=customer_id)
-                except Customer.DoesNotExist:
-                    pass
-            
-            is_valid, message = discount.is_valid(for_customer=customer)
-            
-            if not is_valid:
-                return Response({'valid': False, 'error': message, 'discount': None})
+        # 1. Descuentos estándar: tabla compilada en memoria (discount_engine)
+        table = get_discount_table()
+        if table.get(code):
+            items = serializer.validated_data.get('items')
+            lines = cart_lines(items) if items else [CartLine(None, None, 1, order_amount)]
+            result = evaluate_cart(lines, customer_id=customer_id, codes=[code], table=table)[0]
             
-            if discount.minimum_purchase and order_amount < discount.minimum_purchase:
-                return Response({
-                    'valid': False,
-                    'error': f'Compra mínima requerida: ${discount.minimum_purchase}',
-                    'discount': None
-                })
+            if not result.valid:
+                return Response({'valid': False, 'error': result.message, 'discount': None})
             
-            discount_amount = discount.calculate_discount(order_amount)
+            discount = Discount.objects.prefetch_related(
+                'applicable_products', 'applicable_categories'
+            ).get(pk=result.discount.id)
             
             return Response({
                 'valid': True,
-                'message': message,
+                'message': result.message,
                 'discount': DiscountSerializer(discount).data,
-                'discount_amount': float(discount_amount),
-                'final_amount': float(order_amount - discount_amount)
+                'discount_amount': float(result.amount),
+                'final_amount': float(order_amount - result.amount)
+            })
+        
+        # Existe pero no está en la tabla (inactivo o vencido): motivo del rechazo
+        discount = Discount.objects.filter(code__iexact=code).first()
+        if discount:
+            is_valid, message = discount.is_valid()
+            return Response({
+                'valid': False,
+                'error': message if not is_valid else 'Descuento no disponible',
+                'discount': None
             })
             
         # 2. Si no es descuento estándar, buscar en Cupones de Fidelidad (LOYALTY)
@@ -352,10 +356,13 @@ class DiscountViewSet(viewsets.ModelViewSet):
     def active(self, request):
         now = timezone.now()
         
-        discounts = Discount.objects.filter(
-            is_active=True,
-            valid_from__lte=now,
-            valid_until__gte=now
+        # Vigentes según la tabla compilada; una consulta + prefetch para serializar
+        ids = [
+            discount.id for discount in get_discount_table().by_id.values()
+            if discount.valid_from <= now <= discount.valid_until
+        ]
+        discounts = Discount.objects.filter(id__in=ids).prefetch_related(
+            'applicable_products', 'applicable_categories'
         )
         
         # COMENTADO para desarrollo
@@ -364,7 +371,7 @@ class DiscountViewSet(viewsets.ModelViewSet):
         
         serializer = DiscountSerializer(discounts, many=True)
         return Response({
-            'count': discounts.count(),
+            'count': len(serializer.data),
             'discounts': serializer.data
         })
 
@@ -521,6 +528,14 @@ class DailySummaryViewSet(viewsets.ReadOnlyModelViewSet):
                 pass
         
         return queryset
+
+    @using_replica()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @using_replica()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
     
     @action(detail=False, methods=['post'])
     def generate(self, request):
@@ -693,6 +708,7 @@ class DailySummaryViewSet(viewsets.ReadOnlyModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @action(detail=False, methods=['get'])
+    @using_replica()
     def range(self, request):
         serializer = DateRangeSerializer(data=request.query_params)
         if not serializer.is_valid():
@@ -723,6 +739,7 @@ class DailySummaryViewSet(viewsets.ReadOnlyModelViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @using_replica()
     def dashboard(self, request):
         import pytz
         ecuador_tz = pytz.timezone('America/Guayaquil')
@@ -806,6 +823,7 @@ class DailySummaryViewSet(viewsets.ReadOnlyModelViewSet):
         })
     
     @action(detail=True, methods=['get'])
+    @using_replica()
     def detail_with_orders(self, request, pk=None):
         try:
             summary = self.get_object()
@@ -816,3 +834,63 @@ class DailySummaryViewSet(viewsets.ReadOnlyModelViewSet):
             return Response(summary_data)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+
+# ============================================================================
+# ANALÍTICA DE VENTAS (CUBO EN MEMORIA)
+# ============================================================================
+
+class SalesAnalyticsViewSet(viewsets.ViewSet):
+    """
+    Consultas ad-hoc sobre el cubo de ventas en memoria.
+
+    GET /analytics/?group_by=category,hour&metrics=revenue,margin&top=10
+    """
+    permission_classes = [AllowAny]  # ← CAMBIADO para desarrollo
+
+    def list(self, request):
+        serializer = SalesAnalyticsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        filters = {
+            key: params[key]
+            for key in ('product', 'category', 'brand', 'payment_method',
+                        'hour', 'weekday', 'date_from', 'date_to')
+            if params.get(key)
+        }
+
+        cube = get_sales_cube()
+        if not cube.is_ready:
+            return Response(
+                {'error': 'El cubo de ventas se está cargando, intente nuevamente en unos segundos'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '30'},
+            )
+        result = cube.query(
+            group_by=params['group_by'],
+            metrics=params['metrics'],
+            filters=filters,
+            order_by=params.get('order_by'),
+            top=params['top'],
+            ascending=params['ascending'],
+        )
+        result['group_by'] = params['group_by']
+        result['refreshed_at'] = cube.refreshed_at
+        return Response(result)
+
+    @action(detail=False, methods=['get'])
+    def status(self, request):
+        """Estado del cubo (filas, memoria, último refresco)"""
+        return Response(get_sales_cube().status())
+
+    @action(detail=False, methods=['post'])
+    @method_decorator(require_staff)
+    def refresh(self, request):
+        """
+        Encola un refresco incremental o una reconstrucción completa (?full=true);
+        la ejecuta el hilo de fondo del cubo, no la petición.
+        """
+        full = str(request.data.get('full', request.query_params.get('full', ''))).lower() in ('1', 'true')
+        cube = request_cube_refresh(full=full)
+        return Response(cube.status(), status=status.HTTP_202_ACCEPTED)
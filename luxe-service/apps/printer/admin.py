@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.urls import path
 from django.shortcuts import redirect
 from django.contrib import messages
-from .models import Printer, PrintJob, CashDrawerEvent, PrinterSettings
+from .models import Printer, PrintJob, LabelBatch, CashDrawerEvent, PrinterSettings
 
 
 @admin.register(Printer)
@@ -290,7 +290,8 @@ class PrintJobAdmin(admin.ModelAdmin):
     search_fields = ['job_number', 'created_by', 'content']
     readonly_fields = [
         'id', 'job_number', 'created_at',
-        'started_at', 'completed_at', 'cash_drawer_opened'
+        'started_at', 'completed_at', 'cash_drawer_opened',
+        'label_batch', 'batch_index'
     ]
     date_hierarchy = 'created_at'
     
@@ -307,6 +308,10 @@ class PrintJobAdmin(admin.ModelAdmin):
         ('Configuración', {
             'fields': ('copies', 'open_cash_drawer', 'cash_drawer_opened')
         }),
+        ('Lote de Etiquetas', {
+            'fields': ('label_batch', 'batch_index'),
+            'classes': ('collapse',)
+        }),
         ('Resultado', {
             'fields': ('error_message',)
         }),
@@ -386,6 +391,21 @@ class PrintJobAdmin(admin.ModelAdmin):
     retry_failed_jobs.short_description = '🔄 Reintentar fallidos'
 
 
+@admin.register(LabelBatch)
+class LabelBatchAdmin(admin.ModelAdmin):
+    """Admin para lotes de etiquetas"""
+    list_display = [
+        'id', 'printer', 'status', 'total_labels', 'copies',
+        'chunk_size', 'total_chunks', 'created_by', 'created_at', 'completed_at'
+    ]
+    list_filter = ['status', 'printer', 'created_at']
+    readonly_fields = [
+        'id', 'printer', 'total_labels', 'copies', 'chunk_size',
+        'total_chunks', 'created_by', 'created_at', 'completed_at'
+    ]
+    date_hierarchy = 'created_at'
+
+
 @admin.register(CashDrawerEvent)
 class CashDrawerEventAdmin(admin.ModelAdmin):
     """Admin para eventos de caja"""
@@ -0,0 +1,265 @@
+"""
+apps/printer/labels.py
+
+Lotes de etiquetas TSPL.
+
+Los productos se leen de la BD por id (nombre, código y precio nunca vienen
+del cliente) y las etiquetas se dividen en bloques de
+LABELS_CONFIG['chunk_size']. Cada bloque se renderiza una sola vez al crear
+el lote y se guarda como un PrintJob; solo el primero queda 'pending', el
+resto en 'held' hasta que el agente confirme el anterior. Si un bloque falla
+(papel atascado, impresora apagada) el lote queda 'failed' y resume_batch()
+lo reenvía desde ese bloque.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Printer, PrintJob, LabelBatch
+
+logger = logging.getLogger(__name__)
+
+MAX_COPIES = 10
+
+
+def _config(key, default):
+    return getattr(settings, 'LABELS_CONFIG', {}).get(key, default)
+
+
+# ============================================================================
+# RENDER TSPL
+# ============================================================================
+
+def render_tspl_labels(labels, printer, copies=1):
+    """
+    Genera comandos TSPL dinámicos basados en la configuración de la impresora.
+    labels: [{'name', 'code', 'price'}]
+    """
+    # Configuración dinámica desde la impresora
+    WIDTH_MM = printer.paper_width if printer and printer.paper_width else 57
+
+    # Obtener configuración extendida (height, gap) del campo JSON 'config'
+    printer_config = printer.config if printer and hasattr(printer, 'config') and printer.config else {}
+
+    # Default de altura 27mm, pero configurable
+    HEIGHT_MM = float(printer_config.get('label_height', 27))
+
+    # Default de Gap 0mm, pero configurable
+    GAP_MM = float(printer_config.get('label_gap', 0))
+
+    # Límite de caracteres para el nombre
+    # Default 22 para 57mm. Para 104mm (4") podría ser ~40-50
+    NAME_LIMIT = printer.characters_per_line if printer and printer.characters_per_line else 22
+
+    lines = []
+
+    # Configuración inicial TSPL
+    lines.append(f"SIZE {WIDTH_MM} mm, {HEIGHT_MM} mm")
+    lines.append(f"GAP {GAP_MM} mm, 0 mm")
+    lines.append("DIRECTION 1")
+    lines.append("CLS")
+
+    for label in labels:
+        # Las comillas rompen el string TSPL
+        name = str(label.get('name') or 'Sin nombre').replace('"', "'")[:NAME_LIMIT]
+        code = str(label.get('code') or '0000').replace('"', '')
+        price_str = f"${float(label.get('price') or 0):.2f}"
+
+        # Limpiar buffer de imagen para esta etiqueta
+        lines.append("CLS")
+
+        # 1. Nombre (Arriba). Fuente 2 (pequeña/media). x=10, y=10
+        lines.append(f'TEXT 10,10,"2",0,1,1,"{name}"')
+
+        # 2. Código de Barras (Centro). Tipo 128. x=10, y=35, altura=50
+        lines.append(f'BARCODE 10,35,"128",50,1,0,2,2,"{code}"')
+
+        # 3. Precio (Abajo). Fuente 3 (Grande). x=10, y=110
+        lines.append(f'TEXT 10,110,"3",0,1,1,"{price_str}"')
+
+        # Imprimir
+        lines.append(f"PRINT {copies}")
+
+    # Unir con CR+LF por seguridad
+    return "\r\n".join(lines) + "\r\n"
+
+
+# ============================================================================
+# LOTES
+# ============================================================================
+
+def load_label_products(product_ids=None, codes=None):
+    """
+    Productos para etiquetas en el orden pedido (los repetidos se imprimen
+    repetidos). Retorna (labels, no_encontrados).
+    """
+    from apps.inventario.models import Product
+
+    product_ids = [str(pk) for pk in (product_ids or [])]
+    codes = [str(code) for code in (codes or [])]
+
+    rows = Product.objects.none()
+    if product_ids:
+        rows = Product.objects.filter(id__in=set(product_ids))
+    elif codes:
+        rows = Product.objects.filter(code__in=set(codes))
+
+    by_key = {}
+    for row in rows.order_by().values('id', 'name', 'code', 'barcode', 'price'):
+        label = {'name': row['name'], 'code': row['code'] or row['barcode'], 'price': row['price']}
+        by_key[str(row['id'])] = label
+        if row['code']:
+            by_key[row['code']] = label
+
+    labels, missing = [], []
+    for key in product_ids or codes:
+        if key in by_key:
+            labels.append(by_key[key])
+        else:
+            missing.append(key)
+    return labels, missing
+
+
+def create_label_batch(printer, labels, copies=1, chunk_size=None, created_by=''):
+    """Divide las etiquetas en bloques renderizados y crea sus PrintJob"""
+    chunk_size = max(1, int(chunk_size or _config('chunk_size', 100)))
+    copies = max(1, min(int(copies or 1), MAX_COPIES))
+    chunks = [labels[i:i + chunk_size] for i in range(0, len(labels), chunk_size)]
+
+    with transaction.atomic():
+        batch = LabelBatch.objects.create(
+            printer=printer,
+            total_labels=len(labels),
+            copies=copies,
+            chunk_size=chunk_size,
+            total_chunks=len(chunks),
+            created_by=created_by,
+        )
+
+        base_number = PrintJob.generate_job_number()
+        PrintJob.objects.bulk_create([
+            PrintJob(
+                job_number=f'{base_number}-{index + 1:03d}',
+                printer=printer,
+                document_type='other',
+                label_batch=batch,
+                batch_index=index,
+                content=render_tspl_labels(chunk, printer, copies),
+                data={
+                    'type': 'label',
+                    'batch_id': str(batch.id),
+                    'chunk': index + 1,
+                    'chunks': len(chunks),
+                    'labels': len(chunk),
+                    'copies': copies,
+                },
+                open_cash_drawer=False,
+                created_by=created_by,
+                status='pending' if index == 0 else 'held',
+            )
+            for index, chunk in enumerate(chunks)
+        ])
+
+    logger.info(f"🏷️ Lote {batch.id}: {len(labels)} etiquetas en {len(chunks)} bloque(s) de {chunk_size}")
+    return batch
+
+
+def advance_batch(job):
+    """
+    Llamado cuando el agente reporta el resultado de un bloque: libera el
+    siguiente o marca el lote como completado / fallido.
+    """
+    with transaction.atomic():
+        batch = LabelBatch.objects.select_for_update().filter(id=job.label_batch_id).first()
+        if batch is None or batch.status == 'cancelled':
+            return batch
+
+        if job.status == 'failed':
+            batch.status = 'failed'
+            batch.save(update_fields=['status'])
+            logger.warning(f"🏷️ Lote {batch.id} detenido en el bloque {job.batch_index + 1}/{batch.total_chunks}")
+            return batch
+
+        released = PrintJob.objects.filter(
+            label_batch=batch, status='held', batch_index=job.batch_index + 1
+        ).update(status='pending')
+
+        if not released and not batch.jobs.exclude(status='completed').exists():
+            batch.status = 'completed'
+            batch.completed_at = timezone.now()
+            batch.save(update_fields=['status', 'completed_at'])
+    return batch
+
+
+def resume_batch(batch):
+    """
+    Reenvía el lote desde el primer bloque no completado (el que falló o
+    quedó en 'printing' si el agente se cayó). Retorna el bloque reenviado.
+    """
+    with transaction.atomic():
+        batch = LabelBatch.objects.select_for_update().get(id=batch.id)
+        job = batch.jobs.exclude(status='completed').order_by('batch_index').first()
+        if job is None:
+            return None
+
+        # Un solo bloque activo a la vez; los siguientes esperan
+        batch.jobs.filter(batch_index__gt=job.batch_index).exclude(status='completed').update(status='held')
+        PrintJob.objects.filter(id=job.id).update(
+            status='pending', error_message='', started_at=None, completed_at=None
+        )
+        batch.status = 'printing'
+        batch.completed_at = None
+        batch.save(update_fields=['status', 'completed_at'])
+    return job
+
+
+def cancel_batch(batch):
+    with transaction.atomic():
+        batch.jobs.filter(status__in=['held', 'pending']).update(status='cancelled')
+        batch.status = 'cancelled'
+        batch.save(update_fields=['status'])
+    return batch
+
+
+def batch_progress(batch):
+    counts = {}
+    for status_value in batch.jobs.values_list('status', flat=True):
+        counts[status_value] = counts.get(status_value, 0) + 1
+    completed = counts.get('completed', 0)
+    failed_job = batch.jobs.filter(status='failed').order_by('batch_index').first()
+    return {
+        'batch_id': str(batch.id),
+        'status': batch.status,
+        'printer': batch.printer.name,
+        'total_labels': batch.total_labels,
+        'copies': batch.copies,
+        'chunk_size': batch.chunk_size,
+        'total_chunks': batch.total_chunks,
+        'completed_chunks': completed,
+        'labels_printed': min(completed * batch.chunk_size, batch.total_labels),
+        'progress': round(completed * 100 / batch.total_chunks, 1) if batch.total_chunks else 0,
+        'jobs_by_status': counts,
+        'failed_chunk': failed_job.batch_index + 1 if failed_job else None,
+        'error': failed_job.error_message if failed_job else '',
+        'created_at': batch.created_at,
+        'completed_at': batch.completed_at,
+    }
+
+
+def resolve_label_printer(printer_id=None):
+    """Impresora indicada, o la de etiquetas activa, o la predeterminada"""
+    if printer_id:
+        return Printer.objects.filter(pk=printer_id, is_active=True).first()
+
+    # 1. Impresora marcada específicamente como de ETIQUETAS
+    printer = Printer.objects.filter(printer_type='label', is_active=True).first()
+    # 2. Por nombre
+    if not printer:
+        printer = Printer.objects.filter(name__icontains='etiqueta', is_active=True).first()
+    if not printer:
+        printer = Printer.objects.filter(name__icontains='label', is_active=True).first()
+    # 3. La predeterminada
+    return printer or Printer.get_default()
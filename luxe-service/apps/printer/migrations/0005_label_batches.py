@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-19 06:12
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('printer', '0004_printer_label_gap_printer_label_height'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printjob',
+            name='batch_index',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Bloque'),
+        ),
+        migrations.AlterField(
+            model_name='printjob',
+            name='status',
+            field=models.CharField(choices=[('held', 'En espera'), ('pending', 'Pendiente'), ('printing', 'Imprimiendo'), ('completed', 'Completado'), ('failed', 'Fallido'), ('cancelled', 'Cancelado')], db_index=True, default='pending', max_length=20, verbose_name='Estado'),
+        ),
+        migrations.CreateModel(
+            name='LabelBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('printing', 'Imprimiendo'), ('completed', 'Completado'), ('failed', 'Fallido'), ('cancelled', 'Cancelado')], db_index=True, default='printing', max_length=20, verbose_name='Estado')),
+                ('total_labels', models.PositiveIntegerField(default=0, verbose_name='Etiquetas')),
+                ('copies', models.PositiveIntegerField(default=1, verbose_name='Copias por etiqueta')),
+                ('chunk_size', models.PositiveIntegerField(default=100, verbose_name='Etiquetas por bloque')),
+                ('total_chunks', models.PositiveIntegerField(default=0, verbose_name='Bloques')),
+                ('created_by', models.CharField(blank=True, max_length=100, verbose_name='Creado por')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('printer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='label_batches', to='printer.printer', verbose_name='Impresora')),
+            ],
+            options={
+                'verbose_name': 'Lote de Etiquetas',
+                'verbose_name_plural': 'Lotes de Etiquetas',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='printjob',
+            name='label_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='printer.labelbatch', verbose_name='Lote de Etiquetas'),
+        ),
+    ]
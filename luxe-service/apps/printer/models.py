@@ -241,6 +241,7 @@ class PrintTemplate(models.Model):
 class PrintJob(models.Model):
     """Trabajos de impresión (historial)"""
     JOB_STATUS = [
+        ('held', 'En espera'),  # Bloque de etiquetas aún no liberado
         ('pending', 'Pendiente'),
         ('printing', 'Imprimiendo'),
         ('completed', 'Completado'),
@@ -306,6 +307,21 @@ class PrintJob(models.Model):
         help_text='ID del objeto relacionado'
     )
     
+    # Lote de etiquetas al que pertenece (un trabajo por bloque)
+    label_batch = models.ForeignKey(
+        'LabelBatch',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Lote de Etiquetas'
+    )
+    batch_index = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Bloque'
+    )
+    
     # Contenido a imprimir (ya renderizado)
     content = models.TextField(verbose_name='Contenido')
     
@@ -427,6 +443,51 @@ class PrintJob(models.Model):
         return True
 
 
+class LabelBatch(models.Model):
+    """
+    Impresión de etiquetas dividida en bloques (un PrintJob por bloque).
+    Los bloques se liberan de a uno: el siguiente pasa a 'pending' cuando el
+    anterior se completa, y si uno falla el lote se reanuda desde ese bloque.
+    """
+    STATUS_CHOICES = [
+        ('printing', 'Imprimiendo'),
+        ('completed', 'Completado'),
+        ('failed', 'Fallido'),
+        ('cancelled', 'Cancelado'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    printer = models.ForeignKey(
+        Printer,
+        on_delete=models.PROTECT,
+        related_name='label_batches',
+        verbose_name='Impresora'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='printing',
+        db_index=True,
+        verbose_name='Estado'
+    )
+    total_labels = models.PositiveIntegerField(default=0, verbose_name='Etiquetas')
+    copies = models.PositiveIntegerField(default=1, verbose_name='Copias por etiqueta')
+    chunk_size = models.PositiveIntegerField(default=100, verbose_name='Etiquetas por bloque')
+    total_chunks = models.PositiveIntegerField(default=0, verbose_name='Bloques')
+
+    created_by = models.CharField(max_length=100, blank=True, verbose_name='Creado por')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Lote de Etiquetas'
+        verbose_name_plural = 'Lotes de Etiquetas'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'Lote de {self.total_labels} etiquetas ({self.get_status_display()})'
+
+
 class CashDrawerEvent(models.Model):
     """Historial de aperturas de caja registradora"""
     EVENT_TYPES = [
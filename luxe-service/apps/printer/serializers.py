@@ -41,11 +41,12 @@ class PrintJobSerializer(serializers.ModelSerializer):
             'document_type', 'document_type_display',
             'content', 'data', 'open_cash_drawer', 'cash_drawer_opened',
             'status', 'status_display', 'copies', 'error_message',
+            'label_batch', 'batch_index',
             'created_by', 'created_at', 'started_at', 'completed_at'
         ]
         read_only_fields = [
             'id', 'job_number', 'created_at', 
-            'started_at', 'completed_at'
+            'started_at', 'completed_at', 'label_batch', 'batch_index'
         ]
 
 
@@ -32,6 +32,9 @@ urlpatterns = [
     path('print/', views.PrintAPIView.as_view(), name='print'),
     path('print/receipt/', views.PrintReceiptView.as_view(), name='print-receipt'),
     path('print/label/', views.PrintLabelView.as_view(), name='print-label'),
+    path('print/label/batches/<uuid:batch_id>/', views.label_batch_status, name='print-label-batch'),
+    path('print/label/batches/<uuid:batch_id>/resume/', views.label_batch_resume, name='print-label-batch-resume'),
+    path('print/label/batches/<uuid:batch_id>/cancel/', views.label_batch_cancel, name='print-label-batch-cancel'),
     
     # ============================================================================
     # ENDPOINTS DE UTILIDAD
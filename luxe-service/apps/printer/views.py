@@ -15,7 +15,7 @@ import base64
 from io import BytesIO
 from PIL import Image
 
-from .models import Printer, PrintJob, CashDrawerEvent, PrinterSettings
+from .models import Printer, PrintJob, LabelBatch, CashDrawerEvent, PrinterSettings
 from .serializers import (
     PrinterSerializer, PrintJobSerializer,
     CashDrawerEventSerializer, PrinterSettingsSerializer,
@@ -25,6 +25,10 @@ from .serializers import (
     AgenteResultadoSerializer,
 )
 from .print_manager import PrinterManager
+from .labels import (
+    load_label_products, create_label_batch, resolve_label_printer,
+    advance_batch, resume_batch, cancel_batch, batch_progress,
+)
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -341,12 +345,12 @@ def agente_trabajos_pendientes(request):
     if es_sistema:
         trabajos = PrintJob.objects.filter(
             status='pending'
-        ).select_related('printer').order_by('created_at')[:10]
+        ).select_related('printer').order_by('created_at', 'batch_index')[:10]
     else:
         trabajos = PrintJob.objects.filter(
             status='pending',
             created_by=request.user.username
-        ).select_related('printer').order_by('created_at')[:10]
+        ).select_related('printer').order_by('created_at', 'batch_index')[:10]
     
     trabajos_data = []
     for trabajo in trabajos:
@@ -429,6 +433,10 @@ def agente_reportar_resultado(request):
         trabajo.mark_as_failed(data.get('mensaje', 'Error desconocido'))
         logger.error(f"❌ Trabajo {trabajo.job_number} falló: {data.get('mensaje')}")
     
+    # Lote de etiquetas: liberar el siguiente bloque o detener el lote
+    if trabajo.label_batch_id:
+        advance_batch(trabajo)
+    
     if trabajo.open_cash_drawer and data['success'] and trabajo.printer:
         trabajo.cash_drawer_opened = True
         trabajo.save(update_fields=['cash_drawer_opened'])
@@ -1027,83 +1035,76 @@ class PrintLabelView(APIView):
     
     def post(self, request):
         """
-        Imprime etiquetas para uno o varios productos.
+        Imprime etiquetas para uno o varios productos en un lote por bloques
+        (ver apps/printer/labels.py).
         Payload esperado:
         {
-            "products": [
-                {"name": "Producto 1", "code": "12345678", "price": 15.99},
-                ...
-            ],
+            "product_ids": ["<uuid>", ...],  # Repetir un id imprime la etiqueta repetida
             "copies": 1,  # Copias por etiqueta
-            "printer_id": null  # Opcional, usa default si no se especifica
+            "printer_id": null,  # Opcional, usa default si no se especifica
+            "chunk_size": null  # Opcional, etiquetas por bloque
         }
+        Compatibilidad: "products": [{"id" o "code": ...}] se resuelve en la BD
+        (nombre y precio del cliente se ignoran). "test": true imprime una
+        etiqueta de prueba.
         """
-        products = request.data.get('products', [])
+        products = request.data.get('products') or []
+        product_ids = request.data.get('product_ids') or []
         copies = request.data.get('copies', 1)
         printer_id = request.data.get('printer_id')
+        chunk_size = request.data.get('chunk_size')
+        is_test = bool(request.data.get('test'))
+        
+        missing = []
+        if is_test:
+            labels = [{'name': 'PRUEBA ETIQUETA', 'code': '12345678', 'price': 9.99}]
+        elif product_ids:
+            labels, missing = load_label_products(product_ids=product_ids)
+        elif products:
+            ids = [p.get('id') for p in products if isinstance(p, dict) and p.get('id')]
+            if ids:
+                labels, missing = load_label_products(product_ids=ids)
+            else:
+                codes = [p.get('code') for p in products if isinstance(p, dict) and p.get('code')]
+                labels, missing = load_label_products(codes=codes)
+        else:
+            labels = []
         
-        if not products:
+        if not labels:
+            return Response({
+                'error': 'Debe proporcionar al menos un producto',
+                'not_found': missing
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            copies = int(copies or 1)
+            chunk_size = int(chunk_size) if chunk_size else None
+        except (TypeError, ValueError):
             return Response({
-                'error': 'Debe proporcionar al menos un producto'
+                'error': 'copies y chunk_size deben ser números enteros'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Obtener impresora
-        if not printer_id:
-            try:
-                # 1. Intentar buscar una impresora marcada específicamente como de ETIQUETAS
-                # Opción A: Buscar por tipo (si existe el campo y valor 'label')
-                label_printer = Printer.objects.filter(printer_type='label', is_active=True).first()
-                
-                # Opción B: Si no hay tipo 'label', buscar por nombre
-                if not label_printer:
-                     label_printer = Printer.objects.filter(name__icontains='etiqueta', is_active=True).first()
-                
-                if not label_printer:
-                     label_printer = Printer.objects.filter(name__icontains='label', is_active=True).first()
-
-                # Si encontramos una específica, la usamos
-                if label_printer:
-                    printer = label_printer
-                else:
-                    # Si no, caemos en la por defecto
-                    printer = Printer.get_default()
-            except Exception as e:
-                logger.error(f"Error buscando impresora de etiquetas: {e}")
-                printer = Printer.get_default()
-            
-            if not printer:
-                return Response({
-                    'error': 'No se encontró ninguna impresora de etiquetas activa'
-                }, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            try:
-                printer = Printer.objects.get(pk=printer_id, is_active=True)
-            except Printer.DoesNotExist:
-                return Response({
-                    'error': 'Impresora no encontrada o inactiva'
-                }, status=status.HTTP_400_BAD_REQUEST)
+        printer = resolve_label_printer(printer_id)
+        if not printer:
+            return Response({
+                'error': 'Impresora no encontrada o inactiva' if printer_id
+                else 'No se encontró ninguna impresora de etiquetas activa'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Generar contenido TSPL para todas las etiquetas
-            # Pasa el objeto printer para usar su configuración
-            tspl_content = self.generate_tspl_labels(products, printer, copies)
-            
             username = request.user.username if request.user.is_authenticated else 'system'
-            print_job = PrintJob.objects.create(
-                printer=printer,
-                document_type='other',
-                content=tspl_content,
-                data={'products': products, 'copies': copies, 'type': 'label'},
-                open_cash_drawer=False,
-                created_by=username,
-                status='pending'
-            )
+            batch = create_label_batch(printer, labels, copies, chunk_size, username)
+            first_job = batch.jobs.order_by('batch_index').first()
             
             return Response({
                 'status': 'success',
-                'message': f'{len(products)} etiqueta(s) enviada(s) al Bot',
-                'job_id': str(print_job.id),
-                'job_number': print_job.job_number
+                'message': f'{len(labels)} etiqueta(s) enviada(s) al Bot en {batch.total_chunks} bloque(s)',
+                'job_id': str(first_job.id),
+                'job_number': first_job.job_number,
+                'batch_id': str(batch.id),
+                'chunks': batch.total_chunks,
+                'not_found': missing
             })
                 
         except Exception as e:
@@ -1112,62 +1113,42 @@ class PrintLabelView(APIView):
                 'status': 'error',
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def label_batch_status(request, batch_id):
+    """Progreso de un lote de etiquetas"""
+    batch = get_object_or_404(LabelBatch.objects.select_related('printer'), pk=batch_id)
+    return Response(batch_progress(batch))
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@csrf_exempt
+def label_batch_resume(request, batch_id):
+    """Reanuda un lote desde el primer bloque no completado"""
+    batch = get_object_or_404(LabelBatch, pk=batch_id)
+    if batch.status == 'completed':
+        return Response({
+            'error': 'El lote ya está completado'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    def generate_tspl_labels(self, products, printer, copies=1):
-        """
-        Genera comandos TSPL dinámicos basados en la configuración de la impresora
-        """
-        # Configuración dinámica desde la impresora
-        WIDTH_MM = printer.paper_width if printer and printer.paper_width else 57
-        
-        # Obtener configuración extendida (height, gap) del campo JSON 'config'
-        printer_config = printer.config if printer and hasattr(printer, 'config') and printer.config else {}
-        
-        # Default de altura 27mm, pero configurable
-        HEIGHT_MM = float(printer_config.get('label_height', 27))
-        
-        # Default de Gap 0mm, pero configurable
-        GAP_MM = float(printer_config.get('label_gap', 0))
-        
-        # Límite de caracteres para el nombre
-        # Default 22 para 57mm. Para 104mm (4") podría ser ~40-50
-        NAME_LIMIT = printer.characters_per_line if printer and printer.characters_per_line else 22
-        
-        lines = []
-        
-        # Configuración inicial TSPL
-        lines.append(f"SIZE {WIDTH_MM} mm, {HEIGHT_MM} mm")
-        lines.append(f"GAP {GAP_MM} mm, 0 mm")
-        lines.append("DIRECTION 1")
-        lines.append("CLS")
-        
-        for product in products:
-            name = product.get('name', 'Sin nombre')[:NAME_LIMIT]
-            code = product.get('code', '0000')
-            price = product.get('price', 0)
-            
-            price_str = f"${float(price):.2f}"
-            
-            # Limpiar buffer de imagen para esta etiqueta
-            lines.append("CLS")
-            
-            # 1. Nombre (Arriba). Fuente 2 (pequeña/media). 
-            # Coordenadas: x=10, y=10
-            lines.append(f'TEXT 10,10,"2",0,1,1,"{name}"')
-            
-            # 2. Código de Barras (Centro). Tipo 128.
-            # Coordenadas: x=10, y=35, altura=50.
-            lines.append(f'BARCODE 10,35,"128",50,1,0,2,2,"{code}"')
-            
-            # 3. Precio (Abajo). Fuente 3 (Grande).
-            # Coordenadas: x=10, y=100.
-            lines.append(f'TEXT 10,110,"3",0,1,1,"{price_str}"')
-            
-            # Imprimir
-            lines.append(f"PRINT {copies}")
-        
-        # Unir con CR+LF por seguridad
-        return "\r\n".join(lines) + "\r\n"
+    job = resume_batch(batch)
+    batch.refresh_from_db()
+    data = batch_progress(batch)
+    data['resumed_chunk'] = job.batch_index + 1 if job else None
+    return Response(data)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@csrf_exempt
+def label_batch_cancel(request, batch_id):
+    """Cancela los bloques de un lote que aún no se imprimieron"""
+    batch = get_object_or_404(LabelBatch, pk=batch_id)
+    cancel_batch(batch)
+    return Response(batch_progress(batch))
 
 
 def generar_comandos_tspl_hex(trabajo):
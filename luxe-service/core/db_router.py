@@ -0,0 +1,247 @@
+"""
+core/db_router.py
+
+Enrutamiento de lecturas pesadas (reportes y exportaciones) hacia la réplica
+de lectura ('reporting').
+
+Solo el código envuelto en using_replica() lee de la réplica; todo lo demás
+sigue en la base principal. Las lecturas vuelven a la principal cuando:
+- el cliente escribió hace menos de REPLICA_CONFIG['pin_seconds'] (cookie),
+- hubo una escritura reciente en la misma petición o tarea,
+- hay una transacción abierta en la principal,
+- la réplica no responde o su retraso supera REPLICA_CONFIG['max_lag_seconds'].
+"""
+
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DB_ALIAS = 'reporting'
+
+PIN_COOKIE_NAME = 'luxe_db_pin'
+
+# Profundidad de bloques using_replica() activos en el contexto actual
+_replica_depth = contextvars.ContextVar('replica_depth', default=0)
+# Momento (epoch) hasta el cual las lecturas deben ir a la principal
+_pinned_until = contextvars.ContextVar('pinned_until', default=0.0)
+# Momento (epoch) de la última escritura fuera de using_replica()
+_last_write = contextvars.ContextVar('last_write', default=0.0)
+# Si alguna lectura del bloque actual fue servida por la réplica
+_served_by_replica = contextvars.ContextVar('served_by_replica', default=False)
+
+
+def _config(key, default):
+    return getattr(settings, 'REPLICA_CONFIG', {}).get(key, default)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+# ============================================================================
+# SALUD DE LA RÉPLICA
+# ============================================================================
+
+class _ReplicaHealth:
+    """Estado de la réplica cacheado por proceso durante check_seconds"""
+
+    LAG_SQL = """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.healthy = False
+        self.lag = None
+        self.error = None
+        self.checked_at = 0.0
+
+    def check(self):
+        """Consulta el retraso de la réplica (segundos) y actualiza el estado"""
+        try:
+            with connections[REPLICA_DB_ALIAS].cursor() as cursor:
+                cursor.execute(self.LAG_SQL)
+                lag = float(cursor.fetchone()[0] or 0)
+        except Exception as e:
+            self.mark_down(e)
+            return False
+
+        max_lag = _config('max_lag_seconds', 30)
+        self.lag = lag
+        self.error = None if lag <= max_lag else f'Retraso de {lag:.1f}s (máximo {max_lag}s)'
+        self.healthy = lag <= max_lag
+        self.checked_at = time.monotonic()
+        if not self.healthy:
+            logger.warning('Réplica de lectura descartada: %s', self.error)
+        return self.healthy
+
+    def mark_down(self, error):
+        if self.healthy or self.error is None:
+            logger.warning('Réplica de lectura no disponible, usando principal: %s', error)
+        self.healthy = False
+        self.error = str(error)
+        self.checked_at = time.monotonic()
+        try:
+            connections[REPLICA_DB_ALIAS].close()
+        except Exception:
+            pass
+
+    def is_healthy(self):
+        if time.monotonic() - self.checked_at > _config('health_check_seconds', 15):
+            # Un solo hilo re-verifica; los demás usan el último resultado
+            if self._lock.acquire(blocking=False):
+                try:
+                    self.check()
+                finally:
+                    self._lock.release()
+        return self.healthy
+
+
+replica_health = _ReplicaHealth()
+
+
+# ============================================================================
+# CONTEXTO
+# ============================================================================
+
+def _is_pinned():
+    now = time.time()
+    if _pinned_until.get() > now or now - _last_write.get() < _config('pin_seconds', 5):
+        return True
+    # Lecturas dentro de una transacción de la principal deben ver sus escrituras
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def current_read_alias():
+    """Alias que se usará para lecturas en el contexto actual"""
+    if _replica_depth.get() and replica_configured() and not _is_pinned() and replica_health.is_healthy():
+        return REPLICA_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+class using_replica(ContextDecorator):
+    """
+    Envía las lecturas del bloque a la réplica de reportes.
+
+        with using_replica():
+            ...
+
+        @using_replica()
+        def stats(self, request): ...
+
+    Como decorador, si la réplica falla a mitad de la consulta se marca como
+    caída y la función se reintenta una vez contra la principal (las
+    funciones decoradas deben ser de solo lectura o idempotentes).
+    """
+
+    def __enter__(self):
+        self._depth_token = _replica_depth.set(_replica_depth.get() + 1)
+        self._served_token = _served_by_replica.set(False)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        served = _served_by_replica.get()
+        _replica_depth.reset(self._depth_token)
+        _served_by_replica.reset(self._served_token)
+        if served and exc_type is not None and issubclass(exc_type, OperationalError):
+            replica_health.mark_down(exc)
+            exc._from_replica = True
+        return False
+
+    def _recreate_cm(self):
+        # Instancia nueva por llamada: el decorador se comparte entre hilos
+        return using_replica()
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            try:
+                with self._recreate_cm():
+                    return func(*args, **kwargs)
+            except OperationalError as e:
+                if not getattr(e, '_from_replica', False):
+                    raise
+                logger.warning('Reintentando %s en la base principal', func.__qualname__)
+                return func(*args, **kwargs)
+        return inner
+
+
+# ============================================================================
+# ROUTER
+# ============================================================================
+
+class ReplicaRouter:
+    """
+    Lecturas a la réplica solo dentro de using_replica(); escrituras siempre a
+    la principal.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = current_read_alias()
+        if alias == REPLICA_DB_ALIAS:
+            _served_by_replica.set(True)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        if not _replica_depth.get():
+            _last_write.set(time.time())
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Ambos alias contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Sin restricción: permite `migrate --database=reporting` al probar
+        # localmente con dos instancias independientes.
+        return None
+
+
+# ============================================================================
+# MIDDLEWARE (READ-YOUR-WRITES ENTRE PETICIONES)
+# ============================================================================
+
+class ReplicaPinningMiddleware:
+    """
+    Fija las lecturas a la principal durante pin_seconds después de que un
+    cliente escribe, usando una cookie con el instante de expiración.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE_NAME, 0))
+        except (TypeError, ValueError):
+            pinned_until = 0.0
+
+        pinned_token = _pinned_until.set(pinned_until)
+        write_token = _last_write.set(0.0)
+        try:
+            response = self.get_response(request)
+            if _last_write.get():
+                pin_seconds = _config('pin_seconds', 5)
+                response.set_cookie(
+                    PIN_COOKIE_NAME,
+                    str(time.time() + pin_seconds),
+                    max_age=pin_seconds,
+                    httponly=True,
+                    samesite='Lax',
+                )
+            return response
+        finally:
+            _pinned_until.reset(pinned_token)
+            _last_write.reset(write_token)
@@ -23,6 +23,18 @@ app.conf.beat_schedule = {
         'task': 'apps.integrations.tasks.check_scheduled_birthdays',
         'schedule': crontab(), # Cada minuto
     },
+    'low-stock-alerts-hourly': {
+        'task': 'apps.inventario.tasks.send_low_stock_alerts',
+        'schedule': crontab(minute=0, hour='8-20'), # Cada hora en horario de atención
+    },
+    'reconcile-customer-stats-nightly': {
+        'task': 'apps.customers.tasks.reconcile_customer_stats',
+        'schedule': crontab(minute=30, hour=3), # Madrugada, fuera de horario
+    },
+    'segment-customers-nightly': {
+        'task': 'apps.customers.tasks.segment_customers',
+        'schedule': crontab(minute=0, hour=4), # Después de reconciliar estadísticas
+    },
 }
 
 @app.task(bind=True, ignore_result=True)
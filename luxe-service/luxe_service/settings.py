@@ -20,6 +20,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_router.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'luxe_service.urls'
@@ -83,6 +85,27 @@ DATABASES = {
     )
 }
 
+# Réplica de lectura para reportes y exportaciones (opcional).
+# Sin DATABASE_REPLICA_URL todo se lee de la principal.
+if os.getenv('DATABASE_REPLICA_URL'):
+    DATABASES['reporting'] = dj_database_url.parse(
+        os.getenv('DATABASE_REPLICA_URL'),
+        conn_max_age=600
+    )
+    DATABASES['reporting']['OPTIONS'] = {'connect_timeout': 3}
+    DATABASES['reporting']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+REPLICA_CONFIG = {
+    # Segundos que un cliente lee de la principal después de escribir
+    'pin_seconds': int(os.getenv('REPLICA_PIN_SECONDS', '5')),
+    # Retraso máximo tolerado antes de volver a la principal
+    'max_lag_seconds': int(os.getenv('REPLICA_MAX_LAG_SECONDS', '30')),
+    # Cada cuánto se re-verifica la salud de la réplica
+    'health_check_seconds': int(os.getenv('REPLICA_HEALTH_CHECK_SECONDS', '15')),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -136,6 +159,15 @@ else:
     MEDIA_URL = '/media/'
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Versiones redimensionadas de imágenes (apps/inventario/images.py)
+IMAGE_RENDITIONS_CONFIG = {
+    'widths': [160, 320, 640, 1280],
+    'formats': ['webp', 'jpeg'],
+    'quality': int(os.getenv('IMAGE_RENDITIONS_QUALITY', '80')),
+    # Los nombres llevan hash del contenido: se pueden cachear sin expirar
+    'cache_control': 'public, max-age=31536000, immutable',
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ============================================
@@ -247,6 +279,34 @@ PRINTING_CONFIG = {
     'require_confirmation_to_open_drawer': os.getenv('REQUIRE_CONFIRMATION_TO_OPEN_DRAWER', 'False') == 'True',
 }
 
+# Lotes de etiquetas (apps/printer/labels.py)
+LABELS_CONFIG = {
+    # Etiquetas por PrintJob; cada bloque se libera al completarse el anterior
+    'chunk_size': int(os.getenv('LABELS_CHUNK_SIZE', '100')),
+}
+
+# ============================================
+# STOCK BAJO
+# ============================================
+LOW_STOCK_CONFIG = {
+    # Días de ventas usados para la velocidad de venta
+    'velocity_days': int(os.getenv('LOW_STOCK_VELOCITY_DAYS', '30')),
+    # Días de venta que debe cubrir la reposición sugerida
+    'reorder_cover_days': int(os.getenv('LOW_STOCK_REORDER_COVER_DAYS', '14')),
+    # Ítems listados por mensaje de WhatsApp
+    'alert_max_items': 30,
+}
+
+# ============================================
+# ANALÍTICA (CUBO DE VENTAS EN MEMORIA)
+# ============================================
+ANALYTICS_CONFIG = {
+    # Segundos entre refrescos incrementales (órdenes modificadas)
+    'refresh_seconds': int(os.getenv('ANALYTICS_REFRESH_SECONDS', '60')),
+    # Segundos entre reconstrucciones completas del cubo
+    'full_rebuild_seconds': int(os.getenv('ANALYTICS_FULL_REBUILD_SECONDS', '21600')),
+}
+
 # ============================================
 # LOGGING
 # ============================================
@@ -3,3 +3,11 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'luxe_service.settings')
 application = get_wsgi_application()
+
+# Precarga del índice de escaneo del POS en cada worker
+from apps.inventario.scan_index import warm_scan_index  # noqa: E402
+warm_scan_index()
+
+# Carga del cubo de ventas en un hilo de fondo (no en la primera petición)
+from apps.pos.analytics import get_sales_cube  # noqa: E402
+get_sales_cube()